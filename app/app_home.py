@@ -0,0 +1,279 @@
+import asyncio
+import copy
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+from logging import Logger
+from typing import Awaitable, Callable, Optional
+
+from .cache import TTLCache
+
+# JSON file of the usage guide, which is shown below the dashboard in App Home
+APP_HOME_VIEW_FILEPATH = os.path.join(
+    os.path.dirname(__file__), "assets/current_app_home_block.json"
+)
+# App Home of a user is published at most once in this many seconds. requests in between are
+# published together when the interval has passed, so that a burst of work reports results in one publish.
+APP_HOME_PUBLISH_INTERVAL_SECONDS = 5.0
+# hashes of views published to users are kept for this many seconds, after which the view is published again
+# even if it is unchanged (another replica may have published a different view in the meantime)
+APP_HOME_HASH_TTL_SECONDS = 600.0
+APP_HOME_HASH_MAXSIZE = 4096
+
+
+class AppHomeViewFile:
+    """
+    the App Home view in a JSON file, which is parsed once and parsed again only when the file is modified.
+    """
+
+    def __init__(self, filepath: str = APP_HOME_VIEW_FILEPATH) -> None:
+        self.filepath = filepath
+        self.loads = 0
+        self._mtime_ns: Optional[int] = None
+        self._view: dict = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> dict:
+        """
+        return the view in the file. the returned dict is shared, so it must not be modified.
+        """
+        try:
+            mtime_ns = os.stat(self.filepath).st_mtime_ns
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"JSON file containing App Home view ({self.filepath}) was not found."
+            ) from None
+        with self._lock:
+            if mtime_ns != self._mtime_ns:
+                with open(self.filepath) as viewfile:
+                    self._view = json.load(viewfile)
+                self._mtime_ns = mtime_ns
+                self.loads += 1
+            return self._view
+
+
+def format_hours(minutes: int) -> str:
+    """
+    return `minutes` in "hh:mm" format, where hours can be more than 24.
+    """
+    return f"{minutes // 60:02}:{minutes % 60:02}"
+
+
+def dashboard_view(
+    guide: dict,
+    month: datetime.date,
+    working_hours_of_all_RAs: list[tuple[str, int]],
+) -> dict:
+    """
+    return App Home view showing work hours of each RA job in `month`, followed by the blocks of `guide`.
+    the view contains no timestamp, so that it is unchanged (and not published again) until the hours change.
+    """
+    if working_hours_of_all_RAs:
+        summary = "\n".join(
+            f"*{ra_name}*:  {format_hours(working_hours)}"
+            for ra_name, working_hours in working_hours_of_all_RAs
+        )
+    else:
+        summary = ":beach_with_umbrella: No work records yet"
+    view = copy.copy(guide)
+    view["blocks"] = [
+        {
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": f":bar_chart: Work hours in {month:%Y/%m}",
+                "emoji": True,
+            },
+        },
+        {"type": "section", "text": {"type": "mrkdwn", "text": summary}},
+        {"type": "divider"},
+    ] + guide.get("blocks", [])
+    return view
+
+
+def view_hash(view: dict) -> str:
+    return hashlib.sha256(
+        json.dumps(view, sort_keys=True, ensure_ascii=False).encode()
+    ).hexdigest()
+
+
+class BaseAppHomePublisher:
+    """
+    publishes App Home of each user, at most once every `interval` seconds per user.
+    a request made within the interval after the last publish is delayed until the interval has passed,
+    and further requests made while it is waiting are merged into it. the view is built when it is published,
+    so that it reflects all writes made until then, and it is not sent to Slack if it is the same as the last one.
+    """
+
+    def __init__(
+        self,
+        logger: Logger,
+        interval: float = APP_HOME_PUBLISH_INTERVAL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.logger = logger
+        self.interval = interval
+        self.clock = clock
+        self.view_file = AppHomeViewFile()
+        # number of views sent to Slack, views not sent since they were unchanged, and requests merged into others
+        self.published = 0
+        self.unchanged = 0
+        self.merged = 0
+        # slack user id -> hash of the view published last time
+        self._hashes: TTLCache[str, str] = TTLCache(
+            maxsize=APP_HOME_HASH_MAXSIZE, ttl=APP_HOME_HASH_TTL_SECONDS, clock=clock
+        )
+        # slack user id -> when a view was published last time, forgotten after the interval
+        self._published_at: TTLCache[str, float] = TTLCache(
+            maxsize=APP_HOME_HASH_MAXSIZE, ttl=interval, clock=clock
+        )
+        # users whose publish is waiting for the interval to pass
+        self._waiting: set[str] = set()
+        self._lock = threading.Lock()
+
+    def has_published(self, slack_user_id: str) -> bool:
+        """
+        return whether App Home has been published to the user recently, i.e. the user has looked at it.
+        """
+        with self._lock:
+            return self._hashes.get(slack_user_id) is not None
+
+    def _schedule(self, slack_user_id: str) -> Optional[float]:
+        """
+        return seconds to wait before publishing to the user, or None if the request is merged into a waiting one.
+        """
+        with self._lock:
+            if slack_user_id in self._waiting:
+                self.merged += 1
+                return None
+            self._waiting.add(slack_user_id)
+            published_at = self._published_at.get(slack_user_id)
+            if published_at is None:
+                return 0.0
+            return max(0.0, published_at + self.interval - self.clock())
+
+    def _begin(self, slack_user_id: str) -> None:
+        """
+        mark the publish to the user as started, so that requests from now on publish views built after this one.
+        """
+        with self._lock:
+            self._waiting.discard(slack_user_id)
+            self._published_at.put(slack_user_id, self.clock())
+
+    def _is_changed(self, slack_user_id: str, view: dict) -> bool:
+        with self._lock:
+            if self._hashes.get(slack_user_id) == view_hash(view):
+                self.unchanged += 1
+                return False
+            return True
+
+    def _published(self, slack_user_id: str, view: dict) -> None:
+        with self._lock:
+            self._hashes.put(slack_user_id, view_hash(view))
+            self.published += 1
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "published": self.published,
+            "unchanged": self.unchanged,
+            "merged": self.merged,
+            "view_file_loads": self.view_file.loads,
+        }
+
+
+class AppHomePublisher(BaseAppHomePublisher):
+    def request(
+        self,
+        slack_user_id: str,
+        build_view: Callable[[], dict],
+        send: Callable[[dict], object],
+    ) -> None:
+        """
+        publish the view returned by `build_view` to the user by `send`, on this thread if the interval
+        has passed since the last publish, or on a timer thread after it has passed.
+        """
+        wait = self._schedule(slack_user_id)
+        if wait is None:
+            return
+        if wait == 0.0:
+            self._publish(slack_user_id, build_view, send)
+            return
+        timer = threading.Timer(
+            wait, self._publish_later, args=(slack_user_id, build_view, send)
+        )
+        timer.daemon = True
+        timer.start()
+
+    def _publish(
+        self,
+        slack_user_id: str,
+        build_view: Callable[[], dict],
+        send: Callable[[dict], object],
+    ) -> None:
+        self._begin(slack_user_id)
+        view = build_view()
+        if self._is_changed(slack_user_id, view):
+            send(view)
+            self._published(slack_user_id, view)
+
+    def _publish_later(self, *args) -> None:
+        try:
+            self._publish(*args)
+        except Exception:
+            self.logger.exception(f"failed to publish App Home to slack user {args[0]}")
+
+
+class AsyncAppHomePublisher(BaseAppHomePublisher):
+    """
+    asyncio version of `AppHomePublisher`, which publishes on a task after the interval has passed.
+    """
+
+    def __init__(
+        self,
+        logger: Logger,
+        interval: float = APP_HOME_PUBLISH_INTERVAL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__(logger=logger, interval=interval, clock=clock)
+        # keep references to the waiting tasks, so that they are not garbage collected
+        self._tasks: set[asyncio.Task] = set()
+
+    async def request(
+        self,
+        slack_user_id: str,
+        build_view: Callable[[], Awaitable[dict]],
+        send: Callable[[dict], Awaitable[object]],
+    ) -> None:
+        wait = self._schedule(slack_user_id)
+        if wait is None:
+            return
+        if wait == 0.0:
+            await self._publish(slack_user_id, build_view, send)
+            return
+        task = asyncio.create_task(
+            self._publish_later(wait, slack_user_id, build_view, send)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _publish(
+        self,
+        slack_user_id: str,
+        build_view: Callable[[], Awaitable[dict]],
+        send: Callable[[dict], Awaitable[object]],
+    ) -> None:
+        self._begin(slack_user_id)
+        view = await build_view()
+        if self._is_changed(slack_user_id, view):
+            await send(view)
+            self._published(slack_user_id, view)
+
+    async def _publish_later(self, wait: float, *args) -> None:
+        await asyncio.sleep(wait)
+        try:
+            await self._publish(*args)
+        except Exception:
+            self.logger.exception(f"failed to publish App Home to slack user {args[0]}")
@@ -0,0 +1,14 @@
+from slack_bolt.async_app import AsyncApp
+
+from ..context import AsyncBotContext
+from . import commands, events
+from .middleware import deduplicate_events_wrapper
+
+
+def register_async_listeners(app: AsyncApp, bot_context: AsyncBotContext):
+    """
+    register listeners to the given app running in async mode.
+    """
+    app.middleware(deduplicate_events_wrapper(bot_context))
+    commands.register(app, bot_context)
+    events.register(app, bot_context)
@@ -0,0 +1,111 @@
+import asyncio
+import datetime
+
+from slack_bolt.async_app import AsyncAck, AsyncBoltContext
+from slack_sdk.web.async_client import AsyncWebClient
+
+from ...compliance import audit_month_async, write_violations_csv
+from ...context import AsyncBotContext
+from ...export import new_spooled_file, upload_file_in_chunks_async
+from ...listeners.commands.admin_compliance_report import summarize_violations
+from ...periods import month_period
+from .export_job import submit_export_job
+
+
+def admin_compliance_report_wrapper(bot_context: AsyncBotContext):
+    botctx = bot_context
+
+    async def admin_compliance_report(
+        ack: AsyncAck,
+        body: dict,
+        client: AsyncWebClient,
+        command: dict,
+        context: AsyncBoltContext,
+    ):
+        await ack()
+
+        # check that `context` variable is available
+        if not (context.channel_id and context.actor_user_id):
+            raise ValueError("something is wrong with `context` variable")
+
+        if context.actor_user_id not in botctx.botcfg.admin_ids:
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=":x: You are not allowed to use this command.",
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} tried to execute /admin_compliance_report, but is not allowed to"
+            )
+            return
+
+        year_month = command["text"].strip()
+        if year_month:
+            try:
+                date = datetime.datetime.strptime(year_month, "%Y/%m")
+            except ValueError:  # `year_month` was in invalid format
+                await botctx.outbound.post_ephemeral(
+                    client,
+                    channel=context.channel_id,
+                    user=context.actor_user_id,
+                    text=":x: Use this command like `/admin_compliance_report 2023/11`.",
+                )
+                botctx.logger.info(
+                    f"slack user {context.actor_user_id} executed /admin_compliance_report with invalid argument: {year_month}"
+                )
+                return
+        else:
+            date = datetime.date.today()
+
+        period = month_period(date, label=year_month or "this month")
+
+        async def admin_compliance_report_job() -> None:
+            async with botctx.db_sessmaker() as sess:
+                violations = await audit_month_async(
+                    sess,
+                    first_day=period.first_day,
+                    first_day_of_next_month=period.first_day_of_next_period,
+                )
+
+            summary = summarize_violations(violations, year=date.year, month=date.month)
+            if violations:
+                with new_spooled_file() as csv_file:
+                    await asyncio.to_thread(
+                        write_violations_csv, violations, binary_file=csv_file
+                    )
+                    dm_with_the_user = await client.conversations_open(
+                        users=context.actor_user_id
+                    )
+                    # upload the list of violations and send user the URL to it
+                    await upload_file_in_chunks_async(
+                        client=client,
+                        channel=dm_with_the_user["channel"]["id"],
+                        title=f"Violations of work rules in {date.year}/{date.month}",
+                        filename=f"{date.year}_{date.month}_compliance_report.csv",
+                        file=csv_file,
+                    )
+                summary += (
+                    "\n:page_facing_up: Sent you a CSV file of the violations in DM."
+                )
+
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=summary,
+            )
+
+            botctx.logger.info(
+                f"sent compliance report of {date.year}/{date.month} with {len(violations)} violations to slack user {context.actor_user_id}"
+            )
+
+        await submit_export_job(
+            botctx,
+            client=client,
+            context=context,
+            kind="admin_compliance_report",
+            run=admin_compliance_report_job,
+        )
+
+    return admin_compliance_report
@@ -0,0 +1,140 @@
+import asyncio
+
+from slack_bolt.async_app import AsyncAck, AsyncBoltContext
+from slack_sdk.web.async_client import AsyncWebClient
+
+from ...context import AsyncBotContext
+from ...export import (
+    ExportLayout,
+    export_all_records_async,
+    new_spooled_file,
+    parquet_available,
+    upload_file_in_chunks_async,
+)
+from ...export_cache import ALL_USERS
+from ...listeners.commands.admin_download_all_records import (
+    USAGE_TEXT,
+    all_records_file,
+    parse_all_records_arguments,
+)
+from .export_job import submit_export_job
+
+
+def admin_download_all_records_wrapper(bot_context: AsyncBotContext):
+    botctx = bot_context
+
+    async def admin_download_all_records(
+        ack: AsyncAck,
+        body: dict,
+        client: AsyncWebClient,
+        command: dict,
+        context: AsyncBoltContext,
+    ):
+        await ack()
+
+        # check that `context` variable is available
+        if not (context.channel_id and context.actor_user_id):
+            raise ValueError("something is wrong with `context` variable")
+
+        if context.actor_user_id not in botctx.botcfg.admin_ids:
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=":x: You are not allowed to use this command.",
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} tried to execute /admin_download_all_records, but is not allowed to"
+            )
+            return
+
+        arguments = parse_all_records_arguments(command["text"])
+        if arguments is None:  # the argument was in invalid format
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=USAGE_TEXT,
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} executed /admin_download_all_records with invalid argument: {command['text']}"
+            )
+            return
+        period, layout = arguments
+        if layout == ExportLayout.PARQUET and not parquet_available():
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=":x: Parquet files are not available since the bot is installed without the `parquet` extra.",
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} requested a Parquet file, but pyarrow is not installed"
+            )
+            return
+        title, filename = all_records_file(period, layout)
+
+        async def admin_download_all_records_job() -> None:
+            cache_key = botctx.export_cache.key(
+                scope=ALL_USERS,
+                months=period.months,
+                export_format=layout.value,
+            )
+            # files are read, encoded and written in threads, so that a large export never blocks the event loop
+            cached_file = await asyncio.to_thread(botctx.export_cache.get, cache_key)
+            with cached_file or new_spooled_file() as export_file:
+                if cached_file is None:
+                    # get all records within the specified period by a single query and write them into
+                    # a spooled file batch by batch, so that memory usage stays flat regardless of the number of records
+                    async with botctx.db_sessmaker() as sess:
+                        num_records = await export_all_records_async(
+                            sess,
+                            first_day=period.first_day,
+                            first_day_of_next_period=period.first_day_of_next_period,
+                            binary_file=export_file,
+                            layout=layout,
+                        )
+                    if not num_records:
+                        await botctx.outbound.post_ephemeral(
+                            client,
+                            channel=context.channel_id,
+                            user=context.actor_user_id,
+                            text=f":beach_with_umbrella: No work records found in {period.label}",
+                        )
+                        botctx.logger.info(
+                            f"found no work record in {period.label} for any user"
+                        )
+                        return
+                    await asyncio.to_thread(
+                        botctx.export_cache.put, cache_key, file=export_file
+                    )
+                else:
+                    botctx.logger.info(
+                        f"reused cached file of all work records in {period.label}"
+                    )
+
+                dm_with_the_user = await client.conversations_open(
+                    users=context.actor_user_id
+                )
+                # upload the file and send user the URL to it
+                await upload_file_in_chunks_async(
+                    client=client,
+                    channel=dm_with_the_user["channel"]["id"],
+                    title=title,
+                    filename=filename,
+                    file=export_file,
+                )
+
+            botctx.logger.info(
+                f"sent file of all work records in {period.label} to slack user {context.actor_user_id}"
+            )
+
+        await submit_export_job(
+            botctx,
+            client=client,
+            context=context,
+            kind="admin_download_all_records",
+            run=admin_download_all_records_job,
+        )
+
+    return admin_download_all_records
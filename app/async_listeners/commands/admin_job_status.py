@@ -0,0 +1,54 @@
+from slack_bolt.async_app import AsyncAck, AsyncBoltContext
+from slack_sdk.web.async_client import AsyncWebClient
+
+from ...context import AsyncBotContext
+from ...db.pool import pool_stats
+from ...listeners.commands.admin_job_status import (
+    db_pool_status_message,
+    job_status_message,
+)
+
+
+def admin_job_status_wrapper(bot_context: AsyncBotContext):
+    botctx = bot_context
+
+    async def admin_job_status(
+        ack: AsyncAck,
+        body: dict,
+        client: AsyncWebClient,
+        command: dict,
+        context: AsyncBoltContext,
+    ):
+        await ack()
+
+        # check that `context` variable is available
+        if not (context.channel_id and context.actor_user_id):
+            raise ValueError("something is wrong with `context` variable")
+
+        if context.actor_user_id not in botctx.botcfg.admin_ids:
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=":x: You are not allowed to use this command.",
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} tried to execute /admin_job_status, but is not allowed to"
+            )
+            return
+
+        await botctx.outbound.post_ephemeral(
+            client,
+            channel=context.channel_id,
+            user=context.actor_user_id,
+            text="\n\n".join(
+                [
+                    job_status_message(botctx.jobs.stats()),
+                    db_pool_status_message(
+                        pool_stats(botctx.db_sessmaker.kw["bind"].sync_engine)
+                    ),
+                ]
+            ),
+        )
+
+    return admin_job_status
@@ -0,0 +1,116 @@
+import asyncio
+import io
+
+from slack_bolt.async_app import AsyncAck, AsyncBoltContext
+from slack_sdk.web.async_client import AsyncWebClient
+
+from ...context import AsyncBotContext
+from ...export import encode_user_records
+from ...listeners.commands.download_csv import user_records_file
+from ...periods import parse_period
+from ...services.timecards import get_user_records
+from .export_job import submit_export_job
+
+
+def download_csv_wrapper(bot_context: AsyncBotContext):
+    botctx = bot_context
+
+    async def download_csv(
+        ack: AsyncAck,
+        body: dict,
+        client: AsyncWebClient,
+        command: dict,
+        context: AsyncBoltContext,
+    ):
+        await ack()
+
+        # check that `context` variable is available
+        if not (context.channel_id and context.actor_user_id):
+            raise ValueError("something is wrong with `context` variable")
+
+        period = parse_period(command["text"])
+        if period is None:  # the argument was in invalid format
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=":x: Use this command like `/download_csv 2023/11`, `/download_csv 2024/04-2025/03` or `/download_csv fy2024`.",
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} executed /download_csv with invalid argument: {command['text']}"
+            )
+            return
+
+        layout, title, filename = user_records_file(period)
+
+        async def export_csv() -> None:
+            """
+            get all records within the specified period and send them to the user in DM as a CSV (or ZIP) file.
+            the file is reused until a record within the period is written.
+            """
+            cache_key = botctx.export_cache.key(
+                scope=context.actor_user_id,
+                months=period.months,
+                export_format=layout.value,
+            )
+            # files are encoded, read and written in threads, so that the event loop is not blocked
+            if cached_file := await asyncio.to_thread(
+                botctx.export_cache.get, cache_key
+            ):
+                with cached_file:
+                    file_bytes = await asyncio.to_thread(cached_file.read)
+                botctx.logger.info(
+                    f"reused cached CSV file of work record of slack user {context.actor_user_id}"
+                )
+            else:
+                async with botctx.db_sessmaker() as sess:
+                    records = await sess.run_sync(
+                        get_user_records,
+                        slack_user_id=context.actor_user_id,
+                        first_day=period.first_day,
+                        first_day_of_next_period=period.first_day_of_next_period,
+                    )
+                if not records:
+                    await botctx.outbound.post_ephemeral(
+                        client,
+                        channel=context.channel_id,
+                        user=context.actor_user_id,
+                        text=f":beach_with_umbrella: No work records found in {period.label}",
+                    )
+                    botctx.logger.info(
+                        f"found no work record in {period.label} for slack user {context.actor_user_id}"
+                    )
+                    return
+
+                # make CSV file
+                file_bytes = await asyncio.to_thread(
+                    encode_user_records, records=records, layout=layout
+                )
+                await asyncio.to_thread(
+                    botctx.export_cache.put, cache_key, file=io.BytesIO(file_bytes)
+                )
+
+            dm_with_the_user = await client.conversations_open(
+                users=context.actor_user_id
+            )
+            # upload the file and send user the URL to it
+            await client.files_upload_v2(
+                channel=dm_with_the_user["channel"]["id"],
+                title=title,
+                filename=filename,
+                content=file_bytes,
+            )
+
+            botctx.logger.info(
+                f"sent CSV file of work record to slack user {context.actor_user_id}"
+            )
+
+        await submit_export_job(
+            botctx,
+            client=client,
+            context=context,
+            kind="download_csv",
+            run=export_csv,
+        )
+
+    return download_csv
@@ -0,0 +1,63 @@
+import asyncio
+from typing import Awaitable, Callable
+
+from slack_bolt.async_app import AsyncBoltContext
+from slack_sdk.web.async_client import AsyncWebClient
+
+from ...context import AsyncBotContext
+from ...jobs import JobRejectedError
+
+
+async def submit_export_job(
+    botctx: AsyncBotContext,
+    client: AsyncWebClient,
+    context: AsyncBoltContext,
+    kind: str,
+    run: Callable[[], Awaitable[None]],
+) -> None:
+    """
+    asyncio version of `listeners.commands.export_job.submit_export_job`.
+    """
+
+    # the job waits until the user is told that it has been accepted, so that the file (or the failure)
+    # never reaches the user before the acknowledgement
+    acknowledged = asyncio.Event()
+
+    async def run_and_report_failure() -> None:
+        await acknowledged.wait()
+        try:
+            await run()
+        except Exception:
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=":x: Failed to send you the file. Please try again later.",
+            )
+            raise
+
+    try:
+        botctx.jobs.submit(
+            kind=kind, slack_user_id=context.actor_user_id, run=run_and_report_failure
+        )
+    except JobRejectedError as e:
+        await botctx.outbound.post_ephemeral(
+            client,
+            channel=context.channel_id,
+            user=context.actor_user_id,
+            text=":hourglass: Your previous file is still being prepared, or too many files are being prepared now. Please try again later.",
+        )
+        botctx.logger.info(
+            f"rejected /{kind} of slack user {context.actor_user_id}: {e}"
+        )
+        return
+
+    try:
+        await botctx.outbound.post_ephemeral(
+            client,
+            channel=context.channel_id,
+            user=context.actor_user_id,
+            text=":hourglass_flowing_sand: Preparing the file. It will be sent to you in DM.",
+        )
+    finally:
+        acknowledged.set()
@@ -0,0 +1,69 @@
+from slack_bolt.async_app import AsyncAck, AsyncBoltContext
+from slack_sdk.web.async_client import AsyncWebClient
+
+from ...context import AsyncBotContext
+from ...listeners.commands.get_working_hours import working_hours_message
+from ...periods import parse_period
+from ...services.timecards import sum_working_hours
+
+
+def get_working_hours_wrapper(bot_context: AsyncBotContext):
+    botctx = bot_context
+
+    async def get_working_hours(
+        ack: AsyncAck,
+        body: dict,
+        client: AsyncWebClient,
+        command: dict,
+        context: AsyncBoltContext,
+    ):
+        await ack()
+
+        # check that `context` variable is available
+        if not (context.channel_id and context.actor_user_id):
+            raise ValueError("something is wrong with `context` variable")
+
+        period = parse_period(command["text"])
+        if period is None:  # the argument was in invalid format
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=":x: Use this command like `/get_working_hours 2023/11`, `/get_working_hours 2024/04-2025/03` or `/get_working_hours fy2024`.",
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} executed /get_working_hours with invalid argument: {command['text']}"
+            )
+            return
+
+        async with botctx.db_sessmaker() as sess:
+            working_hours_of_all_RAs = await sess.run_sync(
+                sum_working_hours,
+                slack_user_id=context.actor_user_id,
+                first_day=period.first_day,
+                first_day_of_next_period=period.first_day_of_next_period,
+            )
+
+        if working_hours_of_all_RAs:
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=working_hours_message(
+                    period=period.label,
+                    working_hours_of_all_RAs=working_hours_of_all_RAs,
+                ),
+            )
+            botctx.logger.info(f"sent work hours to slack user {context.actor_user_id}")
+        else:
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=f":beach_with_umbrella: No work records found in {period.label}",
+            )
+            botctx.logger.info(
+                f"found no work record in {period.label} for slack user {context.actor_user_id}"
+            )
+
+    return get_working_hours
@@ -0,0 +1,106 @@
+from slack_bolt.async_app import AsyncAck, AsyncBoltContext
+from slack_sdk.web.async_client import AsyncWebClient
+from sqlalchemy.exc import IntegrityError
+
+from ...context import AsyncBotContext
+from ...services.users import register_user
+from ..events.on_app_home_opened import publish_app_home
+
+
+def init_wrapper(bot_context: AsyncBotContext):
+    botctx = bot_context
+
+    async def init(
+        ack: AsyncAck,
+        body: dict,
+        client: AsyncWebClient,
+        command: dict,
+        context: AsyncBoltContext,
+    ):
+        await ack()
+
+        # check that `context` variable is available
+        if not (context.channel_id and context.actor_user_id):
+            raise ValueError("something is wrong with `context` variable")
+
+        username = command["text"].strip()
+        if not username:
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=":x: Use this command like `/init <Your Name>`",
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} executed /init command with no argument"
+            )
+            return
+
+        # check that username doesn't contain redundant prefix/suffix
+        REDUNDANT_CHARS = ["<", ">", "*"]
+        if username[0] in REDUNDANT_CHARS or username[-1] in REDUNDANT_CHARS:
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=":x: Don't enclose your name between symbols",
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} executed /init command enclosing their name in symbols: {username}"
+            )
+            return
+
+        async with botctx.db_sessmaker() as sess:
+            try:
+                # add the user to the database
+                is_registered = await sess.run_sync(
+                    register_user,
+                    slack_user_id=context.actor_user_id,
+                    name=username,
+                    cache=botctx.id_cache,
+                )
+            except IntegrityError:
+                # exceptions other than UniqueViolation
+                await botctx.outbound.post_ephemeral(
+                    client,
+                    channel=context.channel_id,
+                    user=context.actor_user_id,
+                    text=":x: Failed to register due to some database error.",
+                )
+                botctx.logger.exception(
+                    f"failed to register slack user {context.actor_user_id} as bot user due to a database error"
+                )
+                return
+        if not is_registered:
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=f":thinking_face: Hi {username}, it seems you've been registered already.",
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} executed /init, but is already registered as bot user"
+            )
+            return
+
+        # publish App Home view to the user
+        await publish_app_home(
+            botctx, client=client, slack_user_id=context.actor_user_id
+        )
+        await botctx.outbound.post_ephemeral(
+            client,
+            channel=context.channel_id,
+            user=context.actor_user_id,
+            text=":email: Check DM from this bot.",
+        )
+        dm_with_the_user = await client.conversations_open(users=context.actor_user_id)
+        await client.chat_postMessage(
+            channel=dm_with_the_user["channel"]["id"],
+            text=f':white_check_mark: Hi {username}, you\'ve been successfully registered.\n:rocket: Open the "Home" tab above and read the usage guide!',
+            mrkdwn=True,
+        )
+        botctx.logger.info(
+            f"registered slack user {context.actor_user_id} as new bot user with the name {username}"
+        )
+
+    return init
@@ -0,0 +1,102 @@
+from slack_bolt.async_app import AsyncAck, AsyncBoltContext
+from slack_sdk.web.async_client import AsyncWebClient
+
+from ...context import AsyncBotContext
+from ...services.users import RegisterRAResult, register_ra
+
+
+def register_RA_wrapper(bot_context: AsyncBotContext):
+    botctx = bot_context
+
+    async def register_RA(
+        ack: AsyncAck,
+        body: dict,
+        client: AsyncWebClient,
+        command: dict,
+        context: AsyncBoltContext,
+    ):
+        await ack()
+
+        # check that `context` variable is available
+        if not (context.channel_id and context.actor_user_id):
+            raise ValueError("something is wrong with `context` variable")
+
+        ra_name = command["text"].strip()
+        if not ra_name:
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=":x: Use this command like `/register_ra <RA Job Name (e.g. CREST, NTT, ...)>`",
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} executed /register_ra command with no argument"
+            )
+            return
+
+        # check that ra_name doesn't contain redundant prefix/suffix
+        REDUNDANT_CHARS = ["<", ">", "*"]
+        if ra_name[0] in REDUNDANT_CHARS or ra_name[-1] in REDUNDANT_CHARS:
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=":x: Don't enclose RA name between symbols",
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} executed /register_ra command enclosing RA name in symbols: {ra_name}"
+            )
+            return
+
+        async with botctx.db_sessmaker() as sess:
+            try:
+                result = await sess.run_sync(
+                    register_ra,
+                    slack_user_id=context.actor_user_id,
+                    ra_name=ra_name,
+                    cache=botctx.id_cache,
+                )
+            except Exception:
+                await botctx.outbound.post_ephemeral(
+                    client,
+                    channel=context.channel_id,
+                    user=context.actor_user_id,
+                    text=":x: Failed to register RA Job due to some database error.",
+                )
+                botctx.logger.exception(
+                    f"failed to register RA Job {ra_name} for slack user {context.actor_user_id} due to a database error"
+                )
+                raise
+
+        if result == RegisterRAResult.USER_NOT_FOUND:
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=":x: You have to register first with `/init <Your Name>`.",
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} executed /register_ra, but is not registered as bot user yet"
+            )
+        elif result == RegisterRAResult.ALREADY_REGISTERED:
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=f":x: RA {ra_name} is already registered for you",
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} executed /register_ra, but RA job {ra_name} is already registered for the user."
+            )
+        else:
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=f':white_check_mark: RA Job "{ra_name}" has been successfully registered.',
+            )
+            botctx.logger.info(
+                f"registered RA Job {ra_name} for slack user {context.actor_user_id}"
+            )
+
+    return register_RA
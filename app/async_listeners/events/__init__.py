@@ -0,0 +1,24 @@
+from slack_bolt.async_app import AsyncApp
+
+from ...context import AsyncBotContext
+from ..middleware import measure_listener_wrapper
+from .on_app_home_opened import on_app_home_opened_wrapper
+from .on_mention import on_mention_wrapper
+from .on_message_delete import on_message_delete_wrapper
+from .on_message_events_to_ignore import on_message_events_to_ignore_handler
+
+
+def register(app: AsyncApp, bot_context: AsyncBotContext):
+    measure = measure_listener_wrapper(bot_context)
+    app.event("app_mention")(measure("app_mention", on_mention_wrapper(bot_context)))
+    app.event("app_home_opened")(
+        measure("app_home_opened", on_app_home_opened_wrapper(bot_context))
+    )
+    # IMPORTANT: using `app.event("message")` multiple times will make the bot fail to register handlers but the first one.
+    app.event({"type": "message", "subtype": "message_deleted"})(
+        measure("message_deleted", on_message_delete_wrapper(bot_context))
+    )
+    # ignore all "message" type events except those with "message_deleted" subtype (that is handled above).
+    app.event({"type": "message"})(
+        measure("message", on_message_events_to_ignore_handler)
+    )
@@ -0,0 +1,50 @@
+import datetime
+
+from slack_sdk.web.async_client import AsyncWebClient
+
+from ...app_home import dashboard_view
+from ...context import AsyncBotContext
+from ...periods import month_period
+from ...services.timecards import sum_working_hours
+
+
+async def publish_app_home(
+    botctx: AsyncBotContext, client: AsyncWebClient, slack_user_id: str
+) -> None:
+    """
+    asyncio version of `publish_app_home` of sync mode.
+    """
+
+    async def build_view() -> dict:
+        period = month_period(datetime.date.today(), label="this month")
+        async with botctx.db_sessmaker() as sess:
+            working_hours_of_all_RAs = await sess.run_sync(
+                sum_working_hours,
+                slack_user_id=slack_user_id,
+                first_day=period.first_day,
+                first_day_of_next_period=period.first_day_of_next_period,
+            )
+        return dashboard_view(
+            guide=botctx.app_home.view_file.load(),
+            month=period.first_day,
+            working_hours_of_all_RAs=working_hours_of_all_RAs,
+        )
+
+    async def send(view: dict) -> None:
+        await botctx.outbound.send(
+            lambda: client.views_publish(user_id=slack_user_id, view=view)
+        )
+
+    await botctx.app_home.request(slack_user_id, build_view=build_view, send=send)
+
+
+def on_app_home_opened_wrapper(bot_context: AsyncBotContext):
+    botctx = bot_context
+
+    async def on_app_home_opened(event: dict, client: AsyncWebClient):
+        # this event also occurs when the messages tab is opened
+        if event.get("tab") != "home":
+            return
+        await publish_app_home(botctx, client=client, slack_user_id=event["user"])
+
+    return on_app_home_opened
@@ -0,0 +1,164 @@
+from slack_bolt.async_app import AsyncBoltContext
+from slack_sdk.web.async_client import AsyncWebClient
+
+from ...context import AsyncBotContext
+from ...listeners.events.on_mention import (
+    INCORRECT_DURATION_FORMAT_TEXT,
+    incorrect_message_format_blocks,
+    work_record_summary,
+)
+from ...parsing import ParseError, ParseErrorKind, parse_work_report
+from ...replies import ReplyAggregator
+from ...services.timecards import record_timecard
+from ...services.users import resolve_ra_id
+from ...workrules import WorkRules
+from .on_app_home_opened import publish_app_home
+
+
+def on_mention_wrapper(bot_context: AsyncBotContext):
+    botctx = bot_context
+
+    # NOTE: **This event also occurs when a message is edited**
+    # see `listeners.events.on_mention` for the synchronous version of this handler.
+
+    async def on_mention(
+        event: dict, context: AsyncBoltContext, client: AsyncWebClient
+    ):
+        # check that `context` variable is available
+        if not (context.channel_id and context.actor_user_id):
+            raise ValueError("something is wrong with `context` variable")
+
+        slack_message_ts = event["ts"]
+        parsed = parse_work_report(event["text"])
+        if (
+            isinstance(parsed, ParseError)
+            and parsed.kind == ParseErrorKind.MESSAGE_FORMAT
+        ):
+            botctx.metrics.parse_failures.inc(kind=parsed.kind.name.lower())
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=":x: Your message is in incorrect format. Write it in the following format:",
+                blocks=incorrect_message_format_blocks(),
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} sent work record in invalid format"
+            )
+            return
+
+        # ensure that this user and RA is registered
+        ra_name = parsed.ra_name
+        async with botctx.db_sessmaker() as sess:
+            ra_id = await sess.run_sync(
+                resolve_ra_id,
+                slack_user_id=context.actor_user_id,
+                ra_name=ra_name,
+                cache=botctx.id_cache,
+            )
+        if ra_id is None:
+            botctx.metrics.unknown_ra_rejections.inc()
+            await botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=f":x: You've never registered RA Job named \"{ra_name}\", or you've not completed user registration.",
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} sent work record for unknown RA Job: {ra_name}"
+            )
+            return
+
+        if isinstance(parsed, ParseError):
+            botctx.metrics.parse_failures.inc(kind=parsed.kind.name.lower())
+            if parsed.kind == ParseErrorKind.DURATION_FORMAT:
+                await botctx.outbound.post_ephemeral(
+                    client,
+                    channel=context.channel_id,
+                    user=context.actor_user_id,
+                    text=INCORRECT_DURATION_FORMAT_TEXT,
+                )
+                botctx.logger.info(
+                    f"slack user {context.actor_user_id} sent work record whose date is in invalid format: {parsed.detail}"
+                )
+            else:
+                text = ":x: There are invalid values in the working hours."
+                if parsed.hint:
+                    text += f" {parsed.hint}"
+                await botctx.outbound.post_ephemeral(
+                    client,
+                    channel=context.channel_id,
+                    user=context.actor_user_id,
+                    text=text,
+                )
+                botctx.logger.info(
+                    f"slack user {context.actor_user_id} sent work record including invalid datetime values: {parsed.detail}"
+                )
+            return
+        report = parsed
+
+        # add a new record, or update the existing one if the message was edited or delivered again
+        async with botctx.db_sessmaker() as sess:
+            try:
+                record, is_new, previous_start_time = await sess.run_sync(
+                    record_timecard,
+                    ra_id=ra_id,
+                    start_time=report.start_time,
+                    end_time=report.end_time,
+                    break_duration=report.break_duration,
+                    description=report.description,
+                    slack_message_ts=slack_message_ts,
+                )
+            except Exception:
+                await botctx.outbound.post_ephemeral(
+                    client,
+                    channel=context.channel_id,
+                    user=context.actor_user_id,
+                    text=":x: Failed to record your work due to some database error.",
+                )
+                botctx.logger.exception(
+                    f"failed to record work by slack user {context.actor_user_id} for RA Job {ra_name} due to a database error"
+                )
+                raise
+
+        # files exported for the month of the record (and the month it was in before being edited) are now stale
+        botctx.export_cache.invalidate_month(record.start_time)
+        if previous_start_time is not None:
+            botctx.export_cache.invalidate_month(previous_start_time)
+
+        # reply the summary and warnings, if any, in a single message
+        replies = ReplyAggregator()
+        replies.add(
+            work_record_summary(
+                headline=(
+                    ":white_check_mark: Your work was recorded."
+                    if is_new
+                    else ":white_check_mark: Your work record was updated."
+                ),
+                ra_name=ra_name,
+                work_datetime=report.work_datetime,
+                duration=record.duration,
+                break_duration=record.break_duration,
+                description=report.description,
+            )
+        )
+        for warning in WorkRules.generate_warnings_about_all_rules(record=record):
+            replies.add(warning)
+        await botctx.outbound.post_ephemeral(
+            client,
+            channel=context.channel_id,
+            user=context.actor_user_id,
+            text=replies.text(),
+            blocks=replies.blocks(),
+        )
+        botctx.logger.info(
+            f"{'recorded work' if is_new else 'updated work record'} by slack user {context.actor_user_id} for RA Job {ra_name}: {report.description}"
+        )
+
+        # update the work hours on App Home, if the user has been looking at it
+        if botctx.app_home.has_published(context.actor_user_id):
+            await publish_app_home(
+                botctx, client=client, slack_user_id=context.actor_user_id
+            )
+
+    return on_mention
@@ -0,0 +1,54 @@
+from slack_bolt.async_app import AsyncBoltContext
+from slack_sdk.web.async_client import AsyncWebClient
+
+from ...context import AsyncBotContext
+from ...services.timecards import delete_timecard
+from .on_app_home_opened import publish_app_home
+
+
+def on_message_delete_wrapper(bot_context: AsyncBotContext):
+    botctx = bot_context
+
+    async def on_message_delete(
+        event: dict, context: AsyncBoltContext, client: AsyncWebClient
+    ):
+        # check that `context` variable is available
+        if not (context.channel_id and context.actor_user_id):
+            raise ValueError("something is wrong with `context` variable")
+
+        deleted_slack_message_ts = event["deleted_ts"]
+        async with botctx.db_sessmaker() as sess:
+            try:
+                record_to_delete = await sess.run_sync(
+                    delete_timecard, slack_message_ts=deleted_slack_message_ts
+                )
+                if not record_to_delete:
+                    return  # the deleted message is not a report of work
+            except Exception:
+                await botctx.outbound.post_ephemeral(
+                    client,
+                    channel=context.channel_id,
+                    user=context.actor_user_id,
+                    text=":x: Failed to delete your work record due to some database error.",
+                )
+                botctx.logger.exception(
+                    f"failed to delete work record whose ts is {deleted_slack_message_ts} by slack user {context.actor_user_id} due to a database error"
+                )
+                raise
+            else:
+                botctx.export_cache.invalidate_month(record_to_delete.start_time)
+                await botctx.outbound.post_ephemeral(
+                    client,
+                    channel=context.channel_id,
+                    user=context.actor_user_id,
+                    text=f":wastebasket: Deleted record of you work from {record_to_delete.start_time} to {record_to_delete.end_time}.",
+                )
+                botctx.logger.info(
+                    f"deleted work record by slack user {context.actor_user_id} from {record_to_delete.start_time} to {record_to_delete.end_time}: {record_to_delete.description}"
+                )
+                if botctx.app_home.has_published(context.actor_user_id):
+                    await publish_app_home(
+                        botctx, client=client, slack_user_id=context.actor_user_id
+                    )
+
+    return on_message_delete
@@ -0,0 +1,11 @@
+from slack_bolt.async_app import AsyncBoltContext
+
+
+async def on_message_events_to_ignore_handler(context: AsyncBoltContext):
+    """This handler does nothing other than responding with Ack function
+
+    Args:
+        context (AsyncBoltContext): The context information provided by Bolt
+    """
+
+    await context.ack()
@@ -0,0 +1,65 @@
+import functools
+from typing import Awaitable, Callable, Optional
+
+from slack_bolt import BoltResponse
+
+from ..context import AsyncBotContext
+from ..dedup import SEEN_EVENTS_RETENTION, event_dedup_key
+from ..services.events import claim_event, prune_seen_events
+
+
+def deduplicate_events_wrapper(bot_context: AsyncBotContext):
+    botctx = bot_context
+
+    # see `listeners.middleware` for the synchronous version of this middleware.
+
+    async def deduplicate_events(
+        body: dict, next: Callable[[], Awaitable[None]]
+    ) -> Optional[BoltResponse]:
+        event_key = event_dedup_key(body)
+        if event_key is None:  # not an event
+            return await next()
+
+        is_new = botctx.event_deduplicator.add(event_key)
+        if is_new and botctx.botcfg.persist_seen_events:
+            async with botctx.db_sessmaker() as sess:
+                is_new = await sess.run_sync(claim_event, event_key=event_key)
+                if botctx.event_deduplicator.should_prune():
+                    await sess.run_sync(
+                        prune_seen_events, retention=SEEN_EVENTS_RETENTION
+                    )
+        if not is_new:
+            botctx.event_deduplicator.count_duplicate()
+            botctx.logger.info(
+                f"dropped event {event_key} delivered more than once ({botctx.event_deduplicator.duplicates} in total)"
+            )
+            # ack the copy without passing it to listeners
+            return BoltResponse(status=200, body="")
+        return await next()
+
+    return deduplicate_events
+
+
+def measure_listener_wrapper(bot_context: AsyncBotContext):
+    botctx = bot_context
+
+    # see `listeners.middleware` for the synchronous version of this wrapper.
+
+    def measure_listener(name: str, listener: Callable) -> Callable:
+        @functools.wraps(listener)
+        async def measured_listener(**kwargs):
+            if "client" in kwargs:
+                botctx.metrics.instrument_async_client(kwargs["client"])
+            with (
+                botctx.traces_sampler.transaction(name),
+                botctx.metrics.time_handler(name),
+            ):
+                try:
+                    return await listener(**kwargs)
+                except Exception:
+                    botctx.traces_sampler.record_error(name)
+                    raise
+
+        return measured_listener
+
+    return measure_listener
@@ -0,0 +1,223 @@
+import argparse
+import datetime
+import logging
+import time
+from dataclasses import dataclass, field
+from logging import Logger
+from typing import Iterator, Optional
+
+from slack_sdk.web.client import WebClient
+from sqlalchemy.orm import Session, sessionmaker
+
+from .outbound import OutboundQueue
+from .parsing import ParseError, parse_work_report
+from .services.timecards import insert_missing_timecards
+from .services.users import get_all_ra_ids
+
+# messages (and channels) requested per page, which is the maximum allowed by Slack
+HISTORY_PAGE_SIZE = 999
+# records added in one transaction
+BACKFILL_BATCH_SIZE = 1000
+
+
+@dataclass
+class BackfillStats:
+    """
+    progress of a backfill
+    """
+
+    # messages read from channel histories, and those of them mentioning the bot
+    messages: int = 0
+    mentions: int = 0
+    # mentions that `on_mention` would have rejected
+    parse_failures: int = 0
+    unknown_ra: int = 0
+    # records added, i.e. work reports that had not been recorded
+    added: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def messages_per_second(self) -> float:
+        return self.messages / max(time.monotonic() - self.started_at, 1e-9)
+
+    def summary(self) -> str:
+        return (
+            f"{self.messages} messages read ({self.messages_per_second:.0f} messages/s), "
+            f"{self.mentions} mentions, {self.added} records added, "
+            f"{self.parse_failures} in invalid format, {self.unknown_ra} for unknown RA jobs"
+        )
+
+
+def bot_channel_ids(client: WebClient, outbound: OutboundQueue) -> list[str]:
+    """
+    return ids of the channels the bot is a member of.
+    """
+    channel_ids = []
+    cursor = None
+    while True:
+        response = outbound.send(
+            lambda: client.users_conversations(
+                types="public_channel,private_channel",
+                limit=HISTORY_PAGE_SIZE,
+                cursor=cursor,
+            )
+        )
+        channel_ids.extend(channel["id"] for channel in response["channels"])
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            return channel_ids
+
+
+def iter_history(
+    client: WebClient,
+    outbound: OutboundQueue,
+    channel_id: str,
+    oldest: Optional[datetime.datetime] = None,
+) -> Iterator[list[dict]]:
+    """
+    yield pages of messages sent to the channel (after `oldest`, if given), from the newest.
+    replies in threads are not included, as in `conversations.history`.
+    """
+    cursor = None
+    while True:
+        response = outbound.send(
+            lambda: client.conversations_history(
+                channel=channel_id,
+                oldest=str(oldest.timestamp()) if oldest else None,
+                limit=HISTORY_PAGE_SIZE,
+                cursor=cursor,
+            )
+        )
+        yield response["messages"]
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if not response.get("has_more") or not cursor:
+            return
+
+
+def backfill(
+    client: WebClient,
+    sessmaker: sessionmaker[Session],
+    logger: Logger,
+    channel_ids: list[str],
+    oldest: Optional[datetime.datetime] = None,
+    batch_size: int = BACKFILL_BATCH_SIZE,
+) -> BackfillStats:
+    """
+    read the histories of the channels and record work reported by messages mentioning the bot
+    which have not been recorded (e.g. they were sent while the bot was down), in the same way as `on_mention`.
+    records are added `batch_size` at a time, and work reports that have been recorded are left as they are.
+    """
+    outbound = OutboundQueue()
+    bot_user_id = outbound.send(lambda: client.auth_test())["user_id"]
+    mention = f"<@{bot_user_id}>"
+    with sessmaker() as sess:
+        ra_ids = get_all_ra_ids(sess)
+
+    stats = BackfillStats()
+    records: list[dict] = []
+
+    def flush() -> None:
+        with sessmaker() as sess:
+            stats.added += insert_missing_timecards(sess, records)
+        records.clear()
+        logger.info(stats.summary())
+
+    for channel_id in channel_ids:
+        for messages in iter_history(client, outbound, channel_id, oldest=oldest):
+            stats.messages += len(messages)
+            for message in messages:
+                # messages with subtype (e.g. those of bots or joins) don't trigger `on_mention`
+                if message.get("subtype") or mention not in message.get("text", ""):
+                    continue
+                stats.mentions += 1
+                parsed = parse_work_report(message["text"])
+                if isinstance(parsed, ParseError):
+                    stats.parse_failures += 1
+                    continue
+                ra_id = ra_ids.get((message["user"], parsed.ra_name))
+                if ra_id is None:
+                    stats.unknown_ra += 1
+                    continue
+                records.append(
+                    {
+                        "ra_id": ra_id,
+                        "start_time": parsed.start_time,
+                        "end_time": parsed.end_time,
+                        "break_duration": parsed.break_duration,
+                        "description": parsed.description,
+                        "slack_message_ts": message["ts"],
+                    }
+                )
+                if len(records) >= batch_size:
+                    flush()
+        logger.info(f"finished reading channel {channel_id}")
+    flush()
+    return stats
+
+
+if __name__ == "__main__":
+    # CLI to recover work reports sent while the bot was down, e.g. `python -m app.backfill --dbconfig <path> --slackconfig <path>`
+    from sqlalchemy import create_engine
+
+    from .config import DBConfig, SlackConfig
+    from .db.setup import get_db_url
+
+    parser = argparse.ArgumentParser(
+        description="Record work reports of RA timecard recorder missed while the bot was down, from channel histories"
+    )
+    parser.add_argument(
+        "--dbconfig",
+        help="JSON file containing database configuration (if not given, environment variables will be used)",
+    )
+    parser.add_argument(
+        "--slackconfig",
+        help="JSON file containing slack configuration (if not given, environment variables will be used)",
+    )
+    parser.add_argument(
+        "--channel",
+        help="ID of a channel to read (can be given more than once). if not given, all channels the bot is in are read",
+        action="append",
+        dest="channels",
+    )
+    parser.add_argument(
+        "--oldest",
+        help="Only read messages sent on or after this date (yyyy/mm/dd)",
+        type=lambda value: datetime.datetime.strptime(value, "%Y/%m/%d"),
+    )
+    parser.add_argument(
+        "--batch_size",
+        help="Number of records added in one transaction",
+        type=int,
+        default=BACKFILL_BATCH_SIZE,
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig()
+    logger = logging.getLogger("backfill")
+    logger.setLevel(logging.INFO)
+
+    db_config = (
+        DBConfig.from_file(filepath=args.dbconfig)
+        if args.dbconfig
+        else DBConfig.from_env()
+    )
+    slack_config = (
+        SlackConfig.from_file(filepath=args.slackconfig)
+        if args.slackconfig
+        else SlackConfig.from_env()
+    )
+    engine = create_engine(url=get_db_url(db_config=db_config))
+    client = WebClient(token=slack_config.bot_token, base_url=slack_config.base_url)
+
+    channel_ids = args.channels or bot_channel_ids(client, OutboundQueue())
+    logger.info(f"reading {len(channel_ids)} channels")
+    stats = backfill(
+        client=client,
+        sessmaker=sessionmaker(bind=engine),
+        logger=logger,
+        channel_ids=channel_ids,
+        oldest=args.oldest,
+        batch_size=args.batch_size,
+    )
+    logger.info(f"done: {stats.summary()}")
+    engine.dispose()
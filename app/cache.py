@@ -0,0 +1,110 @@
+import collections
+import threading
+import time
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# users and RA jobs are only added by /init and /register_ra, so their ids can be cached for a while
+IDENTITY_CACHE_MAXSIZE = 4096
+IDENTITY_CACHE_TTL_SECONDS = 600.0
+
+
+class TTLCache(Generic[K, V]):
+    """
+    a thread-safe LRU cache of at most `maxsize` entries, each of which expires `ttl` seconds after it was stored.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        # key -> (expiration time, value), ordered from the least recently used
+        self._entries: collections.OrderedDict[K, tuple[float, V]] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> Optional[V]:
+        """
+        return the value stored for `key`, or None if it is not stored or has expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: K, value: V) -> None:
+        """
+        store `value` for `key`, evicting the least recently used entry if the cache is full.
+        """
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, predicate: Callable[[K], bool]) -> None:
+        """
+        remove entries whose key satisfies `predicate`.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class IdentityCache:
+    """
+    caches of ids resolved from slack user ids, which are looked up on every work report.
+    only ids that were found are cached, so that a registration is visible to the next lookup
+    even if it was done by another process.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = IDENTITY_CACHE_MAXSIZE,
+        ttl: float = IDENTITY_CACHE_TTL_SECONDS,
+    ) -> None:
+        # slack user id -> botuser.id
+        self.user_ids: TTLCache[str, int] = TTLCache(maxsize=maxsize, ttl=ttl)
+        # (slack user id, RA job name) -> ra.id
+        self.ra_ids: TTLCache[tuple[str, str], int] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def invalidate_user(self, slack_user_id: str) -> None:
+        """
+        drop every id cached for the user. call this after the user or their RA jobs are written.
+        """
+        self.user_ids.invalidate(lambda key: key == slack_user_id)
+        self.ra_ids.invalidate(lambda key: key[0] == slack_user_id)
+
+    def stats(self) -> dict[str, int]:
+        """
+        return hit and miss counters of the caches.
+        """
+        return {
+            "user_id_hits": self.user_ids.hits,
+            "user_id_misses": self.user_ids.misses,
+            "ra_id_hits": self.ra_ids.hits,
+            "ra_id_misses": self.ra_ids.misses,
+        }
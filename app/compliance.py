@@ -0,0 +1,444 @@
+import array
+import collections
+import csv
+import datetime
+import enum
+import io
+from dataclasses import dataclass, field
+from typing import IO, TYPE_CHECKING, Callable, Iterator, Optional, Sequence
+
+from sqlalchemy import (
+    BigInteger,
+    ColumnElement,
+    Row,
+    Select,
+    cast,
+    func,
+    select,
+)
+from sqlalchemy.orm import Session
+
+from .db.model import RA, TimeCard, User
+from .services.timecards import starts_within
+from .export import consume_record_batches, iter_record_batches
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# thresholds of the rules in minutes. the first two are the same as those of `WorkRules`.
+RECESS_REQUIRED_OVER_MINUTES = 6 * 60
+REQUIRED_RECESS_MINUTES = 60
+REPORT_DEADLINE_MINUTES = 24 * 60
+DAILY_LIMIT_MINUTES = 8 * 60
+WEEKLY_LIMIT_MINUTES = 40 * 60
+
+MINUTES_PER_DAY = 24 * 60
+# datetimes are converted to minutes since this day
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+# 1970/01/01 was a Thursday, so adding 3 days makes weeks start on Monday
+WEEK_OFFSET_DAYS = 3
+# reported time of a record whose message timestamp is unknown
+UNKNOWN = -1
+
+VIOLATIONS_CSV_FIELDNAMES = ["rule", "name", "ra_name", "date", "detail"]
+
+
+class Rule(enum.Enum):
+    RECESS = "recess"
+    REPORT_TIMING = "report_timing"
+    DAILY_TOTAL = "daily_total"
+    WEEKLY_TOTAL = "weekly_total"
+    OVERLAP = "overlap"
+
+
+@dataclass(frozen=True)
+class Violation:
+    """
+    a violation of a rule found in work records.
+    `ra_name` is empty for rules about the total work hours of a user, which are summed over RA jobs.
+    """
+
+    rule: Rule
+    slack_user_id: str
+    name: str
+    ra_name: str
+    date: datetime.date
+    detail: str
+
+
+def to_minutes(dt: datetime.datetime) -> int:
+    """
+    return minutes since 1970/01/01 00:00 (in the same timezone as `dt`).
+    """
+    return (dt.toordinal() - EPOCH_ORDINAL) * MINUTES_PER_DAY + dt.hour * 60 + dt.minute
+
+
+def to_date(minutes: int) -> datetime.date:
+    return datetime.date.fromordinal(EPOCH_ORDINAL + minutes // MINUTES_PER_DAY)
+
+
+def format_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02}:{minutes % 60:02}"
+
+
+def reported_minutes(slack_message_ts: str) -> int:
+    """
+    return the time a record was reported in minutes, which is given by the timestamp of the message.
+    """
+    try:
+        # the bot compares `datetime.now()` with `end_time` at report time, so use the local time here too
+        return to_minutes(datetime.datetime.fromtimestamp(float(slack_message_ts)))
+    except ValueError:
+        return UNKNOWN
+
+
+def _minutes_since_epoch(column: ColumnElement) -> ColumnElement:
+    # timestamps are stored without time zone, so this is the same as `to_minutes`
+    return cast(func.floor(func.extract("epoch", column) / 60), BigInteger)
+
+
+def select_compliance_columns(
+    first_day: datetime.date, first_day_of_next_period: datetime.date
+) -> Select:
+    """
+    return a statement selecting the columns needed to evaluate the rules over work records of all users
+    starting within [`first_day`, `first_day_of_next_period`), ordered by user and start time.
+    times are converted to minutes by the database, so that rows can be appended to the columns as they are.
+    """
+    return (
+        select(
+            User.slack_user_id,
+            User.name,
+            RA.ra_name,
+            _minutes_since_epoch(TimeCard.start_time),
+            _minutes_since_epoch(TimeCard.end_time),
+            TimeCard.duration,
+            TimeCard.break_duration,
+            TimeCard.slack_message_ts,
+        )
+        .join(RA, RA.id == TimeCard.ra_id)
+        .join(User, User.id == RA.user_id)
+        .where(starts_within(first_day, first_day_of_next_period))
+        .order_by(User.id, TimeCard.start_time)
+    )
+
+
+@dataclass
+class TimeCardColumns:
+    """
+    work records stored column by column, in which times are minutes since 1970/01/01.
+    records are ordered by user and start time.
+    """
+
+    # (slack user id, name) of users, and RA job names, referred to by index
+    users: list[tuple[str, str]] = field(default_factory=list)
+    ra_names: list[str] = field(default_factory=list)
+    user_index: array.array = field(default_factory=lambda: array.array("l"))
+    ra_index: array.array = field(default_factory=lambda: array.array("l"))
+    start: array.array = field(default_factory=lambda: array.array("q"))
+    end: array.array = field(default_factory=lambda: array.array("q"))
+    duration: array.array = field(default_factory=lambda: array.array("l"))
+    recess: array.array = field(default_factory=lambda: array.array("l"))
+    reported: array.array = field(default_factory=lambda: array.array("q"))
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    @classmethod
+    def from_batches(cls, batches: Iterator[Sequence[Row]]) -> "TimeCardColumns":
+        """
+        build columns from rows selected by `select_compliance_columns`.
+        """
+        columns = cls()
+        user_ids: dict[str, int] = {}
+        ra_ids: dict[str, int] = {}
+        for batch in batches:
+            for (
+                slack_user_id,
+                name,
+                ra_name,
+                start,
+                end,
+                duration,
+                recess,
+                slack_message_ts,
+            ) in batch:
+                if (user := user_ids.get(slack_user_id)) is None:
+                    user = user_ids[slack_user_id] = len(columns.users)
+                    columns.users.append((slack_user_id, name))
+                if (ra := ra_ids.get(ra_name)) is None:
+                    ra = ra_ids[ra_name] = len(columns.ra_names)
+                    columns.ra_names.append(ra_name)
+                columns.user_index.append(user)
+                columns.ra_index.append(ra)
+                columns.start.append(start)
+                columns.end.append(end)
+                columns.duration.append(duration)
+                columns.recess.append(recess)
+                columns.reported.append(reported_minutes(slack_message_ts))
+        return columns
+
+    def violation(
+        self, rule: Rule, i: int, detail: str, whole_day: bool = False
+    ) -> Violation:
+        slack_user_id, name = self.users[self.user_index[i]]
+        return Violation(
+            rule=rule,
+            slack_user_id=slack_user_id,
+            name=name,
+            ra_name="" if whole_day else self.ra_names[self.ra_index[i]],
+            date=to_date(self.start[i]),
+            detail=detail,
+        )
+
+
+def get_audit_window(
+    first_day: datetime.date, first_day_of_next_month: datetime.date
+) -> tuple[datetime.date, datetime.date]:
+    """
+    return the period whose records are needed to audit the month, which is extended to whole weeks
+    so that weekly totals of weeks across the beginning or the end of the month are correct.
+    """
+    return (
+        first_day - datetime.timedelta(days=first_day.weekday()),
+        first_day_of_next_month
+        + datetime.timedelta(days=(7 - first_day_of_next_month.weekday()) % 7),
+    )
+
+
+def load_columns(
+    sess: Session, first_day: datetime.date, first_day_of_next_period: datetime.date
+) -> TimeCardColumns:
+    """
+    load work records within the period with a single query, without building ORM objects.
+    """
+    return TimeCardColumns.from_batches(
+        iter_record_batches(
+            sess,
+            select_compliance_columns(
+                first_day=first_day, first_day_of_next_period=first_day_of_next_period
+            ),
+        )
+    )
+
+
+### rules ###
+# each rule scans the columns once. records outside [`since`, `until`) (in minutes) are only used for totals.
+
+
+def check_recess(columns: TimeCardColumns, since: int, until: int) -> list[Violation]:
+    return [
+        columns.violation(
+            Rule.RECESS,
+            i,
+            f"recess {format_minutes(recess)} in {format_minutes(duration)} of attendance",
+        )
+        for i, (start, duration, recess) in enumerate(
+            zip(columns.start, columns.duration, columns.recess)
+        )
+        if since <= start < until
+        and duration > RECESS_REQUIRED_OVER_MINUTES
+        and recess < REQUIRED_RECESS_MINUTES
+    ]
+
+
+def check_report_timing(
+    columns: TimeCardColumns, since: int, until: int
+) -> list[Violation]:
+    return [
+        columns.violation(
+            Rule.REPORT_TIMING,
+            i,
+            f"reported {format_minutes(reported - end)} after the end of work",
+        )
+        for i, (start, end, reported) in enumerate(
+            zip(columns.start, columns.end, columns.reported)
+        )
+        if since <= start < until
+        and reported != UNKNOWN
+        and reported - end > REPORT_DEADLINE_MINUTES
+    ]
+
+
+def _check_totals(
+    columns: TimeCardColumns,
+    since: int,
+    until: int,
+    rule: Rule,
+    period_of: Callable[[int], int],
+    limit: int,
+) -> list[Violation]:
+    """
+    sum work hours (excluding recess) of each user over periods given by `period_of` (which maps start time
+    to a period number), and return a violation per period exceeding `limit`.
+    since records are ordered by user and start time, records of a period are always next to each other.
+    """
+    violations = []
+    current: Optional[tuple[int, int]] = None
+    first_of_period = 0
+    total = 0
+    in_range = False
+    for i, (user, start, duration, recess) in enumerate(
+        zip(columns.user_index, columns.start, columns.duration, columns.recess)
+    ):
+        key = (user, period_of(start))
+        if key != current:
+            if current is not None and in_range and total > limit:
+                violations.append(
+                    columns.violation(
+                        rule,
+                        first_of_period,
+                        f"worked {format_minutes(total)} in total",
+                        whole_day=True,
+                    )
+                )
+            current, first_of_period, total, in_range = key, i, 0, False
+        total += duration - recess
+        in_range = in_range or since <= start < until
+    if current is not None and in_range and total > limit:
+        violations.append(
+            columns.violation(
+                rule,
+                first_of_period,
+                f"worked {format_minutes(total)} in total",
+                whole_day=True,
+            )
+        )
+    return violations
+
+
+def check_daily_total(
+    columns: TimeCardColumns, since: int, until: int
+) -> list[Violation]:
+    return _check_totals(
+        columns,
+        since,
+        until,
+        Rule.DAILY_TOTAL,
+        lambda start: start // MINUTES_PER_DAY,
+        DAILY_LIMIT_MINUTES,
+    )
+
+
+def check_weekly_total(
+    columns: TimeCardColumns, since: int, until: int
+) -> list[Violation]:
+    return _check_totals(
+        columns,
+        since,
+        until,
+        Rule.WEEKLY_TOTAL,
+        lambda start: (start // MINUTES_PER_DAY + WEEK_OFFSET_DAYS) // 7,
+        WEEKLY_LIMIT_MINUTES,
+    )
+
+
+def check_overlap(columns: TimeCardColumns, since: int, until: int) -> list[Violation]:
+    """
+    find records of a user that start before another record of the user (of any RA job) ends.
+    """
+    violations = []
+    previous_user = -1
+    latest_end = 0
+    latest = 0  # index of the record that ends at `latest_end`
+    for i, (user, start, end) in enumerate(
+        zip(columns.user_index, columns.start, columns.end)
+    ):
+        if user == previous_user and start < latest_end and since <= start < until:
+            violations.append(
+                columns.violation(
+                    Rule.OVERLAP,
+                    i,
+                    f"overlaps with the work of {columns.ra_names[columns.ra_index[latest]]} "
+                    f"until {format_minutes(latest_end % MINUTES_PER_DAY)}",
+                )
+            )
+        if user != previous_user or end > latest_end:
+            previous_user, latest_end, latest = user, end, i
+    return violations
+
+
+RULES = [
+    check_recess,
+    check_report_timing,
+    check_daily_total,
+    check_weekly_total,
+    check_overlap,
+]
+
+
+def evaluate_rules(
+    columns: TimeCardColumns,
+    first_day: datetime.date,
+    first_day_of_next_month: datetime.date,
+) -> list[Violation]:
+    """
+    return violations of all rules found in records within the month.
+    """
+    since = (first_day.toordinal() - EPOCH_ORDINAL) * MINUTES_PER_DAY
+    until = (first_day_of_next_month.toordinal() - EPOCH_ORDINAL) * MINUTES_PER_DAY
+    violations = []
+    for rule in RULES:
+        violations.extend(rule(columns, since, until))
+    return violations
+
+
+def audit_month(
+    sess: Session, first_day: datetime.date, first_day_of_next_month: datetime.date
+) -> list[Violation]:
+    """
+    evaluate all rules over work records of all users within the month.
+    """
+    columns = load_columns(sess, *get_audit_window(first_day, first_day_of_next_month))
+    return evaluate_rules(columns, first_day, first_day_of_next_month)
+
+
+async def audit_month_async(
+    sess: "AsyncSession",
+    first_day: datetime.date,
+    first_day_of_next_month: datetime.date,
+) -> list[Violation]:
+    """
+    asyncio version of `audit_month`, in which the columns are built and the rules are evaluated in a thread.
+    """
+    return await consume_record_batches(
+        sess,
+        stmt=select_compliance_columns(
+            *get_audit_window(first_day, first_day_of_next_month)
+        ),
+        consume=lambda batches: evaluate_rules(
+            TimeCardColumns.from_batches(batches), first_day, first_day_of_next_month
+        ),
+    )
+
+
+def count_violations(violations: Sequence[Violation]) -> dict[Rule, int]:
+    """
+    return the number of violations of each rule, including rules with no violation.
+    """
+    counter = collections.Counter(violation.rule for violation in violations)
+    return {rule: counter[rule] for rule in Rule}
+
+
+def write_violations_csv(
+    violations: Sequence[Violation], binary_file: IO[bytes]
+) -> None:
+    """
+    write `violations` to `binary_file` as CSV encoded in cp932, in the same way as `export.write_all_records_csv`.
+    """
+    text_file = io.TextIOWrapper(binary_file, encoding="cp932", newline="")
+    writer = csv.writer(text_file)
+    writer.writerow(VIOLATIONS_CSV_FIELDNAMES)
+    for violation in sorted(
+        violations, key=lambda v: (v.date, v.name, v.rule.value, v.ra_name)
+    ):
+        writer.writerow(
+            [
+                violation.rule.value,
+                violation.name,
+                violation.ra_name,
+                violation.date.strftime("%Y/%m/%d"),
+                violation.detail,
+            ]
+        )
+    text_file.detach()
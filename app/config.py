@@ -1,6 +1,14 @@
 import json
 import os
-from typing import Optional, Self, TypeGuard
+from typing import Any, Optional, Self, TypeGuard
+
+from .db.pool import MAX_OVERFLOW, POOL_RECYCLE, POOL_SIZE, POOL_TIMEOUT
+from .export_cache import EXPORT_CACHE_DIR, EXPORT_CACHE_MAX_BYTES
+from .jobs import JOB_LIMIT_PER_USER, JOB_QUEUE_SIZE, JOB_WORKERS
+from .sampling import PROFILES_SAMPLE_RATE, TRACES_SAMPLE_RATE
+
+# default of `WebClient.base_url`
+SLACK_API_BASE_URL = "https://slack.com/api/"
 
 
 def is_valid_dict(dict_to_check: dict[str, Optional[str]]) -> TypeGuard[dict[str, str]]:
@@ -8,12 +16,16 @@ def is_valid_dict(dict_to_check: dict[str, Optional[str]]) -> TypeGuard[dict[str
 
 
 class SlackConfig:
-    def __init__(self, app_token: str, bot_token: str) -> None:
+    def __init__(
+        self, app_token: str, bot_token: str, base_url: str = SLACK_API_BASE_URL
+    ) -> None:
         """
         [NOTE] This class should not be instantiated directly. Use `SlackConfig.from_file` or `SlackConfig.from_env`
         """
         self.app_token = app_token
         self.bot_token = bot_token
+        # URL of Slack Web API, which only differs for GovSlack (or local servers emulating Slack in benchmarks)
+        self.base_url = base_url
 
     @classmethod
     def from_file(cls, filepath: str) -> Self:
@@ -33,15 +45,29 @@ class SlackConfig:
             "app_token": os.environ.get("SLACK_APP_TOKEN"),
             "bot_token": os.environ.get("SLACK_BOT_TOKEN"),
         }
-        if is_valid_dict(_slack_config):
-            return cls(**_slack_config)
-        raise ValueError(
-            "some of the following environment variables was not found: SLACK_APP_TOKEN, SLACK_BOT_TOKEN"
+        if not is_valid_dict(_slack_config):
+            raise ValueError(
+                "some of the following environment variables was not found: SLACK_APP_TOKEN, SLACK_BOT_TOKEN"
+            )
+        return cls(
+            **_slack_config,
+            base_url=os.environ.get("SLACK_BASE_URL") or SLACK_API_BASE_URL,
         )
 
 
 class DBConfig:
-    def __init__(self, username: str, password: str, host: str, db_name: str) -> None:
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        host: str,
+        db_name: str,
+        pool_size: int = POOL_SIZE,
+        max_overflow: int = MAX_OVERFLOW,
+        pool_timeout: float = POOL_TIMEOUT,
+        pool_recycle: int = POOL_RECYCLE,
+        pool_pre_ping: bool = True,
+    ) -> None:
         """
         [NOTE] This class should not be instantiated directly. Use `DBConfig.from_file` or `DBConfig.from_env`
         """
@@ -49,6 +75,27 @@ class DBConfig:
         self.password = password
         self.host = host
         self.db_name = db_name
+        # connections kept open, and opened additionally while all of them are in use
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        # seconds to wait for a connection when `pool_size + max_overflow` connections are in use
+        self.pool_timeout = pool_timeout
+        # seconds after which a connection is closed and opened again when checked out (-1 to keep it forever)
+        self.pool_recycle = pool_recycle
+        # whether a connection is tested by a round trip every time it is checked out
+        self.pool_pre_ping = pool_pre_ping
+
+    def pool_options(self) -> dict[str, Any]:
+        """
+        return keyword arguments of `create_engine` that configure the connection pool.
+        """
+        return {
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "pool_timeout": self.pool_timeout,
+            "pool_recycle": self.pool_recycle,
+            "pool_pre_ping": self.pool_pre_ping,
+        }
 
     @classmethod
     def from_file(cls, filepath: str) -> Self:
@@ -70,19 +117,55 @@ class DBConfig:
             "host": os.environ.get("DB_HOST"),
             "db_name": os.environ.get("DB_NAME"),
         }
-        if is_valid_dict(_db_config):
-            return cls(**_db_config)
-        raise ValueError(
-            "some of the following environment variables was not found: DB_USENAME, DB_PASSWORD, DB_HOST, DB_NAME"
-        )
+        if not is_valid_dict(_db_config):
+            raise ValueError(
+                "some of the following environment variables was not found: DB_USENAME, DB_PASSWORD, DB_HOST, DB_NAME"
+            )
+        # pool settings are optional
+        _pool_options: dict[str, Any] = {}
+        for name, parse in [
+            ("pool_size", int),
+            ("max_overflow", int),
+            ("pool_timeout", float),
+            ("pool_recycle", int),
+            ("pool_pre_ping", lambda value: value.lower() in ("1", "true", "yes")),
+        ]:
+            if value := os.environ.get(f"DB_{name.upper()}"):
+                _pool_options[name] = parse(value)
+        return cls(**_db_config, **_pool_options)
 
 
 class BotConfig:
-    def __init__(self, admin_ids: list[str]) -> None:
+    def __init__(
+        self,
+        admin_ids: list[str],
+        persist_seen_events: bool = False,
+        job_workers: int = JOB_WORKERS,
+        job_queue_size: int = JOB_QUEUE_SIZE,
+        job_limit_per_user: int = JOB_LIMIT_PER_USER,
+        export_cache_dir: str = EXPORT_CACHE_DIR,
+        export_cache_max_bytes: int = EXPORT_CACHE_MAX_BYTES,
+        sentry_traces_sample_rate: float = TRACES_SAMPLE_RATE,
+        sentry_traces_sample_rates: Optional[dict[str, float]] = None,
+        sentry_profiles_sample_rate: float = PROFILES_SAMPLE_RATE,
+    ) -> None:
         """
         [NOTE] This class should not be instantiated directly. Use `BotConfig.from_file`"
         """
         self.admin_ids = admin_ids
+        # whether ids of received events are also stored in the database, so that duplicates are dropped after restarts
+        self.persist_seen_events = persist_seen_events
+        # limits of background jobs generating and uploading files
+        self.job_workers = job_workers
+        self.job_queue_size = job_queue_size
+        self.job_limit_per_user = job_limit_per_user
+        # where and how much exported files are cached
+        self.export_cache_dir = export_cache_dir
+        self.export_cache_max_bytes = export_cache_max_bytes
+        # share of runs of listeners traced by Sentry (by default, and for each command or event), and profiled among them
+        self.sentry_traces_sample_rate = sentry_traces_sample_rate
+        self.sentry_traces_sample_rates = sentry_traces_sample_rates or {}
+        self.sentry_profiles_sample_rate = sentry_profiles_sample_rate
 
     @classmethod
     def from_file(cls, filepath: str) -> Self:
@@ -1,17 +1,118 @@
 from logging import Logger
+from typing import TYPE_CHECKING, Optional
 
+from sqlalchemy import Engine
 from sqlalchemy.orm import Session, sessionmaker
 
+from .app_home import AppHomePublisher, AsyncAppHomePublisher
+from .cache import IdentityCache
 from .config import BotConfig
+from .db.pool import MeasuredQueuePool, pool_stats
+from .dedup import EventDeduplicator
+from .export_cache import ExportCache
+from .jobs import AsyncJobExecutor, JobExecutor
+from .metrics import Metrics
+from .outbound import AsyncOutboundQueue, OutboundQueue
+from .sampling import TracesSampler
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-class BotContext:
+
+class BaseBotContext:
     def __init__(
-        self, botcfg: BotConfig, logger: Logger, db_sessmaker: sessionmaker[Session]
+        self,
+        botcfg: BotConfig,
+        logger: Logger,
+        traces_sampler: Optional[TracesSampler] = None,
     ) -> None:
         """
-        container that stores various objects used in listeners
+        objects shared by `BotContext` and `AsyncBotContext`
         """
         self.botcfg = botcfg
         self.logger = logger
+        # decides which runs of listeners are traced by Sentry, and traces all runs of a listener that failed recently
+        self.traces_sampler = traces_sampler or TracesSampler.from_config(botcfg)
+        # ids of users and RA jobs resolved by listeners
+        self.id_cache = IdentityCache()
+        # keys of events received from Slack, used to drop redeliveries
+        self.event_deduplicator = EventDeduplicator()
+        # exported files, which are made stale by writes of records
+        self.export_cache = ExportCache(
+            directory=botcfg.export_cache_dir, max_bytes=botcfg.export_cache_max_bytes
+        )
+        # latencies and counters served on `/metrics`, along with the statistics of the objects above
+        self.metrics = Metrics()
+        self.metrics.add_collector(self.id_cache.stats, prefix="id_cache")
+        self.metrics.add_collector(self.export_cache.stats)
+        self.metrics.add_collector(
+            lambda: {"duplicate_events": self.event_deduplicator.duplicates}
+        )
+
+    def _add_collectors(self, engine: Engine) -> None:
+        """
+        measure the database through `engine` and export statistics of objects created by subclasses.
+        """
+        self.metrics.instrument_engine(engine)
+        if isinstance(engine.pool, MeasuredQueuePool):
+            self.metrics.add_collector(lambda: pool_stats(engine), prefix="db_pool")
+        self.metrics.add_collector(self.jobs.stats, prefix="jobs")
+        self.metrics.add_collector(
+            lambda: {
+                "rate_limited": self.outbound.rate_limited,
+                "gave_up": self.outbound.gave_up,
+            },
+            prefix="slack",
+        )
+        self.metrics.add_collector(self.app_home.stats, prefix="app_home")
+
+
+class BotContext(BaseBotContext):
+    def __init__(
+        self,
+        botcfg: BotConfig,
+        logger: Logger,
+        db_sessmaker: sessionmaker[Session],
+        traces_sampler: Optional[TracesSampler] = None,
+    ) -> None:
+        """
+        container that stores various objects used in listeners
+        """
+        super().__init__(botcfg=botcfg, logger=logger, traces_sampler=traces_sampler)
+        self.db_sessmaker = db_sessmaker
+        # calls to Slack Web API made by listeners go through this queue
+        self.outbound = OutboundQueue()
+        # slow work like generating and uploading files is run in the background by this executor
+        self.jobs = JobExecutor(
+            logger=logger,
+            workers=botcfg.job_workers,
+            queue_size=botcfg.job_queue_size,
+            limit_per_user=botcfg.job_limit_per_user,
+        )
+        # App Home of each user is published through this, which spaces out and skips unchanged publishes
+        self.app_home = AppHomePublisher(logger=logger)
+        self._add_collectors(db_sessmaker.kw["bind"])
+
+
+class AsyncBotContext(BaseBotContext):
+    def __init__(
+        self,
+        botcfg: BotConfig,
+        logger: Logger,
+        db_sessmaker: "async_sessionmaker[AsyncSession]",
+        traces_sampler: Optional[TracesSampler] = None,
+    ) -> None:
+        """
+        container that stores various objects used in listeners running in async mode
+        """
+        super().__init__(botcfg=botcfg, logger=logger, traces_sampler=traces_sampler)
         self.db_sessmaker = db_sessmaker
+        self.outbound = AsyncOutboundQueue()
+        self.jobs = AsyncJobExecutor(
+            logger=logger,
+            workers=botcfg.job_workers,
+            queue_size=botcfg.job_queue_size,
+            limit_per_user=botcfg.job_limit_per_user,
+        )
+        self.app_home = AsyncAppHomePublisher(logger=logger)
+        self._add_collectors(db_sessmaker.kw["bind"].sync_engine)
@@ -0,0 +1,313 @@
+import argparse
+import csv
+import datetime
+import io
+import itertools
+import logging
+import re
+import time
+import zipfile
+from dataclasses import dataclass, field
+from logging import Logger
+from typing import Iterable, Iterator, Optional, TextIO, Union
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from .db.model import TimeCard
+from .export import USER_RECORDS_CSV_FIELDNAMES
+from .parsing import MAX_IMPLICIT_OVERNIGHT
+from .services.timecards import copy_missing_timecards
+from .services.users import get_all_ra_ids
+from .workrules import WorkRules
+
+# rows loaded into the staging table by one COPY
+IMPORT_BATCH_SIZE = 10000
+# name of a CSV file in a ZIP file written by `write_user_records_zip`, which tells the month of its records
+ZIP_ENTRY_PATTERN = re.compile(r"(\d{4})_(\d{1,2})_working_hours\.csv")
+
+
+@dataclass(frozen=True)
+class ImportIssue:
+    """
+    a problem found in a row of an imported CSV file.
+    rows with an error are not imported, while rows with a warning (about work rules) are.
+    """
+
+    source: str
+    line: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.source}:{self.line}: {self.message}"
+
+
+@dataclass
+class ImportStats:
+    """
+    progress of an import
+    """
+
+    rows: int = 0
+    # records added, which excludes valid rows that had been recorded
+    added: int = 0
+    errors: list[ImportIssue] = field(default_factory=list)
+    warnings: list[ImportIssue] = field(default_factory=list)
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / max(time.monotonic() - self.started_at, 1e-9)
+
+    def summary(self) -> str:
+        return (
+            f"{self.rows} rows read ({self.rows_per_second:.0f} rows/s), {self.added} records added, "
+            f"{len(self.errors)} errors, {len(self.warnings)} warnings"
+        )
+
+
+def _parse_hhmm(value: str) -> Optional[datetime.time]:
+    """
+    parse time in "HHMM" format as written by `write_user_records_csv`.
+    """
+    if len(value) != 4 or not value.isdigit():
+        return None
+    hour, minute = int(value[:2]), int(value[2:])
+    if hour > 23 or minute > 59:
+        return None
+    return datetime.time(hour, minute)
+
+
+def parse_user_record(
+    row: list[str], month: datetime.date, ra_ids: dict[str, int]
+) -> Union[tuple, str]:
+    """
+    parse a row of CSV file written by `write_user_records_csv` for `month`, whose RA job is resolved by `ra_ids`
+    (RA job name -> id). return the record as a tuple of `TIMECARD_COPY_COLUMNS`, or the reason why it is invalid.
+    """
+    if len(row) != len(USER_RECORDS_CSV_FIELDNAMES):
+        return f"expected {len(USER_RECORDS_CSV_FIELDNAMES)} columns, got {len(row)}"
+    ra_name, day, start, end, break_time, description = row
+    ra_id = ra_ids.get(ra_name)
+    if ra_id is None:
+        return f'RA job "{ra_name}" is not registered for the user'
+    try:
+        date = month.replace(day=int(day))
+    except ValueError:
+        return f"date {day!r} is not a day of {month:%Y/%m}"
+    start_of_day, end_of_day, recess = (
+        _parse_hhmm(value) for value in (start, end, break_time)
+    )
+    if start_of_day is None or end_of_day is None or recess is None:
+        return f"times {start!r}, {end!r} and {break_time!r} are not all in HHMM format"
+    start_time = datetime.datetime.combine(date, start_of_day)
+    end_time = datetime.datetime.combine(date, end_of_day)
+    # work ending before it starts is across midnight, as in work reports without the end date
+    if end_time < start_time:
+        end_time += datetime.timedelta(days=1)
+        if end_time - start_time > MAX_IMPLICIT_OVERNIGHT:
+            return f"work ending on the next day is longer than {MAX_IMPLICIT_OVERNIGHT} ({start}-{end})"
+    # same as the constraint `time_integrity`, which would abort the whole COPY
+    if end_time == start_time:
+        return f"work does not end after it starts ({start}-{end})"
+    return (
+        ra_id,
+        start_time,
+        end_time,
+        recess.hour * 60 + recess.minute,
+        description,
+        # imported records have no message, so a key unique to the work is used instead
+        f"csv:{ra_id}:{start_time:%Y%m%d%H%M}",
+    )
+
+
+def iter_user_records(
+    text_file: TextIO,
+    source: str,
+    month: datetime.date,
+    ra_ids: dict[str, int],
+    stats: ImportStats,
+) -> Iterator[tuple]:
+    """
+    yield valid records in `text_file` (CSV file of `month` named `source`), while adding problems found to `stats`.
+    """
+    reader = csv.reader(text_file)
+    header = next(reader, None)
+    if header != USER_RECORDS_CSV_FIELDNAMES:
+        stats.errors.append(
+            ImportIssue(
+                source, 1, f"header is not {','.join(USER_RECORDS_CSV_FIELDNAMES)}"
+            )
+        )
+        return
+    for row in reader:
+        stats.rows += 1
+        parsed = parse_user_record(row, month=month, ra_ids=ra_ids)
+        if isinstance(parsed, str):
+            stats.errors.append(ImportIssue(source, reader.line_num, parsed))
+            continue
+        ra_id, start_time, end_time, break_duration, *_ = parsed
+        record = TimeCard(
+            ra_id=ra_id,
+            start_time=start_time,
+            end_time=end_time,
+            break_duration=break_duration,
+            description="",
+            slack_message_ts="",
+        )
+        # the record is only checked, so `duration` is set here instead of by the database
+        record.duration = (end_time - start_time) // datetime.timedelta(minutes=1)
+        # report timing is not checked, since every imported record is reported late
+        if warning := WorkRules.generate_warning_about_recess_hours(record=record):
+            stats.warnings.append(ImportIssue(source, reader.line_num, warning))
+        yield parsed
+
+
+def open_csv_files(
+    path: str, month: Optional[datetime.date]
+) -> Iterator[tuple[str, datetime.date, TextIO]]:
+    """
+    yield (name, month, text file) of the CSV file at `path` whose records are in `month`,
+    or of each CSV file in the ZIP file at `path` written by `/download_csv`.
+    """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            for name in zf.namelist():
+                matched = ZIP_ENTRY_PATTERN.fullmatch(name)
+                if not matched:
+                    continue
+                year, month_of_entry = (int(group) for group in matched.groups())
+                # "utf-8-sig" also reads files saved with BOM, e.g. by Excel
+                with io.TextIOWrapper(
+                    zf.open(name), encoding="utf-8-sig", newline=""
+                ) as text_file:
+                    yield f"{path}:{name}", datetime.date(
+                        year, month_of_entry, 1
+                    ), text_file
+        return
+    if month is None:
+        raise ValueError(
+            f"month of the records in {path} must be given, since the CSV file only contains days"
+        )
+    with open(path, encoding="utf-8-sig", newline="") as text_file:
+        yield path, month, text_file
+
+
+def _batched(
+    records: Iterable[tuple], batch_size: int, stats: ImportStats, logger: Logger
+) -> Iterator[list[tuple]]:
+    iterator = iter(records)
+    while batch := list(itertools.islice(iterator, batch_size)):
+        yield batch
+        logger.info(stats.summary())
+
+
+def import_user_records(
+    sessmaker: sessionmaker[Session],
+    logger: Logger,
+    slack_user_id: str,
+    paths: list[str],
+    month: Optional[datetime.date] = None,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    dry_run: bool = False,
+) -> ImportStats:
+    """
+    import records of the user from CSV (or ZIP) files in the format of `/download_csv`.
+    rows are validated while the files are streamed, and valid ones are loaded into a staging table by COPY
+    `batch_size` rows at a time and merged into `TimeCard` in one transaction. with `dry_run`, rows are only validated.
+    """
+    with sessmaker() as sess:
+        ra_ids = {
+            ra_name: ra_id
+            for (_, ra_name), ra_id in get_all_ra_ids(
+                sess, slack_user_id=slack_user_id
+            ).items()
+        }
+    if not ra_ids:
+        raise ValueError(f"slack user {slack_user_id} has no registered RA job")
+
+    stats = ImportStats()
+    records = (
+        record
+        for path in paths
+        for source, month_of_file, text_file in open_csv_files(path, month)
+        for record in iter_user_records(
+            text_file, source=source, month=month_of_file, ra_ids=ra_ids, stats=stats
+        )
+    )
+    batches = _batched(records, batch_size=batch_size, stats=stats, logger=logger)
+    if dry_run:
+        for _ in batches:
+            pass
+        return stats
+    with sessmaker() as sess:
+        stats.added = copy_missing_timecards(sess, batches)
+    return stats
+
+
+if __name__ == "__main__":
+    # CLI to import past records kept outside the bot, e.g. `python -m app.csv_import --dbconfig <path> --slack_user_id <id> --month 2024/04 <file>`
+    from sqlalchemy import create_engine
+
+    from .config import DBConfig
+    from .db.setup import get_db_url
+
+    parser = argparse.ArgumentParser(
+        description="Import work records in the CSV format of /download_csv into RA timecard recorder"
+    )
+    parser.add_argument(
+        "--dbconfig",
+        help="JSON file containing database configuration (if not given, environment variables will be used)",
+    )
+    parser.add_argument(
+        "--slack_user_id",
+        help="Slack user ID of the RA whose records are imported",
+        required=True,
+    )
+    parser.add_argument(
+        "--month",
+        help="Month of the records in CSV files (yyyy/mm), which is not needed for ZIP files",
+        type=lambda value: datetime.datetime.strptime(value, "%Y/%m").date(),
+    )
+    parser.add_argument(
+        "--batch_size",
+        help="Number of rows loaded by one COPY",
+        type=int,
+        default=IMPORT_BATCH_SIZE,
+    )
+    parser.add_argument(
+        "--dry_run",
+        help="Only validate the rows without importing them",
+        action="store_true",
+    )
+    parser.add_argument("paths", help="CSV or ZIP files to import", nargs="+")
+    args = parser.parse_args()
+    if args.month is None and not all(zipfile.is_zipfile(path) for path in args.paths):
+        parser.error("--month is required to import CSV files")
+
+    logging.basicConfig()
+    logger = logging.getLogger("csv_import")
+    logger.setLevel(logging.INFO)
+
+    db_config = (
+        DBConfig.from_file(filepath=args.dbconfig)
+        if args.dbconfig
+        else DBConfig.from_env()
+    )
+    engine = create_engine(url=get_db_url(db_config=db_config))
+    stats = import_user_records(
+        sessmaker=sessionmaker(bind=engine),
+        logger=logger,
+        slack_user_id=args.slack_user_id,
+        paths=args.paths,
+        month=args.month,
+        batch_size=args.batch_size,
+        dry_run=args.dry_run,
+    )
+    for issue in stats.errors:
+        print(f"error: {issue}")
+    for issue in stats.warnings:
+        print(f"warning: {issue}")
+    logger.info(f"done: {stats.summary()}")
+    engine.dispose()
+    # exit with 1 if any row was skipped due to an error
+    raise SystemExit(1 if stats.errors else 0)
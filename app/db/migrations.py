@@ -0,0 +1,403 @@
+import argparse
+import datetime
+import logging
+from dataclasses import dataclass
+from logging import Logger
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    exc,
+    func,
+    select,
+    text,
+)
+
+# key of the advisory lock taken while migrating, so that bots launched at the same time don't migrate concurrently
+MIGRATION_LOCK_KEY = 0x7261_7463  # "ratc"
+
+# the version table is kept out of `Base.metadata`, since it describes the schema rather than bot data
+migration_metadata = MetaData()
+schema_migration_table = Table(
+    "schema_migration",
+    migration_metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False, server_default=func.now()),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    """
+    a change to the schema, identified by a version number that increases by one per migration.
+    [NOTE] Once released, a migration must never be edited. Append a new one instead.
+    """
+
+    version: int
+    description: str
+    statements: tuple[str, ...]
+
+
+# list of all migrations in the order of application.
+# version 0 is the schema created by `Base.metadata.create_all` before migrations were introduced.
+MIGRATIONS: list[Migration] = [
+    Migration(
+        version=1,
+        description="add indexes on timecard.slack_message_ts, timecard(ra_id, start_time) and ra(user_id, ra_name)",
+        statements=(
+            # the same message could be recorded twice when Slack redelivered an event. keep only the latest record.
+            """
+            DELETE FROM timecard AS older USING timecard AS newer
+            WHERE older.slack_message_ts = newer.slack_message_ts AND older.id < newer.id
+            """,
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_timecard_slack_message_ts ON timecard (slack_message_ts)",
+            "CREATE INDEX IF NOT EXISTS ix_timecard_ra_id_start_time ON timecard (ra_id, start_time)",
+            "CREATE INDEX IF NOT EXISTS ix_ra_user_id_ra_name ON ra (user_id, ra_name)",
+        ),
+    ),
+    Migration(
+        version=2,
+        description="add working_hours_rollup and fill it from existing records",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS working_hours_rollup (
+                ra_id INTEGER NOT NULL REFERENCES ra (id) ON DELETE CASCADE ON UPDATE CASCADE,
+                year_month DATE NOT NULL,
+                total_work INTERVAL NOT NULL,
+                record_count INTEGER NOT NULL,
+                PRIMARY KEY (ra_id, year_month)
+            )
+            """,
+            """
+            INSERT INTO working_hours_rollup (ra_id, year_month, total_work, record_count)
+            SELECT ra_id, date_trunc('month', start_time)::date, sum(duration - break_duration), count(*)
+            FROM timecard GROUP BY 1, 2
+            ON CONFLICT (ra_id, year_month) DO UPDATE
+            SET total_work = EXCLUDED.total_work, record_count = EXCLUDED.record_count
+            """,
+        ),
+    ),
+    Migration(
+        version=3,
+        description="maintain working_hours_rollup by a trigger on timecard",
+        statements=(
+            # OLD and NEW are the rows as locked by the statement, so the rollup stays correct
+            # even when the same message is upserted concurrently
+            """
+            CREATE OR REPLACE FUNCTION adjust_working_hours_rollup() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    INSERT INTO working_hours_rollup (ra_id, year_month, total_work, record_count)
+                    VALUES (OLD.ra_id, date_trunc('month', OLD.start_time)::date, -(OLD.duration - OLD.break_duration), -1)
+                    ON CONFLICT (ra_id, year_month) DO UPDATE
+                    SET total_work = working_hours_rollup.total_work + EXCLUDED.total_work,
+                        record_count = working_hours_rollup.record_count + EXCLUDED.record_count;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO working_hours_rollup (ra_id, year_month, total_work, record_count)
+                    VALUES (NEW.ra_id, date_trunc('month', NEW.start_time)::date, NEW.duration - NEW.break_duration, 1)
+                    ON CONFLICT (ra_id, year_month) DO UPDATE
+                    SET total_work = working_hours_rollup.total_work + EXCLUDED.total_work,
+                        record_count = working_hours_rollup.record_count + EXCLUDED.record_count;
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+            "DROP TRIGGER IF EXISTS timecard_working_hours_rollup ON timecard",
+            """
+            CREATE TRIGGER timecard_working_hours_rollup
+            AFTER INSERT OR UPDATE OR DELETE ON timecard
+            FOR EACH ROW EXECUTE FUNCTION adjust_working_hours_rollup()
+            """,
+        ),
+    ),
+    Migration(
+        version=4,
+        description="add seen_event to drop events delivered more than once",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS seen_event (
+                event_key VARCHAR NOT NULL PRIMARY KEY,
+                seen_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_seen_event_seen_at ON seen_event (seen_at)",
+        ),
+    ),
+    Migration(
+        version=5,
+        description="notify months of written records on timecard_month_changed, so that every replica invalidates its cached files",
+        statements=(
+            # notifications are delivered on commit, and the same month is notified only once per transaction
+            """
+            CREATE OR REPLACE FUNCTION notify_timecard_month_changed() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    PERFORM pg_notify('timecard_month_changed', to_char(date_trunc('month', OLD.start_time), 'YYYY-MM-DD'));
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    PERFORM pg_notify('timecard_month_changed', to_char(date_trunc('month', NEW.start_time), 'YYYY-MM-DD'));
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+            "DROP TRIGGER IF EXISTS timecard_month_changed ON timecard",
+            """
+            CREATE TRIGGER timecard_month_changed
+            AFTER INSERT OR UPDATE OR DELETE ON timecard
+            FOR EACH ROW EXECUTE FUNCTION notify_timecard_month_changed()
+            """,
+        ),
+    ),
+    Migration(
+        version=6,
+        description="maintain working_hours_rollup by statement-level triggers, which update each month once per statement",
+        statements=(
+            # a row-level trigger updates the same rollup row once per record, which gets slower with every update
+            # within a transaction and made bulk loads (e.g. `app.csv_import`) spend most of their time here.
+            # the changed rows are summed per month from the transition tables instead. months are updated in order
+            # of the key, so that concurrent statements lock them in the same order.
+            """
+            CREATE OR REPLACE FUNCTION adjust_working_hours_rollup_by_statement() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    INSERT INTO working_hours_rollup (ra_id, year_month, total_work, record_count)
+                    SELECT ra_id, date_trunc('month', start_time)::date, sum(duration - break_duration), count(*)
+                    FROM new_rows GROUP BY 1, 2 ORDER BY 1, 2
+                    ON CONFLICT (ra_id, year_month) DO UPDATE
+                    SET total_work = working_hours_rollup.total_work + EXCLUDED.total_work,
+                        record_count = working_hours_rollup.record_count + EXCLUDED.record_count;
+                ELSIF TG_OP = 'UPDATE' THEN
+                    INSERT INTO working_hours_rollup (ra_id, year_month, total_work, record_count)
+                    SELECT ra_id, year_month, sum(work), sum(records) FROM (
+                        SELECT ra_id, date_trunc('month', start_time)::date AS year_month,
+                            duration - break_duration AS work, 1 AS records FROM new_rows
+                        UNION ALL
+                        SELECT ra_id, date_trunc('month', start_time)::date,
+                            -(duration - break_duration), -1 FROM old_rows
+                    ) AS changes GROUP BY 1, 2 ORDER BY 1, 2
+                    ON CONFLICT (ra_id, year_month) DO UPDATE
+                    SET total_work = working_hours_rollup.total_work + EXCLUDED.total_work,
+                        record_count = working_hours_rollup.record_count + EXCLUDED.record_count;
+                ELSE
+                    INSERT INTO working_hours_rollup (ra_id, year_month, total_work, record_count)
+                    SELECT ra_id, date_trunc('month', start_time)::date, -sum(duration - break_duration), -count(*)
+                    FROM old_rows GROUP BY 1, 2 ORDER BY 1, 2
+                    ON CONFLICT (ra_id, year_month) DO UPDATE
+                    SET total_work = working_hours_rollup.total_work + EXCLUDED.total_work,
+                        record_count = working_hours_rollup.record_count + EXCLUDED.record_count;
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+            "DROP TRIGGER IF EXISTS timecard_working_hours_rollup ON timecard",
+            # a trigger with transition tables can only be defined for one event
+            "DROP TRIGGER IF EXISTS timecard_working_hours_rollup_insert ON timecard",
+            """
+            CREATE TRIGGER timecard_working_hours_rollup_insert
+            AFTER INSERT ON timecard REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION adjust_working_hours_rollup_by_statement()
+            """,
+            "DROP TRIGGER IF EXISTS timecard_working_hours_rollup_update ON timecard",
+            """
+            CREATE TRIGGER timecard_working_hours_rollup_update
+            AFTER UPDATE ON timecard REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION adjust_working_hours_rollup_by_statement()
+            """,
+            "DROP TRIGGER IF EXISTS timecard_working_hours_rollup_delete ON timecard",
+            """
+            CREATE TRIGGER timecard_working_hours_rollup_delete
+            AFTER DELETE ON timecard REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION adjust_working_hours_rollup_by_statement()
+            """,
+            "DROP FUNCTION IF EXISTS adjust_working_hours_rollup()",
+        ),
+    ),
+    Migration(
+        version=7,
+        description="make timecard unique on (slack_message_ts, start_time), so that it can be partitioned by start_time",
+        statements=(
+            # a unique index on a partitioned table must contain the partition key
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_timecard_slack_message_ts_start_time ON timecard (slack_message_ts, start_time)",
+            "DROP INDEX IF EXISTS ix_timecard_slack_message_ts",
+        ),
+    ),
+    Migration(
+        version=8,
+        description="store durations of timecard and working_hours_rollup in minutes, and compute timecard.duration from start and end times",
+        statements=(
+            # TIME can't hold work of 24 hours or longer, and the duration was computed from the same times by every
+            # writer. columns keep their names (with the same meaning), so that the triggers of migration 6 sum integers
+            # as they are. types are checked first, since tables created by `create_all` already have the new ones.
+            """
+            DO $$
+            BEGIN
+                IF (SELECT data_type FROM information_schema.columns WHERE table_schema = current_schema()
+                    AND table_name = 'timecard' AND column_name = 'break_duration') <> 'integer' THEN
+                    ALTER TABLE timecard ALTER COLUMN break_duration TYPE INTEGER
+                        USING (extract(hour FROM break_duration) * 60 + extract(minute FROM break_duration))::integer;
+                    ALTER TABLE timecard DROP COLUMN duration, ADD COLUMN duration INTEGER
+                        GENERATED ALWAYS AS ((extract(epoch FROM end_time - start_time) / 60)::integer) STORED;
+                END IF;
+                IF (SELECT data_type FROM information_schema.columns WHERE table_schema = current_schema()
+                    AND table_name = 'working_hours_rollup' AND column_name = 'total_work') <> 'integer' THEN
+                    ALTER TABLE working_hours_rollup ALTER COLUMN total_work TYPE INTEGER
+                        USING (extract(epoch FROM total_work) / 60)::integer;
+                END IF;
+            END;
+            $$
+            """,
+        ),
+    ),
+    Migration(
+        version=9,
+        description="keep one record per message on timecard unless it is partitioned",
+        statements=(
+            # migration 7 left only the index on (slack_message_ts, start_time), so a message whose start time was
+            # edited while the bot was down could be added again with the new start time by `app.backfill`.
+            # keep the latest record of such a message, as in migration 1. the constraint is checked at the end of
+            # each statement (see `TimeCard`), and a partitioned table can't have it.
+            """
+            DO $$
+            BEGIN
+                IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('timecard')) = 'r'
+                    AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conrelid = to_regclass('timecard')
+                    AND conname = 'uq_timecard_slack_message_ts') THEN
+                    DELETE FROM timecard AS older USING timecard AS newer
+                    WHERE older.slack_message_ts = newer.slack_message_ts AND older.id < newer.id;
+                    ALTER TABLE timecard ADD CONSTRAINT uq_timecard_slack_message_ts
+                        UNIQUE (slack_message_ts) DEFERRABLE INITIALLY IMMEDIATE;
+                END IF;
+            END;
+            $$
+            """,
+        ),
+    ),
+]
+
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def get_schema_version(conn: Connection) -> int:
+    """
+    return the version of the schema the database is in.
+    """
+    schema_migration_table.create(bind=conn, checkfirst=True)
+    version = conn.execute(select(func.max(schema_migration_table.c.version))).scalar()
+    return version or 0
+
+
+def is_schema_up_to_date(conn: Connection) -> bool:
+    """
+    return whether the schema is in `LATEST_SCHEMA_VERSION`, by a single query that creates nothing.
+    every change to the schema comes with a migration, so tables don't have to be checked one by one if it is.
+    if the database has never been migrated, the transaction of `conn` can't be used afterwards.
+    """
+    try:
+        version = conn.execute(
+            select(func.max(schema_migration_table.c.version))
+        ).scalar()
+    except exc.ProgrammingError:
+        # `schema_migration` does not exist
+        return False
+    return version == LATEST_SCHEMA_VERSION
+
+
+def get_pending_migrations(current_version: int) -> list[Migration]:
+    """
+    return migrations that have not been applied to the schema in `current_version`.
+    """
+    return [m for m in MIGRATIONS if m.version > current_version]
+
+
+def lock_schema(conn: Connection) -> None:
+    """
+    wait until other processes finish changing the schema, and hold the lock until the transaction of `conn` ends.
+    """
+    conn.execute(
+        text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY}
+    )
+
+
+def migrate(conn: Connection, logger: Logger) -> int:
+    """
+    apply all pending migrations within the transaction of `conn` and return the resulting schema version.
+    tables of a new database must have been created by `setup.create_tables` before calling this function.
+    it takes a connection rather than an engine, so that it can also be run through `AsyncConnection.run_sync`.
+    """
+    # wait until other processes finish migrating
+    lock_schema(conn)
+    current_version = get_schema_version(conn)
+    for migration in get_pending_migrations(current_version):
+        logger.info(
+            f"migrating database schema to version {migration.version}: {migration.description}"
+        )
+        for statement in migration.statements:
+            conn.execute(text(statement))
+        conn.execute(
+            schema_migration_table.insert().values(
+                version=migration.version, description=migration.description
+            )
+        )
+        current_version = migration.version
+    return current_version
+
+
+if __name__ == "__main__":
+    # CLI to migrate the database without launching the bot, e.g. `python -m app.db.migrations --dbconfig <path>`
+    from sqlalchemy import create_engine
+
+    from ..config import DBConfig
+    from .setup import create_tables, get_db_url
+
+    parser = argparse.ArgumentParser(
+        description="Migrate database schema of RA timecard recorder"
+    )
+    parser.add_argument(
+        "--dbconfig",
+        help="JSON file containing database configuration (if not given, environment variables will be used)",
+    )
+    parser.add_argument(
+        "--status",
+        help="Only show the current schema version and pending migrations",
+        action="store_true",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig()
+    logger = logging.getLogger("migration")
+    logger.setLevel(logging.INFO)
+
+    db_config = (
+        DBConfig.from_file(filepath=args.dbconfig)
+        if args.dbconfig
+        else DBConfig.from_env()
+    )
+    engine = create_engine(url=get_db_url(db_config=db_config))
+
+    if args.status:
+        with engine.begin() as conn:
+            current_version = get_schema_version(conn)
+        print(
+            f"current schema version: {current_version} (latest: {LATEST_SCHEMA_VERSION})"
+        )
+        for migration in get_pending_migrations(current_version):
+            print(f"  pending: {migration.version}: {migration.description}")
+    else:
+        started_at = datetime.datetime.now()
+        with engine.begin() as conn:
+            create_tables(conn)
+            version = migrate(conn=conn, logger=logger)
+        logger.info(
+            f"database schema is now in version {version} (took {(datetime.datetime.now() - started_at).total_seconds():.2f}s)"
+        )
+    engine.dispose()
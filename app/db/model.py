@@ -1,6 +1,13 @@
 import datetime
 
-from sqlalchemy import CheckConstraint, ForeignKey
+from sqlalchemy import (
+    CheckConstraint,
+    Computed,
+    ForeignKey,
+    Index,
+    UniqueConstraint,
+    func,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, MappedAsDataclass, mapped_column
 
 
@@ -32,6 +39,10 @@ class RA(Base):
     """
 
     __tablename__ = "ra"
+    __table_args__ = (
+        # used to resolve RA job name sent in a work report
+        Index("ix_ra_user_id_ra_name", "user_id", "ra_name"),
+    )
 
     # id will be automatically assigned by the database, so it should not be initialized in the constructor
     id: Mapped[int] = mapped_column(primary_key=True, init=False)
@@ -47,6 +58,28 @@ class TimeCard(Base):
     """
 
     __tablename__ = "timecard"
+    __table_args__ = (
+        # used to find the record corresponding to an edited or deleted message.
+        # `start_time` is included so that the index can also be created on a table partitioned by month
+        # (see `app.db.partitioning`), and `record_timecard` deletes the record of a message moved to another time.
+        Index(
+            "ix_timecard_slack_message_ts_start_time",
+            "slack_message_ts",
+            "start_time",
+            unique=True,
+        ),
+        # a message reports at most one record (see migration 9). it is checked at the end of each statement, so that
+        # `record_timecard` can delete and add the record of a message moved to another time in one statement.
+        # a partitioned table can't have it, since it doesn't contain `start_time` (see `app.db.partitioning`)
+        UniqueConstraint(
+            "slack_message_ts",
+            name="uq_timecard_slack_message_ts",
+            deferrable=True,
+            initially="IMMEDIATE",
+        ),
+        # used to aggregate records of an RA job within a month
+        Index("ix_timecard_ra_id_start_time", "ra_id", "start_time"),
+    )
 
     # id will be automatically assigned by the database, so it should not be initialized in the constructor
     id: Mapped[int] = mapped_column(primary_key=True, init=False)
@@ -57,7 +90,50 @@ class TimeCard(Base):
     end_time: Mapped[datetime.datetime] = mapped_column(
         CheckConstraint("end_time > start_time", name="time_integrity")
     )
-    duration: Mapped[datetime.time]
-    break_duration: Mapped[datetime.time]
+    # minutes from `start_time` to `end_time`, which is computed by the database (see migration 8).
+    # it is set on objects loaded from the database, or returned by `services.timecards.record_timecard`
+    duration: Mapped[int] = mapped_column(
+        Computed(
+            "(extract(epoch FROM end_time - start_time) / 60)::integer", persisted=True
+        ),
+        init=False,
+    )
+    # minutes of recess
+    break_duration: Mapped[int]
     description: Mapped[str]
     slack_message_ts: Mapped[str]
+
+
+class WorkingHoursRollup(Base):
+    """
+    a model representing total work hours of an RA job in a month, maintained by a trigger on `TimeCard`
+    """
+
+    __tablename__ = "working_hours_rollup"
+
+    ra_id: Mapped[int] = mapped_column(
+        ForeignKey("ra.id", ondelete="CASCADE", onupdate="CASCADE"), primary_key=True
+    )
+    # the first day of the month in which the work started
+    year_month: Mapped[datetime.date] = mapped_column(primary_key=True)
+    # sum of (duration - break_duration) of the records in the month, in minutes
+    total_work: Mapped[int]
+    record_count: Mapped[int]
+
+
+class SeenEvent(Base):
+    """
+    a model representing an event received from Slack, which is used to drop events delivered more than once
+    """
+
+    __tablename__ = "seen_event"
+    __table_args__ = (
+        # used to delete old events
+        Index("ix_seen_event_seen_at", "seen_at"),
+    )
+
+    # see `app.dedup.event_dedup_key`
+    event_key: Mapped[str] = mapped_column(primary_key=True)
+    seen_at: Mapped[datetime.datetime] = mapped_column(
+        server_default=func.now(), init=False
+    )
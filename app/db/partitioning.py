@@ -0,0 +1,359 @@
+import argparse
+import datetime
+import gzip
+import logging
+import os
+import re
+from logging import Logger
+from typing import Optional
+
+from dateutil import relativedelta
+from sqlalchemy import Connection, text
+
+from .migrations import LATEST_SCHEMA_VERSION, get_schema_version, lock_schema
+from .model import TimeCard
+
+# partitions are created for the current month and this many months ahead on every boot (and by `ensure`),
+# so that a bot restarted at least once in this many months never writes to the default partition
+PARTITION_MONTHS_AHEAD = 3
+# partition receiving records outside the ranges of monthly partitions, e.g. those of a month already archived
+DEFAULT_PARTITION = "timecard_default"
+MONTH_PARTITION_PATTERN = re.compile(r"timecard_(?P<year>[0-9]{4})(?P<month>[0-9]{2})")
+
+# columns of `timecard` copied between tables, which exclude those computed by the database (e.g. `duration`)
+TIMECARD_STORED_COLUMNS = ", ".join(
+    column.name for column in TimeCard.__table__.columns if column.computed is None
+)
+
+# triggers on `timecard` as of the latest migration, which are created again on the partitioned table.
+# [NOTE] Keep this in sync when a migration changes the triggers on `timecard`.
+TIMECARD_TRIGGER_STATEMENTS = (
+    # migration 5
+    """
+    CREATE TRIGGER timecard_month_changed
+    AFTER INSERT OR UPDATE OR DELETE ON timecard
+    FOR EACH ROW EXECUTE FUNCTION notify_timecard_month_changed()
+    """,
+    # migration 6
+    """
+    CREATE TRIGGER timecard_working_hours_rollup_insert
+    AFTER INSERT ON timecard REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION adjust_working_hours_rollup_by_statement()
+    """,
+    """
+    CREATE TRIGGER timecard_working_hours_rollup_update
+    AFTER UPDATE ON timecard REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION adjust_working_hours_rollup_by_statement()
+    """,
+    """
+    CREATE TRIGGER timecard_working_hours_rollup_delete
+    AFTER DELETE ON timecard REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION adjust_working_hours_rollup_by_statement()
+    """,
+)
+
+
+def first_day_of_month(date: datetime.date) -> datetime.date:
+    return date.replace(day=1)
+
+
+def month_partition_name(month: datetime.date) -> str:
+    return f"timecard_{month:%Y%m}"
+
+
+def is_timecard_partitioned(conn: Connection) -> bool:
+    """
+    return whether `timecard` has been converted into a partitioned table by `convert_timecard_to_partitioned`.
+    """
+    return bool(
+        conn.execute(
+            text(
+                "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('timecard')"
+            )
+        ).scalar()
+    )
+
+
+def list_month_partitions(conn: Connection) -> dict[datetime.date, str]:
+    """
+    return names of the monthly partitions of `timecard` keyed by the first days of their months.
+    """
+    names = conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass('timecard')"
+        )
+    ).scalars()
+    partitions = {}
+    for name in names:
+        if matched := MONTH_PARTITION_PATTERN.fullmatch(name):
+            month = datetime.date(int(matched["year"]), int(matched["month"]), 1)
+            partitions[month] = name
+    return partitions
+
+
+def _create_month_partition(conn: Connection, month: datetime.date) -> str:
+    """
+    create the partition of `month` and move records of the month from the default partition into it.
+    """
+    name = month_partition_name(month)
+    next_month = month + relativedelta.relativedelta(months=1)
+    # a partition can't be created for a range of which the default partition has records,
+    # so the records are moved into a new table before it is attached. the rows are moved by statements on
+    # the partitions rather than on `timecard`, so that the triggers maintaining the rollup don't see them.
+    conn.execute(
+        text(
+            f"CREATE TABLE {name} "
+            "(LIKE timecard INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)"
+        )
+    )
+    conn.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            "WHERE start_time >= :first_day AND start_time < :next_month RETURNING *) "
+            f"INSERT INTO {name} ({TIMECARD_STORED_COLUMNS}) SELECT {TIMECARD_STORED_COLUMNS} FROM moved"
+        ),
+        {"first_day": month, "next_month": next_month},
+    )
+    conn.execute(
+        text(
+            f"ALTER TABLE timecard ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+        )
+    )
+    return name
+
+
+def ensure_timecard_partitions(
+    conn: Connection,
+    today: Optional[datetime.date] = None,
+    months_ahead: int = PARTITION_MONTHS_AHEAD,
+) -> list[str]:
+    """
+    create partitions of `timecard` for the current month and `months_ahead` months ahead that don't exist yet,
+    and return their names. nothing is done (by a single query) unless `timecard` is partitioned.
+    it takes a connection, so that it can also be run through `AsyncConnection.run_sync`.
+    """
+    if not is_timecard_partitioned(conn):
+        return []
+    this_month = first_day_of_month(today or datetime.date.today())
+    months = [
+        this_month + relativedelta.relativedelta(months=i)
+        for i in range(months_ahead + 1)
+    ]
+    existing = list_month_partitions(conn)
+    if all(month in existing for month in months):
+        return []
+    # replicas launched at the same time create partitions one by one
+    lock_schema(conn)
+    existing = list_month_partitions(conn)
+    return [
+        _create_month_partition(conn, month)
+        for month in months
+        if month not in existing
+    ]
+
+
+def convert_timecard_to_partitioned(
+    conn: Connection, logger: Logger, today: Optional[datetime.date] = None
+) -> int:
+    """
+    convert `timecard` into a table partitioned by month on `start_time`, with a partition for every month
+    that has records (up to `PARTITION_MONTHS_AHEAD` months ahead) and the default partition,
+    and return the number of partitions created. this is done within the transaction of `conn`,
+    during which the table is locked, so it should be done while the bot is stopped.
+    the rollup is left as it is, since the records are only copied.
+    """
+    lock_schema(conn)
+    if is_timecard_partitioned(conn):
+        raise RuntimeError("timecard has already been partitioned")
+    if get_schema_version(conn) < LATEST_SCHEMA_VERSION:
+        raise RuntimeError(
+            "the schema is not in the latest version. migrate it by `python -m app.db.migrations` first."
+        )
+    conn.execute(text("LOCK TABLE timecard IN ACCESS EXCLUSIVE MODE"))
+    sequence = conn.execute(
+        text("SELECT pg_get_serial_sequence('timecard', 'id')")
+    ).scalar()
+    # keep the sequence of ids, which would be dropped together with the table owning it
+    conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+    conn.execute(text("ALTER TABLE timecard RENAME TO timecard_unpartitioned"))
+    conn.execute(
+        text(
+            "CREATE TABLE timecard "
+            "(LIKE timecard_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED) "
+            "PARTITION BY RANGE (start_time)"
+        )
+    )
+
+    this_month = first_day_of_month(today or datetime.date.today())
+    months = set(
+        conn.execute(
+            text(
+                "SELECT DISTINCT date_trunc('month', start_time)::date FROM timecard_unpartitioned"
+            )
+        ).scalars()
+    )
+    months.update(
+        this_month + relativedelta.relativedelta(months=i)
+        for i in range(PARTITION_MONTHS_AHEAD + 1)
+    )
+    for month in sorted(months):
+        next_month = month + relativedelta.relativedelta(months=1)
+        conn.execute(
+            text(
+                f"CREATE TABLE {month_partition_name(month)} PARTITION OF timecard "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+            )
+        )
+    conn.execute(
+        text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF timecard DEFAULT")
+    )
+
+    # copy the records before adding indexes and triggers, which is faster and keeps the rollup unchanged
+    num_records = conn.execute(
+        text(
+            f"INSERT INTO timecard ({TIMECARD_STORED_COLUMNS}) "
+            f"SELECT {TIMECARD_STORED_COLUMNS} FROM timecard_unpartitioned"
+        )
+    ).rowcount
+    logger.info(f"copied {num_records} records into {len(months)} monthly partitions")
+    conn.execute(text("DROP TABLE timecard_unpartitioned"))
+    conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY timecard.id"))
+
+    # a primary key (and any unique index) of a partitioned table must contain the partition key
+    conn.execute(text("ALTER TABLE timecard ADD PRIMARY KEY (id, start_time)"))
+    conn.execute(
+        text(
+            "ALTER TABLE timecard ADD FOREIGN KEY (ra_id) REFERENCES ra (id) "
+            "ON DELETE CASCADE ON UPDATE CASCADE"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE UNIQUE INDEX ix_timecard_slack_message_ts_start_time "
+            "ON timecard (slack_message_ts, start_time)"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE INDEX ix_timecard_ra_id_start_time ON timecard (ra_id, start_time)"
+        )
+    )
+    for statement in TIMECARD_TRIGGER_STATEMENTS:
+        conn.execute(text(statement))
+    conn.execute(text("ANALYZE timecard"))
+    return len(months) + 1
+
+
+def archive_month_partition(
+    conn: Connection, month: datetime.date, output_dir: str
+) -> str:
+    """
+    detach the partition of `month` from `timecard`, dump its records into a gzipped CSV file in `output_dir`,
+    and drop it together with the rollup of the month. return the path to the file.
+    if anything fails, the transaction of `conn` is rolled back and the partition is left as it is.
+    """
+    name = month_partition_name(month)
+    path = os.path.join(output_dir, f"{name}.csv.gz")
+    conn.execute(text(f"ALTER TABLE timecard DETACH PARTITION {name}"))
+    # COPY is only available on the DBAPI (psycopg2) cursor
+    cursor = conn.connection.dbapi_connection.cursor()
+    # write to a temporary file first, so that a file with the final name always contains all records
+    with gzip.open(f"{path}.tmp", "wb") as dump:
+        cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", dump)
+    os.replace(f"{path}.tmp", path)
+    conn.execute(
+        text("DELETE FROM working_hours_rollup WHERE year_month = :month"),
+        {"month": month},
+    )
+    # files exported for the month are cached by replicas (see `app.replicas`)
+    conn.execute(
+        text("SELECT pg_notify('timecard_month_changed', :month)"),
+        {"month": month.isoformat()},
+    )
+    conn.execute(text(f"DROP TABLE {name}"))
+    return path
+
+
+if __name__ == "__main__":
+    # CLI to partition and archive records, e.g. `python -m app.db.partitioning --dbconfig <path> convert`
+    from sqlalchemy import create_engine
+
+    from ..config import DBConfig
+    from .setup import get_db_url
+
+    parser = argparse.ArgumentParser(
+        description="Partition work records of RA timecard recorder by month, and archive old ones"
+    )
+    parser.add_argument(
+        "--dbconfig",
+        help="JSON file containing database configuration (if not given, environment variables will be used)",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="Show the monthly partitions")
+    subparsers.add_parser(
+        "convert",
+        help="Convert the table of work records into a partitioned table (stop the bot beforehand)",
+    )
+    subparsers.add_parser(
+        "ensure",
+        help=f"Create partitions for this month and {PARTITION_MONTHS_AHEAD} months ahead",
+    )
+    archive_parser = subparsers.add_parser(
+        "archive",
+        help="Dump partitions older than the given years into gzipped CSV files and drop them",
+    )
+    archive_parser.add_argument(
+        "--years",
+        help="Partitions of months before this many years ago are archived",
+        type=int,
+        required=True,
+    )
+    archive_parser.add_argument(
+        "--output_dir", help="Directory to write the dumps to", required=True
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig()
+    logger = logging.getLogger("partitioning")
+    logger.setLevel(logging.INFO)
+
+    db_config = (
+        DBConfig.from_file(filepath=args.dbconfig)
+        if args.dbconfig
+        else DBConfig.from_env()
+    )
+    engine = create_engine(url=get_db_url(db_config=db_config))
+
+    if args.command == "status":
+        with engine.connect() as conn:
+            if not is_timecard_partitioned(conn):
+                print("timecard is not partitioned")
+            for month, name in sorted(list_month_partitions(conn).items()):
+                print(f"{month:%Y/%m}: {name}")
+    elif args.command == "convert":
+        with engine.begin() as conn:
+            num_partitions = convert_timecard_to_partitioned(conn, logger=logger)
+        logger.info(f"partitioned timecard into {num_partitions} partitions")
+    elif args.command == "ensure":
+        with engine.begin() as conn:
+            created = ensure_timecard_partitions(conn)
+        logger.info(f"created {len(created)} partitions: {', '.join(created)}")
+    elif args.command == "archive":
+        cutoff = first_day_of_month(
+            datetime.date.today()
+        ) - relativedelta.relativedelta(years=args.years)
+        os.makedirs(args.output_dir, exist_ok=True)
+        with engine.connect() as conn:
+            months = sorted(
+                month for month in list_month_partitions(conn) if month < cutoff
+            )
+        # archive a month per transaction, so that locks are held only while each partition is dumped
+        for month in months:
+            with engine.begin() as conn:
+                path = archive_month_partition(conn, month, output_dir=args.output_dir)
+            logger.info(f"archived records of {month:%Y/%m} into {path}")
+        logger.info(f"archived {len(months)} partitions before {cutoff:%Y/%m}")
+    engine.dispose()
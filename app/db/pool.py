@@ -0,0 +1,91 @@
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import Engine, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+# defaults of `QueuePool`, which can be overridden by `DBConfig`
+POOL_SIZE = 5
+MAX_OVERFLOW = 10
+POOL_TIMEOUT = 30.0
+POOL_RECYCLE = -1
+
+
+class PoolMetrics:
+    def __init__(self) -> None:
+        """
+        counters of connections checked out of a pool, and of the time spent waiting for them (including opening new ones)
+        """
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, wait_seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+
+class MeasuredQueuePool(QueuePool):
+    """
+    `QueuePool` that records how long each checkout waited for a connection (e.g. while all of them were in use).
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self) -> Any:
+        started_at = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - started_at, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - started_at)
+        return connection
+
+    def recreate(self) -> "MeasuredQueuePool":
+        # `Engine.dispose` replaces the pool with a new one, which keeps counting
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class MeasuredAsyncAdaptedQueuePool(MeasuredQueuePool, AsyncAdaptedQueuePool):
+    """
+    asyncio version of `MeasuredQueuePool`, used by engines of `create_async_engine`.
+    """
+
+
+def pool_stats(engine: Engine) -> dict[str, float]:
+    """
+    return the number of connections in use and the time spent waiting for them, for the pool of `engine`.
+    pass `AsyncEngine.sync_engine` for async engines.
+    """
+    pool: Pool = engine.pool
+    if not isinstance(pool, MeasuredQueuePool):
+        raise ValueError(f"{type(pool).__name__} does not record metrics")
+    metrics = pool.metrics
+    with metrics._lock:
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            # negative while fewer than `size` connections have been opened
+            "overflow": max(pool.overflow(), 0),
+            "checkouts": metrics.checkouts,
+            "timeouts": metrics.timeouts,
+            "mean_wait_seconds": (
+                metrics.total_wait_seconds / (metrics.checkouts + metrics.timeouts)
+                if metrics.checkouts + metrics.timeouts
+                else 0.0
+            ),
+            "max_wait_seconds": metrics.max_wait_seconds,
+        }
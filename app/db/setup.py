@@ -2,41 +2,102 @@ import logging
 import signal
 import sys
 import urllib.parse
+from typing import TYPE_CHECKING
 
-from sqlalchemy import URL, create_engine
+from sqlalchemy import URL, Connection, Engine, create_engine, inspect
 from sqlalchemy.orm import Session, sessionmaker
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
 from ..config import DBConfig
-from .model import Base
+from .migrations import is_schema_up_to_date, lock_schema, migrate
+from .model import Base, TimeCard
+from .partitioning import ensure_timecard_partitions
+from .pool import MeasuredAsyncAdaptedQueuePool, MeasuredQueuePool
+
+
+def get_db_url(db_config: DBConfig, drivername: str = "postgresql+psycopg2") -> URL:
+    """
+    return URL of the database described by `db_config`.
+    """
+    return URL.create(
+        drivername=drivername,
+        username=db_config.username,
+        password=urllib.parse.quote_plus(db_config.password),
+        host=db_config.host,
+        database=db_config.db_name,
+        # asyncpg takes "ssl" instead of libpq's "sslmode"
+        query={"ssl" if drivername.endswith("asyncpg") else "sslmode": "disable"},
+    )
+
+
+def create_tables(conn: Connection) -> None:
+    """
+    create all tables defined in model.py, if the database has none of them yet.
+    tables of an existing database are only created and changed by the migrations, which are written against
+    the tables as they were at their versions (e.g. migration 2 creates `working_hours_rollup` in INTERVAL,
+    which migration 8 converts into minutes), and can't be applied to tables created from the latest model.
+    it takes a connection, so that it can also be run through `AsyncConnection.run_sync`.
+    """
+    if not inspect(conn).has_table(TimeCard.__tablename__):
+        Base.metadata.create_all(bind=conn)
+
+
+def prepare_schema(engine: Engine, run_migrations: bool = True) -> None:
+    """
+    create all tables defined in model.py on a new database and apply pending schema migrations
+    (unless `run_migrations` is False).
+    nothing is done if the schema is already in the latest version, which takes a single query,
+    so that a restarted bot does not wait for catalog queries and the lock.
+    partitions of the coming months are also created if `timecard` is partitioned, which takes another query otherwise.
+    """
+    with engine.connect() as conn:
+        if is_schema_up_to_date(conn):
+            # partition the coming months, if `timecard` is partitioned
+            ensure_timecard_partitions(conn)
+            conn.commit()
+            return
+
+    with engine.begin() as conn:
+        # replicas launched at the same time create tables and migrate one by one
+        lock_schema(conn)
+        # create tables related to Base, if the database is new
+        create_tables(conn)
+        # bring existing tables up to date (e.g. add indexes that `create_all` can't add to existing tables)
+        if run_migrations:
+            migrate(conn=conn, logger=logging.getLogger("bot"))
+        ensure_timecard_partitions(conn)
 
 
 def setup_db_and_get_sessionmaker(
-    db_config: DBConfig, sqlalchemy_loglevel: int = logging.WARNING
+    db_config: DBConfig,
+    sqlalchemy_loglevel: int = logging.WARNING,
+    run_migrations: bool = True,
+    defer_schema: bool = False,
 ) -> sessionmaker[Session]:
     """
     return `sessionmaker` after following procedures:
 
     1. set SQLAlchemy logger to `sqlalchemy_loglevel`.
-    2. connect to DB and create all tables defined in model.py.
-    3. get `sessionmaker` that creates "session", on which DB operations will be performed.
-    4. set up signal handler, so that connection to db will be properly closed on SIGINT or SIGTERM.
+    2. connect to DB and create all tables defined in model.py if it is new, unless `defer_schema` is True.
+    3. apply pending schema migrations, unless `run_migrations` is False or `defer_schema` is True.
+    4. get `sessionmaker` that creates "session", on which DB operations will be performed.
+    5. set up signal handler, so that connection to db will be properly closed on SIGINT or SIGTERM.
+
+    with `defer_schema`, no connection is made here, and `prepare_schema` has to be called later.
     """
     logging.getLogger("sqlalchemy.engine").setLevel(sqlalchemy_loglevel)
 
     ### DB setup ###
-    db_url = URL.create(
-        drivername="postgresql+psycopg2",
-        username=db_config.username,
-        password=urllib.parse.quote_plus(db_config.password),
-        host=db_config.host,
-        database=db_config.db_name,
-        query={"sslmode": "disable"},
-    )
+    db_url = get_db_url(db_config=db_config)
 
     # define an engine that connects to the database
-    engine = create_engine(url=db_url, pool_pre_ping=True)
-    # create tables related to Base, if they're not present
-    Base.metadata.create_all(bind=engine, checkfirst=True)
+    engine = create_engine(
+        url=db_url, poolclass=MeasuredQueuePool, **db_config.pool_options()
+    )
+    if not defer_schema:
+        prepare_schema(engine, run_migrations=run_migrations)
 
     # define a sessionmaker that creates a "session", on which database operations are performed
     sessmaker = sessionmaker(bind=engine, expire_on_commit=False)
@@ -52,3 +113,58 @@ def setup_db_and_get_sessionmaker(
     signal.signal(signal.SIGINT, signal_handler)
 
     return sessmaker
+
+
+async def prepare_async_schema(
+    engine: "AsyncEngine", run_migrations: bool = True
+) -> None:
+    """
+    asyncio version of `prepare_schema`.
+    """
+    async with engine.connect() as conn:
+        if await conn.run_sync(is_schema_up_to_date):
+            await conn.run_sync(ensure_timecard_partitions)
+            await conn.commit()
+            return
+
+    async with engine.begin() as conn:
+        # replicas launched at the same time create tables and migrate one by one
+        await conn.run_sync(lock_schema)
+        # create tables related to Base, if the database is new
+        await conn.run_sync(create_tables)
+        # bring existing tables up to date
+        if run_migrations:
+            await conn.run_sync(migrate, logger=logging.getLogger("bot"))
+        await conn.run_sync(ensure_timecard_partitions)
+
+
+async def setup_async_db_and_get_sessionmaker(
+    db_config: DBConfig,
+    sqlalchemy_loglevel: int = logging.WARNING,
+    run_migrations: bool = True,
+    defer_schema: bool = False,
+) -> "async_sessionmaker[AsyncSession]":
+    """
+    asyncio version of `setup_db_and_get_sessionmaker`, which connects to DB through asyncpg.
+    signal handler is not set up, since the engine should be disposed by awaiting
+    `sessmaker.kw["bind"].dispose()` when the event loop finishes.
+    """
+    # imported here so that asyncpg is only required in async mode
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    logging.getLogger("sqlalchemy.engine").setLevel(sqlalchemy_loglevel)
+
+    ### DB setup ###
+    db_url = get_db_url(db_config=db_config, drivername="postgresql+asyncpg")
+
+    # define an engine that connects to the database
+    engine = create_async_engine(
+        url=db_url,
+        poolclass=MeasuredAsyncAdaptedQueuePool,
+        **db_config.pool_options(),
+    )
+    if not defer_schema:
+        await prepare_async_schema(engine, run_migrations=run_migrations)
+
+    # define a sessionmaker that creates a "session", on which database operations are performed
+    return async_sessionmaker(bind=engine, expire_on_commit=False)
@@ -0,0 +1,64 @@
+import collections
+import datetime
+import threading
+import time
+from typing import Optional
+
+# number of event keys remembered in memory
+SEEN_EVENTS_MAXSIZE = 10000
+# Slack retries an event for a few minutes at most, so keys stored in the database are kept only for a day
+SEEN_EVENTS_RETENTION = datetime.timedelta(days=1)
+# interval in seconds between deletions of expired keys from the database
+SEEN_EVENTS_PRUNE_INTERVAL = 3600.0
+
+
+def event_dedup_key(body: dict) -> Optional[str]:
+    """
+    return the key identifying the event in `body`, which is its `event_id`. Slack keeps the event_id when it delivers
+    an event again, while an edit of a message (which also results in `app_mention`) is a new event with its own.
+    return None if `body` is not an event (e.g. a slash command), which is never deduplicated.
+    """
+    if body.get("type") != "event_callback":
+        return None
+    return body.get("event_id")
+
+
+class EventDeduplicator:
+    """
+    a bounded in-memory set of event keys that have been received, and the number of duplicates dropped with it.
+    """
+
+    def __init__(self, maxsize: int = SEEN_EVENTS_MAXSIZE) -> None:
+        self.maxsize = maxsize
+        self.duplicates = 0
+        # keys ordered from the oldest
+        self._seen: collections.OrderedDict[str, None] = collections.OrderedDict()
+        self._last_pruned_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, event_key: str) -> bool:
+        """
+        remember `event_key` and return True, or return False if it has already been remembered.
+        """
+        with self._lock:
+            if event_key in self._seen:
+                return False
+            self._seen[event_key] = None
+            while len(self._seen) > self.maxsize:
+                self._seen.popitem(last=False)
+            return True
+
+    def count_duplicate(self) -> None:
+        with self._lock:
+            self.duplicates += 1
+
+    def should_prune(self) -> bool:
+        """
+        return True once every `SEEN_EVENTS_PRUNE_INTERVAL` seconds, when expired keys should be deleted from the database.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_pruned_at < SEEN_EVENTS_PRUNE_INTERVAL:
+                return False
+            self._last_pruned_at = now
+            return True
@@ -0,0 +1,513 @@
+import asyncio
+import csv
+import datetime
+import enum
+import importlib.util
+import io
+import itertools
+import tempfile
+import urllib.request
+import zipfile
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    AsyncIterator,
+    Callable,
+    Iterator,
+    Sequence,
+    TextIO,
+    TypeVar,
+)
+
+from slack_sdk.web.client import WebClient
+from sqlalchemy import Row, Select, func, select
+from sqlalchemy.orm import Session
+
+from .db.model import RA, TimeCard, User
+from .services.timecards import starts_within
+
+if TYPE_CHECKING:
+    from slack_sdk.web.async_client import AsyncWebClient
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+T = TypeVar("T")
+
+# number of rows fetched from the server-side cursor at once
+EXPORT_BATCH_SIZE = 1000
+# exported files larger than this are rolled over from memory to a temporary file on disk
+EXPORT_SPOOL_MAX_SIZE = 1024 * 1024
+# number of rows written to a Parquet file as a row group, since a row group per fetched batch would compress poorly
+PARQUET_ROW_GROUP_SIZE = 64 * 1024
+
+ALL_RECORDS_CSV_FIELDNAMES = [
+    "name",
+    "ra_name",
+    "start_timestamp",
+    "end_timestamp",
+    "work_duration",
+    "break_duration",
+    "description",
+]
+
+
+class ExportLayout(enum.Enum):
+    """
+    how records of a period are exported.
+    """
+
+    # a single CSV file
+    CSV = "csv"
+    # a ZIP file containing a CSV file per month
+    ZIP_BY_MONTH = "zip_by_month"
+    # a ZIP file containing a CSV file per RA job
+    ZIP_BY_RA = "zip_by_ra"
+    # a Parquet file with typed columns for analytics, which requires the `parquet` extra
+    PARQUET = "parquet"
+
+
+USER_RECORDS_CSV_FIELDNAMES = [
+    "ra_name",
+    "date",
+    "start_time",
+    "end_time",
+    "break_time",
+    "description",
+]
+
+
+def select_all_records(
+    first_day: datetime.date,
+    first_day_of_next_period: datetime.date,
+    layout: ExportLayout = ExportLayout.CSV,
+) -> Select:
+    """
+    return a statement selecting the columns needed to export work records of all users
+    starting within [`first_day`, `first_day_of_next_period`).
+    only plain columns are selected so that no ORM object has to be built per row.
+    rows are ordered so that those written to the same file in `layout` are next to each other.
+    """
+    month = func.date_trunc("month", TimeCard.start_time)
+    return (
+        select(
+            User.name,
+            RA.ra_name,
+            TimeCard.start_time,
+            TimeCard.end_time,
+            TimeCard.duration,
+            TimeCard.break_duration,
+            TimeCard.description,
+        )
+        .join(RA, RA.id == TimeCard.ra_id)
+        .join(User, User.id == RA.user_id)
+        .where(starts_within(first_day, first_day_of_next_period))
+        .order_by(
+            *(
+                [RA.ra_name, month]
+                if layout == ExportLayout.ZIP_BY_RA
+                else [month, RA.ra_name]
+            ),
+            User.id,
+            TimeCard.start_time,
+        )
+    )
+
+
+def iter_record_batches(
+    sess: Session, stmt: Select, batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[Sequence[Row]]:
+    """
+    execute `stmt` with a server-side cursor and yield its result in batches of `batch_size` rows,
+    so that the whole result never has to be held in memory.
+    """
+    result = sess.execute(stmt.execution_options(yield_per=batch_size))
+    yield from result.partitions()
+
+
+def _iter_batches_from_loop(
+    batches: AsyncIterator[Sequence[Row]], loop: asyncio.AbstractEventLoop
+) -> Iterator[Sequence[Row]]:
+    """
+    yield batches of `batches` in a thread other than that of `loop`, on which they are fetched one by one.
+    """
+
+    async def next_batch():
+        return await anext(batches, None)
+
+    while (
+        batch := asyncio.run_coroutine_threadsafe(next_batch(), loop).result()
+    ) is not None:
+        yield batch
+
+
+async def consume_record_batches(
+    sess: "AsyncSession",
+    stmt: Select,
+    consume: Callable[[Iterator[Sequence[Row]]], T],
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> T:
+    """
+    asyncio version of `iter_record_batches`, which passes the batches to `consume` and returns its result.
+    rows are fetched on the event loop, while `consume` is run in a thread, so that encoding rows or writing them
+    to a file never blocks the event loop however many rows there are.
+    """
+    result = await sess.stream(stmt.execution_options(yield_per=batch_size))
+    return await asyncio.to_thread(
+        consume,
+        _iter_batches_from_loop(result.partitions(), asyncio.get_running_loop()),
+    )
+
+
+def _format_minutes(minutes: int, separator: str = ":") -> str:
+    return f"{minutes // 60:02}{separator}{minutes % 60:02}"
+
+
+def _write_all_records_rows(writer, rows: Sequence[Row]) -> None:
+    for (
+        name,
+        ra_name,
+        start_time,
+        end_time,
+        duration,
+        break_duration,
+        description,
+    ) in rows:
+        writer.writerow(
+            [
+                name,
+                ra_name,
+                start_time.strftime("%Y/%m/%d %H:%M:%S"),
+                end_time.strftime("%Y/%m/%d %H:%M:%S"),
+                _format_minutes(duration),
+                _format_minutes(break_duration),
+                description,
+            ]
+        )
+
+
+def write_all_records_csv(
+    batches: Iterator[Sequence[Row]], binary_file: IO[bytes]
+) -> int:
+    """
+    write rows selected by `select_all_records` to `binary_file` as CSV encoded in cp932, and return the number of rows.
+    NOTE: "cp932" is used instead of "shift_jis" since it can handle platform-dependent characters like "髙".
+    """
+    # newline="" keeps "\r\n" written by the csv module as it is
+    text_file = io.TextIOWrapper(binary_file, encoding="cp932", newline="")
+    writer = csv.writer(text_file)
+    writer.writerow(ALL_RECORDS_CSV_FIELDNAMES)
+    num_rows = 0
+    for batch in batches:
+        _write_all_records_rows(writer, batch)
+        num_rows += len(batch)
+        # encode what has been written so far, so that the text buffer never grows beyond one batch
+        text_file.flush()
+    # detach so that closing the wrapper does not close `binary_file`
+    text_file.detach()
+    return num_rows
+
+
+def write_all_records_zip(
+    batches: Iterator[Sequence[Row]],
+    binary_file: IO[bytes],
+    filename_of: Callable[[Row], str],
+) -> int:
+    """
+    write rows selected by `select_all_records` to `binary_file` as a ZIP file, in which rows are split into
+    cp932 CSV files named by `filename_of`, and return the number of rows.
+    rows of the same file have to be next to each other, so that each file is written at once while streaming rows.
+    """
+    num_rows = 0
+    with zipfile.ZipFile(binary_file, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        text_file = None
+        current_filename = None
+        for batch in batches:
+            for filename, rows in itertools.groupby(batch, key=filename_of):
+                if filename != current_filename:
+                    if text_file is not None:
+                        text_file.close()
+                    text_file = io.TextIOWrapper(
+                        zf.open(filename, mode="w"), encoding="cp932", newline=""
+                    )
+                    writer = csv.writer(text_file)
+                    writer.writerow(ALL_RECORDS_CSV_FIELDNAMES)
+                    current_filename = filename
+                _write_all_records_rows(writer, list(rows))
+            num_rows += len(batch)
+        if text_file is not None:
+            text_file.close()
+    return num_rows
+
+
+def parquet_available() -> bool:
+    """
+    return whether pyarrow, which is needed to export Parquet files, is installed.
+    """
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def write_all_records_parquet(
+    batches: Iterator[Sequence[Row]], binary_file: IO[bytes]
+) -> int:
+    """
+    write rows selected by `select_all_records` to `binary_file` as a Parquet file compressed by zstd,
+    and return the number of rows.
+    timestamps are written as timestamps and durations as minutes, so that they can be analyzed without parsing.
+    each batch is converted into columns at once, without building an object per row.
+    """
+    # imported here so that pyarrow is only required to export Parquet files
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            ("name", pa.string()),
+            ("ra_name", pa.string()),
+            ("start_timestamp", pa.timestamp("us")),
+            ("end_timestamp", pa.timestamp("us")),
+            ("work_minutes", pa.int32()),
+            ("break_minutes", pa.int32()),
+            ("description", pa.string()),
+        ]
+    )
+    num_rows = 0
+    # tables of batches not written yet, which are written together as a row group
+    pending_tables = []
+    num_pending_rows = 0
+    with pq.ParquetWriter(binary_file, schema=schema, compression="zstd") as writer:
+        for batch in batches:
+            (
+                names,
+                ra_names,
+                start_times,
+                end_times,
+                durations,
+                break_durations,
+                descriptions,
+            ) = zip(*batch)
+            pending_tables.append(
+                pa.Table.from_arrays(
+                    [
+                        pa.array(names, type=pa.string()),
+                        pa.array(ra_names, type=pa.string()),
+                        pa.array(start_times, type=pa.timestamp("us")),
+                        pa.array(end_times, type=pa.timestamp("us")),
+                        pa.array(durations, type=pa.int32()),
+                        pa.array(break_durations, type=pa.int32()),
+                        pa.array(descriptions, type=pa.string()),
+                    ],
+                    schema=schema,
+                )
+            )
+            num_pending_rows += len(batch)
+            num_rows += len(batch)
+            if num_pending_rows >= PARQUET_ROW_GROUP_SIZE:
+                writer.write_table(
+                    pa.concat_tables(pending_tables),
+                    row_group_size=num_pending_rows,
+                )
+                pending_tables = []
+                num_pending_rows = 0
+        if pending_tables:
+            writer.write_table(
+                pa.concat_tables(pending_tables), row_group_size=num_pending_rows
+            )
+    return num_rows
+
+
+def export_all_records(
+    sess: Session,
+    first_day: datetime.date,
+    first_day_of_next_period: datetime.date,
+    binary_file: IO[bytes],
+    layout: ExportLayout = ExportLayout.CSV,
+) -> int:
+    """
+    write work records of all users starting within [`first_day`, `first_day_of_next_period`) to `binary_file`
+    as a cp932 CSV file, a ZIP file of them or a Parquet file, and return the number of records.
+    all records are read by a single query regardless of the length of the period.
+    """
+    return write_all_records(
+        iter_record_batches(
+            sess=sess,
+            stmt=select_all_records(
+                first_day=first_day,
+                first_day_of_next_period=first_day_of_next_period,
+                layout=layout,
+            ),
+        ),
+        binary_file=binary_file,
+        layout=layout,
+    )
+
+
+async def export_all_records_async(
+    sess: "AsyncSession",
+    first_day: datetime.date,
+    first_day_of_next_period: datetime.date,
+    binary_file: IO[bytes],
+    layout: ExportLayout = ExportLayout.CSV,
+) -> int:
+    """
+    asyncio version of `export_all_records`, in which the file is written in a thread.
+    """
+    return await consume_record_batches(
+        sess,
+        stmt=select_all_records(
+            first_day=first_day,
+            first_day_of_next_period=first_day_of_next_period,
+            layout=layout,
+        ),
+        consume=lambda batches: write_all_records(
+            batches, binary_file=binary_file, layout=layout
+        ),
+    )
+
+
+def write_all_records(
+    batches: Iterator[Sequence[Row]],
+    binary_file: IO[bytes],
+    layout: ExportLayout = ExportLayout.CSV,
+) -> int:
+    """
+    write rows selected by `select_all_records` to `binary_file` in `layout`, and return the number of rows.
+    """
+    if layout == ExportLayout.ZIP_BY_MONTH:
+        return write_all_records_zip(
+            batches,
+            binary_file=binary_file,
+            filename_of=lambda row: f"{row.start_time.year}_{row.start_time.month}_all_working_records.csv",
+        )
+    if layout == ExportLayout.ZIP_BY_RA:
+        return write_all_records_zip(
+            batches,
+            binary_file=binary_file,
+            filename_of=lambda row: f"{row.ra_name}_all_working_records.csv",
+        )
+    if layout == ExportLayout.PARQUET:
+        return write_all_records_parquet(batches=batches, binary_file=binary_file)
+    return write_all_records_csv(batches=batches, binary_file=binary_file)
+
+
+def write_user_records_csv(
+    records: Sequence[tuple[RA, TimeCard]], text_file: TextIO
+) -> None:
+    """
+    write records returned by `services.timecards.get_user_records` to `text_file` as CSV.
+    """
+    writer = csv.writer(text_file)
+    writer.writerow(USER_RECORDS_CSV_FIELDNAMES)
+    for ra, timecard in records:
+        writer.writerow(
+            [
+                ra.ra_name,
+                timecard.start_time.strftime("%d"),
+                timecard.start_time.strftime("%H%M"),
+                timecard.end_time.strftime("%H%M"),
+                _format_minutes(timecard.break_duration, separator=""),
+                timecard.description,
+            ]
+        )
+
+
+def write_user_records_zip(
+    records: Sequence[tuple[RA, TimeCard]], binary_file: IO[bytes]
+) -> None:
+    """
+    write records returned by `services.timecards.get_user_records` to `binary_file` as a ZIP file
+    containing a CSV file per month, each of which is the same as the one written by `write_user_records_csv`.
+    """
+    with zipfile.ZipFile(binary_file, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for (year, month), records_of_month in itertools.groupby(
+            records,
+            key=lambda record: (record[1].start_time.year, record[1].start_time.month),
+        ):
+            with io.TextIOWrapper(
+                zf.open(f"{year}_{month}_working_hours.csv", mode="w"),
+                encoding="utf-8",
+                newline="",
+            ) as text_file:
+                write_user_records_csv(
+                    records=list(records_of_month), text_file=text_file
+                )
+
+
+def encode_user_records(
+    records: Sequence[tuple[RA, TimeCard]], layout: ExportLayout
+) -> bytes:
+    """
+    return the content of the file of records returned by `services.timecards.get_user_records`,
+    which is a UTF-8 CSV file or a ZIP file of them by month.
+    """
+    if layout == ExportLayout.CSV:
+        with io.StringIO() as csv_text_as_file:
+            write_user_records_csv(records=records, text_file=csv_text_as_file)
+            return csv_text_as_file.getvalue().encode("utf-8")
+    with io.BytesIO() as zip_file:
+        write_user_records_zip(records=records, binary_file=zip_file)
+        return zip_file.getvalue()
+
+
+def new_spooled_file() -> tempfile.SpooledTemporaryFile:
+    """
+    return a binary temporary file that stays in memory until it exceeds `EXPORT_SPOOL_MAX_SIZE`.
+    """
+    return tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE, mode="w+b")
+
+
+def upload_file_in_chunks(
+    client: WebClient, channel: str, title: str, filename: str, file: IO[bytes]
+) -> None:
+    """
+    upload the content of `file` to `channel` like `WebClient.files_upload_v2` does,
+    but stream it from the file instead of reading it into memory at once.
+    """
+    length = file.seek(0, io.SEEK_END)
+    file.seek(0)
+    url_response = client.files_getUploadURLExternal(filename=filename, length=length)
+    # urllib sends a file object in blocks as long as Content-Length is given
+    request = urllib.request.Request(
+        url=url_response["upload_url"],
+        data=file,
+        headers={"Content-Length": str(length)},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=client.timeout) as response:
+        if response.status != 200:
+            raise RuntimeError(
+                f"failed to upload {filename} (status: {response.status})"
+            )
+    client.files_completeUploadExternal(
+        files=[{"id": url_response["file_id"], "title": title}], channel_id=channel
+    )
+
+
+async def upload_file_in_chunks_async(
+    client: "AsyncWebClient", channel: str, title: str, filename: str, file: IO[bytes]
+) -> None:
+    """
+    asyncio version of `upload_file_in_chunks`.
+    """
+    # imported here so that aiohttp is only required in async mode
+    import aiohttp
+
+    length = file.seek(0, io.SEEK_END)
+    file.seek(0)
+    url_response = await client.files_getUploadURLExternal(
+        filename=filename, length=length
+    )
+    # aiohttp reads a file object in chunks in a thread pool, so the event loop is never blocked by file I/O
+    async with aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=client.timeout)
+    ) as http_session:
+        async with http_session.post(
+            url=url_response["upload_url"],
+            data=file,
+            headers={"Content-Length": str(length)},
+        ) as response:
+            if response.status != 200:
+                raise RuntimeError(
+                    f"failed to upload {filename} (status: {response.status})"
+                )
+    await client.files_completeUploadExternal(
+        files=[{"id": url_response["file_id"], "title": title}], channel_id=channel
+    )
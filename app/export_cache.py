@@ -0,0 +1,188 @@
+import collections
+import datetime
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from typing import IO, NamedTuple, Optional, Sequence
+
+# directory in which exported files are cached, if not given by the bot configuration
+EXPORT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "ra-timecard-recorder-exports")
+# total size of cached files, beyond which the least recently used ones are deleted
+EXPORT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# prefix of files being written to the cache
+EXPORT_CACHE_TMP_PREFIX = "tmp-"
+# the key used for exports of all users
+ALL_USERS = "*"
+
+
+class ExportKey(NamedTuple):
+    # a slack user id, or `ALL_USERS`
+    scope: str
+    # the first days of the exported months
+    months: tuple[datetime.date, ...]
+    export_format: str
+    # versions of the months when the key was taken
+    versions: tuple[int, ...]
+    # generation of the whole cache when the key was taken
+    generation: int
+
+
+class ExportCache:
+    """
+    a cache of exported files on local disk, keyed by (slack user id or `ALL_USERS`, months, format).
+    files are stored under the SHA-256 of their content, so that the same content is stored only once.
+    each month has a version which is incremented whenever a record within the month is written,
+    and it is part of the key, so that files exported before the write are never returned again.
+    """
+
+    def __init__(
+        self, directory: str = EXPORT_CACHE_DIR, max_bytes: int = EXPORT_CACHE_MAX_BYTES
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # keys and digests of the files, ordered from the least recently used
+        self._digests: collections.OrderedDict[ExportKey, str] = (
+            collections.OrderedDict()
+        )
+        # digest -> size of the file
+        self._sizes: dict[str, int] = {}
+        self._versions: collections.Counter[datetime.date] = collections.Counter()
+        # incremented when it is unknown which months have been written, which makes every key stale
+        self._generation = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        # files left by the previous run may be stale, since versions start from 0 again
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and (
+                entry.name.startswith(EXPORT_CACHE_TMP_PREFIX)
+                or re.fullmatch(r"[0-9a-f]{64}", entry.name)
+            ):
+                os.remove(entry.path)
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest)
+
+    def key(
+        self, scope: str, months: Sequence[datetime.date], export_format: str
+    ) -> ExportKey:
+        """
+        return the key of the file of `scope` (a slack user id or `ALL_USERS`) exported in `export_format`
+        for the months, given by their first days.
+        the key has to be taken before reading records, so that a write during the export makes it stale.
+        """
+        with self._lock:
+            return ExportKey(
+                scope=scope,
+                months=tuple(months),
+                export_format=export_format,
+                versions=tuple(self._versions[month] for month in months),
+                generation=self._generation,
+            )
+
+    def _is_stale(self, key: ExportKey) -> bool:
+        return key.generation != self._generation or key.versions != tuple(
+            self._versions[month] for month in key.months
+        )
+
+    def get(self, key: ExportKey) -> Optional[IO[bytes]]:
+        """
+        return the cached file opened in binary mode, or None if it is not cached.
+        """
+        with self._lock:
+            digest = self._digests.get(key)
+            if digest is None:
+                self.misses += 1
+                return None
+            self._digests.move_to_end(key)
+            self.hits += 1
+            # open it while holding the lock, so that it is not deleted by eviction before being opened
+            return open(self._path(digest), "rb")
+
+    def put(self, key: ExportKey, file: IO[bytes]) -> None:
+        """
+        store the content of `file` (from its beginning) under `key`. the position of `file` is restored.
+        """
+        position = file.tell()
+        file.seek(0)
+        sha256 = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(
+            dir=self.directory, prefix=EXPORT_CACHE_TMP_PREFIX, delete=False
+        ) as tmp:
+            while chunk := file.read(1024 * 1024):
+                sha256.update(chunk)
+                tmp.write(chunk)
+                size += len(chunk)
+        file.seek(position)
+        digest = sha256.hexdigest()
+        with self._lock:
+            if self._is_stale(key) or size > self.max_bytes:
+                # the month has been written during the export, or the file is too large to cache
+                os.remove(tmp.name)
+                return
+            if digest in self._sizes:
+                os.remove(tmp.name)
+            else:
+                os.replace(tmp.name, self._path(digest))
+                self._sizes[digest] = size
+            self._digests[key] = digest
+            self._digests.move_to_end(key)
+            self._evict()
+
+    def invalidate_month(self, year_month: datetime.date) -> None:
+        """
+        make files of the month stale. `year_month` may be any date or datetime within the month.
+        """
+        year_month = datetime.date(year=year_month.year, month=year_month.month, day=1)
+        with self._lock:
+            self._versions[year_month] += 1
+            for key in [key for key in self._digests if year_month in key.months]:
+                self._release(key)
+
+    def invalidate_all(self) -> None:
+        """
+        make every file stale, including those being exported now.
+        used when writes of records may have been missed, e.g. while other replicas could not be listened to.
+        """
+        with self._lock:
+            self._generation += 1
+            for key in list(self._digests):
+                self._release(key)
+
+    def _release(self, key: ExportKey) -> None:
+        """
+        forget `key` and delete its file unless another key refers to it. `self._lock` has to be held.
+        """
+        digest = self._digests.pop(key)
+        if digest not in self._digests.values():
+            del self._sizes[digest]
+            try:
+                os.remove(self._path(digest))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self) -> None:
+        """
+        delete the least recently used files until the total size fits. `self._lock` has to be held.
+        """
+        while sum(self._sizes.values()) > self.max_bytes and self._digests:
+            self._release(next(iter(self._digests)))
+
+    def stats(self) -> dict[str, int]:
+        """
+        return hit and miss counters and the total size of cached files.
+        """
+        return {
+            "export_cache_hits": self.hits,
+            "export_cache_misses": self.misses,
+            "export_cache_bytes": self.total_bytes,
+        }
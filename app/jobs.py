@@ -0,0 +1,271 @@
+import asyncio
+import collections
+import concurrent.futures
+import enum
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from logging import Logger
+from typing import Awaitable, Callable, Optional
+
+# number of jobs run at the same time
+JOB_WORKERS = 2
+# number of jobs waiting or running, beyond which new jobs are rejected
+JOB_QUEUE_SIZE = 20
+# number of jobs waiting or running for one user, beyond which new jobs of the user are rejected
+JOB_LIMIT_PER_USER = 1
+# number of finished jobs kept for statistics
+JOB_HISTORY_SIZE = 100
+
+
+class JobStatus(enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """
+    a job run in the background on behalf of a user. times are given by `time.monotonic`.
+    """
+
+    id: int
+    kind: str
+    slack_user_id: str
+    enqueued_at: float
+    status: JobStatus = JobStatus.QUEUED
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = field(default=None, repr=False)
+
+    @property
+    def wait_seconds(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return self.started_at - self.enqueued_at
+
+    @property
+    def run_seconds(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+class JobRejectedError(Exception):
+    """
+    raised when a job cannot be accepted since the queue or the limit of the user is full.
+    """
+
+
+class BaseJobExecutor:
+    """
+    a bounded queue of jobs run in the background, so that slow jobs (e.g. uploading files) don't hold up listeners.
+    at most `queue_size` jobs wait or run at once, and at most `limit_per_user` of them are of the same user.
+    """
+
+    def __init__(
+        self,
+        logger: Logger,
+        workers: int = JOB_WORKERS,
+        queue_size: int = JOB_QUEUE_SIZE,
+        limit_per_user: int = JOB_LIMIT_PER_USER,
+    ) -> None:
+        self.logger = logger
+        self.workers = workers
+        self.queue_size = queue_size
+        self.limit_per_user = limit_per_user
+        # number of jobs rejected since the queue or the limit of the user was full
+        self.rejected = 0
+        self._active: dict[int, Job] = {}
+        self._finished: collections.deque[Job] = collections.deque(
+            maxlen=JOB_HISTORY_SIZE
+        )
+        self._counts: collections.Counter[JobStatus] = collections.Counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _accept(self, kind: str, slack_user_id: str) -> Job:
+        """
+        register a new job, or raise `JobRejectedError` if it cannot be accepted.
+        """
+        with self._lock:
+            if len(self._active) >= self.queue_size:
+                self.rejected += 1
+                raise JobRejectedError(f"too many jobs ({len(self._active)}) in queue")
+            if (
+                sum(job.slack_user_id == slack_user_id for job in self._active.values())
+                >= self.limit_per_user
+            ):
+                self.rejected += 1
+                raise JobRejectedError(
+                    f"slack user {slack_user_id} already has {self.limit_per_user} jobs in queue"
+                )
+            job = Job(
+                id=next(self._ids),
+                kind=kind,
+                slack_user_id=slack_user_id,
+                enqueued_at=time.monotonic(),
+            )
+            self._active[job.id] = job
+            return job
+
+    def _start(self, job: Job) -> None:
+        with self._lock:
+            job.status = JobStatus.RUNNING
+            job.started_at = time.monotonic()
+
+    def _finish(self, job: Job, error: Optional[BaseException]) -> None:
+        with self._lock:
+            job.finished_at = time.monotonic()
+            job.status = JobStatus.FAILED if error else JobStatus.SUCCEEDED
+            job.error = repr(error) if error else None
+            del self._active[job.id]
+            self._finished.append(job)
+            self._counts[job.status] += 1
+        if error:
+            self.logger.error(
+                f"job {job.id} ({job.kind}) of slack user {job.slack_user_id} failed",
+                exc_info=error,
+            )
+        else:
+            self.logger.info(
+                f"job {job.id} ({job.kind}) of slack user {job.slack_user_id} finished "
+                f"in {job.run_seconds:.2f} s after waiting {job.wait_seconds:.2f} s"
+            )
+
+    def jobs_of(self, slack_user_id: str) -> list[Job]:
+        """
+        return jobs of the user which are waiting or running.
+        """
+        with self._lock:
+            return [
+                job
+                for job in self._active.values()
+                if job.slack_user_id == slack_user_id
+            ]
+
+    def stats(self) -> dict[str, float]:
+        """
+        return the number of jobs in each status and durations of recently finished jobs.
+        """
+        with self._lock:
+            active = collections.Counter(job.status for job in self._active.values())
+            run_seconds = [job.run_seconds or 0.0 for job in self._finished]
+            wait_seconds = [job.wait_seconds or 0.0 for job in self._finished]
+            return {
+                "queued": active[JobStatus.QUEUED],
+                "running": active[JobStatus.RUNNING],
+                "succeeded": self._counts[JobStatus.SUCCEEDED],
+                "failed": self._counts[JobStatus.FAILED],
+                "rejected": self.rejected,
+                "mean_wait_seconds": (
+                    sum(wait_seconds) / len(wait_seconds) if wait_seconds else 0.0
+                ),
+                "mean_run_seconds": (
+                    sum(run_seconds) / len(run_seconds) if run_seconds else 0.0
+                ),
+                "max_run_seconds": max(run_seconds, default=0.0),
+            }
+
+
+class JobExecutor(BaseJobExecutor):
+    """
+    runs jobs in a pool of `workers` threads.
+    """
+
+    def __init__(
+        self,
+        logger: Logger,
+        workers: int = JOB_WORKERS,
+        queue_size: int = JOB_QUEUE_SIZE,
+        limit_per_user: int = JOB_LIMIT_PER_USER,
+    ) -> None:
+        super().__init__(
+            logger=logger,
+            workers=workers,
+            queue_size=queue_size,
+            limit_per_user=limit_per_user,
+        )
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="job"
+        )
+
+    def submit(
+        self, kind: str, slack_user_id: str, run: Callable[[], None]
+    ) -> concurrent.futures.Future:
+        """
+        queue `run` as a job of the user and return immediately.
+        raise `JobRejectedError` if the job cannot be accepted.
+        """
+        job = self._accept(kind=kind, slack_user_id=slack_user_id)
+
+        def run_job() -> None:
+            self._start(job)
+            try:
+                run()
+            except Exception as e:
+                self._finish(job, error=e)
+            else:
+                self._finish(job, error=None)
+
+        return self._pool.submit(run_job)
+
+    def shutdown(self) -> None:
+        """
+        wait for queued jobs to finish.
+        """
+        self._pool.shutdown(wait=True)
+
+
+class AsyncJobExecutor(BaseJobExecutor):
+    """
+    asyncio version of `JobExecutor`, which runs at most `workers` jobs as tasks at the same time.
+    """
+
+    def __init__(
+        self,
+        logger: Logger,
+        workers: int = JOB_WORKERS,
+        queue_size: int = JOB_QUEUE_SIZE,
+        limit_per_user: int = JOB_LIMIT_PER_USER,
+    ) -> None:
+        super().__init__(
+            logger=logger,
+            workers=workers,
+            queue_size=queue_size,
+            limit_per_user=limit_per_user,
+        )
+        # created lazily, since there may be no running event loop yet
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # keep references to tasks so that they are not garbage collected while running
+        self._tasks: set[asyncio.Task] = set()
+
+    def submit(
+        self, kind: str, slack_user_id: str, run: Callable[[], Awaitable[None]]
+    ) -> asyncio.Task:
+        job = self._accept(kind=kind, slack_user_id=slack_user_id)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+        semaphore = self._semaphore
+
+        async def run_job() -> None:
+            async with semaphore:
+                self._start(job)
+                try:
+                    await run()
+                except Exception as e:
+                    self._finish(job, error=e)
+                else:
+                    self._finish(job, error=None)
+
+        task = asyncio.create_task(run_job())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def shutdown(self) -> None:
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
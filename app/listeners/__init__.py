@@ -2,11 +2,13 @@ from slack_bolt import App
 
 from ..context import BotContext
 from . import commands, events
+from .middleware import deduplicate_events_wrapper
 
 
 def register_listeners(app: App, bot_context: BotContext):
     """
     register listeners to the given app.
     """
+    app.middleware(deduplicate_events_wrapper(bot_context))
     commands.register(app, bot_context)
     events.register(app, bot_context)
@@ -1,7 +1,10 @@
 from slack_bolt import App
 
 from ...context import BotContext
+from ..middleware import measure_listener_wrapper
+from .admin_compliance_report import admin_compliance_report_wrapper
 from .admin_download_all_records import admin_download_all_records_wrapper
+from .admin_job_status import admin_job_status_wrapper
 from .download_csv import download_csv_wrapper
 from .get_working_hours import get_working_hours_wrapper
 from .init import init_wrapper
@@ -9,10 +12,28 @@ from .register_RA import register_RA_wrapper
 
 
 def register(app: App, bot_context: BotContext):
-    app.command("/init")(init_wrapper(bot_context))
-    app.command("/register_ra")(register_RA_wrapper(bot_context))
-    app.command("/get_working_hours")(get_working_hours_wrapper(bot_context))
-    app.command("/download_csv")(download_csv_wrapper(bot_context))
+    measure = measure_listener_wrapper(bot_context)
+    app.command("/init")(measure("/init", init_wrapper(bot_context)))
+    app.command("/register_ra")(
+        measure("/register_ra", register_RA_wrapper(bot_context))
+    )
+    app.command("/get_working_hours")(
+        measure("/get_working_hours", get_working_hours_wrapper(bot_context))
+    )
+    app.command("/download_csv")(
+        measure("/download_csv", download_csv_wrapper(bot_context))
+    )
     app.command("/admin_download_all_records")(
-        admin_download_all_records_wrapper(bot_context)
+        measure(
+            "/admin_download_all_records",
+            admin_download_all_records_wrapper(bot_context),
+        )
+    )
+    app.command("/admin_compliance_report")(
+        measure(
+            "/admin_compliance_report", admin_compliance_report_wrapper(bot_context)
+        )
+    )
+    app.command("/admin_job_status")(
+        measure("/admin_job_status", admin_job_status_wrapper(bot_context))
     )
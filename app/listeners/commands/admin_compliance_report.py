@@ -0,0 +1,127 @@
+import datetime
+
+from slack_bolt import Ack, BoltContext
+from slack_sdk.web.client import WebClient
+
+from ...compliance import (
+    Rule,
+    Violation,
+    audit_month,
+    count_violations,
+    write_violations_csv,
+)
+from ...context import BotContext
+from ...export import new_spooled_file, upload_file_in_chunks
+from ...periods import month_period
+from .export_job import submit_export_job
+
+RULE_DESCRIPTIONS = {
+    Rule.RECESS: "Too short recess",
+    Rule.REPORT_TIMING: "Reported more than 24 hours late",
+    Rule.DAILY_TOTAL: "Worked more than 8 hours a day",
+    Rule.WEEKLY_TOTAL: "Worked more than 40 hours a week",
+    Rule.OVERLAP: "Overlapping work",
+}
+
+
+def summarize_violations(violations: list[Violation], year: int, month: int) -> str:
+    """
+    return a message telling the number of violations of each rule.
+    """
+    lines = [f":mag: Compliance report of {year}/{month}"]
+    for rule, count in count_violations(violations).items():
+        lines.append(f"• {RULE_DESCRIPTIONS[rule]}: {count}")
+    return "\n".join(lines)
+
+
+def admin_compliance_report_wrapper(bot_context: BotContext):
+    botctx = bot_context
+
+    def admin_compliance_report(
+        ack: Ack, body: dict, client: WebClient, command: dict, context: BoltContext
+    ):
+        ack()
+
+        # check that `context` variable is available
+        if not (context.channel_id and context.actor_user_id):
+            raise ValueError("something is wrong with `context` variable")
+
+        if context.actor_user_id not in botctx.botcfg.admin_ids:
+            botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=":x: You are not allowed to use this command.",
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} tried to execute /admin_compliance_report, but is not allowed to"
+            )
+            return
+
+        year_month = command["text"].strip()
+        if year_month:
+            try:
+                date = datetime.datetime.strptime(year_month, "%Y/%m")
+            except ValueError:  # `year_month` was in invalid format
+                botctx.outbound.post_ephemeral(
+                    client,
+                    channel=context.channel_id,
+                    user=context.actor_user_id,
+                    text=":x: Use this command like `/admin_compliance_report 2023/11`.",
+                )
+                botctx.logger.info(
+                    f"slack user {context.actor_user_id} executed /admin_compliance_report with invalid argument: {year_month}"
+                )
+                return
+        else:
+            date = datetime.date.today()
+
+        period = month_period(date, label=year_month or "this month")
+
+        def admin_compliance_report_job() -> None:
+            with botctx.db_sessmaker() as sess:
+                violations = audit_month(
+                    sess,
+                    first_day=period.first_day,
+                    first_day_of_next_month=period.first_day_of_next_period,
+                )
+
+            summary = summarize_violations(violations, year=date.year, month=date.month)
+            if violations:
+                with new_spooled_file() as csv_file:
+                    write_violations_csv(violations, binary_file=csv_file)
+                    dm_with_the_user = client.conversations_open(
+                        users=context.actor_user_id
+                    )
+                    # upload the list of violations and send user the URL to it
+                    upload_file_in_chunks(
+                        client=client,
+                        channel=dm_with_the_user["channel"]["id"],
+                        title=f"Violations of work rules in {date.year}/{date.month}",
+                        filename=f"{date.year}_{date.month}_compliance_report.csv",
+                        file=csv_file,
+                    )
+                summary += (
+                    "\n:page_facing_up: Sent you a CSV file of the violations in DM."
+                )
+
+            botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=summary,
+            )
+
+            botctx.logger.info(
+                f"sent compliance report of {date.year}/{date.month} with {len(violations)} violations to slack user {context.actor_user_id}"
+            )
+
+        submit_export_job(
+            botctx,
+            client=client,
+            context=context,
+            kind="admin_compliance_report",
+            run=admin_compliance_report_job,
+        )
+
+    return admin_compliance_report
@@ -1,14 +1,64 @@
-import csv
-import datetime
-import io
+from typing import Optional
 
-from dateutil import relativedelta
 from slack_bolt import Ack, BoltContext
 from slack_sdk.web.client import WebClient
-from sqlalchemy import select
 
 from ...context import BotContext
-from ...db.model import RA, TimeCard, User
+from ...export import (
+    ExportLayout,
+    export_all_records,
+    new_spooled_file,
+    parquet_available,
+    upload_file_in_chunks,
+)
+from ...export_cache import ALL_USERS
+from ...periods import Period, parse_period
+from .export_job import submit_export_job
+
+# the last word of the argument choosing the layout of the exported file, which is a single CSV file if omitted
+LAYOUT_OPTIONS = {
+    "by_month": ExportLayout.ZIP_BY_MONTH,
+    "by_ra": ExportLayout.ZIP_BY_RA,
+    "parquet": ExportLayout.PARQUET,
+}
+
+USAGE_TEXT = (
+    ":x: Use this command like `/admin_download_all_records 2023/11`, `/admin_download_all_records 2024/04-2025/03` "
+    "or `/admin_download_all_records fy2024`. Add `by_month` or `by_ra` to get a ZIP file containing a CSV file "
+    "per month or per RA Job, like `/admin_download_all_records fy2024 by_ra`, or `parquet` to get a Parquet file."
+)
+
+
+def parse_all_records_arguments(text: str) -> Optional[tuple[Period, ExportLayout]]:
+    """
+    return the period and the layout given to `/admin_download_all_records`, or None if they are invalid.
+    """
+    words = text.split()
+    layout = ExportLayout.CSV
+    if words and words[-1].lower() in LAYOUT_OPTIONS:
+        layout = LAYOUT_OPTIONS[words.pop().lower()]
+    period = parse_period(" ".join(words))
+    if period is None:
+        return None
+    return period, layout
+
+
+def all_records_file(period: Period, layout: ExportLayout) -> tuple[str, str]:
+    """
+    return the title and the name of the file of all records in the period.
+    """
+    if period.is_single_month:
+        title = f"Work records of all users in {period.first_day.year}/{period.first_day.month}"
+    else:
+        title = f"Work records of all users in {period.label}"
+    if layout == ExportLayout.CSV:
+        return title, f"{period.filename_prefix}_all_working_records.csv"
+    if layout == ExportLayout.PARQUET:
+        return title, f"{period.filename_prefix}_all_working_records.parquet"
+    return (
+        title,
+        f"{period.filename_prefix}_all_working_records_{layout.value.removeprefix('zip_')}.zip",
+    )
 
 
 def admin_download_all_records_wrapper(bot_context: BotContext):
@@ -24,7 +74,8 @@ def admin_download_all_records_wrapper(bot_context: BotContext):
             raise ValueError("something is wrong with `context` variable")
 
         if context.actor_user_id not in botctx.botcfg.admin_ids:
-            client.chat_postEphemeral(
+            botctx.outbound.post_ephemeral(
+                client,
                 channel=context.channel_id,
                 user=context.actor_user_id,
                 text=":x: You are not allowed to use this command.",
@@ -34,103 +85,90 @@ def admin_download_all_records_wrapper(bot_context: BotContext):
             )
             return
 
-        year_month = command["text"].strip()
-        if year_month:
-            try:
-                date = datetime.datetime.strptime(year_month, "%Y/%m")
-            except ValueError:  # `year_month` was in invalid format
-                client.chat_postEphemeral(
-                    channel=context.channel_id,
-                    user=context.actor_user_id,
-                    text=":x: Use this command like `/download_all_working_records 2023/11`.",
-                )
-                botctx.logger.info(
-                    f"slack user {context.actor_user_id} executed /admin_download_all_records with invalid argument: {year_month}"
-                )
-                return
-        else:
-            date = datetime.date.today()
-
-        first_day_of_this_month = datetime.date(year=date.year, month=date.month, day=1)
-        # get all records within the specified month
-        with botctx.db_sessmaker() as sess:
-            records = sess.execute(
-                select(User, RA, TimeCard)
-                .join(RA, RA.id == TimeCard.ra_id)
-                .join(User, User.id == RA.user_id)
-                .where(
-                    TimeCard.start_time >= first_day_of_this_month,
-                    TimeCard.end_time
-                    < first_day_of_this_month + relativedelta.relativedelta(months=1),
-                )
-                .order_by(RA.ra_name, User.id, TimeCard.start_time)
-            ).all()
-            if not records:
-                client.chat_postEphemeral(
-                    channel=context.channel_id,
-                    user=context.actor_user_id,
-                    text=f':beach_with_umbrella: No work records found in {year_month if year_month else "this month"}',
+        arguments = parse_all_records_arguments(command["text"])
+        if arguments is None:  # the argument was in invalid format
+            botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=USAGE_TEXT,
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} executed /admin_download_all_records with invalid argument: {command['text']}"
+            )
+            return
+        period, layout = arguments
+        if layout == ExportLayout.PARQUET and not parquet_available():
+            botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=":x: Parquet files are not available since the bot is installed without the `parquet` extra.",
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} requested a Parquet file, but pyarrow is not installed"
+            )
+            return
+        title, filename = all_records_file(period, layout)
+
+        def admin_download_all_records_job() -> None:
+            cache_key = botctx.export_cache.key(
+                scope=ALL_USERS,
+                months=period.months,
+                export_format=layout.value,
+            )
+            cached_file = botctx.export_cache.get(cache_key)
+            with cached_file or new_spooled_file() as export_file:
+                if cached_file is None:
+                    # get all records within the specified period by a single query and write them into
+                    # a spooled file batch by batch, so that memory usage stays flat regardless of the number of records
+                    with botctx.db_sessmaker() as sess:
+                        num_records = export_all_records(
+                            sess,
+                            first_day=period.first_day,
+                            first_day_of_next_period=period.first_day_of_next_period,
+                            binary_file=export_file,
+                            layout=layout,
+                        )
+                    if not num_records:
+                        botctx.outbound.post_ephemeral(
+                            client,
+                            channel=context.channel_id,
+                            user=context.actor_user_id,
+                            text=f":beach_with_umbrella: No work records found in {period.label}",
+                        )
+                        botctx.logger.info(
+                            f"found no work record in {period.label} for any user"
+                        )
+                        return
+                    botctx.export_cache.put(cache_key, file=export_file)
+                else:
+                    botctx.logger.info(
+                        f"reused cached file of all work records in {period.label}"
+                    )
+
+                dm_with_the_user = client.conversations_open(
+                    users=context.actor_user_id
                 )
-                botctx.logger.info(
-                    f"found no work record in {date.year}/{date.month} for any user"
+                # upload the file and send user the URL to it
+                upload_file_in_chunks(
+                    client=client,
+                    channel=dm_with_the_user["channel"]["id"],
+                    title=title,
+                    filename=filename,
+                    file=export_file,
                 )
-                return
-
-        # make CSV file
-        csv_text_as_file = io.StringIO()
-        writer = csv.DictWriter(
-            f=csv_text_as_file,
-            fieldnames=[
-                "name",
-                "ra_name",
-                "start_timestamp",
-                "end_timestamp",
-                "work_duration",
-                "break_duration",
-                "description",
-            ],
-        )
-        writer.writeheader()
-        for record in records:
-            user, ra, timecard = record._tuple()
-            duration_time = (
-                datetime.datetime.min + (timecard.end_time - timecard.start_time)
-            ).time()  # convert timedelta to Time
-            writer.writerow(
-                {
-                    "name": user.name,
-                    "ra_name": ra.ra_name,
-                    "start_timestamp": timecard.start_time.strftime(
-                        "%Y/%m/%d %H:%M:%S"
-                    ),
-                    "end_timestamp": timecard.end_time.strftime("%Y/%m/%d %H:%M:%S"),
-                    "work_duration": duration_time.strftime("%H:%M"),
-                    "break_duration": timecard.break_duration.strftime("%H:%M"),
-                    "description": timecard.description,
-                }
-            )
-        csv_text = csv_text_as_file.getvalue()
-        csv_text_as_file.close()
-
-        dm_with_the_user = client.conversations_open(users=context.actor_user_id)
-        # upload the CSV and send user the URL to it
-        client.files_upload_v2(
-            channel=dm_with_the_user["channel"]["id"],
-            title=f"Work records of all users in {date.year}/{date.month}",
-            filename=f"{date.year}_{date.month}_all_working_records.csv",
-            content=csv_text.encode(
-                encoding="cp932"
-            ),  # NOTE: this command exports CSV in Shift_JIS. "cp932" can handle platform-dependent characters like "髙".
-        )
 
-        client.chat_postEphemeral(
-            channel=context.channel_id,
-            user=context.actor_user_id,
-            text=":page_facing_up: Sent you a CSV file in DM.",
-        )
+            botctx.logger.info(
+                f"sent file of all work records in {period.label} to slack user {context.actor_user_id}"
+            )
 
-        botctx.logger.info(
-            f"sent CSV file of all work records to slack user {context.actor_user_id}"
+        submit_export_job(
+            botctx,
+            client=client,
+            context=context,
+            kind="admin_download_all_records",
+            run=admin_download_all_records_job,
         )
 
     return admin_download_all_records
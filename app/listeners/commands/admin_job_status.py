@@ -0,0 +1,76 @@
+from slack_bolt import Ack, BoltContext
+from slack_sdk.web.client import WebClient
+
+from ...context import BotContext
+from ...db.pool import pool_stats
+
+
+def job_status_message(stats: dict[str, float]) -> str:
+    """
+    return a message showing statistics returned by `BaseJobExecutor.stats`.
+    """
+    return "\n".join(
+        [
+            ":gear: Background jobs",
+            f"• Waiting: {stats['queued']}",
+            f"• Running: {stats['running']}",
+            f"• Succeeded: {stats['succeeded']}",
+            f"• Failed: {stats['failed']}",
+            f"• Rejected: {stats['rejected']}",
+            f"• Mean wait: {stats['mean_wait_seconds']:.1f} s",
+            f"• Mean duration: {stats['mean_run_seconds']:.1f} s (max {stats['max_run_seconds']:.1f} s)",
+        ]
+    )
+
+
+def db_pool_status_message(stats: dict[str, float]) -> str:
+    """
+    return a message showing statistics returned by `pool_stats`.
+    """
+    return "\n".join(
+        [
+            ":floppy_disk: Database connections",
+            f"• In use: {stats['checked_out']} (pool size {stats['size']}, overflow {stats['overflow']})",
+            f"• Checkouts: {stats['checkouts']} (timed out {stats['timeouts']})",
+            f"• Mean wait: {stats['mean_wait_seconds'] * 1000:.1f} ms (max {stats['max_wait_seconds'] * 1000:.1f} ms)",
+        ]
+    )
+
+
+def admin_job_status_wrapper(bot_context: BotContext):
+    botctx = bot_context
+
+    def admin_job_status(
+        ack: Ack, body: dict, client: WebClient, command: dict, context: BoltContext
+    ):
+        ack()
+
+        # check that `context` variable is available
+        if not (context.channel_id and context.actor_user_id):
+            raise ValueError("something is wrong with `context` variable")
+
+        if context.actor_user_id not in botctx.botcfg.admin_ids:
+            botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=":x: You are not allowed to use this command.",
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} tried to execute /admin_job_status, but is not allowed to"
+            )
+            return
+
+        botctx.outbound.post_ephemeral(
+            client,
+            channel=context.channel_id,
+            user=context.actor_user_id,
+            text="\n\n".join(
+                [
+                    job_status_message(botctx.jobs.stats()),
+                    db_pool_status_message(pool_stats(botctx.db_sessmaker.kw["bind"])),
+                ]
+            ),
+        )
+
+    return admin_job_status
@@ -1,14 +1,32 @@
-import csv
-import datetime
 import io
 
-from dateutil import relativedelta
 from slack_bolt import Ack, BoltContext
 from slack_sdk.web.client import WebClient
-from sqlalchemy import select
 
 from ...context import BotContext
-from ...db.model import RA, TimeCard, User
+from ...export import ExportLayout, encode_user_records
+from ...periods import Period, parse_period
+from ...services.timecards import get_user_records
+from .export_job import submit_export_job
+
+
+def user_records_file(period: Period) -> tuple[ExportLayout, str, str]:
+    """
+    return the layout, the title and the name of the file of the user's records in the period.
+    records of multiple months are exported as a ZIP file containing a CSV file per month,
+    since the CSV file only has the day of each record.
+    """
+    if period.is_single_month:
+        return (
+            ExportLayout.CSV,
+            f"Work records in {period.first_day.year}/{period.first_day.month}",
+            f"{period.filename_prefix}_working_hours.csv",
+        )
+    return (
+        ExportLayout.ZIP_BY_MONTH,
+        f"Work records in {period.label}",
+        f"{period.filename_prefix}_working_hours.zip",
+    )
 
 
 def download_csv_wrapper(bot_context: BotContext):
@@ -23,95 +41,80 @@ def download_csv_wrapper(bot_context: BotContext):
         if not (context.channel_id and context.actor_user_id):
             raise ValueError("something is wrong with `context` variable")
 
-        year_month = command["text"].strip()
-        if year_month:
-            try:
-                date = datetime.datetime.strptime(year_month, "%Y/%m")
-            except ValueError:  # `year_month` was in invalid format
-                client.chat_postEphemeral(
-                    channel=context.channel_id,
-                    user=context.actor_user_id,
-                    text=":x: Use this command like `/download_csv 2023/11`.",
-                )
-                botctx.logger.info(
-                    f"slack user {context.actor_user_id} executed /download_csv with invalid argument: {year_month}"
-                )
-                return
-        else:
-            date = datetime.date.today()
-
-        first_day_of_this_month = datetime.date(year=date.year, month=date.month, day=1)
-        # get all records within the specified month
-        with botctx.db_sessmaker() as sess:
-            records = sess.execute(
-                select(User, RA, TimeCard)
-                .join(RA, RA.id == TimeCard.ra_id)
-                .join(User, User.id == RA.user_id)
-                .where(
-                    User.slack_user_id == context.actor_user_id,
-                    TimeCard.start_time >= first_day_of_this_month,
-                    TimeCard.end_time
-                    < first_day_of_this_month + relativedelta.relativedelta(months=1),
-                )
-                .order_by(TimeCard.start_time)
-            ).all()
-            if not records:
-                client.chat_postEphemeral(
-                    channel=context.channel_id,
-                    user=context.actor_user_id,
-                    text=f':beach_with_umbrella: No work records found in {year_month if year_month else "this month"}',
-                )
+        period = parse_period(command["text"])
+        if period is None:  # the argument was in invalid format
+            botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=":x: Use this command like `/download_csv 2023/11`, `/download_csv 2024/04-2025/03` or `/download_csv fy2024`.",
+            )
+            botctx.logger.info(
+                f"slack user {context.actor_user_id} executed /download_csv with invalid argument: {command['text']}"
+            )
+            return
+
+        layout, title, filename = user_records_file(period)
+
+        def export_csv() -> None:
+            """
+            get all records within the specified period and send them to the user in DM as a CSV (or ZIP) file.
+            the file is reused until a record within the period is written.
+            """
+            cache_key = botctx.export_cache.key(
+                scope=context.actor_user_id,
+                months=period.months,
+                export_format=layout.value,
+            )
+            if cached_file := botctx.export_cache.get(cache_key):
+                with cached_file:
+                    file_bytes = cached_file.read()
                 botctx.logger.info(
-                    f"found no work record in {date.year}/{date.month} for slack user {context.actor_user_id}"
+                    f"reused cached CSV file of work record of slack user {context.actor_user_id}"
                 )
-                return
-
-        # make CSV file
-        csv_text_as_file = io.StringIO()
-        writer = csv.DictWriter(
-            f=csv_text_as_file,
-            fieldnames=[
-                "ra_name",
-                "date",
-                "start_time",
-                "end_time",
-                "break_time",
-                "description",
-            ],
-        )
-        writer.writeheader()
-        for record in records:
-            _, ra, timecard = record._tuple()
-            writer.writerow(
-                {
-                    "ra_name": ra.ra_name,
-                    "date": timecard.start_time.strftime("%d"),
-                    "start_time": timecard.start_time.strftime("%H%M"),
-                    "end_time": timecard.end_time.strftime("%H%M"),
-                    "break_time": timecard.break_duration.strftime("%H%M"),
-                    "description": timecard.description,
-                }
+            else:
+                with botctx.db_sessmaker() as sess:
+                    records = get_user_records(
+                        sess,
+                        slack_user_id=context.actor_user_id,
+                        first_day=period.first_day,
+                        first_day_of_next_period=period.first_day_of_next_period,
+                    )
+                if not records:
+                    botctx.outbound.post_ephemeral(
+                        client,
+                        channel=context.channel_id,
+                        user=context.actor_user_id,
+                        text=f":beach_with_umbrella: No work records found in {period.label}",
+                    )
+                    botctx.logger.info(
+                        f"found no work record in {period.label} for slack user {context.actor_user_id}"
+                    )
+                    return
+
+                # make CSV file
+                file_bytes = encode_user_records(records=records, layout=layout)
+                botctx.export_cache.put(cache_key, file=io.BytesIO(file_bytes))
+
+            dm_with_the_user = client.conversations_open(users=context.actor_user_id)
+            # upload the file and send user the URL to it
+            client.files_upload_v2(
+                channel=dm_with_the_user["channel"]["id"],
+                title=title,
+                filename=filename,
+                content=file_bytes,
             )
-        csv_text = csv_text_as_file.getvalue()
-        csv_text_as_file.close()
-
-        dm_with_the_user = client.conversations_open(users=context.actor_user_id)
-        # upload the CSV and send user the URL to it
-        client.files_upload_v2(
-            channel=dm_with_the_user["channel"]["id"],
-            title=f"Work records in {date.year}/{date.month}",
-            filename=f"{date.year}_{date.month}_working_hours.csv",
-            content=csv_text,
-        )
 
-        client.chat_postEphemeral(
-            channel=context.channel_id,
-            user=context.actor_user_id,
-            text=":page_facing_up: Sent you a CSV file in DM.",
-        )
+            botctx.logger.info(
+                f"sent CSV file of work record to slack user {context.actor_user_id}"
+            )
 
-        botctx.logger.info(
-            f"sent CSV file of work record to slack user {context.actor_user_id}"
+        submit_export_job(
+            botctx,
+            client=client,
+            context=context,
+            kind="download_csv",
+            run=export_csv,
         )
 
     return download_csv
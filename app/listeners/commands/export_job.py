@@ -0,0 +1,64 @@
+import threading
+from typing import Callable
+
+from slack_bolt import BoltContext
+from slack_sdk.web.client import WebClient
+
+from ...context import BotContext
+from ...jobs import JobRejectedError
+
+
+def submit_export_job(
+    botctx: BotContext,
+    client: WebClient,
+    context: BoltContext,
+    kind: str,
+    run: Callable[[], None],
+) -> None:
+    """
+    run `run`, which sends a file to the user in DM, as a background job and tell the user that it has been accepted.
+    the user is also told if the job is rejected or fails.
+    """
+
+    # the job waits until the user is told that it has been accepted, so that the file (or the failure)
+    # never reaches the user before the acknowledgement
+    acknowledged = threading.Event()
+
+    def run_and_report_failure() -> None:
+        acknowledged.wait()
+        try:
+            run()
+        except Exception:
+            botctx.outbound.post_ephemeral(
+                client,
+                channel=context.channel_id,
+                user=context.actor_user_id,
+                text=":x: Failed to send you the file. Please try again later.",
+            )
+            raise
+
+    try:
+        botctx.jobs.submit(
+            kind=kind, slack_user_id=context.actor_user_id, run=run_and_report_failure
+        )
+    except JobRejectedError as e:
+        botctx.outbound.post_ephemeral(
+            client,
+            channel=context.channel_id,
+            user=context.actor_user_id,
+            text=":hourglass: Your previous file is still being prepared, or too many files are being prepared now. Please try again later.",
+        )
+        botctx.logger.info(
+            f"rejected /{kind} of slack user {context.actor_user_id}: {e}"
+        )
+        return
+
+    try:
+        botctx.outbound.post_ephemeral(
+            client,
+            channel=context.channel_id,
+            user=context.actor_user_id,
+            text=":hourglass_flowing_sand: Preparing the file. It will be sent to you in DM.",
+        )
+    finally:
+        acknowledged.set()
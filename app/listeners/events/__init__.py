@@ -1,6 +1,8 @@
 from slack_bolt import App
 
 from ...context import BotContext
+from ..middleware import measure_listener_wrapper
+from .on_app_home_opened import on_app_home_opened_wrapper
 from .on_mention import on_mention_wrapper
 from .on_message_delete import on_message_delete_wrapper
 from .on_message_events_to_ignore import on_message_events_to_ignore_handler
@@ -10,12 +12,18 @@ from .on_message_events_to_ignore import on_message_events_to_ignore_handler
 
 
 def register(app: App, bot_context: BotContext):
-    app.event("app_mention")(on_mention_wrapper(bot_context))
+    measure = measure_listener_wrapper(bot_context)
+    app.event("app_mention")(measure("app_mention", on_mention_wrapper(bot_context)))
+    app.event("app_home_opened")(
+        measure("app_home_opened", on_app_home_opened_wrapper(bot_context))
+    )
     # IMPORTANT: using `app.event("message")` multiple times will make the bot fail to register handlers but the first one.
     # DO NOT uncomment the below line if that activates more than one `app.event("message")`.
     # [^read the above message^] app.event("message")(on_message_update_wrapper(bot_context))
     app.event({"type": "message", "subtype": "message_deleted"})(
-        on_message_delete_wrapper(bot_context)
+        measure("message_deleted", on_message_delete_wrapper(bot_context))
     )
     # ignore all "message" type events except those with "message_deleted" subtype (that is handled above).
-    app.event({"type": "message"})(on_message_events_to_ignore_handler)
+    app.event({"type": "message"})(
+        measure("message", on_message_events_to_ignore_handler)
+    )
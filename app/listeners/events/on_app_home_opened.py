@@ -0,0 +1,49 @@
+import datetime
+
+from slack_sdk.web.client import WebClient
+
+from ...app_home import dashboard_view
+from ...context import BotContext
+from ...periods import month_period
+from ...services.timecards import sum_working_hours
+
+
+def publish_app_home(botctx: BotContext, client: WebClient, slack_user_id: str) -> None:
+    """
+    publish App Home showing work hours of the user in this month, unless it is unchanged.
+    publishes to the same user are spaced out by `botctx.app_home`.
+    """
+
+    def build_view() -> dict:
+        period = month_period(datetime.date.today(), label="this month")
+        with botctx.db_sessmaker() as sess:
+            working_hours_of_all_RAs = sum_working_hours(
+                sess,
+                slack_user_id=slack_user_id,
+                first_day=period.first_day,
+                first_day_of_next_period=period.first_day_of_next_period,
+            )
+        return dashboard_view(
+            guide=botctx.app_home.view_file.load(),
+            month=period.first_day,
+            working_hours_of_all_RAs=working_hours_of_all_RAs,
+        )
+
+    def send(view: dict) -> None:
+        botctx.outbound.send(
+            lambda: client.views_publish(user_id=slack_user_id, view=view)
+        )
+
+    botctx.app_home.request(slack_user_id, build_view=build_view, send=send)
+
+
+def on_app_home_opened_wrapper(bot_context: BotContext):
+    botctx = bot_context
+
+    def on_app_home_opened(event: dict, client: WebClient):
+        # this event also occurs when the messages tab is opened
+        if event.get("tab") != "home":
+            return
+        publish_app_home(botctx, client=client, slack_user_id=event["user"])
+
+    return on_app_home_opened
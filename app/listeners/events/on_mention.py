@@ -1,20 +1,79 @@
-import datetime
-import re
 import textwrap
 
 from slack_bolt import BoltContext
 from slack_sdk.models.blocks import (
+    Block,
     ContextBlock,
     DividerBlock,
     MarkdownTextObject,
     SectionBlock,
 )
 from slack_sdk.web.client import WebClient
-from sqlalchemy import select
 
+from ...app_home import format_hours
 from ...context import BotContext
-from ...db.model import RA, TimeCard, User
+from ...parsing import ParseError, ParseErrorKind, parse_work_report
+from ...replies import ReplyAggregator
+from ...services.timecards import record_timecard
+from ...services.users import resolve_ra_id
 from ...workrules import WorkRules
+from .on_app_home_opened import publish_app_home
+
+INCORRECT_DURATION_FORMAT_TEXT = textwrap.dedent("""
+        :x: Working Hour is in incorrect format. Please write it in the following format. "Rxx:xx" can be omitted if you didn't take a recess.
+        `2023/11/18 10:00-18:00 R01:00`
+        Work across midnight can be written like `2023/11/18 22:00-02:00`, or with the end date like `2023/11/18 22:00-2023/11/19 02:00`, which is required if the work is longer than 12 hours.
+    """)
+
+
+def incorrect_message_format_blocks() -> list[Block]:
+    """
+    return blocks of the reply to a work report in incorrect format.
+    """
+    return [
+        SectionBlock(
+            text=MarkdownTextObject(text=textwrap.dedent("""
+                        :x: Your message is in incorrect format. Write it in the following format
+
+                        ```
+                        @RA timecard recorder [arbitrary comment(can be blank)]
+                        • <Your Name> (e.g. Tanaka Taro)
+                        • <RA Job Name> (e.g. CREST)
+                        • <Working Hour> (e.g. 2023/11/18 10:00-17:00 R01:00) "R01:00" means you took an hour recess.
+                        • <Description of work> (e.g. analyzed CICIDS2017 dataset)
+                        ```
+                        """)),
+        ),
+        DividerBlock(),
+        ContextBlock(
+            elements=[
+                MarkdownTextObject(
+                    text=":bulb: You don't need to delete your message and send again. Instead, you can directly edit the message into correct format."
+                )
+            ]
+        ),
+    ]
+
+
+def work_record_summary(
+    headline: str,
+    ra_name: str,
+    work_datetime: str,
+    duration: int,
+    break_duration: int,
+    description: str,
+) -> str:
+    """
+    return the reply to a work report that has been recorded, whose durations are given in minutes.
+    """
+    return (
+        f"{headline}\n"
+        f"RA Job Name: {ra_name}\n"
+        f"Work datetime: {work_datetime}\n"
+        f"Attendance hours: {format_hours(duration)}\n"
+        f"Recess hours: {format_hours(break_duration)}\n"
+        f"Description of work: {description}"
+    )
 
 
 def on_mention_wrapper(bot_context: BotContext):
@@ -32,234 +91,134 @@ def on_mention_wrapper(bot_context: BotContext):
             raise ValueError("something is wrong with `context` variable")
 
         slack_message_ts = event["ts"]
-        text = event["text"]
-        expected_message_format = (
-            r"<@.+>.*\n"  # ignore the first mention line
-            r"• (?P<name>.+)\n"
-            r"• (?P<ra_name>.+)\n"
-            r"• (?P<duration>.+)\n"
-            r"• (?P<description>.+)$"
-        )
-        message_matched = re.match(pattern=expected_message_format, string=text)
-        if not message_matched or (
-            message_matched and len(message_matched.groups()) != 4
+        parsed = parse_work_report(event["text"])
+        if (
+            isinstance(parsed, ParseError)
+            and parsed.kind == ParseErrorKind.MESSAGE_FORMAT
         ):
-            client.chat_postEphemeral(
+            botctx.metrics.parse_failures.inc(kind=parsed.kind.name.lower())
+            botctx.outbound.post_ephemeral(
+                client,
                 channel=context.channel_id,
                 user=context.actor_user_id,
                 text=":x: Your message is in incorrect format. Write it in the following format:",
-                blocks=[
-                    SectionBlock(
-                        text=MarkdownTextObject(
-                            text=textwrap.dedent(
-                                """
-                                    :x: Your message is in incorrect format. Write it in the following format
-
-                                    ```
-                                    @RA timecard recorder [arbitrary comment(can be blank)]
-                                    • <Your Name> (e.g. Tanaka Taro)
-                                    • <RA Job Name> (e.g. CREST)
-                                    • <Working Hour> (e.g. 2023/11/18 10:00-17:00 R01:00) "R01:00" means you took an hour recess.
-                                    • <Description of work> (e.g. analyzed CICIDS2017 dataset)
-                                    ```
-                                    """
-                            )
-                        ),
-                    ),
-                    DividerBlock(),
-                    ContextBlock(
-                        elements=[
-                            MarkdownTextObject(
-                                text=":bulb: You don't need to delete your message and send again. Instead, you can directly edit the message into correct format."
-                            )
-                        ]
-                    ),
-                ],
+                blocks=incorrect_message_format_blocks(),
             )
             botctx.logger.info(
                 f"slack user {context.actor_user_id} sent work record in invalid format"
             )
             return
 
-        # extract information from user's message
-        ra_name = message_matched.group("ra_name").strip()
-        duration_str = message_matched.group("duration").strip()
-        description = message_matched.group("description").strip()
-
         # ensure that this user and RA is registered
+        ra_name = parsed.ra_name
         with botctx.db_sessmaker() as sess:
-            user_ra_data = sess.execute(
-                select(User.id.label("user_id"), RA.id.label("ra_id"), RA.ra_name)
-                .join_from(User, RA, User.id == RA.user_id)
-                .where(
-                    User.slack_user_id == context.actor_user_id, RA.ra_name == ra_name
-                )
-            ).first()
-            if not user_ra_data:
-                client.chat_postEphemeral(
-                    channel=context.channel_id,
-                    user=context.actor_user_id,
-                    text=f":x: You've never registered RA Job named \"{ra_name}\", or you've not completed user registration.",
-                )
-                botctx.logger.info(
-                    f"slack user {context.actor_user_id} sent work record for unknown RA Job: {ra_name}"
-                )
-                return
-
-        _, ra_id, _ = user_ra_data._tuple()
-        expected_duration_format = r"(?P<date>[0-9]{4}/[0-9]{1,2}/[0-9]{1,2}) (?P<start_time>[0-9]{1,2}:[0-9]{2})-(?P<end_time>[0-9]{1,2}:[0-9]{2})( R(?P<break_time>[0-9]{1,2}:[0-9]{2}))?$"
-        date_matched = re.match(pattern=expected_duration_format, string=duration_str)
-        if not date_matched or (date_matched and len(date_matched.groups()) < 3):
-            client.chat_postEphemeral(
+            ra_id = resolve_ra_id(
+                sess,
+                slack_user_id=context.actor_user_id,
+                ra_name=ra_name,
+                cache=botctx.id_cache,
+            )
+        if ra_id is None:
+            botctx.metrics.unknown_ra_rejections.inc()
+            botctx.outbound.post_ephemeral(
+                client,
                 channel=context.channel_id,
                 user=context.actor_user_id,
-                text=textwrap.dedent(
-                    """
-                        :x: Working Hour is in incorrect format. Please write it in the following format. "Rxx:xx" can be omitted if you didn't take a recess.
-                        `2023/11/18 10:00-18:00 R01:00`
-                    """
-                ),
+                text=f":x: You've never registered RA Job named \"{ra_name}\", or you've not completed user registration.",
             )
             botctx.logger.info(
-                f"slack user {context.actor_user_id} sent work record whose date is in invalid format"
+                f"slack user {context.actor_user_id} sent work record for unknown RA Job: {ra_name}"
             )
             return
 
-        # extract string representations of datetime info
-        date_str = date_matched.group("date")
-        start_time_str = date_matched.group("start_time")
-        end_time_str = date_matched.group("end_time")
-        break_time_str_or_none = date_matched.group("break_time")
-        try:
-            # convert string to datetime type
-            date_format = "%Y/%m/%d %H:%M"
-            start_dt = datetime.datetime.strptime(
-                f"{date_str} {start_time_str}", date_format
-            )
-            end_dt = datetime.datetime.strptime(
-                f"{date_str} {end_time_str}", date_format
-            )
-            duration_time = (
-                datetime.datetime.min + (end_dt - start_dt)
-            ).time()  # convert timedelta to Time
-            if break_time_str_or_none:
-                # since `time` type has no equivalent to strptime, this dirty workaround is needed...
-                break_time = datetime.datetime.strptime(break_time_str_or_none, "%H:%M")
-                break_time = datetime.time(
-                    hour=break_time.hour, minute=break_time.minute
+        if isinstance(parsed, ParseError):
+            botctx.metrics.parse_failures.inc(kind=parsed.kind.name.lower())
+            if parsed.kind == ParseErrorKind.DURATION_FORMAT:
+                botctx.outbound.post_ephemeral(
+                    client,
+                    channel=context.channel_id,
+                    user=context.actor_user_id,
+                    text=INCORRECT_DURATION_FORMAT_TEXT,
+                )
+                botctx.logger.info(
+                    f"slack user {context.actor_user_id} sent work record whose date is in invalid format: {parsed.detail}"
                 )
             else:
-                break_time = datetime.time(hour=0, minute=0)
-        except Exception:
-            client.chat_postEphemeral(
-                channel=context.channel_id,
-                user=context.actor_user_id,
-                text=":x: There are invalid values in the working hours.",
-            )
-            botctx.logger.info(
-                f"slack user {context.actor_user_id} sent work record including invalid datetime values"
-            )
+                text = ":x: There are invalid values in the working hours."
+                if parsed.hint:
+                    text += f" {parsed.hint}"
+                botctx.outbound.post_ephemeral(
+                    client,
+                    channel=context.channel_id,
+                    user=context.actor_user_id,
+                    text=text,
+                )
+                botctx.logger.info(
+                    f"slack user {context.actor_user_id} sent work record including invalid datetime values: {parsed.detail}"
+                )
             return
+        report = parsed
 
-        # add a new record or update existing one
+        # add a new record, or update the existing one if the message was edited or delivered again
         with botctx.db_sessmaker() as sess:
-            record = sess.execute(
-                select(TimeCard).where(TimeCard.slack_message_ts == slack_message_ts)
-            ).scalar_one_or_none()
-            if not record:  # existing record was not found, let's try to add new one
-                try:
-                    new_record = TimeCard(
-                        ra_id=ra_id,
-                        start_time=start_dt,
-                        end_time=end_dt,
-                        duration=duration_time,
-                        break_duration=break_time,
-                        description=description,
-                        slack_message_ts=slack_message_ts,
-                    )
-                    sess.add(new_record)
-                    sess.flush()
-                    sess.commit()
-                except Exception:
-                    sess.rollback()
-                    client.chat_postEphemeral(
-                        channel=context.channel_id,
-                        user=context.actor_user_id,
-                        text=":x: Failed to record your work due to some database error.",
-                    )
-                    botctx.logger.exception(
-                        f"failed to record work by slack user {context.actor_user_id} for RA Job {ra_name} due to a database error"
-                    )
-                    raise
-                else:
-                    client.chat_postEphemeral(
-                        channel=context.channel_id,
-                        user=context.actor_user_id,
-                        text=(
-                            f":white_check_mark: Your work was recorded.\n"
-                            f"RA Job Name: {ra_name}\n"
-                            f"Work datetime: {date_str} {start_time_str}-{end_time_str}\n"
-                            f"Attendance hours: {duration_time.hour:02}:{duration_time.minute:02}\n"
-                            f"Recess hours: {break_time.hour:02}:{break_time.minute:02}\n"
-                            f"Description of work: {description}"
-                        ),
-                    )
-                    botctx.logger.info(
-                        f"recorded work by slack user {context.actor_user_id} for RA Job {ra_name}: {description}"
-                    )
-                    # send warnings, if any.
-                    for warning in WorkRules.generate_warnings_about_all_rules(
-                        record=new_record
-                    ):
-                        client.chat_postEphemeral(
-                            channel=context.channel_id,
-                            user=context.actor_user_id,
-                            text=warning,
-                        )
-            else:  # existing record was found, let's update it
-                try:
-                    record.start_time = start_dt
-                    record.end_time = end_dt
-                    record.duration = duration_time
-                    record.break_duration = break_time
-                    record.description = description
-                    sess.flush()
-                    sess.commit()
-                except Exception:
-                    sess.rollback()
-                    client.chat_postEphemeral(
-                        channel=context.channel_id,
-                        user=context.actor_user_id,
-                        text=":x: Failed to update your work record due to some database error.",
-                    )
-                    botctx.logger.exception(
-                        f"failed to update work record by slack user {context.actor_user_id} for RA Job {ra_name} due to a database error"
-                    )
-                    raise
-                else:
-                    client.chat_postEphemeral(
-                        channel=context.channel_id,
-                        user=context.actor_user_id,
-                        text=(
-                            f":white_check_mark: Your work record was updated.\n"
-                            f"RA Job Name: {ra_name}\n"
-                            f"Work datetime: {date_str} {start_time_str}-{end_time_str}\n"
-                            f"Attendance hours: {duration_time.hour:02}:{duration_time.minute:02}\n"
-                            f"Recess hours: {break_time.hour:02}:{break_time.minute:02}\n"
-                            f"Description of work: {description}"
-                        ),
-                    )
-                    botctx.logger.info(
-                        f"updated work record by slack user {context.actor_user_id} for RA Job {ra_name}: {description}"
-                    )
-                    # send warnings, if any.
-                    for warning in WorkRules.generate_warnings_about_all_rules(
-                        record=record
-                    ):
-                        client.chat_postEphemeral(
-                            channel=context.channel_id,
-                            user=context.actor_user_id,
-                            text=warning,
-                        )
+            try:
+                record, is_new, previous_start_time = record_timecard(
+                    sess,
+                    ra_id=ra_id,
+                    start_time=report.start_time,
+                    end_time=report.end_time,
+                    break_duration=report.break_duration,
+                    description=report.description,
+                    slack_message_ts=slack_message_ts,
+                )
+            except Exception:
+                botctx.outbound.post_ephemeral(
+                    client,
+                    channel=context.channel_id,
+                    user=context.actor_user_id,
+                    text=":x: Failed to record your work due to some database error.",
+                )
+                botctx.logger.exception(
+                    f"failed to record work by slack user {context.actor_user_id} for RA Job {ra_name} due to a database error"
+                )
+                raise
+
+        # files exported for the month of the record (and the month it was in before being edited) are now stale
+        botctx.export_cache.invalidate_month(record.start_time)
+        if previous_start_time is not None:
+            botctx.export_cache.invalidate_month(previous_start_time)
+
+        # reply the summary and warnings, if any, in a single message
+        replies = ReplyAggregator()
+        replies.add(
+            work_record_summary(
+                headline=(
+                    ":white_check_mark: Your work was recorded."
+                    if is_new
+                    else ":white_check_mark: Your work record was updated."
+                ),
+                ra_name=ra_name,
+                work_datetime=report.work_datetime,
+                duration=record.duration,
+                break_duration=record.break_duration,
+                description=report.description,
+            )
+        )
+        for warning in WorkRules.generate_warnings_about_all_rules(record=record):
+            replies.add(warning)
+        botctx.outbound.post_ephemeral(
+            client,
+            channel=context.channel_id,
+            user=context.actor_user_id,
+            text=replies.text(),
+            blocks=replies.blocks(),
+        )
+        botctx.logger.info(
+            f"{'recorded work' if is_new else 'updated work record'} by slack user {context.actor_user_id} for RA Job {ra_name}: {report.description}"
+        )
+
+        # update the work hours on App Home, if the user has been looking at it
+        if botctx.app_home.has_published(context.actor_user_id):
+            publish_app_home(botctx, client=client, slack_user_id=context.actor_user_id)
 
     return on_mention
@@ -1,9 +1,9 @@
 from slack_bolt import BoltContext
 from slack_sdk.web.client import WebClient
-from sqlalchemy import select
 
 from ...context import BotContext
-from ...db.model import TimeCard
+from ...services.timecards import delete_timecard
+from .on_app_home_opened import publish_app_home
 
 
 def on_message_delete_wrapper(bot_context: BotContext):
@@ -17,19 +17,14 @@ def on_message_delete_wrapper(bot_context: BotContext):
         deleted_slack_message_ts = event["deleted_ts"]
         with botctx.db_sessmaker() as sess:
             try:
-                record_to_delete = sess.execute(
-                    select(TimeCard).where(
-                        TimeCard.slack_message_ts == deleted_slack_message_ts
-                    )
-                ).scalar_one_or_none()
+                record_to_delete = delete_timecard(
+                    sess, slack_message_ts=deleted_slack_message_ts
+                )
                 if not record_to_delete:
                     return  # the deleted message is not a report of work
-                sess.delete(record_to_delete)
-                sess.flush()
-                sess.commit()
             except Exception:
-                sess.rollback()
-                client.chat_postEphemeral(
+                botctx.outbound.post_ephemeral(
+                    client,
                     channel=context.channel_id,
                     user=context.actor_user_id,
                     text=":x: Failed to delete your work record due to some database error.",
@@ -39,7 +34,9 @@ def on_message_delete_wrapper(bot_context: BotContext):
                 )
                 raise
             else:
-                client.chat_postEphemeral(
+                botctx.export_cache.invalidate_month(record_to_delete.start_time)
+                botctx.outbound.post_ephemeral(
+                    client,
                     channel=context.channel_id,
                     user=context.actor_user_id,
                     text=f":wastebasket: Deleted record of you work from {record_to_delete.start_time} to {record_to_delete.end_time}.",
@@ -47,5 +44,9 @@ def on_message_delete_wrapper(bot_context: BotContext):
                 botctx.logger.info(
                     f"deleted work record by slack user {context.actor_user_id} from {record_to_delete.start_time} to {record_to_delete.end_time}: {record_to_delete.description}"
                 )
+                if botctx.app_home.has_published(context.actor_user_id):
+                    publish_app_home(
+                        botctx, client=client, slack_user_id=context.actor_user_id
+                    )
 
     return on_message_delete
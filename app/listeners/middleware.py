@@ -0,0 +1,67 @@
+import functools
+from typing import Callable, Optional
+
+from slack_bolt import BoltResponse
+
+from ..context import BotContext
+from ..dedup import SEEN_EVENTS_RETENTION, event_dedup_key
+from ..services.events import claim_event, prune_seen_events
+
+
+def deduplicate_events_wrapper(bot_context: BotContext):
+    botctx = bot_context
+
+    # Slack delivers an event again when the bot does not ack it in time,
+    # and listeners would record (or delete) work and reply once more for each copy.
+
+    def deduplicate_events(
+        body: dict, next: Callable[[], None]
+    ) -> Optional[BoltResponse]:
+        event_key = event_dedup_key(body)
+        if event_key is None:  # not an event
+            return next()
+
+        is_new = botctx.event_deduplicator.add(event_key)
+        if is_new and botctx.botcfg.persist_seen_events:
+            with botctx.db_sessmaker() as sess:
+                is_new = claim_event(sess, event_key=event_key)
+                if botctx.event_deduplicator.should_prune():
+                    prune_seen_events(sess, retention=SEEN_EVENTS_RETENTION)
+        if not is_new:
+            botctx.event_deduplicator.count_duplicate()
+            botctx.logger.info(
+                f"dropped event {event_key} delivered more than once ({botctx.event_deduplicator.duplicates} in total)"
+            )
+            # ack the copy without passing it to listeners
+            return BoltResponse(status=200, body="")
+        return next()
+
+    return deduplicate_events
+
+
+def measure_listener_wrapper(bot_context: BotContext):
+    botctx = bot_context
+
+    # Bolt runs global middleware before a listener instead of around it, so listeners are wrapped one by one
+    # to measure the time they take, including the time spent on the database and on Slack Web API.
+    # each run is also a transaction of Sentry, which `TracesSampler` decides whether to trace.
+
+    def measure_listener(name: str, listener: Callable) -> Callable:
+        # `functools.wraps` lets Bolt see the arguments of `listener`, which it passes by name
+        @functools.wraps(listener)
+        def measured_listener(**kwargs):
+            if "client" in kwargs:
+                botctx.metrics.instrument_client(kwargs["client"])
+            with (
+                botctx.traces_sampler.transaction(name),
+                botctx.metrics.time_handler(name),
+            ):
+                try:
+                    return listener(**kwargs)
+                except Exception:
+                    botctx.traces_sampler.record_error(name)
+                    raise
+
+        return measured_listener
+
+    return measure_listener
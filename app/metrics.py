@@ -0,0 +1,300 @@
+import bisect
+import contextvars
+import http.server
+import threading
+import time
+from dataclasses import dataclass
+from logging import Logger
+from typing import TYPE_CHECKING, Callable, Optional
+
+from slack_sdk.web.client import WebClient
+from sqlalchemy import Engine, event
+
+if TYPE_CHECKING:
+    from slack_sdk.web.async_client import AsyncWebClient
+
+# prefix of the names of all metrics
+METRIC_PREFIX = "ra_timecard"
+# upper bounds of the buckets of latency histograms in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# address on which `/metrics` is served, which is only reachable from the same machine
+METRICS_HOST = "127.0.0.1"
+
+# function returning current values, such as `JobExecutor.stats`
+Collector = Callable[[], dict[str, float]]
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str) -> None:
+        """
+        a counter of events, kept for each combination of label values
+        """
+        self.name = f"{METRIC_PREFIX}_{name}_total"
+        self.help = help
+        self._values: dict[tuple[tuple[str, str], ...], int] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"] + [
+            f"{self.name}{_format_labels(labels)} {value}" for labels, value in values
+        ]
+
+
+class Histogram:
+    def __init__(
+        self, name: str, help: str, buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ) -> None:
+        """
+        a histogram of observed values (e.g. latencies in seconds), kept for each combination of label values
+        """
+        self.name = f"{METRIC_PREFIX}_{name}"
+        self.help = help
+        self.buckets = buckets
+        # label values -> (counts of observations in each bucket and above the last one, sum of observations)
+        self._values: dict[tuple[tuple[str, str], ...], tuple[list[int], float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted((key, (list(c), t)) for key, (c, t) in self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in values:
+            # buckets of Prometheus are cumulative
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+@dataclass
+class HandlerTimer:
+    """
+    time spent on the database and on Slack Web API by the listener being run
+    """
+
+    db_seconds: float = 0.0
+    slack_seconds: float = 0.0
+
+
+# timer of the listener run by the current thread (or asyncio task), set by `Metrics.time_handler`
+current_handler_timer: contextvars.ContextVar[Optional[HandlerTimer]] = (
+    contextvars.ContextVar("current_handler_timer", default=None)
+)
+
+
+class Metrics:
+    def __init__(self) -> None:
+        """
+        metrics of the bot, which are served in the text format of Prometheus by `MetricsServer`
+        """
+        self.handler_seconds = Histogram(
+            "handler_seconds", "Time taken by listeners to handle a request."
+        )
+        self.handler_db_seconds = Histogram(
+            "handler_db_seconds",
+            "Time spent on database queries while handling a request.",
+        )
+        self.handler_slack_seconds = Histogram(
+            "handler_slack_seconds",
+            "Time spent on calls to Slack Web API while handling a request.",
+        )
+        self.handler_errors = Counter(
+            "handler_errors", "Requests whose listener raised an exception."
+        )
+        self.parse_failures = Counter(
+            "parse_failures", "Work reports rejected because they could not be parsed."
+        )
+        self.db_errors = Counter("db_errors", "Errors raised by the database driver.")
+        self.unknown_ra_rejections = Counter(
+            "unknown_ra_rejections",
+            "Work reports rejected because the RA job or the user was not registered.",
+        )
+        # each value returned by these functions is exported as a gauge
+        self._collectors: list[tuple[Optional[str], Collector]] = []
+
+    def add_collector(self, collect: Collector, prefix: Optional[str] = None) -> None:
+        """
+        export each value returned by `collect` as a gauge named `<prefix>_<key>` (or `<key>` without `prefix`).
+        """
+        self._collectors.append((prefix, collect))
+
+    def time_handler(self, name: str) -> "_HandlerTiming":
+        """
+        return a context manager measuring a run of the listener called `name`.
+        """
+        return _HandlerTiming(self, name)
+
+    def instrument_engine(self, engine: Engine) -> None:
+        """
+        measure queries executed through `engine` (`AsyncEngine.sync_engine` for async engines)
+        as the database time of the running listener, and count errors raised by the driver.
+        """
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(
+            conn, cursor, statement, parameters, context, executemany
+        ):
+            conn.info["query_started_at"] = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(
+            conn, cursor, statement, parameters, context, executemany
+        ):
+            if timer := current_handler_timer.get():
+                timer.db_seconds += time.perf_counter() - conn.info["query_started_at"]
+
+        @event.listens_for(engine, "handle_error")
+        def handle_error(exception_context):
+            self.db_errors.inc(
+                error=type(exception_context.original_exception).__name__
+            )
+
+    def instrument_client(self, client: WebClient) -> None:
+        """
+        measure calls to Slack Web API made through `client` as the Slack time of the running listener.
+        Bolt creates a client for each request, so the client passed to a listener can be instrumented alone.
+        """
+        api_call = client.api_call
+
+        def measured_api_call(*args, **kwargs):
+            started_at = time.perf_counter()
+            try:
+                return api_call(*args, **kwargs)
+            finally:
+                if timer := current_handler_timer.get():
+                    timer.slack_seconds += time.perf_counter() - started_at
+
+        client.api_call = measured_api_call
+
+    def instrument_async_client(self, client: "AsyncWebClient") -> None:
+        """
+        asyncio version of `instrument_client`.
+        """
+        api_call = client.api_call
+
+        async def measured_api_call(*args, **kwargs):
+            started_at = time.perf_counter()
+            try:
+                return await api_call(*args, **kwargs)
+            finally:
+                if timer := current_handler_timer.get():
+                    timer.slack_seconds += time.perf_counter() - started_at
+
+        client.api_call = measured_api_call
+
+    def render(self) -> str:
+        lines = []
+        for metric in [
+            self.handler_seconds,
+            self.handler_db_seconds,
+            self.handler_slack_seconds,
+            self.handler_errors,
+            self.parse_failures,
+            self.db_errors,
+            self.unknown_ra_rejections,
+        ]:
+            lines.extend(metric.render())
+        for prefix, collect in self._collectors:
+            for key, value in collect().items():
+                name = "_".join(filter(None, [METRIC_PREFIX, prefix, key]))
+                lines.extend([f"# TYPE {name} gauge", f"{name} {float(value)}"])
+        return "\n".join(lines) + "\n"
+
+
+class _HandlerTiming:
+    def __init__(self, metrics: Metrics, name: str) -> None:
+        self.metrics = metrics
+        self.name = name
+        self.timer = HandlerTimer()
+
+    def __enter__(self) -> HandlerTimer:
+        self._token = current_handler_timer.set(self.timer)
+        self._started_at = time.perf_counter()
+        return self.timer
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.metrics.handler_seconds.observe(
+            time.perf_counter() - self._started_at, handler=self.name
+        )
+        self.metrics.handler_db_seconds.observe(
+            self.timer.db_seconds, handler=self.name
+        )
+        self.metrics.handler_slack_seconds.observe(
+            self.timer.slack_seconds, handler=self.name
+        )
+        if exc_type is not None:
+            self.metrics.handler_errors.inc(handler=self.name)
+        current_handler_timer.reset(self._token)
+
+
+class MetricsServer:
+    """
+    a thread serving `metrics` at `http://<host>:<port>/metrics` for Prometheus to scrape.
+    """
+
+    def __init__(
+        self, metrics: Metrics, port: int, logger: Logger, host: str = METRICS_HOST
+    ) -> None:
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                # scrapes are too frequent to be logged
+                pass
+
+        self.logger = logger
+        self._server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="metrics-server", daemon=True
+        )
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> None:
+        self._thread.start()
+        self.logger.info(f"serving metrics on port {self.port}")
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
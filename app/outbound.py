@@ -0,0 +1,125 @@
+import asyncio
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional
+
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.client import WebClient
+from slack_sdk.web.slack_response import SlackResponse
+
+if TYPE_CHECKING:
+    from slack_sdk.web.async_client import AsyncWebClient
+    from slack_sdk.web.async_slack_response import AsyncSlackResponse
+
+# number of retries of a call rejected by the rate limit of Slack
+OUTBOUND_MAX_RETRIES = 5
+# wait before the first retry when Slack does not tell how long to wait, which is doubled on every retry
+OUTBOUND_INITIAL_BACKOFF_SECONDS = 1.0
+
+
+class BaseOutboundQueue:
+    """
+    a queue of calls to Slack Web API shared by listeners.
+    calls wait in order until their turn, which comes at most once every `min_interval` seconds.
+    when Slack rejects a call with HTTP 429, every call waits for the time given by Retry-After header
+    (instead of all of them hitting the rate limit again), and the rejected one is retried.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 0.0,
+        max_retries: int = OUTBOUND_MAX_RETRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.clock = clock
+        # number of calls rejected by the rate limit, and the number of calls that finally failed due to it
+        self.rate_limited = 0
+        self.gave_up = 0
+        self._next_call_at = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """
+        take the next turn and return seconds to wait until it comes.
+        """
+        with self._lock:
+            now = self.clock()
+            call_at = max(now, self._next_call_at)
+            self._next_call_at = call_at + self.min_interval
+            return call_at - now
+
+    def _backoff(self, error: SlackApiError, attempt: int) -> Optional[float]:
+        """
+        return seconds to wait before retrying the call that raised `error`, or None if it should not be retried.
+        all calls are held back for that duration.
+        """
+        if error.response.status_code != 429:
+            return None
+        with self._lock:
+            self.rate_limited += 1
+            if attempt >= self.max_retries:
+                self.gave_up += 1
+                return None
+            retry_after = error.response.headers.get(
+                "Retry-After"
+            ) or error.response.headers.get("retry-after")
+            if retry_after is not None:
+                wait = float(retry_after)
+            else:
+                # add jitter so that callers rejected at the same time don't retry at the same time
+                wait = (
+                    OUTBOUND_INITIAL_BACKOFF_SECONDS
+                    * 2**attempt
+                    * random.uniform(1.0, 1.5)
+                )
+            self._next_call_at = max(self._next_call_at, self.clock() + wait)
+            return wait
+
+
+class OutboundQueue(BaseOutboundQueue):
+    def send(self, call: Callable[[], SlackResponse]) -> SlackResponse:
+        """
+        make `call` when its turn comes, retrying it while it is rejected by the rate limit.
+        """
+        attempt = 0
+        while True:
+            time.sleep(self._reserve())
+            try:
+                return call()
+            except SlackApiError as e:
+                if self._backoff(e, attempt) is None:
+                    raise
+                attempt += 1
+
+    def post_ephemeral(self, client: WebClient, **kwargs) -> SlackResponse:
+        """
+        send `WebClient.chat_postEphemeral(**kwargs)` through the queue.
+        """
+        return self.send(lambda: client.chat_postEphemeral(**kwargs))
+
+
+class AsyncOutboundQueue(BaseOutboundQueue):
+    """
+    asyncio version of `OutboundQueue`.
+    """
+
+    async def send(
+        self, call: Callable[[], Awaitable["AsyncSlackResponse"]]
+    ) -> "AsyncSlackResponse":
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._reserve())
+            try:
+                return await call()
+            except SlackApiError as e:
+                if self._backoff(e, attempt) is None:
+                    raise
+                attempt += 1
+
+    async def post_ephemeral(
+        self, client: "AsyncWebClient", **kwargs
+    ) -> "AsyncSlackResponse":
+        return await self.send(lambda: client.chat_postEphemeral(**kwargs))
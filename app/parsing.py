@@ -0,0 +1,234 @@
+import datetime
+import enum
+import re
+from dataclasses import dataclass
+from typing import Optional, Union
+
+# patterns are compiled once at import, instead of on every work report
+MESSAGE_PATTERN = re.compile(
+    r"<@.+>.*\n"  # ignore the first mention line
+    r"• (?P<name>.+)\n"
+    r"• (?P<ra_name>.+)\n"
+    r"• (?P<duration>.+)\n"
+    r"• (?P<description>.+)$"
+)
+# the end date can be omitted, in which case work ending before its start time ends on the next day
+DURATION_PATTERN = re.compile(
+    r"(?P<year>[0-9]{4})/(?P<month>[0-9]{1,2})/(?P<day>[0-9]{1,2}) "
+    r"(?P<start_hour>[0-9]{1,2}):(?P<start_minute>[0-9]{2})-"
+    r"(?:(?P<end_year>[0-9]{4})/(?P<end_month>[0-9]{1,2})/(?P<end_day>[0-9]{1,2}) )?"
+    r"(?P<end_hour>[0-9]{1,2}):(?P<end_minute>[0-9]{2})"
+    r"(?: R(?P<break_hour>[0-9]{1,2}):(?P<break_minute>[0-9]{2}))?$"
+)
+EXPECTED_DURATION_FORMAT = "YYYY/MM/DD HH:MM-[YYYY/MM/DD ]HH:MM [Rhh:mm]"
+# work must end within this long after it starts, so that a typo in the end date (e.g. "2023/12/19" for "2023/11/19")
+# is not recorded as work of a month. records also have to fit in the HHMM columns of `/download_csv`
+MAX_WORK_DURATION = datetime.timedelta(days=1)
+# without the end date, work whose end time is earlier than its start time ends on the next day only if it is at
+# most this long (e.g. "22:00-06:00"), since longer ones like "10:00-09:00" are more likely typos than overnight work
+MAX_IMPLICIT_OVERNIGHT = datetime.timedelta(hours=12)
+
+
+class ParseErrorKind(enum.Enum):
+    """
+    reasons why a work report could not be parsed, each of which has its own reply
+    """
+
+    # the message does not consist of a mention line and four bullet lines
+    MESSAGE_FORMAT = enum.auto()
+    # the working hours line is not in `EXPECTED_DURATION_FORMAT`
+    DURATION_FORMAT = enum.auto()
+    # the working hours are in the format, but contain values like 25:00 or 2023/02/30, do not end within
+    # `MAX_WORK_DURATION` after they start, or end on the next day later than `MAX_IMPLICIT_OVERNIGHT` without the end date
+    DATETIME_VALUE = enum.auto()
+
+
+@dataclass(slots=True)
+class ParseError:
+    """
+    a work report that could not be parsed.
+    `ra_name` is available unless the message itself is in incorrect format,
+    so that the RA job can be checked before complaining about the working hours.
+    unlike `WorkReport`, this is not frozen, since a frozen dataclass takes twice as long to construct,
+    which is a large part of the time to reject a malformed report.
+    """
+
+    kind: ParseErrorKind
+    detail: str
+    ra_name: Optional[str] = None
+    # how to correct the working hours, which is added to the reply if given
+    hint: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class WorkReport:
+    """
+    a work report parsed from a message
+    """
+
+    name: str
+    ra_name: str
+    description: str
+    # working hours as written in the message, e.g. "2023/11/18 10:00-18:00"
+    work_datetime: str
+    start_time: datetime.datetime
+    end_time: datetime.datetime
+    # minutes of recess
+    break_duration: int
+
+
+def _split_duration(duration_str: str) -> Optional[tuple[Optional[int], ...]]:
+    """
+    split working hours into 12 integers (year, month, day, start hour and minute, end year, month, day, hour and
+    minute, and break hour and minute), where the end date and the break are None if omitted.
+    return None if they are not in `EXPECTED_DURATION_FORMAT`.
+    """
+    # the format only consists of ASCII characters, so e.g. full-width digits are rejected without the regex.
+    # this also makes str.isdigit below reject non-ASCII digits like "١"
+    if not duration_str.isascii():
+        return None
+    # fast path for the zero-padded format used by almost every report, which avoids the regex engine
+    length = len(duration_str)
+    if (
+        (
+            length == 22
+            or (
+                length == 29 and duration_str[22:24] == " R" and duration_str[26] == ":"
+            )
+        )
+        and duration_str[4] == "/"
+        and duration_str[7] == "/"
+        and duration_str[10] == " "
+        and duration_str[13] == ":"
+        and duration_str[16] == "-"
+        and duration_str[19] == ":"
+    ):
+        fields = [
+            duration_str[0:4],
+            duration_str[5:7],
+            duration_str[8:10],
+            duration_str[11:13],
+            duration_str[14:16],
+            duration_str[17:19],
+            duration_str[20:22],
+        ]
+        if length == 29:
+            fields += [duration_str[24:26], duration_str[27:29]]
+        # all fields are checked at once, and the regex is tried if any of them is not digits
+        if "".join(fields).isdigit():
+            values = [int(field) for field in fields]
+            # the end date is never given in this format
+            return (
+                *values[:5],
+                None,
+                None,
+                None,
+                *values[5:7],
+                *(values[7:] or [None, None]),
+            )
+    # slow path for the others, e.g. single-digit month or hour, or the end date
+    matched = DURATION_PATTERN.match(duration_str)
+    if not matched:
+        return None
+    return tuple(None if field is None else int(field) for field in matched.groups())
+
+
+def parse_work_period(
+    duration_str: str, ra_name: Optional[str] = None
+) -> Union[tuple[datetime.datetime, datetime.datetime, int], ParseError]:
+    """
+    parse working hours like "2023/11/18 10:00-18:00 R01:00" into start time, end time and minutes of recess.
+    work across midnight can be written either with the end date ("2023/11/18 22:00-2023/11/19 06:00"),
+    or without it ("2023/11/18 22:00-06:00") if it is not longer than `MAX_IMPLICIT_OVERNIGHT`.
+    either way, it has to end within `MAX_WORK_DURATION` after it starts.
+    `ra_name` is set to the error returned if the working hours are invalid.
+    """
+    fields = _split_duration(duration_str)
+    if fields is None:
+        return ParseError(
+            kind=ParseErrorKind.DURATION_FORMAT,
+            ra_name=ra_name,
+            detail=f"working hours {duration_str!r} are not in the format {EXPECTED_DURATION_FORMAT}",
+        )
+    (
+        year,
+        month,
+        day,
+        start_hour,
+        start_minute,
+        end_year,
+        end_month,
+        end_day,
+        end_hour,
+        end_minute,
+        break_hour,
+        break_minute,
+    ) = fields
+    try:
+        start_time = datetime.datetime(year, month, day, start_hour, start_minute)
+        if end_year is None:
+            end_time = datetime.datetime(year, month, day, end_hour, end_minute)
+            if end_time < start_time:
+                end_time += datetime.timedelta(days=1)
+        else:
+            end_time = datetime.datetime(
+                end_year, end_month, end_day, end_hour, end_minute
+            )
+        # recess is written in the same way as a time of day, e.g. "R01:75" is invalid
+        break_time = datetime.time(break_hour or 0, break_minute or 0)
+    except ValueError as e:  # e.g. "month must be in 1..12"
+        return ParseError(
+            kind=ParseErrorKind.DATETIME_VALUE,
+            ra_name=ra_name,
+            detail=f"working hours {duration_str!r} contain an invalid value: {e}",
+        )
+    if end_time <= start_time:
+        return ParseError(
+            kind=ParseErrorKind.DATETIME_VALUE,
+            ra_name=ra_name,
+            detail=f"working hours {duration_str!r} do not end after they start",
+        )
+    if (
+        end_year is None
+        and end_time.date() != start_time.date()
+        and end_time - start_time > MAX_IMPLICIT_OVERNIGHT
+    ):
+        return ParseError(
+            kind=ParseErrorKind.DATETIME_VALUE,
+            ra_name=ra_name,
+            detail=f"working hours {duration_str!r} end before they start, and are longer than {MAX_IMPLICIT_OVERNIGHT} if they end on the next day",
+            hint=f"If the work ends on the next day, write the end date like `{start_time:%Y/%m/%d %H:%M}-{end_time:%Y/%m/%d %H:%M}`.",
+        )
+    if end_time - start_time >= MAX_WORK_DURATION:
+        return ParseError(
+            kind=ParseErrorKind.DATETIME_VALUE,
+            ra_name=ra_name,
+            detail=f"working hours {duration_str!r} do not end within {MAX_WORK_DURATION} after they start",
+        )
+    return start_time, end_time, break_time.hour * 60 + break_time.minute
+
+
+def parse_work_report(text: str) -> Union[WorkReport, ParseError]:
+    """
+    parse the text of a message reporting work.
+    """
+    message_matched = MESSAGE_PATTERN.match(text)
+    if not message_matched:
+        return ParseError(
+            kind=ParseErrorKind.MESSAGE_FORMAT,
+            detail="message does not consist of a mention line followed by 4 bullet lines",
+        )
+    name, ra_name, duration_str, description = map(str.strip, message_matched.groups())
+    work_period = parse_work_period(duration_str, ra_name=ra_name)
+    if isinstance(work_period, ParseError):
+        return work_period
+    start_time, end_time, break_duration = work_period
+    return WorkReport(
+        name=name,
+        ra_name=ra_name,
+        description=description,
+        work_datetime=duration_str.split(" R", 1)[0],
+        start_time=start_time,
+        end_time=end_time,
+        break_duration=break_duration,
+    )
@@ -0,0 +1,126 @@
+import datetime
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from dateutil import relativedelta
+
+# the month in which a fiscal year starts, i.e. "fy2024" is from 2024/04 to 2025/03
+FISCAL_YEAR_START_MONTH = 4
+# the maximum number of months in a period, to keep exports within a reasonable size
+MAX_PERIOD_MONTHS = 24
+
+MONTH_PATTERN = re.compile(r"(?P<year>[0-9]{4})/(?P<month>[0-9]{1,2})")
+RANGE_PATTERN = re.compile(
+    r"(?P<first>[0-9]{4}/[0-9]{1,2})\s*-\s*(?P<last>[0-9]{4}/[0-9]{1,2})"
+)
+FISCAL_YEAR_PATTERN = re.compile(r"fy(?P<year>[0-9]{4})", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Period:
+    """
+    whole months from the month of `first_day` to the month before `first_day_of_next_period`.
+    """
+
+    first_day: datetime.date
+    first_day_of_next_period: datetime.date
+    # how the period is referred to in replies, e.g. "2023/11", "2024/04-2025/03" or "fy2024"
+    label: str
+
+    @property
+    def months(self) -> list[datetime.date]:
+        """
+        return the first days of the months in the period.
+        """
+        months = []
+        month = self.first_day
+        while month < self.first_day_of_next_period:
+            months.append(month)
+            month += relativedelta.relativedelta(months=1)
+        return months
+
+    @property
+    def is_single_month(self) -> bool:
+        return (
+            self.first_day + relativedelta.relativedelta(months=1)
+            == self.first_day_of_next_period
+        )
+
+    @property
+    def filename_prefix(self) -> str:
+        """
+        return the prefix of names of files exported for the period, e.g. "2023_11", "2024_4-2025_3" or "fy2024".
+        """
+        if self.label.lower().startswith("fy"):
+            return self.label.lower()
+        last_month = self.first_day_of_next_period - relativedelta.relativedelta(
+            months=1
+        )
+        prefix = f"{self.first_day.year}_{self.first_day.month}"
+        if not self.is_single_month:
+            prefix += f"-{last_month.year}_{last_month.month}"
+        return prefix
+
+
+def _parse_month(text: str) -> Optional[datetime.date]:
+    if not (matched := MONTH_PATTERN.fullmatch(text)):
+        return None
+    try:
+        return datetime.date(
+            year=int(matched.group("year")), month=int(matched.group("month")), day=1
+        )
+    except ValueError:  # month out of range
+        return None
+
+
+def month_period(date: datetime.date, label: str) -> Period:
+    """
+    return the period consisting of the month of `date`.
+    """
+    first_day = datetime.date(year=date.year, month=date.month, day=1)
+    return Period(
+        first_day=first_day,
+        first_day_of_next_period=first_day + relativedelta.relativedelta(months=1),
+        label=label,
+    )
+
+
+def parse_period(text: str, today: Optional[datetime.date] = None) -> Optional[Period]:
+    """
+    parse the argument of commands taking a period, which is one of
+    - empty: this month
+    - "yyyy/mm": the month
+    - "yyyy/mm-yyyy/mm": months from the first to the last, both inclusive
+    - "fyyyyy": the fiscal year starting in April of the year
+    return None if `text` is in none of the formats, or the period is empty or longer than `MAX_PERIOD_MONTHS`.
+    """
+    text = text.strip()
+    if not text:
+        return month_period(today or datetime.date.today(), label="this month")
+    if month := _parse_month(text):
+        return month_period(month, label=text)
+    if matched := RANGE_PATTERN.fullmatch(text):
+        first_month = _parse_month(matched.group("first"))
+        last_month = _parse_month(matched.group("last"))
+        if first_month is None or last_month is None or last_month < first_month:
+            return None
+        period = Period(
+            first_day=first_month,
+            first_day_of_next_period=last_month + relativedelta.relativedelta(months=1),
+            label=text,
+        )
+    elif matched := FISCAL_YEAR_PATTERN.fullmatch(text):
+        first_day = datetime.date(
+            year=int(matched.group("year")), month=FISCAL_YEAR_START_MONTH, day=1
+        )
+        period = Period(
+            first_day=first_day,
+            first_day_of_next_period=first_day + relativedelta.relativedelta(years=1),
+            label=text,
+        )
+    else:
+        return None
+    if len(period.months) > MAX_PERIOD_MONTHS:
+        return None
+    return period
@@ -0,0 +1,118 @@
+import asyncio
+import datetime
+import select
+import threading
+from logging import Logger
+from typing import TYPE_CHECKING
+
+from sqlalchemy import Engine
+
+from .export_cache import ExportCache
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+# channel on which the trigger added by migration 5 notifies the first day of the month of a written record
+TIMECARD_MONTH_CHANNEL = "timecard_month_changed"
+# seconds to wait for a notification before checking whether listening should stop
+NOTIFICATION_POLL_INTERVAL = 1.0
+# seconds to wait before listening again after the connection is lost
+NOTIFICATION_RECONNECT_INTERVAL = 5.0
+
+
+class MonthInvalidationListener:
+    """
+    a thread that listens on `TIMECARD_MONTH_CHANNEL` and invalidates the months in `export_cache`,
+    so that files cached by a replica are not sent after another replica (or a maintenance command) writes records.
+    notifications sent while the connection is lost are missed, so the whole cache is invalidated on every (re)connection.
+    """
+
+    def __init__(
+        self, engine: Engine, export_cache: ExportCache, logger: Logger
+    ) -> None:
+        self.engine = engine
+        self.export_cache = export_cache
+        self.logger = logger
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="month-invalidation-listener", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self._listen()
+            except Exception as e:
+                self.logger.warning(
+                    f"stopped listening on {TIMECARD_MONTH_CHANNEL} due to {type(e).__name__}: {e}"
+                )
+                self._stopped.wait(NOTIFICATION_RECONNECT_INTERVAL)
+
+    def _listen(self) -> None:
+        # the connection is detached from the pool, since it is kept for as long as the bot runs
+        pooled_connection = self.engine.raw_connection()
+        connection = pooled_connection.driver_connection
+        pooled_connection.detach()
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {TIMECARD_MONTH_CHANNEL}")
+            self.export_cache.invalidate_all()
+            self.logger.info(f"started listening on {TIMECARD_MONTH_CHANNEL}")
+            while not self._stopped.is_set():
+                readable, _, _ = select.select(
+                    [connection], [], [], NOTIFICATION_POLL_INTERVAL
+                )
+                if not readable:
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    notification = connection.notifies.pop(0)
+                    self.export_cache.invalidate_month(
+                        datetime.date.fromisoformat(notification.payload)
+                    )
+        finally:
+            pooled_connection.close()
+
+
+async def listen_month_invalidations(
+    engine: "AsyncEngine", export_cache: ExportCache, logger: Logger
+) -> None:
+    """
+    asyncio version of `MonthInvalidationListener`, which listens until cancelled.
+    """
+    while True:
+        try:
+            pooled_connection = await engine.raw_connection()
+            connection = pooled_connection.driver_connection
+            pooled_connection.detach()
+            try:
+                # asyncpg calls listeners in the event loop, so invalidation never blocks for long
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(
+                    TIMECARD_MONTH_CHANNEL,
+                    lambda _connection, _pid, _channel, payload: export_cache.invalidate_month(
+                        datetime.date.fromisoformat(payload)
+                    ),
+                )
+                export_cache.invalidate_all()
+                logger.info(f"started listening on {TIMECARD_MONTH_CHANNEL}")
+                await lost.wait()
+            finally:
+                # closed without awaiting, so that it is closed even when cancelled
+                connection.terminate()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(
+                f"stopped listening on {TIMECARD_MONTH_CHANNEL} due to {type(e).__name__}: {e}"
+            )
+        await asyncio.sleep(NOTIFICATION_RECONNECT_INTERVAL)
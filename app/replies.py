@@ -0,0 +1,44 @@
+from slack_sdk.models.blocks import (
+    Block,
+    DividerBlock,
+    MarkdownTextObject,
+    SectionBlock,
+)
+
+# the maximum length of text in a section block
+SECTION_TEXT_MAX_LENGTH = 3000
+
+
+class ReplyAggregator:
+    """
+    collect messages replied to one event, so that they are sent as sections of a single message
+    instead of one Web API call per message.
+    """
+
+    def __init__(self) -> None:
+        self.messages: list[str] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.messages)
+
+    def add(self, text: str) -> None:
+        self.messages.append(text)
+
+    def text(self) -> str:
+        """
+        return the fallback text shown in notifications.
+        """
+        return "\n\n".join(self.messages)
+
+    def blocks(self) -> list[Block]:
+        """
+        return a section per message, separated by dividers.
+        """
+        blocks: list[Block] = []
+        for message in self.messages:
+            if blocks:
+                blocks.append(DividerBlock())
+            if len(message) > SECTION_TEXT_MAX_LENGTH:
+                message = message[: SECTION_TEXT_MAX_LENGTH - 1] + "…"
+            blocks.append(SectionBlock(text=MarkdownTextObject(text=message)))
+        return blocks
@@ -0,0 +1,108 @@
+import contextlib
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, ContextManager, Self
+
+if TYPE_CHECKING:
+    from .config import BotConfig
+
+# share of runs of a listener traced by Sentry, unless the listener is in `TRACES_SAMPLE_RATES`
+TRACES_SAMPLE_RATE = 0.05
+# listeners that are run rarely and take long, so that every run is worth tracing
+TRACES_SAMPLE_RATES = {
+    "/admin_download_all_records": 1.0,
+    "/admin_compliance_report": 1.0,
+    "/download_csv": 1.0,
+}
+# share of traced runs that are also profiled
+PROFILES_SAMPLE_RATE = 0.1
+# seconds during which every run of a listener is traced after the listener raised an exception
+ERROR_BOOST_SECONDS = 600.0
+
+
+class TracesSampler:
+    """
+    `traces_sampler` of Sentry, which decides whether a run of a listener (a transaction named after the command
+    or the event) is traced by the rate given to the listener. after a listener raises an exception,
+    all of its runs are traced for a while, so that the failure can be looked into with traces of every run.
+    exceptions themselves are always reported to Sentry regardless of these rates.
+    """
+
+    def __init__(
+        self,
+        default_rate: float = TRACES_SAMPLE_RATE,
+        rates: dict[str, float] = TRACES_SAMPLE_RATES,
+        error_boost_seconds: float = ERROR_BOOST_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.default_rate = default_rate
+        self.rates = rates
+        self.error_boost_seconds = error_boost_seconds
+        self.clock = clock
+        # whether Sentry has been initialized by `start_sentry`
+        self.enabled = False
+        # name of a listener -> when it raised an exception the last time
+        self._failed_at: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, botcfg: "BotConfig") -> Self:
+        """
+        return `TracesSampler` with the rates in `botcfg`, where rates of listeners not given there keep the defaults.
+        """
+        return cls(
+            default_rate=botcfg.sentry_traces_sample_rate,
+            rates=TRACES_SAMPLE_RATES | botcfg.sentry_traces_sample_rates,
+        )
+
+    def start_sentry(self, dsn: str, profiles_sample_rate: float) -> None:
+        """
+        initialize Sentry with this sampler, so that runs of listeners are traced as transactions from now on.
+        """
+        # imported here so that sentry_sdk is only loaded when monitoring is enabled, which saves time on startup
+        import sentry_sdk
+
+        sentry_sdk.init(
+            dsn=dsn,
+            send_default_pii=True,
+            traces_sampler=self,
+            profiles_sample_rate=profiles_sample_rate,
+        )
+        self.enabled = True
+
+    def transaction(self, name: str) -> ContextManager:
+        """
+        return a context manager that runs the listener called `name` in a transaction of Sentry,
+        which does nothing unless Sentry has been initialized by `start_sentry`.
+        """
+        if not self.enabled:
+            return contextlib.nullcontext()
+        import sentry_sdk
+        from sentry_sdk.tracing import TransactionSource
+
+        return sentry_sdk.start_transaction(
+            op="slack.listener", name=name, source=TransactionSource.COMPONENT
+        )
+
+    def record_error(self, name: str) -> None:
+        """
+        trace all runs of the listener called `name` for `error_boost_seconds` from now.
+        """
+        with self._lock:
+            self._failed_at[name] = self.clock()
+
+    def rate(self, name: str) -> float:
+        with self._lock:
+            failed_at = self._failed_at.get(name)
+        if (
+            failed_at is not None
+            and self.clock() - failed_at < self.error_boost_seconds
+        ):
+            return 1.0
+        return self.rates.get(name, self.default_rate)
+
+    def __call__(self, sampling_context: dict[str, Any]) -> float:
+        # follow the decision of the parent, if a transaction is ever started within a traced one
+        if sampling_context.get("parent_sampled") is not None:
+            return float(sampling_context["parent_sampled"])
+        return self.rate(sampling_context["transaction_context"].get("name", ""))
@@ -0,0 +1,24 @@
+import hashlib
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+
+def singleton_lock_key(name: str) -> int:
+    """
+    return the key of the advisory lock taken by work called `name`, which is a signed 64-bit integer.
+    """
+    return int.from_bytes(
+        hashlib.sha256(name.encode()).digest()[:8], byteorder="big", signed=True
+    )
+
+
+def try_lock_singleton(sess: Session, name: str) -> bool:
+    """
+    take the advisory lock of work called `name` until the transaction of `sess` ends and return True,
+    or return False without waiting if another replica holds it (i.e. is doing the work right now).
+    work that only one replica should do at a time has to be done in the same transaction.
+    """
+    return sess.execute(
+        select(func.pg_try_advisory_xact_lock(singleton_lock_key(name)))
+    ).scalar_one()
@@ -0,0 +1,47 @@
+import datetime
+
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..db.model import SeenEvent
+from .coordination import try_lock_singleton
+
+
+def claim_event(sess: Session, event_key: str) -> bool:
+    """
+    store the key of an event and return True, or return False if it has already been stored
+    (i.e. the event has already been handled, possibly before a restart).
+    """
+    try:
+        claimed = sess.execute(
+            insert(SeenEvent)
+            .values(event_key=event_key)
+            .on_conflict_do_nothing(index_elements=[SeenEvent.event_key])
+            .returning(SeenEvent.event_key)
+        ).first()
+        sess.commit()
+    except Exception:
+        sess.rollback()
+        raise
+    return claimed is not None
+
+
+def prune_seen_events(sess: Session, retention: datetime.timedelta) -> int:
+    """
+    delete keys of events received more than `retention` ago, and return the number of deleted keys.
+    nothing is deleted if another replica is pruning them at the same time.
+    """
+    try:
+        if not try_lock_singleton(sess, name="prune_seen_events"):
+            sess.rollback()
+            return 0
+        # compare with the clock of the database, which set `seen_at`
+        result = sess.execute(
+            delete(SeenEvent).where(SeenEvent.seen_at < func.now() - retention)
+        )
+        sess.commit()
+    except Exception:
+        sess.rollback()
+        raise
+    return result.rowcount
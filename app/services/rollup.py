@@ -0,0 +1,155 @@
+import argparse
+import datetime
+import logging
+from dataclasses import dataclass
+
+import sqlalchemy.sql.functions as sqlfuncs
+from sqlalchemy import Date, Select, cast, delete, func, or_, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..db.model import TimeCard, WorkingHoursRollup
+
+# the rollup is maintained by the triggers `timecard_working_hours_rollup_*` (see migration 6) within the transaction
+# that changes `TimeCard`. functions in this module are used to check and repair it.
+
+
+def select_rollup_from_timecards() -> Select:
+    """
+    return a statement computing the rollup from raw `TimeCard` records.
+    """
+    year_month = cast(func.date_trunc("month", TimeCard.start_time), Date)
+    return select(
+        TimeCard.ra_id.label("ra_id"),
+        year_month.label("year_month"),
+        sqlfuncs.sum(TimeCard.duration - TimeCard.break_duration).label("total_work"),
+        sqlfuncs.count().label("record_count"),
+    ).group_by(TimeCard.ra_id, year_month)
+
+
+@dataclass(frozen=True)
+class RollupDrift:
+    """
+    a month of an RA job, whose rollup differs from the one recomputed from raw records
+    """
+
+    ra_id: int
+    year_month: datetime.date
+    stored_total_work: int
+    stored_record_count: int
+    actual_total_work: int
+    actual_record_count: int
+
+
+def find_rollup_drifts(sess: Session) -> list[RollupDrift]:
+    """
+    recompute the rollup from raw `TimeCard` records and return months whose stored rollup differs.
+    """
+    actual = select_rollup_from_timecards().subquery()
+    stored = select(WorkingHoursRollup).subquery()
+    stored_total_work = func.coalesce(stored.c.total_work, 0)
+    stored_record_count = func.coalesce(stored.c.record_count, 0)
+    actual_total_work = func.coalesce(actual.c.total_work, 0)
+    actual_record_count = func.coalesce(actual.c.record_count, 0)
+    ra_id = func.coalesce(stored.c.ra_id, actual.c.ra_id)
+    year_month = func.coalesce(stored.c.year_month, actual.c.year_month)
+    rows = sess.execute(
+        select(
+            ra_id,
+            year_month,
+            stored_total_work,
+            stored_record_count,
+            actual_total_work,
+            actual_record_count,
+        )
+        .select_from(stored)
+        .join(
+            actual,
+            (stored.c.ra_id == actual.c.ra_id)
+            & (stored.c.year_month == actual.c.year_month),
+            full=True,
+        )
+        .where(
+            or_(
+                stored_total_work != actual_total_work,
+                stored_record_count != actual_record_count,
+            )
+        )
+        .order_by(year_month, ra_id)
+    ).all()
+    return [RollupDrift(*row) for row in rows]
+
+
+def rebuild_rollup(sess: Session) -> int:
+    """
+    replace the whole rollup with the one recomputed from raw `TimeCard` records, and return the number of rows.
+    """
+    try:
+        # block the trigger until the rebuild is committed. reports that have already updated the rollup
+        # are waited for, and the others add their change on top of the rebuilt rollup afterwards.
+        sess.execute(text("LOCK TABLE working_hours_rollup IN EXCLUSIVE MODE"))
+        sess.execute(delete(WorkingHoursRollup))
+        actual = select_rollup_from_timecards()
+        result = sess.execute(
+            insert(WorkingHoursRollup).from_select(
+                ["ra_id", "year_month", "total_work", "record_count"], actual
+            )
+        )
+        sess.commit()
+    except Exception:
+        sess.rollback()
+        raise
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    # CLI to check the rollup against raw records, e.g. `python -m app.services.rollup --dbconfig <path>`
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from ..config import DBConfig
+    from ..db.setup import get_db_url
+
+    parser = argparse.ArgumentParser(
+        description="Verify (and rebuild) monthly working hours rollup of RA timecard recorder"
+    )
+    parser.add_argument(
+        "--dbconfig",
+        help="JSON file containing database configuration (if not given, environment variables will be used)",
+    )
+    parser.add_argument(
+        "--rebuild",
+        help="Recompute the rollup from work records if any drift is found",
+        action="store_true",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig()
+    logger = logging.getLogger("rollup")
+    logger.setLevel(logging.INFO)
+
+    db_config = (
+        DBConfig.from_file(filepath=args.dbconfig)
+        if args.dbconfig
+        else DBConfig.from_env()
+    )
+    engine = create_engine(url=get_db_url(db_config=db_config))
+    sessmaker = sessionmaker(bind=engine)
+
+    with sessmaker() as sess:
+        drifts = find_rollup_drifts(sess)
+    for drift in drifts:
+        print(
+            f"ra_id={drift.ra_id} {drift.year_month:%Y/%m}: "
+            f"stored {drift.stored_total_work} minutes ({drift.stored_record_count} records), "
+            f"actual {drift.actual_total_work} minutes ({drift.actual_record_count} records)"
+        )
+    logger.info(f"found {len(drifts)} drifted months")
+
+    if drifts and args.rebuild:
+        with sessmaker() as sess:
+            num_rows = rebuild_rollup(sess)
+        logger.info(f"rebuilt the rollup ({num_rows} rows)")
+    engine.dispose()
+    # exit with 1 if the rollup was left drifted, so that this can be used in scheduled checks
+    raise SystemExit(1 if drifts and not args.rebuild else 0)
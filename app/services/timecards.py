@@ -0,0 +1,273 @@
+import csv
+import datetime
+import io
+from typing import Iterable, Optional, Sequence
+
+from sqlalchemy import (
+    ColumnElement,
+    and_,
+    column,
+    delete,
+    exists,
+    func,
+    select,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..db.model import RA, TimeCard, User, WorkingHoursRollup
+
+# columns of `TimeCard` given to `copy_missing_timecards`, in this order. `duration` is computed by the database
+TIMECARD_COPY_COLUMNS = [
+    "ra_id",
+    "start_time",
+    "end_time",
+    "break_duration",
+    "description",
+    "slack_message_ts",
+]
+
+
+def starts_within(
+    first_day: datetime.date, first_day_of_next_period: datetime.date
+) -> ColumnElement[bool]:
+    """
+    return the condition that a record of work starts within [`first_day`, `first_day_of_next_period`).
+    a record belongs to the period in which it starts, as in the rollup, so work across midnight at the end of
+    the period is not left out of every period. only `start_time` is compared, so that an index on it (or a
+    partition of the period) can be used by itself.
+    """
+    return and_(
+        TimeCard.start_time >= first_day, TimeCard.start_time < first_day_of_next_period
+    )
+
+
+def find_timecard(sess: Session, slack_message_ts: str) -> Optional[TimeCard]:
+    """
+    return the record of work reported by the message sent at `slack_message_ts`, if any.
+    """
+    return sess.execute(
+        select(TimeCard).where(TimeCard.slack_message_ts == slack_message_ts)
+    ).scalar_one_or_none()
+
+
+def record_timecard(
+    sess: Session,
+    ra_id: int,
+    start_time: datetime.datetime,
+    end_time: datetime.datetime,
+    break_duration: int,
+    description: str,
+    slack_message_ts: str,
+) -> tuple[TimeCard, bool, Optional[datetime.datetime]]:
+    """
+    add a record of work reported by the message sent at `slack_message_ts`, or overwrite it if it already exists.
+    `break_duration` is in minutes. return the record (with `duration` computed by the database), whether it was
+    newly added, and its start time before being overwritten (if any).
+    this is done by a single statement, so that the same message delivered twice never results in two records.
+    """
+    # the CTE sees the table as of before the statement, i.e. the record before being overwritten
+    previous = (
+        select(TimeCard.start_time)
+        .where(TimeCard.slack_message_ts == slack_message_ts)
+        .cte("previous")
+    )
+    # the upsert can only be keyed on (slack_message_ts, start_time), which a partitioned table can have, so a record
+    # whose start time was edited is deleted and added again (which also moves it to another partition).
+    # the unique constraint on `slack_message_ts` of an unpartitioned table is checked after both
+    moved = (
+        delete(TimeCard)
+        .where(
+            TimeCard.slack_message_ts == slack_message_ts,
+            TimeCard.start_time != start_time,
+        )
+        .returning(TimeCard.id)
+        .cte("moved")
+    )
+    stmt = insert(TimeCard).values(
+        ra_id=ra_id,
+        start_time=start_time,
+        end_time=end_time,
+        break_duration=break_duration,
+        description=description,
+        slack_message_ts=slack_message_ts,
+    )
+    stmt = (
+        stmt.on_conflict_do_update(
+            index_elements=[TimeCard.slack_message_ts, TimeCard.start_time],
+            set_={
+                "ra_id": stmt.excluded.ra_id,
+                "end_time": stmt.excluded.end_time,
+                "break_duration": stmt.excluded.break_duration,
+                "description": stmt.excluded.description,
+            },
+        )
+        .add_cte(previous)
+        .add_cte(moved)
+    )
+    try:
+        record, previous_start_time = sess.execute(
+            stmt.returning(TimeCard, select(previous.c.start_time).scalar_subquery()),
+            execution_options={"populate_existing": True},
+        ).one()
+        sess.commit()
+    except Exception:
+        sess.rollback()
+        raise
+    # the record is new if the message had no record before the statement. (`xmax` of the returned row would tell
+    # whether it was inserted, but it can't be read from a partitioned table.) if the same new message is recorded
+    # by two statements at the same time, both tell that it is new, though only one record is added.
+    is_new = previous_start_time is None
+    return record, is_new, previous_start_time
+
+
+def insert_missing_timecards(sess: Session, records: list[dict]) -> int:
+    """
+    add records of work given as dicts of the columns in `TIMECARD_COPY_COLUMNS`, except those whose message
+    has already been recorded (even with another start time, e.g. edited while the bot was down), and return
+    the number of added records. the records are sent in a single multi-row INSERT statement, instead of one
+    statement per record like `record_timecard`.
+    """
+    if not records:
+        return 0
+    staged = values(
+        *(
+            column(name, TimeCard.__table__.c[name].type)
+            for name in TIMECARD_COPY_COLUMNS
+        ),
+        name="staged",
+    ).data(
+        [tuple(record[name] for name in TIMECARD_COPY_COLUMNS) for record in records]
+    )
+    try:
+        added = sess.execute(
+            insert(TimeCard)
+            .from_select(
+                TIMECARD_COPY_COLUMNS,
+                # a partitioned table has no unique constraint on `slack_message_ts` to skip them
+                select(staged).where(
+                    ~exists().where(
+                        TimeCard.slack_message_ts == staged.c.slack_message_ts
+                    )
+                ),
+            )
+            .on_conflict_do_nothing(
+                index_elements=[TimeCard.slack_message_ts, TimeCard.start_time]
+            )
+            .returning(TimeCard.id)
+        ).all()
+        sess.commit()
+    except Exception:
+        sess.rollback()
+        raise
+    return len(added)
+
+
+def copy_missing_timecards(sess: Session, batches: Iterable[Sequence[tuple]]) -> int:
+    """
+    add records of work given as tuples of `TIMECARD_COPY_COLUMNS` and return the number of added records.
+    the records are loaded by COPY into a temporary table batch by batch (so `batches` can be produced lazily
+    while reading a large file), and then merged into `TimeCard` by a single statement, all within one transaction.
+    records whose RA job already has a record starting at the same time (e.g. imported before, or reported in Slack)
+    or whose message has already been recorded are skipped.
+    """
+    columns = ", ".join(TIMECARD_COPY_COLUMNS)
+    try:
+        # COPY is only available on the DBAPI (psycopg2) cursor
+        cursor = sess.connection().connection.dbapi_connection.cursor()
+        cursor.execute(
+            "CREATE TEMPORARY TABLE timecard_staging "
+            "(ra_id integer, start_time timestamp, end_time timestamp, "
+            "break_duration integer, description varchar, slack_message_ts varchar) ON COMMIT DROP"
+        )
+        for batch in batches:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(batch)
+            buffer.seek(0)
+            cursor.copy_expert(
+                f"COPY timecard_staging ({columns}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+        cursor.execute(
+            f"INSERT INTO timecard ({columns}) "
+            f"SELECT {columns} FROM timecard_staging AS staged "
+            "WHERE NOT EXISTS (SELECT 1 FROM timecard "
+            "WHERE timecard.ra_id = staged.ra_id AND timecard.start_time = staged.start_time "
+            "OR timecard.slack_message_ts = staged.slack_message_ts) "
+            "ON CONFLICT (slack_message_ts, start_time) DO NOTHING"
+        )
+        added = cursor.rowcount
+        sess.commit()
+    except Exception:
+        sess.rollback()
+        raise
+    return added
+
+
+def delete_timecard(sess: Session, slack_message_ts: str) -> Optional[TimeCard]:
+    """
+    delete the record of work reported by the message sent at `slack_message_ts` and return it.
+    return None if the message was not a report of work.
+    """
+    try:
+        record_to_delete = find_timecard(sess, slack_message_ts=slack_message_ts)
+        if not record_to_delete:
+            return None
+        sess.delete(record_to_delete)
+        sess.flush()
+        sess.commit()
+    except Exception:
+        sess.rollback()
+        raise
+    return record_to_delete
+
+
+def sum_working_hours(
+    sess: Session,
+    slack_user_id: str,
+    first_day: datetime.date,
+    first_day_of_next_period: datetime.date,
+) -> list[tuple[str, int]]:
+    """
+    return pairs of RA job name and total work minutes (excluding recess) of the user within the months
+    from `first_day` to the month before `first_day_of_next_period`, which are first days of months.
+    they are summed from the rollup instead of aggregating records.
+    """
+    working_hours_of_all_RAs = sess.execute(
+        select(RA.ra_name, func.sum(WorkingHoursRollup.total_work))
+        .join(RA, RA.id == WorkingHoursRollup.ra_id)
+        .join(User, User.id == RA.user_id)
+        .where(
+            User.slack_user_id == slack_user_id,
+            WorkingHoursRollup.year_month >= first_day,
+            WorkingHoursRollup.year_month < first_day_of_next_period,
+        )
+        .group_by(RA.id, RA.ra_name)
+        # months whose records have all been deleted are left with no record
+        .having(func.sum(WorkingHoursRollup.record_count) > 0)
+    ).all()
+    return [working_hour._tuple() for working_hour in working_hours_of_all_RAs]
+
+
+def get_user_records(
+    sess: Session,
+    slack_user_id: str,
+    first_day: datetime.date,
+    first_day_of_next_period: datetime.date,
+) -> list[tuple[RA, TimeCard]]:
+    """
+    return pairs of RA job and record of work of the user starting within [`first_day`, `first_day_of_next_period`),
+    in chronological order.
+    """
+    records = sess.execute(
+        select(RA, TimeCard)
+        .join(RA, RA.id == TimeCard.ra_id)
+        .join(User, User.id == RA.user_id)
+        .where(
+            User.slack_user_id == slack_user_id,
+            starts_within(first_day, first_day_of_next_period),
+        )
+        .order_by(TimeCard.start_time)
+    ).all()
+    return [record._tuple() for record in records]
@@ -0,0 +1,133 @@
+import enum
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..cache import IdentityCache
+from ..db.model import RA, User
+
+# SQLSTATE of unique_violation. it is checked instead of `psycopg2.errors.UniqueViolation`
+# so that errors raised through both psycopg2 and asyncpg can be handled.
+UNIQUE_VIOLATION = "23505"
+
+
+def register_user(
+    sess: Session,
+    slack_user_id: str,
+    name: str,
+    cache: Optional[IdentityCache] = None,
+) -> bool:
+    """
+    add a user to the database and return True, or return False if the user is already registered.
+    """
+    try:
+        sess.add(User(slack_user_id=slack_user_id, name=name))
+        sess.flush()
+        sess.commit()
+    except IntegrityError as e:
+        sess.rollback()
+        if getattr(e.orig, "pgcode", None) == UNIQUE_VIOLATION:
+            return False
+        raise
+    finally:
+        if cache:
+            cache.invalidate_user(slack_user_id)
+    return True
+
+
+class RegisterRAResult(enum.Enum):
+    REGISTERED = enum.auto()
+    USER_NOT_FOUND = enum.auto()
+    ALREADY_REGISTERED = enum.auto()
+
+
+def resolve_user_id(
+    sess: Session, slack_user_id: str, cache: Optional[IdentityCache] = None
+) -> Optional[int]:
+    """
+    return id of the user, or None if the user is not registered.
+    """
+    if cache and (user_id := cache.user_ids.get(slack_user_id)) is not None:
+        return user_id
+    user_id = sess.execute(
+        select(User.id).where(User.slack_user_id == slack_user_id)
+    ).scalar()
+    if cache and user_id is not None:
+        cache.user_ids.put(slack_user_id, user_id)
+    return user_id
+
+
+def register_ra(
+    sess: Session,
+    slack_user_id: str,
+    ra_name: str,
+    cache: Optional[IdentityCache] = None,
+) -> RegisterRAResult:
+    """
+    add an RA job of the user to the database.
+    """
+    # check that the user is already registered
+    user_id = resolve_user_id(sess, slack_user_id=slack_user_id, cache=cache)
+    if user_id is None:
+        return RegisterRAResult.USER_NOT_FOUND
+
+    # check that the RA job is not already registered for this user
+    if cache and cache.ra_ids.get((slack_user_id, ra_name)) is not None:
+        return RegisterRAResult.ALREADY_REGISTERED
+    _should_be_none = sess.execute(
+        select(RA.id).where(RA.user_id == user_id, RA.ra_name == ra_name)
+    ).first()
+    if _should_be_none is not None:
+        return RegisterRAResult.ALREADY_REGISTERED
+
+    try:
+        sess.add(RA(user_id=user_id, ra_name=ra_name))
+        sess.flush()
+        sess.commit()
+    except Exception:
+        sess.rollback()
+        raise
+    finally:
+        if cache:
+            cache.invalidate_user(slack_user_id)
+    return RegisterRAResult.REGISTERED
+
+
+def resolve_ra_id(
+    sess: Session,
+    slack_user_id: str,
+    ra_name: str,
+    cache: Optional[IdentityCache] = None,
+) -> Optional[int]:
+    """
+    return id of the RA job named `ra_name` that belongs to the user, or None if there is no such RA job.
+    the database is not queried if the id is found in `cache`.
+    """
+    if cache and (ra_id := cache.ra_ids.get((slack_user_id, ra_name))) is not None:
+        return ra_id
+    ra_id = sess.execute(
+        select(RA.id)
+        .join_from(User, RA, User.id == RA.user_id)
+        .where(User.slack_user_id == slack_user_id, RA.ra_name == ra_name)
+    ).scalar()
+    if cache and ra_id is not None:
+        cache.ra_ids.put((slack_user_id, ra_name), ra_id)
+    return ra_id
+
+
+def get_all_ra_ids(
+    sess: Session, slack_user_id: Optional[str] = None
+) -> dict[tuple[str, str], int]:
+    """
+    return ids of all RA jobs (of the user, if given) keyed by (slack user id, RA job name),
+    for resolving many work reports at once.
+    """
+    stmt = select(User.slack_user_id, RA.ra_name, RA.id).join_from(
+        User, RA, User.id == RA.user_id
+    )
+    if slack_user_id is not None:
+        stmt = stmt.where(User.slack_user_id == slack_user_id)
+    rows = sess.execute(stmt).all()
+    return {(user, ra_name): ra_id for user, ra_name, ra_id in rows}
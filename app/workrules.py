@@ -19,9 +19,7 @@ class WorkRules:
             Optional[str]: returns a warning message if recess hours are too short.
         """
 
-        if record.duration > datetime.time(
-            hour=6
-        ) and record.break_duration < datetime.time(hour=1):
+        if record.duration > 6 * 60 and record.break_duration < 60:
             return ":warning: Recess hours are too short. If you work more than 6 hours, you must take 1 hour's recess."
 
     @classmethod
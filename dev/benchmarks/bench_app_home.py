@@ -0,0 +1,208 @@
+"""
+compare ways of keeping App Home up to date: publishing the view read from the JSON file every time App Home is
+opened or a record is written (a straightforward live dashboard), and publishing through `AppHomePublisher`,
+which caches the JSON file, spaces out publishes of each user and skips unchanged views.
+each user opens App Home, sends a burst of work reports and opens App Home again a few times, and opens it
+once more after a while. the time to handle the events and the number of views.publish calls are reported, and the last view
+published to every user is checked to show the hours of all reports. Slack Web API is emulated by `fakeslack.py`.
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import threading
+import time
+
+from benchutil import add_db_arguments, create_benchmark_engine, print_table
+from fakeslack import FakeSlackWebAPI
+from slack_bolt import App, BoltRequest
+from slack_sdk.web.client import WebClient
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.app_home import APP_HOME_VIEW_FILEPATH, AppHomePublisher, AppHomeViewFile
+from app.config import BotConfig
+from app.context import BotContext
+from app.db.setup import prepare_schema
+from app.listeners import register_listeners
+
+parser = argparse.ArgumentParser(description=__doc__)
+add_db_arguments(parser)
+parser.add_argument("--users", type=int, default=20)
+parser.add_argument("--reports", type=int, default=5, help="work reports per user")
+parser.add_argument("--opens", type=int, default=3, help="App Home opens per user")
+parser.add_argument("--interval", type=float, default=1.0)
+parser.add_argument("--slack_latency_ms", type=float, default=50)
+
+
+class EveryTimeViewFile(AppHomeViewFile):
+    """
+    reads the JSON file on every call, as `/init` did before `AppHomeViewFile`.
+    """
+
+    def load(self) -> dict:
+        self.loads += 1
+        with open(APP_HOME_VIEW_FILEPATH) as viewfile:
+            return json.load(viewfile)
+
+
+class EveryTimePublisher(AppHomePublisher):
+    """
+    publishes the view on every request.
+    """
+
+    def has_published(self, slack_user_id: str) -> bool:
+        return True
+
+    def request(self, slack_user_id, build_view, send) -> None:
+        send(build_view())
+        self.published += 1
+
+
+def make_events(num_users: int, num_reports: int, num_opens: int) -> list[dict]:
+    """
+    return events of users opening App Home once, sending work reports and opening App Home again.
+    """
+    today = datetime.date.today()
+    events = []
+    for user in range(num_users):
+        slack_user_id = f"U{user:08}"
+        opened = {"type": "app_home_opened", "user": slack_user_id, "tab": "home"}
+        events.append(opened)
+        for report in range(num_reports):
+            day = today.replace(day=report + 1)
+            events.append(
+                {
+                    "type": "app_mention",
+                    "user": slack_user_id,
+                    "channel": "C0",
+                    "ts": f"{user:04}{report:04}.000100",
+                    "text": f"<@UBOT>\n• user {user}\n• RA1\n• {day:%Y/%m/%d} 10:00-11:00\n• benchmark",
+                }
+            )
+        events.extend([opened] * (num_opens - 1))
+    return [
+        {
+            "type": "event_callback",
+            "team_id": "T0",
+            "api_app_id": "A0",
+            "event_id": f"Ev{i}",
+            "event": event,
+        }
+        for i, event in enumerate(events)
+    ]
+
+
+def run(args: argparse.Namespace, engine, every_time: bool) -> list[object]:
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM timecard"))
+    # slack user id -> the view published last
+    views: dict[str, dict] = {}
+    lock = threading.Lock()
+
+    def on_views_publish(params: dict) -> dict:
+        with lock:
+            views[params["user_id"]] = params["view"]
+        return {}
+
+    with FakeSlackWebAPI(
+        latency=args.slack_latency_ms / 1000,
+        handlers={"views.publish": on_views_publish},
+    ) as fake_slack:
+        logger = logging.getLogger("bot")
+        logger.setLevel(logging.WARNING)
+        bot_context = BotContext(
+            botcfg=BotConfig(admin_ids=[]),
+            logger=logger,
+            db_sessmaker=sessionmaker(bind=engine, expire_on_commit=False),
+        )
+        if every_time:
+            bot_context.app_home = EveryTimePublisher(logger=logger)
+            bot_context.app_home.view_file = EveryTimeViewFile()
+        else:
+            bot_context.app_home = AppHomePublisher(
+                logger=logger, interval=args.interval
+            )
+        app = App(
+            client=WebClient(token="xoxb-benchmark", base_url=fake_slack.base_url),
+            request_verification_enabled=False,
+            token_verification_enabled=False,
+            process_before_response=True,
+        )
+        register_listeners(app=app, bot_context=bot_context)
+
+        started_at = time.perf_counter()
+        for payload in make_events(args.users, args.reports, args.opens):
+            app.dispatch(BoltRequest(body=payload, mode="socket_mode"))
+        elapsed = time.perf_counter() - started_at
+        # wait for publishes delayed by the interval
+        time.sleep(args.interval + 1.0)
+        # open App Home once more, whose view has not changed since the last publish
+        for user in range(args.users):
+            app.dispatch(
+                BoltRequest(
+                    body={
+                        "type": "event_callback",
+                        "team_id": "T0",
+                        "api_app_id": "A0",
+                        "event_id": f"EvReopen{user}",
+                        "event": {
+                            "type": "app_home_opened",
+                            "user": f"U{user:08}",
+                            "tab": "home",
+                        },
+                    },
+                    mode="socket_mode",
+                )
+            )
+        publishes = fake_slack.calls["views.publish"]
+
+    expected = f"*RA1*:  {args.reports:02}:00"
+    stale = sum(
+        expected not in json.dumps(views.get(f"U{user:08}"), ensure_ascii=False)
+        for user in range(args.users)
+    )
+    assert stale == 0, f"the last view of {stale} users does not show {expected}"
+    stats = bot_context.app_home.stats()
+    return [
+        elapsed,
+        publishes,
+        stats["merged"],
+        stats["unchanged"],
+        stats["view_file_loads"],
+    ]
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    engine = create_benchmark_engine(args)
+    # tables and the trigger maintaining the rollup, from which App Home is built
+    prepare_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO botuser (slack_user_id, name) "
+                "SELECT 'U' || lpad(i::text, 8, '0'), 'user ' || i FROM generate_series(0, :users - 1) AS i"
+            ),
+            {"users": args.users},
+        )
+        conn.execute(
+            text("INSERT INTO ra (user_id, ra_name) SELECT id, 'RA1' FROM botuser")
+        )
+
+    rows = []
+    for name, every_time in [("every time", True), ("AppHomePublisher", False)]:
+        rows.append([name] + run(args, engine, every_time))
+    print_table(
+        headers=[
+            "App Home",
+            "elapsed [s]",
+            "views.publish calls",
+            "merged requests",
+            "unchanged views",
+            "JSON file loads",
+        ],
+        rows=rows,
+    )
+    engine.dispose()
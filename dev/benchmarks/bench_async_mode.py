@@ -0,0 +1,369 @@
+"""
+compare throughput (events per second) and ack latency of the bot in sync mode and async mode (`run.py --async`),
+by dispatching a burst of work reports and /download_csv commands like the one at the end of a month.
+in async mode, the ack latency of work reports is also measured while a fiscal year of `--export_records` records
+is exported by /admin_download_all_records, which must not block the event loop.
+Slack Web API is emulated by a local server that answers every call after `--slack_latency_ms`.
+"""
+
+import argparse
+import asyncio
+import datetime
+import logging
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from benchutil import add_db_arguments, create_benchmark_engine, print_table
+from fakeslack import FakeSlackWebAPI
+from slack_bolt import App, BoltRequest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.config import BotConfig
+from app.context import AsyncBotContext, BotContext
+from app.db.model import Base
+from app.listeners import register_listeners
+
+parser = argparse.ArgumentParser(description=__doc__)
+add_db_arguments(parser)
+parser.add_argument("--events", type=int, default=1000)
+parser.add_argument("--users", type=int, default=50)
+parser.add_argument(
+    "--download_ratio",
+    type=float,
+    default=0.2,
+    help="ratio of /download_csv commands among the events",
+)
+parser.add_argument("--slack_latency_ms", type=float, default=100)
+parser.add_argument(
+    "--workers",
+    type=int,
+    default=10,
+    help="number of threads dispatching events in sync mode (same as the default of SocketModeHandler)",
+)
+parser.add_argument(
+    "--export_records",
+    type=int,
+    default=1_000_000,
+    help="number of records exported by /admin_download_all_records in the async export case (0 to skip it)",
+)
+parser.add_argument(
+    "--mention_interval_ms",
+    type=float,
+    default=20,
+    help="interval between work reports in the async export case, which is long enough for the bot to keep up with them without the export",
+)
+
+# the fiscal year exported in the async export case
+EXPORT_FISCAL_YEAR = 2023
+ADMIN_USER_ID = "UADMIN"
+
+# a command that results in one chat.postEphemeral call without touching the database
+WARMUP_PAYLOAD = {
+    "command": "/init",
+    "text": "",
+    "user_id": "UWARMUP",
+    "channel_id": "C0",
+    "team_id": "T0",
+    "api_app_id": "A0",
+}
+
+logger = logging.getLogger("bot")
+logger.setLevel(logging.WARNING)
+
+
+def make_payloads(num_events: int, num_users: int, download_ratio: float) -> list[dict]:
+    """
+    return payloads of Socket Mode requests. every event results in exactly one chat.postEphemeral call.
+    """
+    today = datetime.date.today().strftime("%Y/%m/%d")
+    download_every = round(1 / download_ratio) if download_ratio else num_events + 1
+    payloads = []
+    for i in range(num_events):
+        slack_user_id = f"U{i % num_users:08}"
+        if i % download_every == 0:
+            payloads.append(
+                {
+                    "command": "/download_csv",
+                    "text": "",
+                    "user_id": slack_user_id,
+                    "channel_id": "C0",
+                    "team_id": "T0",
+                    "api_app_id": "A0",
+                }
+            )
+        else:
+            payloads.append(
+                {
+                    "type": "event_callback",
+                    "team_id": "T0",
+                    "api_app_id": "A0",
+                    "event_id": f"Ev{i}",
+                    "event": {
+                        "type": "app_mention",
+                        "user": slack_user_id,
+                        "channel": "C0",
+                        "ts": f"{i}.000100",
+                        # 2 hours of work reported right after the work, so that no warning is sent
+                        "text": f"<@UBOT>\n• user {i}\n• RA1\n• {today} 10:00-12:00\n• benchmark",
+                    },
+                }
+            )
+    return payloads
+
+
+def make_export_payload() -> dict:
+    return {
+        "command": "/admin_download_all_records",
+        "text": f"fy{EXPORT_FISCAL_YEAR}",
+        "user_id": ADMIN_USER_ID,
+        "channel_id": "C0",
+        "team_id": "T0",
+        "api_app_id": "A0",
+    }
+
+
+def insert_export_records(engine, num_records: int) -> None:
+    """
+    insert `num_records` records of 2 hours spread over the fiscal year `EXPORT_FISCAL_YEAR`.
+    """
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO timecard (ra_id, start_time, end_time, break_duration, description, slack_message_ts) "
+                "SELECT ra.id, start_time, start_time + interval '2 hours', 0, 'analyzed dataset', 'export.' || i "
+                "FROM generate_series(1, :num_records) AS i "
+                "CROSS JOIN LATERAL (SELECT timestamp :first_day + (i % 365) * interval '1 day' + interval '9 hours' "
+                "    AS start_time) AS t "
+                "JOIN ra ON ra.id = 1 + i % (SELECT count(*) FROM ra)"
+            ),
+            {
+                "num_records": num_records,
+                "first_day": datetime.datetime(EXPORT_FISCAL_YEAR, 4, 1),
+            },
+        )
+
+
+def summarize(
+    mode: str, ack_latencies: list[float], elapsed: float, num_events: int
+) -> list[object]:
+    ack_latencies.sort()
+    return [
+        mode,
+        num_events,
+        elapsed,
+        num_events / elapsed,
+        ack_latencies[len(ack_latencies) // 2] * 1000,
+        ack_latencies[min(len(ack_latencies) - 1, int(len(ack_latencies) * 0.99))]
+        * 1000,
+    ]
+
+
+def run_sync_mode(args, engine, fake_slack: FakeSlackWebAPI, payloads) -> list[object]:
+    from slack_sdk.web.client import WebClient
+
+    bot_context = BotContext(
+        botcfg=BotConfig(admin_ids=[]),
+        logger=logger,
+        db_sessmaker=sessionmaker(bind=engine, expire_on_commit=False),
+    )
+    app = App(
+        client=WebClient(token="xoxb-benchmark", base_url=fake_slack.base_url),
+        request_verification_enabled=False,
+        token_verification_enabled=False,
+    )
+    register_listeners(app=app, bot_context=bot_context)
+
+    def dispatch(payload: dict) -> float:
+        started_at = time.perf_counter()
+        app.dispatch(BoltRequest(body=payload, mode="socket_mode"))
+        return time.perf_counter() - started_at
+
+    # warm up, so that the result of auth.test is cached before measurement
+    replies_before = fake_slack.calls["chat.postEphemeral"] + 1
+    dispatch(WARMUP_PAYLOAD)
+    fake_slack.wait_for_calls("chat.postEphemeral", replies_before, timeout=60)
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        ack_latencies = list(executor.map(dispatch, payloads))
+    fake_slack.wait_for_calls(
+        "chat.postEphemeral", replies_before + len(payloads), timeout=600
+    )
+    return summarize(
+        "sync", ack_latencies, time.perf_counter() - started_at, len(payloads)
+    )
+
+
+async def run_async_mode(
+    args,
+    fake_slack: FakeSlackWebAPI,
+    payloads,
+    paced: bool = False,
+    export_payload: Optional[dict] = None,
+) -> list[object]:
+    """
+    dispatch `payloads` at once, or one every `--mention_interval_ms` if `paced`.
+    `export_payload` is dispatched before them if it is given, and they are measured until its file is uploaded.
+    the ack latency of a paced payload is measured from when it was due to be sent,
+    so that the time during which the event loop was blocked is included.
+    """
+    from slack_bolt.async_app import AsyncApp
+    from slack_bolt.request.async_request import AsyncBoltRequest
+    from slack_sdk.web.async_client import AsyncWebClient
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from app.async_listeners import register_async_listeners
+    from app.config import DBConfig
+    from app.db.setup import get_db_url
+
+    db_config = (
+        DBConfig.from_file(filepath=args.dbconfig)
+        if args.dbconfig
+        else DBConfig.from_env()
+    )
+    engine = create_async_engine(
+        url=get_db_url(db_config=db_config, drivername="postgresql+asyncpg"),
+        connect_args={"server_settings": {"search_path": args.schema}},
+    )
+    bot_context = AsyncBotContext(
+        botcfg=BotConfig(
+            admin_ids=[ADMIN_USER_ID], export_cache_dir=tempfile.mkdtemp()
+        ),
+        logger=logger,
+        db_sessmaker=async_sessionmaker(bind=engine, expire_on_commit=False),
+    )
+    app = AsyncApp(
+        client=AsyncWebClient(token="xoxb-benchmark", base_url=fake_slack.base_url),
+        request_verification_enabled=False,
+    )
+    register_async_listeners(app=app, bot_context=bot_context)
+
+    async def dispatch(payload: dict) -> float:
+        started_at = time.perf_counter()
+        await app.async_dispatch(AsyncBoltRequest(body=payload, mode="socket_mode"))
+        return time.perf_counter() - started_at
+
+    # warm up, so that the result of auth.test is cached before measurement
+    replies_before = fake_slack.calls["chat.postEphemeral"] + 1
+    await dispatch(WARMUP_PAYLOAD)
+    await asyncio.to_thread(
+        fake_slack.wait_for_calls, "chat.postEphemeral", replies_before, 60
+    )
+
+    started_at = time.perf_counter()
+    uploads_before = fake_slack.calls["files.completeUploadExternal"]
+    if export_payload is not None:
+        await dispatch(export_payload)
+        replies_before += 1  # the file is being prepared
+    if not paced:
+        # AsyncSocketModeHandler processes every incoming message in its own task
+        ack_latencies = await asyncio.gather(
+            *(dispatch(payload) for payload in payloads)
+        )
+    else:
+
+        async def dispatch_when_due(payload: dict, due: float) -> float:
+            await asyncio.sleep(due - time.perf_counter())
+            await dispatch(payload)
+            return time.perf_counter() - due
+
+        sent_at = time.perf_counter()
+        ack_latencies = await asyncio.gather(
+            *(
+                dispatch_when_due(
+                    payload, sent_at + i * args.mention_interval_ms / 1000
+                )
+                for i, payload in enumerate(payloads)
+            )
+        )
+    if export_payload is not None:
+        await asyncio.to_thread(
+            fake_slack.wait_for_calls,
+            "files.completeUploadExternal",
+            uploads_before + 1,
+            600,
+        )
+    await asyncio.to_thread(
+        fake_slack.wait_for_calls,
+        "chat.postEphemeral",
+        replies_before + len(payloads),
+        600,
+    )
+    elapsed = time.perf_counter() - started_at
+    await bot_context.jobs.shutdown()
+    await engine.dispose()
+    mode = "async (paced)" if paced else "async"
+    return summarize(
+        mode if export_payload is None else f"{mode} + export",
+        list(ack_latencies),
+        elapsed,
+        len(payloads),
+    )
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    engine = create_benchmark_engine(args, pool_size=args.workers)
+    with engine.begin() as conn:
+        Base.metadata.create_all(bind=conn)
+        conn.execute(
+            text(
+                "INSERT INTO botuser (slack_user_id, name) "
+                "SELECT 'U' || lpad(i::text, 8, '0'), 'user ' || i FROM generate_series(0, :users - 1) AS i"
+            ),
+            {"users": args.users},
+        )
+        conn.execute(
+            text("INSERT INTO ra (user_id, ra_name) SELECT id, 'RA1' FROM botuser")
+        )
+
+    results = []
+    with FakeSlackWebAPI(latency=args.slack_latency_ms / 1000) as fake_slack:
+        for mode in ["sync", "async"]:
+            with engine.begin() as conn:
+                conn.execute(text("DELETE FROM timecard"))
+            payloads = make_payloads(args.events, args.users, args.download_ratio)
+            if mode == "sync":
+                results.append(run_sync_mode(args, engine, fake_slack, payloads))
+            else:
+                results.append(asyncio.run(run_async_mode(args, fake_slack, payloads)))
+        if args.export_records:
+            with engine.begin() as conn:
+                conn.execute(text("DELETE FROM timecard"))
+            insert_export_records(engine, args.export_records)
+            # work reports are sent at the same pace with and without the export
+            for export_payload in [None, make_export_payload()]:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text(
+                            "DELETE FROM timecard WHERE slack_message_ts NOT LIKE 'export.%'"
+                        )
+                    )
+                payloads = make_payloads(args.events, args.users, download_ratio=0)
+                results.append(
+                    asyncio.run(
+                        run_async_mode(
+                            args,
+                            fake_slack,
+                            payloads,
+                            paced=True,
+                            export_payload=export_payload,
+                        )
+                    )
+                )
+
+    print_table(
+        headers=[
+            "mode",
+            "events",
+            "elapsed [s]",
+            "events/s",
+            "ack p50 [ms]",
+            "ack p99 [ms]",
+        ],
+        rows=results,
+    )
+    engine.dispose()
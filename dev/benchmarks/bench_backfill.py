@@ -0,0 +1,160 @@
+"""
+measure how fast `app.backfill` rebuilds records from channel histories (100,000 messages by default),
+adding records in batches of different sizes. a batch of 1 commits every record on its own, as `on_mention` does,
+and is run on a part of the messages to keep the benchmark short. the backfill is then run once more
+to check that no record is added twice. Slack Web API is emulated by `fakeslack.py`.
+"""
+
+import argparse
+import datetime
+import logging
+import time
+
+from benchutil import add_db_arguments, create_benchmark_engine, print_table
+from fakeslack import FakeSlackWebAPI
+from slack_sdk.web.client import WebClient
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.backfill import backfill
+from app.db.model import TimeCard
+from app.db.setup import prepare_schema
+
+parser = argparse.ArgumentParser(description=__doc__)
+add_db_arguments(parser)
+parser.add_argument("--messages", type=int, default=100_000)
+parser.add_argument(
+    "--baseline_messages",
+    type=int,
+    default=10_000,
+    help="messages read with a batch of 1",
+)
+parser.add_argument("--channels", type=int, default=4)
+parser.add_argument("--users", type=int, default=50)
+parser.add_argument(
+    "--chatter_ratio",
+    type=float,
+    default=0.2,
+    help="share of messages not mentioning the bot",
+)
+parser.add_argument("--batch_sizes", type=int, nargs="+", default=[100, 1000])
+parser.add_argument("--slack_latency_ms", type=float, default=20)
+
+
+def make_histories(args: argparse.Namespace, num_messages: int) -> dict[str, list]:
+    """
+    return messages of each channel, where most of them are work reports of registered users.
+    """
+    first_day = datetime.date.today().replace(month=1, day=1)
+    histories: dict[str, list] = {f"C{c}": [] for c in range(args.channels)}
+    for i in range(num_messages):
+        message = {
+            "type": "message",
+            "user": f"U{i % args.users:08}",
+            "ts": f"{1700000000 + i}.000100",
+        }
+        if (i * 7919) % 1000 < args.chatter_ratio * 1000:
+            message["text"] = "thanks!"
+        else:
+            day = first_day + datetime.timedelta(days=i % 365)
+            message["text"] = (
+                f"<@UBOT>\n• user {i % args.users}\n• RA1\n• {day:%Y/%m/%d} 10:00-11:30\n• backfill benchmark"
+            )
+        histories[f"C{i % args.channels}"].append(message)
+    return histories
+
+
+def run(
+    args: argparse.Namespace, engine, num_messages: int, batch_size: int, clear: bool
+) -> list[object]:
+    if clear:
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM timecard"))
+    histories = make_histories(args, num_messages)
+
+    def on_conversations_history(params: dict) -> dict:
+        messages = histories[params["channel"]]
+        offset = int(params.get("cursor") or 0)
+        limit = int(params["limit"])
+        next_offset = offset + limit
+        has_more = next_offset < len(messages)
+        return {
+            "messages": messages[offset:next_offset],
+            "has_more": has_more,
+            "response_metadata": {"next_cursor": str(next_offset) if has_more else ""},
+        }
+
+    logger = logging.getLogger("backfill")
+    logger.setLevel(logging.WARNING)
+    sessmaker = sessionmaker(bind=engine)
+    with FakeSlackWebAPI(
+        latency=args.slack_latency_ms / 1000,
+        handlers={"conversations.history": on_conversations_history},
+    ) as fake_slack:
+        started_at = time.perf_counter()
+        stats = backfill(
+            client=WebClient(token="xoxb-benchmark", base_url=fake_slack.base_url),
+            sessmaker=sessmaker,
+            logger=logger,
+            channel_ids=list(histories),
+            batch_size=batch_size,
+        )
+        elapsed = time.perf_counter() - started_at
+        history_calls = fake_slack.calls["conversations.history"]
+
+    with sessmaker() as sess:
+        records = sess.scalar(select(func.count()).select_from(TimeCard))
+    assert (
+        records == stats.mentions
+    ), f"{records} records for {stats.mentions} work reports"
+    return [
+        num_messages,
+        batch_size,
+        elapsed,
+        num_messages / elapsed,
+        history_calls,
+        stats.added,
+    ]
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    engine = create_benchmark_engine(args)
+    # tables and the triggers maintaining the rollup, which are run for every added record
+    prepare_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO botuser (slack_user_id, name) "
+                "SELECT 'U' || lpad(i::text, 8, '0'), 'user ' || i FROM generate_series(0, :users - 1) AS i"
+            ),
+            {"users": args.users},
+        )
+        conn.execute(
+            text("INSERT INTO ra (user_id, ra_name) SELECT id, 'RA1' FROM botuser")
+        )
+
+    rows = [["batch of 1"] + run(args, engine, args.baseline_messages, 1, clear=True)]
+    for batch_size in args.batch_sizes:
+        rows.append(
+            [f"batch of {batch_size}"]
+            + run(args, engine, args.messages, batch_size, clear=True)
+        )
+    # run again over the same histories, which adds nothing
+    rows.append(
+        ["again (all recorded)"]
+        + run(args, engine, args.messages, args.batch_sizes[-1], clear=False)
+    )
+    print_table(
+        headers=[
+            "backfill",
+            "messages",
+            "batch size",
+            "elapsed [s]",
+            "messages/s",
+            "conversations.history calls",
+            "records added",
+        ],
+        rows=rows,
+    )
+    engine.dispose()
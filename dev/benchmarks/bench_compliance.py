@@ -0,0 +1,172 @@
+"""
+compare the time to audit a month of work records of all users between `app.compliance`, which evaluates the rules
+over columns built from a single projection query, and checking ORM objects one by one with `WorkRules`.
+both are also checked to find the same violations, except for report timing which `WorkRules` checks against the current time.
+"""
+
+import argparse
+import collections
+import datetime
+
+from benchutil import (
+    add_db_arguments,
+    create_benchmark_engine,
+    measure,
+    print_table,
+)
+from sqlalchemy import Connection, select, text
+from sqlalchemy.orm import Session
+
+from app.compliance import (
+    Rule,
+    evaluate_rules,
+    get_audit_window,
+    load_columns,
+)
+from app.db.model import RA, Base, TimeCard, User
+from app.workrules import WorkRules
+
+parser = argparse.ArgumentParser(description=__doc__)
+add_db_arguments(parser)
+parser.add_argument("--users", type=int, default=5000)
+parser.add_argument("--ras_per_user", type=int, default=3)
+parser.add_argument("--timecards", type=int, default=100_000)
+parser.add_argument("--repeat", type=int, default=5)
+
+FIRST_DAY = datetime.date(2023, 11, 1)
+FIRST_DAY_OF_NEXT_MONTH = datetime.date(2023, 12, 1)
+
+
+def load_synthetic_data(conn: Connection, args: argparse.Namespace) -> None:
+    conn.execute(
+        text(
+            "INSERT INTO botuser (slack_user_id, name) "
+            "SELECT 'U' || lpad(i::text, 8, '0'), 'user ' || i FROM generate_series(1, :users) AS i"
+        ),
+        {"users": args.users},
+    )
+    conn.execute(
+        text(
+            "INSERT INTO ra (user_id, ra_name) "
+            "SELECT botuser.id, 'RA' || j FROM botuser, generate_series(1, :ras_per_user) AS j"
+        ),
+        {"ras_per_user": args.ras_per_user},
+    )
+    # records of 1 to 9 hours with 0 to 90 minutes of recess, reported 0 to 48 hours after the end,
+    # spread over the month with a deterministic pseudo-random start time
+    conn.execute(
+        text(
+            "INSERT INTO timecard (ra_id, start_time, end_time, break_duration, description, slack_message_ts) "
+            "SELECT 1 + i % :num_ras, start_time, start_time + hours * interval '1 hour', (i * 13 % 4) * 30, "
+            "'synthetic work ' || i, "
+            "extract(epoch from start_time + (hours + i * 17 % 49) * interval '1 hour')::bigint || '.' || lpad(i::text, 6, '0') "
+            "FROM generate_series(1, :timecards) AS i, "
+            "LATERAL (SELECT timestamp '2023-11-01' + (i::bigint * i * 7919 % 41000) * interval '1 minute' AS start_time, "
+            "1 + i * 31 % 9 AS hours) AS t"
+        ),
+        {"num_ras": args.users * args.ras_per_user, "timecards": args.timecards},
+    )
+    conn.execute(text("ANALYZE"))
+
+
+def audit_with_orm(sess: Session) -> dict[Rule, int]:
+    """
+    audit the month by loading every record as an ORM object, in the way `WorkRules` checks a record at report time.
+    """
+    since, until = get_audit_window(FIRST_DAY, FIRST_DAY_OF_NEXT_MONTH)
+    counts = collections.Counter()
+    daily: dict[tuple, datetime.timedelta] = collections.defaultdict(datetime.timedelta)
+    weekly: dict[tuple, datetime.timedelta] = collections.defaultdict(
+        datetime.timedelta
+    )
+    weeks_in_month = set()
+    latest_end: dict[int, datetime.datetime] = {}
+    rows = sess.execute(
+        select(User, RA, TimeCard)
+        .join(RA, RA.id == TimeCard.ra_id)
+        .join(User, User.id == RA.user_id)
+        .where(TimeCard.start_time >= since, TimeCard.start_time < until)
+        .order_by(User.id, TimeCard.start_time)
+    ).all()
+    for user, _, timecard in rows:
+        in_month = FIRST_DAY <= timecard.start_time.date() < FIRST_DAY_OF_NEXT_MONTH
+        if in_month and WorkRules.generate_warning_about_recess_hours(timecard):
+            counts[Rule.RECESS] += 1
+        if (
+            in_month
+            and user.id in latest_end
+            and timecard.start_time < latest_end[user.id]
+        ):
+            counts[Rule.OVERLAP] += 1
+        latest_end[user.id] = max(
+            latest_end.get(user.id, timecard.end_time), timecard.end_time
+        )
+        work = datetime.timedelta(minutes=timecard.duration - timecard.break_duration)
+        day = (user.id, timecard.start_time.date())
+        week = (user.id, timecard.start_time.isocalendar()[:2])
+        daily[day] += work
+        weekly[week] += work
+        if in_month:
+            weeks_in_month.add(week)
+    counts[Rule.DAILY_TOTAL] = sum(
+        FIRST_DAY <= day < FIRST_DAY_OF_NEXT_MONTH
+        and total > datetime.timedelta(hours=8)
+        for (_, day), total in daily.items()
+    )
+    counts[Rule.WEEKLY_TOTAL] = sum(
+        week in weeks_in_month and total > datetime.timedelta(hours=40)
+        for week, total in weekly.items()
+    )
+    return counts
+
+
+def audit_with_columns(sess: Session) -> dict[Rule, int]:
+    columns = load_columns(sess, *get_audit_window(FIRST_DAY, FIRST_DAY_OF_NEXT_MONTH))
+    violations = evaluate_rules(columns, FIRST_DAY, FIRST_DAY_OF_NEXT_MONTH)
+    return collections.Counter(violation.rule for violation in violations)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    engine = create_benchmark_engine(args)
+
+    with engine.begin() as conn:
+        Base.metadata.create_all(bind=conn)
+        print(f"loading {args.timecards} synthetic records...")
+        load_synthetic_data(conn, args)
+
+    with Session(engine) as sess:
+        orm_counts = audit_with_orm(sess)
+        column_counts = audit_with_columns(sess)
+        for rule in [Rule.RECESS, Rule.DAILY_TOTAL, Rule.WEEKLY_TOTAL, Rule.OVERLAP]:
+            assert (
+                orm_counts[rule] == column_counts[rule]
+            ), f"{rule.value}: {orm_counts[rule]} != {column_counts[rule]}"
+        print(
+            "violations found: "
+            + ", ".join(f"{rule.value}={column_counts[rule]}" for rule in Rule)
+        )
+
+        results = {}
+        for name, f in [
+            ("ORM objects + WorkRules", audit_with_orm),
+            ("projection + columnar rules", audit_with_columns),
+        ]:
+            # expunge loaded objects so that every run builds them again
+            results[name] = measure(lambda: (f(sess), sess.expunge_all()), args.repeat)
+
+    baseline = results["ORM objects + WorkRules"]["median"]
+    print_table(
+        headers=["method", "median [ms]", "max [ms]", "records/s", "speedup"],
+        rows=[
+            [
+                name,
+                result["median"],
+                result["max"],
+                f'{args.timecards / result["median"] * 1000:,.0f}',
+                f'x{baseline / result["median"]:.1f}',
+            ]
+            for name, result in results.items()
+        ],
+    )
+    engine.dispose()
@@ -0,0 +1,185 @@
+"""
+measure how fast `app.csv_import` imports a CSV file in the format of `/download_csv` (100,000 rows by default,
+a small share of which are invalid). rows validated in the same way are loaded by `record_timecard` one by one
+(on a part of the rows), by multi-row INSERT statements (`insert_missing_timecards`), and by COPY into a staging
+table (`copy_missing_timecards`). the import is then run once more to check that no record is added twice.
+"""
+
+import argparse
+import csv
+import datetime
+import logging
+import os
+import tempfile
+import time
+
+from benchutil import add_db_arguments, create_benchmark_engine, print_table
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.csv_import import (
+    IMPORT_BATCH_SIZE,
+    ImportStats,
+    import_user_records,
+    iter_user_records,
+    open_csv_files,
+)
+from app.db.model import TimeCard
+from app.db.setup import prepare_schema
+from app.export import USER_RECORDS_CSV_FIELDNAMES
+from app.services.timecards import (
+    TIMECARD_COPY_COLUMNS,
+    insert_missing_timecards,
+    record_timecard,
+)
+from app.services.users import get_all_ra_ids
+
+parser = argparse.ArgumentParser(description=__doc__)
+add_db_arguments(parser)
+parser.add_argument("--rows", type=int, default=100_000)
+parser.add_argument(
+    "--baseline_rows", type=int, default=5000, help="rows loaded one by one"
+)
+parser.add_argument("--ras", type=int, default=100)
+parser.add_argument(
+    "--invalid_ratio", type=float, default=0.01, help="share of invalid rows"
+)
+
+MONTH = datetime.date(2024, 4, 1)
+
+
+def write_csv(path: str, num_rows: int, args: argparse.Namespace) -> None:
+    """
+    write records of distinct work in `MONTH`, some of which are invalid.
+    """
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(USER_RECORDS_CSV_FIELDNAMES)
+        for i in range(num_rows):
+            ra_name = f"RA{i % args.ras}"
+            day = (i // args.ras) % 28 + 1
+            # 20-minute slots, so that all rows have distinct start times within the day
+            start = (i // (args.ras * 28)) * 20
+            end = start + 15
+            if (i * 7919) % 10000 < args.invalid_ratio * 10000:
+                end = start  # violates `time_integrity`
+            writer.writerow(
+                [
+                    ra_name,
+                    f"{day:02}",
+                    f"{start // 60:02}{start % 60:02}",
+                    f"{end // 60:02}{end % 60:02}",
+                    "0000",
+                    "imported",
+                ]
+            )
+
+
+def count_records(sessmaker) -> int:
+    with sessmaker() as sess:
+        return sess.scalar(select(func.count()).select_from(TimeCard))
+
+
+def validated_records(path: str, ra_ids: dict[str, int]) -> list[tuple]:
+    stats = ImportStats()
+    return [
+        record
+        for source, month, text_file in open_csv_files(path, MONTH)
+        for record in iter_user_records(text_file, source, month, ra_ids, stats)
+    ]
+
+
+def load_one_by_one(sessmaker, path: str, ra_ids: dict[str, int]) -> int:
+    added = 0
+    for record in validated_records(path, ra_ids):
+        with sessmaker() as sess:
+            _, is_new, _ = record_timecard(
+                sess, **dict(zip(TIMECARD_COPY_COLUMNS, record))
+            )
+        added += is_new
+    return added
+
+
+def load_by_insert(sessmaker, path: str, ra_ids: dict[str, int]) -> int:
+    records = validated_records(path, ra_ids)
+    added = 0
+    for start in range(0, len(records), IMPORT_BATCH_SIZE):
+        with sessmaker() as sess:
+            added += insert_missing_timecards(
+                sess,
+                [
+                    dict(zip(TIMECARD_COPY_COLUMNS, record))
+                    for record in records[start : start + IMPORT_BATCH_SIZE]
+                ],
+            )
+    return added
+
+
+def load_by_copy(sessmaker, path: str, ra_ids: dict[str, int]) -> int:
+    logger = logging.getLogger("csv_import")
+    logger.setLevel(logging.WARNING)
+    return import_user_records(
+        sessmaker=sessmaker,
+        logger=logger,
+        slack_user_id="U0",
+        paths=[path],
+        month=MONTH,
+    ).added
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    engine = create_benchmark_engine(args)
+    # tables and the triggers maintaining the rollup, which are run for every added record
+    prepare_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO botuser (slack_user_id, name) VALUES ('U0', 'user')")
+        )
+        conn.execute(
+            text(
+                "INSERT INTO ra (user_id, ra_name) "
+                "SELECT botuser.id, 'RA' || i FROM botuser, generate_series(0, :ras - 1) AS i"
+            ),
+            {"ras": args.ras},
+        )
+    sessmaker = sessionmaker(bind=engine)
+    with sessmaker() as sess:
+        ra_ids = {
+            ra_name: ra_id
+            for (_, ra_name), ra_id in get_all_ra_ids(sess, slack_user_id="U0").items()
+        }
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        baseline_path = os.path.join(tmpdir, "baseline.csv")
+        path = os.path.join(tmpdir, "records.csv")
+        write_csv(baseline_path, args.baseline_rows, args)
+        write_csv(path, args.rows, args)
+        for name, num_rows, f, clear in [
+            ("record_timecard one by one", args.baseline_rows, lambda: load_one_by_one(sessmaker, baseline_path, ra_ids), True),
+            ("multi-row INSERT", args.rows, lambda: load_by_insert(sessmaker, path, ra_ids), True),
+            ("COPY and merge", args.rows, lambda: load_by_copy(sessmaker, path, ra_ids), True),
+            ("COPY and merge again", args.rows, lambda: load_by_copy(sessmaker, path, ra_ids), False),
+        ]:  # fmt: skip
+            if clear:
+                with engine.begin() as conn:
+                    conn.execute(text("DELETE FROM timecard"))
+            started_at = time.perf_counter()
+            added = f()
+            elapsed = time.perf_counter() - started_at
+            rows.append(
+                [
+                    name,
+                    num_rows,
+                    elapsed,
+                    num_rows / elapsed,
+                    added,
+                    count_records(sessmaker),
+                ]
+            )
+    print_table(
+        headers=["load", "rows", "elapsed [s]", "rows/s", "records added", "records"],
+        rows=rows,
+    )
+    engine.dispose()
@@ -0,0 +1,118 @@
+"""
+compare settings of the connection pool (`DBConfig.pool_*`) under a burst of short transactions from more threads
+than the pool holds connections, as at the end of a month. reports throughput, how long checkouts waited
+for a connection as shown by `/admin_job_status`, and how many connections were opened and pinged.
+"""
+
+import argparse
+import threading
+import time
+
+from benchutil import add_db_arguments, create_benchmark_engine, print_table
+from sqlalchemy import event, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.pool import MeasuredQueuePool, pool_stats
+
+parser = argparse.ArgumentParser(description=__doc__)
+add_db_arguments(parser)
+parser.add_argument("--threads", type=int, default=32)
+parser.add_argument("--transactions", type=int, default=200)
+parser.add_argument("--pool_size", type=int, default=5)
+parser.add_argument("--max_overflow", type=int, nargs="+", default=[10, 0])
+
+SETTINGS = {
+    "pre_ping": {"pool_pre_ping": True},
+    "recycle 300 s": {"pool_pre_ping": False, "pool_recycle": 300},
+}
+
+
+def run(args: argparse.Namespace, max_overflow: int, options: dict) -> list[object]:
+    engine = create_benchmark_engine(
+        args,
+        poolclass=MeasuredQueuePool,
+        pool_size=args.pool_size,
+        max_overflow=max_overflow,
+        **options,
+    )
+    opened = 0
+
+    def on_connect(dbapi_connection, connection_record):
+        nonlocal opened
+        opened += 1
+
+    event.listen(engine, "connect", on_connect)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE counter (id int PRIMARY KEY, n int)"))
+        conn.execute(
+            text(
+                "INSERT INTO counter SELECT i, 0 FROM generate_series(1, :threads) AS i"
+            ),
+            {"threads": args.threads},
+        )
+    sessmaker = sessionmaker(bind=engine)
+    # the ping of `pool_pre_ping` is a statement executed by the dialect
+    pings = 0
+    do_ping = engine.dialect.do_ping
+
+    def counting_ping(dbapi_connection):
+        nonlocal pings
+        pings += 1
+        return do_ping(dbapi_connection)
+
+    engine.dialect.do_ping = counting_ping
+
+    def work(id: int):
+        for _ in range(args.transactions):
+            # similar to recording a work report: a lookup and a short write of the user's own row
+            with sessmaker.begin() as sess:
+                sess.execute(text("SELECT n FROM counter WHERE id = :id"), {"id": id})
+                sess.execute(
+                    text("UPDATE counter SET n = n + 1 WHERE id = :id"), {"id": id}
+                )
+
+    threads = [
+        threading.Thread(target=work, args=(id,)) for id in range(1, args.threads + 1)
+    ]
+    started_at = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started_at
+
+    stats = pool_stats(engine)
+    with engine.connect() as conn:
+        total = conn.execute(text("SELECT sum(n) FROM counter")).scalar_one()
+    assert total == args.threads * args.transactions
+    engine.dispose()
+    return [
+        max_overflow,
+        total / elapsed,
+        stats["mean_wait_seconds"] * 1000,
+        stats["max_wait_seconds"] * 1000,
+        stats["timeouts"],
+        opened,
+        pings,
+    ]
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    rows = []
+    for max_overflow in args.max_overflow:
+        for name, options in SETTINGS.items():
+            rows.append([name] + run(args, max_overflow, options))
+    print_table(
+        headers=[
+            "liveness",
+            "max_overflow",
+            "transactions/s",
+            "wait mean [ms]",
+            "wait max [ms]",
+            "timeouts",
+            "connections opened",
+            "pings",
+        ],
+        rows=rows,
+    )
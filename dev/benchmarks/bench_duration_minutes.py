@@ -0,0 +1,174 @@
+"""
+compare aggregations over durations stored as integer minutes (migration 8) with the same ones over TIME columns
+and an INTERVAL rollup as stored before, on millions of synthetic records spread over 5 years.
+the old columns are reproduced in copies of the tables, and both are checked to give the same totals.
+"""
+
+import argparse
+import datetime
+
+from benchutil import add_db_arguments, create_benchmark_engine, measure, print_table
+from sqlalchemy import Engine, text
+
+from app.db.setup import prepare_schema
+
+parser = argparse.ArgumentParser(description=__doc__)
+add_db_arguments(parser)
+parser.add_argument("--users", type=int, default=500)
+parser.add_argument("--ras_per_user", type=int, default=3)
+parser.add_argument("--timecards", type=int, default=2_000_000)
+parser.add_argument("--repeat", type=int, default=10)
+
+PARAMS = {
+    "slack_user_id": "U00000042",
+    "first_day": "2023-04-01",
+    "next_period": "2024-04-01",
+    "first_day_of_month": "2023-11-01",
+    "next_month": "2023-12-01",
+}
+
+# (TIME and INTERVAL columns, integer minutes) versions of the queries issued by the bot
+QUERIES = {
+    "total of a fiscal year from the rollup (get_working_hours)": (
+        "SELECT ra.ra_name, sum(rollup.total_work) FROM working_hours_rollup_interval AS rollup "
+        "JOIN ra ON ra.id = rollup.ra_id JOIN botuser ON botuser.id = ra.user_id "
+        "WHERE botuser.slack_user_id = :slack_user_id "
+        "AND rollup.year_month >= :first_day AND rollup.year_month < :next_period "
+        "GROUP BY ra.id, ra.ra_name ORDER BY ra.ra_name",
+        "SELECT ra.ra_name, sum(rollup.total_work) FROM working_hours_rollup AS rollup "
+        "JOIN ra ON ra.id = rollup.ra_id JOIN botuser ON botuser.id = ra.user_id "
+        "WHERE botuser.slack_user_id = :slack_user_id "
+        "AND rollup.year_month >= :first_day AND rollup.year_month < :next_period "
+        "GROUP BY ra.id, ra.ra_name ORDER BY ra.ra_name",
+    ),
+    "rollup recomputed from all records (python -m app.services.rollup)": (
+        "SELECT ra_id, date_trunc('month', start_time)::date AS year_month, sum(duration - break_duration), count(*) "
+        "FROM timecard_time GROUP BY 1, 2 ORDER BY 1, 2",
+        "SELECT ra_id, date_trunc('month', start_time)::date AS year_month, sum(duration - break_duration), count(*) "
+        "FROM timecard GROUP BY 1, 2 ORDER BY 1, 2",
+    ),
+    "minutes of a month for the rules (admin_compliance_report)": (
+        "SELECT (extract(hour FROM duration) * 60 + extract(minute FROM duration))::integer, "
+        "(extract(hour FROM break_duration) * 60 + extract(minute FROM break_duration))::integer "
+        "FROM timecard_time WHERE start_time >= :first_day_of_month AND start_time < :next_month",
+        "SELECT duration, break_duration "
+        "FROM timecard WHERE start_time >= :first_day_of_month AND start_time < :next_month",
+    ),
+}
+
+
+def load_synthetic_data(engine: Engine, args: argparse.Namespace) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO botuser (slack_user_id, name) "
+                "SELECT 'U' || lpad(i::text, 8, '0'), 'user ' || i FROM generate_series(1, :users) AS i"
+            ),
+            {"users": args.users},
+        )
+        conn.execute(
+            text(
+                "INSERT INTO ra (user_id, ra_name) "
+                "SELECT botuser.id, 'RA' || j FROM botuser, generate_series(1, :ras_per_user) AS j"
+            ),
+            {"ras_per_user": args.ras_per_user},
+        )
+        # spread records over 5 years with a deterministic pseudo-random start time, some of which end on the next day
+        conn.execute(
+            text(
+                "INSERT INTO timecard (ra_id, start_time, end_time, break_duration, description, slack_message_ts) "
+                "SELECT 1 + i % :num_ras, start_time, start_time + (1 + i % 10) * interval '1 hour', (i * 13 % 4) * 15, "
+                "'synthetic work ' || i, i || '.000100' "
+                "FROM generate_series(1, :timecards) AS i, "
+                "LATERAL (SELECT timestamp '2020-01-01' + (i::bigint * 7919 % 2628000) * interval '1 minute' AS start_time) AS t"
+            ),
+            {"num_ras": args.users * args.ras_per_user, "timecards": args.timecards},
+        )
+        # the same records and rollup in the columns used before migration 8, with the same index on the records
+        conn.execute(
+            text(
+                "CREATE TABLE timecard_time AS SELECT id, ra_id, start_time, end_time, "
+                "make_interval(mins => duration)::time AS duration, "
+                "make_interval(mins => break_duration)::time AS break_duration, description, slack_message_ts FROM timecard"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX ix_timecard_time_ra_id_start_time ON timecard_time (ra_id, start_time)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE TABLE working_hours_rollup_interval AS SELECT ra_id, year_month, "
+                "make_interval(mins => total_work) AS total_work, record_count FROM working_hours_rollup"
+            )
+        )
+        conn.execute(
+            text(
+                "ALTER TABLE working_hours_rollup_interval ADD PRIMARY KEY (ra_id, year_month)"
+            )
+        )
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE"))
+
+
+def in_minutes(row: tuple) -> tuple:
+    """
+    return `row` with its durations as TIME or INTERVAL converted to minutes.
+    """
+    return tuple(
+        (
+            value // datetime.timedelta(minutes=1)
+            if isinstance(value, datetime.timedelta)
+            else (
+                value.hour * 60 + value.minute
+                if isinstance(value, datetime.time)
+                else value
+            )
+        )
+        for value in row
+    )
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    engine = create_benchmark_engine(args)
+    # tables and the triggers maintaining the rollup
+    prepare_schema(engine)
+    print(f"loading {args.timecards} synthetic records...")
+    load_synthetic_data(engine, args)
+
+    rows = []
+    with engine.connect() as conn:
+        for name, (time_query, minutes_query) in QUERIES.items():
+            time_result, minutes_result = (
+                sorted(in_minutes(row) for row in conn.execute(text(query), PARAMS))
+                for query in (time_query, minutes_query)
+            )
+            assert time_result == minutes_result, f"{name}: the results differ"
+            time_latency = measure(
+                lambda: conn.execute(text(time_query), PARAMS).all(), repeat=args.repeat
+            )
+            minutes_latency = measure(
+                lambda: conn.execute(text(minutes_query), PARAMS).all(),
+                repeat=args.repeat,
+            )
+            rows.append(
+                [
+                    name,
+                    time_latency["median"],
+                    minutes_latency["median"],
+                    f'x{time_latency["median"] / minutes_latency["median"]:.1f}',
+                ]
+            )
+        sizes = conn.execute(
+            text(
+                "SELECT pg_size_pretty(pg_table_size('timecard_time')), pg_size_pretty(pg_table_size('timecard'))"
+            )
+        ).one()
+    print_table(
+        headers=["query", "TIME / INTERVAL [ms]", "minutes [ms]", "speedup"],
+        rows=rows,
+    )
+    print(f"table size: timecard_time {sizes[0]}, timecard {sizes[1]}")
+    engine.dispose()
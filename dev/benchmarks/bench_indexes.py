@@ -0,0 +1,146 @@
+"""
+compare query plans and latencies of the queries issued by the bot, before and after the indexes added by migration 1.
+"""
+
+import argparse
+
+from benchutil import (
+    add_db_arguments,
+    create_benchmark_engine,
+    measure,
+    print_table,
+)
+from sqlalchemy import Connection, text
+
+from app.db.migrations import MIGRATIONS
+from app.db.model import Base
+
+parser = argparse.ArgumentParser(description=__doc__)
+add_db_arguments(parser)
+parser.add_argument("--users", type=int, default=500)
+parser.add_argument("--ras_per_user", type=int, default=3)
+parser.add_argument("--timecards", type=int, default=2_000_000)
+parser.add_argument("--repeat", type=int, default=20)
+
+# queries equivalent to those issued by the listeners
+QUERIES = {
+    "find record by message ts (on_mention edit, on_message_delete)": (
+        "SELECT * FROM timecard WHERE slack_message_ts = :ts"
+    ),
+    "resolve RA job (on_mention)": (
+        "SELECT botuser.id, ra.id, ra.ra_name FROM botuser JOIN ra ON botuser.id = ra.user_id "
+        "WHERE botuser.slack_user_id = :slack_user_id AND ra.ra_name = :ra_name"
+    ),
+    "sum of a month (get_working_hours)": (
+        "SELECT ra.ra_name, sum(timecard.duration - timecard.break_duration) FROM timecard "
+        "JOIN ra ON ra.id = timecard.ra_id JOIN botuser ON botuser.id = ra.user_id "
+        "WHERE botuser.slack_user_id = :slack_user_id "
+        "AND timecard.start_time >= :first_day AND timecard.end_time < :next_month "
+        "GROUP BY ra.ra_name"
+    ),
+    "records of a month (download_csv)": (
+        "SELECT botuser.*, ra.*, timecard.* FROM timecard "
+        "JOIN ra ON ra.id = timecard.ra_id JOIN botuser ON botuser.id = ra.user_id "
+        "WHERE botuser.slack_user_id = :slack_user_id "
+        "AND timecard.start_time >= :first_day AND timecard.end_time < :next_month "
+        "ORDER BY timecard.start_time"
+    ),
+}
+PARAMS = {
+    "ts": "1234567.000100",
+    "slack_user_id": "U00000042",
+    "ra_name": "RA2",
+    "first_day": "2023-11-01",
+    "next_month": "2023-12-01",
+}
+
+
+def load_synthetic_data(conn: Connection, args: argparse.Namespace) -> None:
+    conn.execute(
+        text(
+            "INSERT INTO botuser (slack_user_id, name) "
+            "SELECT 'U' || lpad(i::text, 8, '0'), 'user ' || i FROM generate_series(1, :users) AS i"
+        ),
+        {"users": args.users},
+    )
+    conn.execute(
+        text(
+            "INSERT INTO ra (user_id, ra_name) "
+            "SELECT botuser.id, 'RA' || j FROM botuser, generate_series(1, :ras_per_user) AS j"
+        ),
+        {"ras_per_user": args.ras_per_user},
+    )
+    # spread records over 5 years with a deterministic pseudo-random start time
+    conn.execute(
+        text(
+            "INSERT INTO timecard (ra_id, start_time, end_time, break_duration, description, slack_message_ts) "
+            "SELECT 1 + i % :num_ras, start_time, start_time + interval '3 hours', 30, "
+            "'synthetic work ' || i, i || '.000100' "
+            "FROM generate_series(1, :timecards) AS i, "
+            "LATERAL (SELECT timestamp '2020-01-01' + (i::bigint * 7919 % 2628000) * interval '1 minute' AS start_time) AS t"
+        ),
+        {"num_ras": args.users * args.ras_per_user, "timecards": args.timecards},
+    )
+    conn.execute(text("ANALYZE"))
+
+
+def run_queries(conn: Connection, repeat: int) -> dict[str, dict[str, float]]:
+    results = {}
+    for name, query in QUERIES.items():
+        plan = conn.execute(
+            text(f"EXPLAIN (ANALYZE, BUFFERS) {query}"), PARAMS
+        ).scalars()
+        print(f"### {name}")
+        print("\n".join(plan))
+        print()
+        results[name] = measure(
+            lambda: conn.execute(text(query), PARAMS).all(), repeat=repeat
+        )
+    return results
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    engine = create_benchmark_engine(args)
+
+    with engine.begin() as conn:
+        Base.metadata.create_all(bind=conn)
+        # start from the schema before migration 1
+        for index_name in [
+            "ix_timecard_slack_message_ts_start_time",
+            "ix_timecard_ra_id_start_time",
+            "ix_ra_user_id_ra_name",
+        ]:
+            conn.execute(text(f"DROP INDEX {index_name}"))
+        conn.execute(
+            text("ALTER TABLE timecard DROP CONSTRAINT uq_timecard_slack_message_ts")
+        )
+        print(f"loading {args.timecards} synthetic records...")
+        load_synthetic_data(conn, args)
+
+    with engine.connect() as conn:
+        print("## before migration 1\n")
+        before = run_queries(conn, repeat=args.repeat)
+
+    with engine.begin() as conn:
+        for statement in MIGRATIONS[0].statements:
+            conn.execute(text(statement))
+        conn.execute(text("ANALYZE"))
+
+    with engine.connect() as conn:
+        print("## after migration 1\n")
+        after = run_queries(conn, repeat=args.repeat)
+
+    print_table(
+        headers=["query", "before median [ms]", "after median [ms]", "speedup"],
+        rows=[
+            [
+                name,
+                before[name]["median"],
+                after[name]["median"],
+                f'x{before[name]["median"] / after[name]["median"]:.1f}',
+            ]
+            for name in QUERIES
+        ],
+    )
+    engine.dispose()
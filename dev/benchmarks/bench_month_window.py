@@ -0,0 +1,204 @@
+"""
+compare the condition selecting records of a month, `start_time >= first_day AND end_time < next_month` as used
+before, with `starts_within` (`start_time` only), on millions of synthetic records spread over 5 years.
+plans and latencies of a query covered by the index on (ra_id, start_time) are measured with each condition.
+then work across midnight at the boundaries of a month is recorded, and `/get_working_hours` (the rollup),
+`/download_csv` and `/admin_download_all_records` are checked to agree on the records of the month.
+"""
+
+import argparse
+import datetime
+
+from benchutil import add_db_arguments, create_benchmark_engine, measure, print_table
+from sqlalchemy import ColumnElement, Engine, and_, func, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.model import RA, TimeCard, User
+from app.db.setup import prepare_schema
+from app.export import select_all_records
+from app.services.timecards import (
+    get_user_records,
+    record_timecard,
+    starts_within,
+    sum_working_hours,
+)
+
+parser = argparse.ArgumentParser(description=__doc__)
+add_db_arguments(parser)
+parser.add_argument("--users", type=int, default=500)
+parser.add_argument("--ras_per_user", type=int, default=3)
+parser.add_argument("--timecards", type=int, default=2_000_000)
+parser.add_argument("--repeat", type=int, default=20)
+
+FIRST_DAY = datetime.date(2023, 11, 1)
+NEXT_MONTH = datetime.date(2023, 12, 1)
+SLACK_USER_ID = "U00000042"
+
+
+def start_and_end_within(
+    first_day: datetime.date, first_day_of_next_period: datetime.date
+) -> ColumnElement[bool]:
+    """
+    the condition used before `starts_within`, which leaves out work ending after the period.
+    """
+    return and_(
+        TimeCard.start_time >= first_day, TimeCard.end_time < first_day_of_next_period
+    )
+
+
+CONDITIONS = {
+    "start_time >= first_day AND end_time < next_month": start_and_end_within,
+    "starts_within": starts_within,
+}
+
+# work across midnight at the boundaries of the month, and whether it belongs to the month
+BOUNDARY_WORK = [
+    (datetime.datetime(2023, 10, 31, 22), datetime.datetime(2023, 11, 1, 2), False),
+    (datetime.datetime(2023, 11, 30, 22), datetime.datetime(2023, 12, 1, 2), True),
+    (datetime.datetime(2023, 11, 30, 20), datetime.datetime(2023, 12, 1, 0), True),
+]
+
+
+def load_synthetic_data(engine: Engine, args: argparse.Namespace) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO botuser (slack_user_id, name) "
+                "SELECT 'U' || lpad(i::text, 8, '0'), 'user ' || i FROM generate_series(1, :users) AS i"
+            ),
+            {"users": args.users},
+        )
+        conn.execute(
+            text(
+                "INSERT INTO ra (user_id, ra_name) "
+                "SELECT botuser.id, 'RA' || j FROM botuser, generate_series(1, :ras_per_user) AS j"
+            ),
+            {"ras_per_user": args.ras_per_user},
+        )
+        # spread records over 5 years with a deterministic pseudo-random start time
+        conn.execute(
+            text(
+                "INSERT INTO timecard (ra_id, start_time, end_time, break_duration, description, slack_message_ts) "
+                "SELECT 1 + i % :num_ras, start_time, start_time + interval '3 hours', 30, "
+                "'synthetic work ' || i, i || '.000100' "
+                "FROM generate_series(1, :timecards) AS i, "
+                "LATERAL (SELECT timestamp '2020-01-01' + (i::bigint * 7919 % 2628000) * interval '1 minute' AS start_time) AS t"
+            ),
+            {"num_ras": args.users * args.ras_per_user, "timecards": args.timecards},
+        )
+    # index-only scans need the visibility map, which is set by VACUUM
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE"))
+
+
+def count_of_ra_jobs(condition: ColumnElement[bool]):
+    """
+    number of records of each RA job of the user in the month.
+    """
+    return (
+        select(TimeCard.ra_id, func.count())
+        .join(RA, RA.id == TimeCard.ra_id)
+        .join(User, User.id == RA.user_id)
+        .where(User.slack_user_id == SLACK_USER_ID, condition)
+        .group_by(TimeCard.ra_id)
+    )
+
+
+def scan_of_timecard(plan: dict) -> str:
+    """
+    return the type of the node of `plan` (in JSON format) reading `timecard`, with its heap fetches if any.
+    """
+    if plan.get("Relation Name") == "timecard":
+        heap_fetches = (
+            f" ({plan['Heap Fetches']} heap fetches)" if "Heap Fetches" in plan else ""
+        )
+        return f"{plan['Node Type']}{heap_fetches}"
+    for child in plan.get("Plans", []):
+        if scan := scan_of_timecard(child):
+            return scan
+    return ""
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    engine = create_benchmark_engine(args)
+    # tables and the triggers maintaining the rollup
+    prepare_schema(engine)
+    print(f"loading {args.timecards} synthetic records...")
+    load_synthetic_data(engine, args)
+    sessmaker = sessionmaker(bind=engine)
+
+    rows = []
+    for name, condition in CONDITIONS.items():
+        stmt = count_of_ra_jobs(condition(FIRST_DAY, NEXT_MONTH))
+        with engine.connect() as conn:
+            compiled = stmt.compile(conn)
+            plan = conn.exec_driver_sql(
+                f"EXPLAIN (ANALYZE, FORMAT JSON) {compiled}", compiled.params
+            ).scalar()
+            latency = measure(lambda: conn.execute(stmt).all(), repeat=args.repeat)
+        rows.append(
+            [name, scan_of_timecard(plan[0]["Plan"]), latency["median"], latency["p99"]]
+        )
+    print_table(headers=["condition", "scan of timecard", "median [ms]", "p99 [ms]"], rows=rows)  # fmt: skip
+    assert rows[-1][1].startswith("Index Only Scan"), rows[-1][1]
+
+    with sessmaker() as sess:
+        ra = (
+            sess.execute(
+                select(RA).join(User).where(User.slack_user_id == SLACK_USER_ID)
+            )
+            .scalars()
+            .first()
+        )
+        for i, (start_time, end_time, _) in enumerate(BOUNDARY_WORK):
+            record_timecard(
+                sess,
+                ra_id=ra.id,
+                start_time=start_time,
+                end_time=end_time,
+                break_duration=0,
+                description="work across midnight",
+                slack_message_ts=f"boundary.{i}",
+            )
+    expected = sorted(start for start, _, in_month in BOUNDARY_WORK if in_month)
+    with sessmaker() as sess:
+        records = get_user_records(
+            sess,
+            slack_user_id=SLACK_USER_ID,
+            first_day=FIRST_DAY,
+            first_day_of_next_period=NEXT_MONTH,
+        )
+        exported = sess.execute(select_all_records(FIRST_DAY, NEXT_MONTH)).all()
+        rollup = dict(
+            sum_working_hours(
+                sess,
+                slack_user_id=SLACK_USER_ID,
+                first_day=FIRST_DAY,
+                first_day_of_next_period=NEXT_MONTH,
+            )
+        )
+    boundary_starts = sorted(
+        record.start_time
+        for _, record in records
+        if record.description == "work across midnight"
+    )
+    assert boundary_starts == expected, f"/download_csv returns {boundary_starts}"
+    boundary_starts = sorted(
+        row.start_time for row in exported if row.description == "work across midnight"
+    )
+    assert boundary_starts == expected, f"/admin_download_all_records returns {boundary_starts}"  # fmt: skip
+    # the rollup sums work by the month in which it starts, which now agrees with the records of the month
+    totals: dict[str, int] = {}
+    for ra_of_record, record in records:
+        totals[ra_of_record.ra_name] = (
+            totals.get(ra_of_record.ra_name, 0)
+            + record.duration
+            - record.break_duration
+        )
+    assert rollup == totals, f"/get_working_hours returns {rollup}, records sum to {totals}"  # fmt: skip
+    print(
+        f"work across midnight at the end of {FIRST_DAY:%Y/%m} is in /get_working_hours, /download_csv "
+        "and /admin_download_all_records of the month"
+    )
+    engine.dispose()
@@ -0,0 +1,165 @@
+"""
+compare exporting a month of work records of all users as a cp932 CSV file and as a Parquet file,
+in the size of the file, the time to generate it, and the time to load it back into typed columns
+as an analytics notebook would do (parsing the CSV file with `csv` and `strptime`, or reading the Parquet file with pyarrow).
+both files are also checked to contain the same records. requires the `parquet` extra (`uv sync --extra parquet`).
+"""
+
+import argparse
+import csv
+import datetime
+import io
+
+import pyarrow.parquet as pq
+from benchutil import (
+    add_db_arguments,
+    create_benchmark_engine,
+    measure,
+    print_table,
+)
+from sqlalchemy import Connection, text
+from sqlalchemy.orm import Session
+
+from app.db.model import Base
+from app.export import ExportLayout, export_all_records, new_spooled_file
+
+parser = argparse.ArgumentParser(description=__doc__)
+add_db_arguments(parser)
+parser.add_argument("--users", type=int, default=1000)
+parser.add_argument("--ras_per_user", type=int, default=3)
+parser.add_argument("--timecards", type=int, default=100_000)
+parser.add_argument("--repeat", type=int, default=5)
+
+FIRST_DAY = datetime.date(2023, 11, 1)
+FIRST_DAY_OF_NEXT_MONTH = datetime.date(2023, 12, 1)
+
+
+def load_synthetic_data(conn: Connection, args: argparse.Namespace) -> None:
+    conn.execute(
+        text(
+            "INSERT INTO botuser (slack_user_id, name) "
+            "SELECT 'U' || lpad(i::text, 8, '0'), 'user ' || i FROM generate_series(1, :users) AS i"
+        ),
+        {"users": args.users},
+    )
+    conn.execute(
+        text(
+            "INSERT INTO ra (user_id, ra_name) "
+            "SELECT botuser.id, 'RA' || j FROM botuser, generate_series(1, :ras_per_user) AS j"
+        ),
+        {"ras_per_user": args.ras_per_user},
+    )
+    # records of 1 to 9 hours with 0 to 90 minutes of recess within the month,
+    # described by a few words in Japanese to exercise cp932 encoding
+    conn.execute(
+        text(
+            "INSERT INTO timecard (ra_id, start_time, end_time, break_duration, description, slack_message_ts) "
+            "SELECT 1 + i % :num_ras, start_time, start_time + hours * interval '1 hour', (i * 13 % 4) * 30, "
+            "(ARRAY['データ整理', '論文調査', '実験の準備', 'ミーティング'])[1 + i % 4] || ' ' || i, "
+            "extract(epoch from start_time)::bigint || '.' || lpad(i::text, 6, '0') "
+            "FROM generate_series(1, :timecards) AS i, "
+            "LATERAL (SELECT timestamp '2023-11-01' + (i::bigint * 7919 % 42600) * interval '1 minute' AS start_time, "
+            "1 + i * 31 % 9 AS hours) AS t"
+        ),
+        {"num_ras": args.users * args.ras_per_user, "timecards": args.timecards},
+    )
+    conn.execute(text("ANALYZE"))
+
+
+def export(sess: Session, layout: ExportLayout) -> bytes:
+    with new_spooled_file() as export_file:
+        export_all_records(
+            sess,
+            first_day=FIRST_DAY,
+            first_day_of_next_period=FIRST_DAY_OF_NEXT_MONTH,
+            binary_file=export_file,
+            layout=layout,
+        )
+        export_file.seek(0)
+        return export_file.read()
+
+
+def load_csv(content: bytes) -> dict[str, list]:
+    """
+    load the CSV file into typed columns, converting durations back into minutes.
+    """
+    columns = {
+        "start_timestamp": [],
+        "end_timestamp": [],
+        "work_minutes": [],
+        "break_minutes": [],
+    }
+    for row in csv.DictReader(io.StringIO(content.decode("cp932"), newline="")):
+        columns["start_timestamp"].append(
+            datetime.datetime.strptime(row["start_timestamp"], "%Y/%m/%d %H:%M:%S")
+        )
+        columns["end_timestamp"].append(
+            datetime.datetime.strptime(row["end_timestamp"], "%Y/%m/%d %H:%M:%S")
+        )
+        for field, column in [
+            ("work_duration", "work_minutes"),
+            ("break_duration", "break_minutes"),
+        ]:
+            hours, minutes = row[field].split(":")
+            columns[column].append(int(hours) * 60 + int(minutes))
+    return columns
+
+
+def load_parquet(content: bytes) -> dict[str, list]:
+    table = pq.read_table(
+        io.BytesIO(content),
+        columns=["start_timestamp", "end_timestamp", "work_minutes", "break_minutes"],
+    )
+    return {name: table.column(name) for name in table.column_names}
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    engine = create_benchmark_engine(args)
+
+    with engine.begin() as conn:
+        Base.metadata.create_all(bind=conn)
+        print(f"loading {args.timecards} synthetic records...")
+        load_synthetic_data(conn, args)
+
+    with Session(engine) as sess:
+        files = {
+            "CSV (cp932)": export(sess, ExportLayout.CSV),
+            "Parquet (zstd)": export(sess, ExportLayout.PARQUET),
+        }
+        csv_columns = load_csv(files["CSV (cp932)"])
+        parquet_columns = load_parquet(files["Parquet (zstd)"])
+        for name, column in parquet_columns.items():
+            assert column.to_pylist() == csv_columns[name], f"{name} differs"
+
+        results = {
+            "CSV (cp932)": (
+                measure(lambda: export(sess, ExportLayout.CSV), args.repeat),
+                measure(lambda: load_csv(files["CSV (cp932)"]), args.repeat),
+            ),
+            "Parquet (zstd)": (
+                measure(lambda: export(sess, ExportLayout.PARQUET), args.repeat),
+                measure(lambda: load_parquet(files["Parquet (zstd)"]), args.repeat),
+            ),
+        }
+
+    print_table(
+        headers=[
+            "format",
+            "size [KiB]",
+            "generate median [ms]",
+            "generate max [ms]",
+            "load median [ms]",
+        ],
+        rows=[
+            [
+                name,
+                f"{len(files[name]) / 1024:,.0f}",
+                generate["median"],
+                generate["max"],
+                load["median"],
+            ]
+            for name, (generate, load) in results.items()
+        ],
+    )
+    engine.dispose()
@@ -0,0 +1,180 @@
+"""
+compare parses per second of work reports between `app.parsing` and the parsing code that `on_mention` used before it,
+on a corpus of valid and malformed messages. both parsers are also checked to agree on every message.
+"""
+
+import argparse
+import datetime
+import random
+import re
+import time
+from typing import Callable
+
+from benchutil import print_table
+
+from app.parsing import ParseError, ParseErrorKind, parse_work_report
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--messages", type=int, default=200_000)
+parser.add_argument(
+    "--malformed_ratio",
+    type=float,
+    default=0.2,
+    help="ratio of malformed messages in the corpus",
+)
+parser.add_argument("--repeat", type=int, default=3)
+parser.add_argument("--seed", type=int, default=0)
+
+### the parsing code of `on_mention` before `app.parsing` was introduced ###
+
+LEGACY_MESSAGE_FORMAT = (
+    r"<@.+>.*\n"  # ignore the first mention line
+    r"• (?P<name>.+)\n"
+    r"• (?P<ra_name>.+)\n"
+    r"• (?P<duration>.+)\n"
+    r"• (?P<description>.+)$"
+)
+LEGACY_DURATION_FORMAT = r"(?P<date>[0-9]{4}/[0-9]{1,2}/[0-9]{1,2}) (?P<start_time>[0-9]{1,2}:[0-9]{2})-(?P<end_time>[0-9]{1,2}:[0-9]{2})( R(?P<break_time>[0-9]{1,2}:[0-9]{2}))?$"
+
+
+def legacy_parse(text: str) -> tuple:
+    """
+    return ("ok", start, end, duration, break) or the kind of error, in the same way as the old `on_mention`.
+    """
+    message_matched = re.match(pattern=LEGACY_MESSAGE_FORMAT, string=text)
+    if not message_matched or (message_matched and len(message_matched.groups()) != 4):
+        return (ParseErrorKind.MESSAGE_FORMAT,)
+    duration_str = message_matched.group("duration").strip()
+    date_matched = re.match(pattern=LEGACY_DURATION_FORMAT, string=duration_str)
+    if not date_matched or (date_matched and len(date_matched.groups()) < 3):
+        return (ParseErrorKind.DURATION_FORMAT,)
+    date_str = date_matched.group("date")
+    start_time_str = date_matched.group("start_time")
+    end_time_str = date_matched.group("end_time")
+    break_time_str_or_none = date_matched.group("break_time")
+    try:
+        date_format = "%Y/%m/%d %H:%M"
+        start_dt = datetime.datetime.strptime(
+            f"{date_str} {start_time_str}", date_format
+        )
+        end_dt = datetime.datetime.strptime(f"{date_str} {end_time_str}", date_format)
+        duration_time = (datetime.datetime.min + (end_dt - start_dt)).time()
+        if break_time_str_or_none:
+            break_time = datetime.datetime.strptime(break_time_str_or_none, "%H:%M")
+            break_time = datetime.time(hour=break_time.hour, minute=break_time.minute)
+        else:
+            break_time = datetime.time(hour=0, minute=0)
+    except Exception:
+        return (ParseErrorKind.DATETIME_VALUE,)
+    return ("ok", start_dt, end_dt, duration_time, break_time)
+
+
+def new_parse(text: str) -> tuple:
+    """
+    return the result of `parse_work_report` in the same shape as `legacy_parse`.
+    work across midnight (e.g. "18:00-10:00"), which the old code rejected, is not in the corpus.
+    """
+    parsed = parse_work_report(text)
+    if isinstance(parsed, ParseError):
+        return (parsed.kind,)
+    return (
+        "ok",
+        parsed.start_time,
+        parsed.end_time,
+        (datetime.datetime.min + (parsed.end_time - parsed.start_time)).time(),
+        datetime.time(*divmod(parsed.break_duration, 60)),
+    )
+
+
+### corpus ###
+
+
+def make_duration(rng: random.Random) -> str:
+    date = datetime.date(2023, 1, 1) + datetime.timedelta(days=rng.randrange(730))
+    start = rng.randrange(0, 20)
+    end = rng.randrange(start + 1, 24)
+    style = rng.random()
+    if style < 0.9:  # the format shown in the help message, which almost everyone uses
+        duration = f"{date:%Y/%m/%d} {start:02}:00-{end:02}:30"
+    else:
+        duration = f"{date.year}/{date.month}/{date.day} {start}:00-{end}:30"
+    if rng.random() < 0.6:
+        duration += f" R{rng.randrange(0, 2):02}:{rng.choice([0, 15, 30, 45]):02}"
+    return duration
+
+
+def make_message(duration: str, i: int) -> str:
+    return f"<@UBOT> report\n• user {i}\n• CREST\n• {duration}\n• analyzed dataset {i}"
+
+
+MALFORMATIONS: list[Callable[[str, int], str]] = [
+    # missing description line
+    lambda duration, i: f"<@UBOT>\n• user {i}\n• CREST\n• {duration}",
+    # no mention line
+    lambda duration, i: f"• user {i}\n• CREST\n• {duration}\n• work",
+    # spaces around the hyphen, or time without colon
+    lambda duration, i: make_message(duration.replace("-", " - "), i),
+    lambda duration, i: make_message(duration.replace(":", "", 1), i),
+    # full-width digit
+    lambda duration, i: make_message(duration.replace("2", "２", 1), i),
+    # invalid values
+    lambda duration, i: make_message("2023/13/01 10:00-12:00", i),
+    lambda duration, i: make_message("2023/02/30 10:00-12:00", i),
+    lambda duration, i: make_message("2023/11/18 10:00-25:00 R00:30", i),
+    lambda duration, i: make_message("2023/11/18 10:00-18:00 R01:75", i),
+]
+
+
+def make_corpus(num_messages: int, malformed_ratio: float, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(num_messages):
+        duration = make_duration(rng)
+        if rng.random() < malformed_ratio:
+            corpus.append(rng.choice(MALFORMATIONS)(duration, i))
+        else:
+            corpus.append(make_message(duration, i))
+    return corpus
+
+
+def parses_per_second(
+    parse: Callable[[str], tuple], corpus: list[str], repeat: int
+) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        for text in corpus:
+            parse(text)
+        best = min(best, time.perf_counter() - started_at)
+    return len(corpus) / best
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    corpus = make_corpus(args.messages, args.malformed_ratio, args.seed)
+
+    mismatches = [text for text in corpus if legacy_parse(text) != new_parse(text)]
+    if mismatches:
+        raise SystemExit(
+            f"{len(mismatches)} messages are parsed differently, e.g. {mismatches[0]!r}"
+        )
+
+    rows = []
+    for label, subset in [
+        ("all", corpus),
+        ("valid", [text for text in corpus if new_parse(text)[0] == "ok"]),
+        ("malformed", [text for text in corpus if new_parse(text)[0] != "ok"]),
+    ]:
+        legacy = parses_per_second(legacy_parse, subset, args.repeat)
+        new = parses_per_second(new_parse, subset, args.repeat)
+        rows.append([label, len(subset), legacy, new, f"x{new / legacy:.1f}"])
+    print_table(
+        headers=[
+            "messages",
+            "count",
+            "legacy [parses/s]",
+            "app.parsing [parses/s]",
+            "speedup",
+        ],
+        rows=rows,
+    )
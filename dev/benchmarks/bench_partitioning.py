@@ -0,0 +1,284 @@
+"""
+compare the monthly queries issued by the bot on `timecard` before and after it is partitioned by month
+(`python -m app.db.partitioning convert`), using millions of synthetic records spread over 5 years.
+the statements are captured while the service functions run, and `EXPLAIN` of each of them is checked to scan
+a single partition once `timecard` is partitioned. then a partition is created for a month whose record is in
+the default partition, and the partitions of the oldest years are archived, checking that the rollup still
+matches the records.
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import tempfile
+import time
+
+from benchutil import add_db_arguments, create_benchmark_engine, measure, print_table
+from dateutil import relativedelta
+from sqlalchemy import Engine, event, func, select, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.compliance import select_compliance_columns
+from app.db.model import TimeCard
+from app.db.partitioning import (
+    DEFAULT_PARTITION,
+    PARTITION_MONTHS_AHEAD,
+    archive_month_partition,
+    convert_timecard_to_partitioned,
+    ensure_timecard_partitions,
+    list_month_partitions,
+    month_partition_name,
+)
+from app.db.setup import prepare_schema
+from app.export import select_all_records
+from app.services.rollup import find_rollup_drifts
+from app.services.timecards import find_timecard, get_user_records
+
+parser = argparse.ArgumentParser(description=__doc__)
+add_db_arguments(parser)
+parser.add_argument("--users", type=int, default=500)
+parser.add_argument("--ras_per_user", type=int, default=3)
+parser.add_argument("--timecards", type=int, default=2_000_000)
+parser.add_argument("--repeat", type=int, default=20)
+parser.add_argument(
+    "--archive_before",
+    type=datetime.date.fromisoformat,
+    default=datetime.date(2022, 1, 1),
+    help="partitions of the months before this day are archived",
+)
+
+FIRST_DAY = datetime.date(2023, 11, 1)
+NEXT_MONTH = datetime.date(2023, 12, 1)
+
+# service functions issuing the queries of the listeners, and whether they should scan a single partition
+QUERIES = {
+    "records of a month (download_csv)": (
+        lambda sess: get_user_records(
+            sess,
+            slack_user_id="U00000042",
+            first_day=FIRST_DAY,
+            first_day_of_next_period=NEXT_MONTH,
+        ),
+        True,
+    ),
+    "all records of a month (admin_download_all_records)": (
+        lambda sess: sess.execute(select_all_records(FIRST_DAY, NEXT_MONTH)).all(),
+        True,
+    ),
+    "rules of a month (admin_compliance_report)": (
+        lambda sess: sess.execute(
+            select_compliance_columns(FIRST_DAY, NEXT_MONTH)
+        ).all(),
+        True,
+    ),
+    # the month of a deleted message is unknown, so every partition is looked up by the index
+    "record by message ts (on_message_delete)": (
+        lambda sess: find_timecard(sess, slack_message_ts="1234567.000100"),
+        False,
+    ),
+}
+
+
+def load_synthetic_data(engine: Engine, args: argparse.Namespace) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO botuser (slack_user_id, name) "
+                "SELECT 'U' || lpad(i::text, 8, '0'), 'user ' || i FROM generate_series(1, :users) AS i"
+            ),
+            {"users": args.users},
+        )
+        conn.execute(
+            text(
+                "INSERT INTO ra (user_id, ra_name) "
+                "SELECT botuser.id, 'RA' || j FROM botuser, generate_series(1, :ras_per_user) AS j"
+            ),
+            {"ras_per_user": args.ras_per_user},
+        )
+        # spread records over 5 years with a deterministic pseudo-random start time
+        conn.execute(
+            text(
+                "INSERT INTO timecard (ra_id, start_time, end_time, break_duration, description, slack_message_ts) "
+                "SELECT 1 + i % :num_ras, start_time, start_time + interval '3 hours', 30, "
+                "'synthetic work ' || i, i || '.000100' "
+                "FROM generate_series(1, :timecards) AS i, "
+                "LATERAL (SELECT timestamp '2020-01-01' + (i::bigint * 7919 % 2628000) * interval '1 minute' AS start_time) AS t"
+            ),
+            {"num_ras": args.users * args.ras_per_user, "timecards": args.timecards},
+        )
+        conn.execute(text("ANALYZE"))
+
+
+def capture_statements(engine: Engine, f) -> list[tuple[str, dict]]:
+    """
+    call `f` and return the statements (and their parameters) executed through `engine`.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        f()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def scanned_relations(plan: dict) -> set[str]:
+    """
+    return names of the relations read by the nodes of `plan` (in JSON format) and its children.
+    """
+    relations = {plan["Relation Name"]} if "Relation Name" in plan else set()
+    for child in plan.get("Plans", []):
+        relations |= scanned_relations(child)
+    return relations
+
+
+def run_queries(engine: Engine, args: argparse.Namespace, partitioned: bool) -> list:
+    sessmaker = sessionmaker(bind=engine)
+    rows = []
+    for name, (query, single_partition) in QUERIES.items():
+
+        def run() -> None:
+            with sessmaker() as sess:
+                query(sess)
+
+        (statement, parameters), *_ = capture_statements(engine, run)
+        with engine.connect() as conn:
+            plan = conn.exec_driver_sql(
+                f"EXPLAIN (ANALYZE, FORMAT JSON) {statement}", parameters
+            ).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        partitions = sorted(
+            relation
+            for relation in scanned_relations(plan[0]["Plan"])
+            if relation.startswith("timecard")
+        )
+        if partitioned and single_partition:
+            assert partitions == [
+                month_partition_name(FIRST_DAY)
+            ], f"{name} scans {partitions}"
+        latency = measure(run, repeat=args.repeat)
+        rows.append(
+            [
+                name,
+                "partitioned" if partitioned else "single table",
+                len(partitions),
+                latency["median"],
+                latency["p99"],
+            ]
+        )
+    return rows
+
+
+def count_records(sess: Session) -> int:
+    return sess.scalar(select(func.count()).select_from(TimeCard))
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    engine = create_benchmark_engine(args)
+    logger = logging.getLogger("partitioning")
+    logger.setLevel(logging.WARNING)
+    # tables and the triggers maintaining the rollup
+    prepare_schema(engine)
+    print(f"loading {args.timecards} synthetic records...")
+    load_synthetic_data(engine, args)
+    sessmaker = sessionmaker(bind=engine)
+
+    query_rows = run_queries(engine, args, partitioned=False)
+    started_at = time.perf_counter()
+    with engine.begin() as conn:
+        num_partitions = convert_timecard_to_partitioned(conn, logger=logger)
+    convert_elapsed = time.perf_counter() - started_at
+    query_rows += run_queries(engine, args, partitioned=True)
+    print_table(
+        headers=[
+            "query",
+            "timecard",
+            "relations scanned",
+            "median [ms]",
+            "p99 [ms]",
+        ],
+        rows=sorted(query_rows, key=lambda row: row[0]),
+    )
+
+    # a record beyond the partitioned months goes to the default partition, and is moved into its own partition
+    # when the month comes close
+    later = datetime.date.today().replace(day=1) + relativedelta.relativedelta(
+        months=PARTITION_MONTHS_AHEAD + 2
+    )
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO timecard (ra_id, start_time, end_time, break_duration, description, slack_message_ts) "
+                "SELECT min(id), :start_time, :start_time + interval '1 hour', 0, 'later', 'later' FROM ra"
+            ),
+            {"start_time": datetime.datetime.combine(later, datetime.time(10))},
+        )
+    started_at = time.perf_counter()
+    with engine.begin() as conn:
+        created = ensure_timecard_partitions(conn, today=later)
+    ensure_elapsed = time.perf_counter() - started_at
+    with engine.connect() as conn:
+        partition_of_later = conn.execute(
+            text(
+                "SELECT tableoid::regclass::text FROM timecard WHERE slack_message_ts = 'later'"
+            )
+        ).scalar()
+        in_default = conn.execute(
+            text(f"SELECT count(*) FROM {DEFAULT_PARTITION}")
+        ).scalar()
+    assert partition_of_later == month_partition_name(later), partition_of_later
+    assert in_default == 0
+
+    with sessmaker() as sess:
+        records_before = count_records(sess)
+    with engine.connect() as conn:
+        months = sorted(
+            month
+            for month in list_month_partitions(conn)
+            if month < args.archive_before
+        )
+    with tempfile.TemporaryDirectory() as output_dir:
+        started_at = time.perf_counter()
+        for month in months:
+            with engine.begin() as conn:
+                archive_month_partition(conn, month, output_dir=output_dir)
+        archive_elapsed = time.perf_counter() - started_at
+        archive_size = sum(
+            os.path.getsize(os.path.join(output_dir, filename))
+            for filename in os.listdir(output_dir)
+        )
+    with sessmaker() as sess:
+        records_after = count_records(sess)
+        drifts = find_rollup_drifts(sess)
+    assert not drifts, f"the rollup of {len(drifts)} months differs from the records"
+
+    print_table(
+        headers=["operation", "elapsed [s]", "result"],
+        rows=[
+            [
+                "convert",
+                convert_elapsed,
+                f"{args.timecards} records into {num_partitions} partitions",
+            ],
+            [
+                "ensure",
+                ensure_elapsed,
+                f"created {len(created)} partitions, moved 1 record out of the default partition",
+            ],
+            [
+                "archive",
+                archive_elapsed,
+                f"{len(months)} partitions, {records_before - records_after} records, "
+                f"{archive_size / 1024 / 1024:.1f} MiB gzipped",
+            ],
+        ],
+    )
+    engine.dispose()
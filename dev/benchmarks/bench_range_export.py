@@ -0,0 +1,164 @@
+"""
+compare the time to export work records of all users over a range of months between running the single-month export
+once per month, as `/admin_download_all_records yyyy/mm` had to be run before ranges were supported, and exporting
+the whole range by a single ordered query into one CSV file or a ZIP file per month or per RA Job.
+the range exports are also checked to export every record. single-month exports miss records crossing the end of a month,
+since a record is exported only if it is within the month, so their count is just printed.
+"""
+
+import argparse
+import datetime
+import zipfile
+
+from benchutil import (
+    add_db_arguments,
+    create_benchmark_engine,
+    measure,
+    print_table,
+)
+from sqlalchemy import Connection, text
+from sqlalchemy.orm import Session
+
+from app.db.model import Base
+from app.export import ExportLayout, export_all_records, new_spooled_file
+from app.periods import parse_period
+
+parser = argparse.ArgumentParser(description=__doc__)
+add_db_arguments(parser)
+parser.add_argument("--users", type=int, default=500)
+parser.add_argument("--ras_per_user", type=int, default=3)
+parser.add_argument("--timecards", type=int, default=200_000)
+parser.add_argument("--period", default="fy2024")
+parser.add_argument("--repeat", type=int, default=3)
+
+
+def load_synthetic_data(
+    conn: Connection, args: argparse.Namespace, first_day: datetime.date, days: int
+) -> None:
+    conn.execute(
+        text(
+            "INSERT INTO botuser (slack_user_id, name) "
+            "SELECT 'U' || lpad(i::text, 8, '0'), 'user ' || i FROM generate_series(1, :users) AS i"
+        ),
+        {"users": args.users},
+    )
+    conn.execute(
+        text(
+            "INSERT INTO ra (user_id, ra_name) "
+            "SELECT botuser.id, 'RA' || j FROM botuser, generate_series(1, :ras_per_user) AS j"
+        ),
+        {"ras_per_user": args.ras_per_user},
+    )
+    # records of 1 to 9 hours spread over the period with a deterministic pseudo-random start time
+    conn.execute(
+        text(
+            "INSERT INTO timecard (ra_id, start_time, end_time, break_duration, description, slack_message_ts) "
+            "SELECT 1 + i % :num_ras, start_time, start_time + hours * interval '1 hour', 0, "
+            "'synthetic work ' || i, "
+            "extract(epoch from start_time)::bigint || '.' || lpad(i::text, 6, '0') "
+            "FROM generate_series(1, :timecards) AS i, "
+            "LATERAL (SELECT CAST(:first_day AS timestamp) + (i::bigint * 7919 % :minutes) * interval '1 minute' AS start_time, "
+            "1 + i * 31 % 9 AS hours) AS t"
+        ),
+        {
+            "num_ras": args.users * args.ras_per_user,
+            "timecards": args.timecards,
+            "first_day": first_day,
+            "minutes": days * 24 * 60 - 9 * 60,
+        },
+    )
+    conn.execute(text("ANALYZE"))
+
+
+def export_month_by_month(sess: Session, months: list[datetime.date]) -> int:
+    num_records = 0
+    for month in months:
+        with new_spooled_file() as export_file:
+            num_records += export_all_records(
+                sess,
+                first_day=month,
+                first_day_of_next_period=parse_period(
+                    f"{month.year}/{month.month}"
+                ).first_day_of_next_period,
+                binary_file=export_file,
+            )
+    return num_records
+
+
+def export_range(sess: Session, period, layout: ExportLayout) -> int:
+    with new_spooled_file() as export_file:
+        num_records = export_all_records(
+            sess,
+            first_day=period.first_day,
+            first_day_of_next_period=period.first_day_of_next_period,
+            binary_file=export_file,
+            layout=layout,
+        )
+        if layout != ExportLayout.CSV:
+            export_file.seek(0)
+            with zipfile.ZipFile(export_file) as zip_file:
+                assert zip_file.testzip() is None
+    return num_records
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    period = parse_period(args.period)
+    if period is None:
+        parser.error(f"invalid period: {args.period}")
+    months = period.months
+    engine = create_benchmark_engine(args)
+
+    with engine.begin() as conn:
+        Base.metadata.create_all(bind=conn)
+        print(
+            f"loading {args.timecards} synthetic records over {len(months)} months..."
+        )
+        load_synthetic_data(
+            conn,
+            args,
+            first_day=period.first_day,
+            days=(period.first_day_of_next_period - period.first_day).days,
+        )
+
+    methods = {
+        f"{len(months)} single-month CSV exports": lambda sess: export_month_by_month(
+            sess, months
+        ),
+        "single range query -> CSV": lambda sess: export_range(
+            sess, period, ExportLayout.CSV
+        ),
+        "single range query -> ZIP by month": lambda sess: export_range(
+            sess, period, ExportLayout.ZIP_BY_MONTH
+        ),
+        "single range query -> ZIP by RA": lambda sess: export_range(
+            sess, period, ExportLayout.ZIP_BY_RA
+        ),
+    }
+    results = {}
+    with Session(engine) as sess:
+        for name, f in methods.items():
+            num_records = f(sess)
+            if "range" in name:
+                assert (
+                    num_records == args.timecards
+                ), f"{name}: exported {num_records} records out of {args.timecards}"
+            else:
+                print(f"{name}: exported {num_records} records out of {args.timecards}")
+            results[name] = measure(lambda: f(sess), args.repeat)
+
+    baseline = results[f"{len(months)} single-month CSV exports"]["median"]
+    print_table(
+        headers=["method", "median [ms]", "max [ms]", "records/s", "speedup"],
+        rows=[
+            [
+                name,
+                result["median"],
+                result["max"],
+                f'{args.timecards / result["median"] * 1000:,.0f}',
+                f'x{baseline / result["median"]:.1f}',
+            ]
+            for name, result in results.items()
+        ],
+    )
+    engine.dispose()
@@ -0,0 +1,234 @@
+"""
+measure how throughput (events per second) scales with the number of bot replicas (`run.py --replicas`),
+each running its own `SocketModeHandler` in its own process, as Slack distributes events among their connections.
+Socket Mode is emulated by `fakesocketmode.py` and Slack Web API by `fakeslack.py`, which answers every call after
+`--slack_latency_ms`. a part of the events is delivered to two replicas at once like retries of Slack,
+and every event is checked to be recorded and replied to exactly once.
+"""
+
+import argparse
+import datetime
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from benchutil import (
+    add_db_arguments,
+    connect_benchmark_engine,
+    create_benchmark_engine,
+    print_table,
+)
+from fakeslack import FakeSlackWebAPI
+from fakesocketmode import FakeSocketModeServer
+from slack_bolt import App
+from slack_bolt.adapter.socket_mode import SocketModeHandler
+from slack_sdk.web.client import WebClient
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.config import BotConfig
+from app.context import BotContext
+from app.db.model import Base
+from app.listeners import register_listeners
+
+parser = argparse.ArgumentParser(description=__doc__)
+add_db_arguments(parser)
+parser.add_argument("--events", type=int, default=1000)
+parser.add_argument("--users", type=int, default=50)
+parser.add_argument("--replicas", type=int, nargs="+", default=[1, 2, 4])
+parser.add_argument("--slack_latency_ms", type=float, default=200)
+parser.add_argument(
+    "--duplicate_ratio",
+    type=float,
+    default=0.1,
+    help="ratio of events delivered to two replicas at once",
+)
+
+# a command that results in one chat.postEphemeral call without touching the database
+WARMUP_PAYLOAD = {
+    "command": "/init",
+    "text": "",
+    "user_id": "UWARMUP",
+    "channel_id": "C0",
+    "team_id": "T0",
+    "api_app_id": "A0",
+}
+
+
+def run_replica(args: argparse.Namespace, slack_base_url: str, replica: int) -> None:
+    """
+    run a replica like `run.py --replicas` does, until the process is terminated.
+    """
+    logging.basicConfig()
+    logger = logging.getLogger("bot").getChild(f"replica{replica}")
+    logger.setLevel(logging.WARNING)
+    engine = connect_benchmark_engine(args)
+    bot_context = BotContext(
+        botcfg=BotConfig(
+            admin_ids=[],
+            persist_seen_events=True,
+            export_cache_dir=os.path.join(
+                tempfile.gettempdir(), "bench-replicas", f"replica{replica}"
+            ),
+        ),
+        logger=logger,
+        db_sessmaker=sessionmaker(bind=engine, expire_on_commit=False),
+    )
+    app = App(
+        client=WebClient(token="xoxb-benchmark", base_url=slack_base_url),
+        request_verification_enabled=False,
+        token_verification_enabled=False,
+    )
+    register_listeners(app=app, bot_context=bot_context)
+    SocketModeHandler(app=app, app_token="xapp-benchmark").connect()
+    threading.Event().wait()
+
+
+def make_payloads(num_events: int, num_users: int, run: int) -> list[dict]:
+    """
+    return payloads of work reports, each of which results in exactly one chat.postEphemeral call.
+    """
+    today = datetime.date.today().strftime("%Y/%m/%d")
+    return [
+        {
+            "type": "event_callback",
+            "team_id": "T0",
+            "api_app_id": "A0",
+            "event_id": f"Ev{run}-{i}",
+            "event": {
+                "type": "app_mention",
+                "user": f"U{i % num_users:08}",
+                "channel": "C0",
+                "ts": f"{run}{i:08}.000100",
+                # 2 hours of work reported right after the work, so that no warning is sent
+                "text": f"<@UBOT>\n• user {i}\n• RA1\n• {today} 10:00-12:00\n• benchmark",
+            },
+        }
+        for i in range(num_events)
+    ]
+
+
+def run_replicas(
+    args: argparse.Namespace,
+    engine,
+    fake_slack: FakeSlackWebAPI,
+    fake_socket_mode: FakeSocketModeServer,
+    num_replicas: int,
+    run: int,
+) -> list[object]:
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM timecard"))
+        conn.execute(text("DELETE FROM seen_event"))
+
+    spawn = multiprocessing.get_context("spawn")
+    processes = [
+        spawn.Process(target=run_replica, args=(args, fake_slack.base_url, replica))
+        for replica in range(num_replicas)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        if not fake_socket_mode.wait_for_connections(num_replicas, timeout=120):
+            raise RuntimeError("replicas did not connect to the Socket Mode server")
+
+        # warm up every replica, so that the result of auth.test is cached before measurement
+        replies_before = fake_slack.calls["chat.postEphemeral"] + num_replicas
+        for replica in range(num_replicas):
+            fake_socket_mode.deliver(
+                WARMUP_PAYLOAD, envelope_type="slash_commands", connection_index=replica
+            )
+        fake_slack.wait_for_calls("chat.postEphemeral", replies_before, timeout=60)
+
+        payloads = make_payloads(args.events, args.users, run)
+        duplicate_every = (
+            round(1 / args.duplicate_ratio)
+            if args.duplicate_ratio
+            else len(payloads) + 1
+        )
+        acks_before = len(fake_socket_mode.ack_latencies)
+        started_at = time.perf_counter()
+        for i, payload in enumerate(payloads):
+            fake_socket_mode.deliver(
+                payload, copies=min(num_replicas, 2) if i % duplicate_every == 0 else 1
+            )
+        fake_slack.wait_for_calls(
+            "chat.postEphemeral", replies_before + len(payloads), timeout=600
+        )
+        elapsed = time.perf_counter() - started_at
+
+        # wait a little longer, so that a duplicated reply would be counted
+        time.sleep(1)
+        replies = fake_slack.calls["chat.postEphemeral"] - replies_before
+        with engine.connect() as conn:
+            records = conn.execute(text("SELECT count(*) FROM timecard")).scalar_one()
+        assert (
+            replies == records == len(payloads)
+        ), f"{num_replicas} replicas: {records} records and {replies} replies for {len(payloads)} events"
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join()
+    # wait until the server notices that the replicas are gone, so that the next run only delivers to new ones
+    while fake_socket_mode.num_connections:
+        time.sleep(0.01)
+
+    ack_latencies = sorted(fake_socket_mode.ack_latencies[acks_before:])
+    return [
+        num_replicas,
+        len(payloads),
+        elapsed,
+        len(payloads) / elapsed,
+        ack_latencies[len(ack_latencies) // 2] * 1000,
+        ack_latencies[min(len(ack_latencies) - 1, int(len(ack_latencies) * 0.99))]
+        * 1000,
+    ]
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    engine = create_benchmark_engine(args)
+    with engine.begin() as conn:
+        Base.metadata.create_all(bind=conn)
+        conn.execute(
+            text(
+                "INSERT INTO botuser (slack_user_id, name) "
+                "SELECT 'U' || lpad(i::text, 8, '0'), 'user ' || i FROM generate_series(0, :users - 1) AS i"
+            ),
+            {"users": args.users},
+        )
+        conn.execute(
+            text("INSERT INTO ra (user_id, ra_name) SELECT id, 'RA1' FROM botuser")
+        )
+
+    results = []
+    with (
+        FakeSocketModeServer() as fake_socket_mode,
+        FakeSlackWebAPI(
+            latency=args.slack_latency_ms / 1000,
+            handlers={"apps.connections.open": lambda _: {"url": fake_socket_mode.url}},
+        ) as fake_slack,
+    ):
+        for run, num_replicas in enumerate(args.replicas):
+            results.append(
+                run_replicas(
+                    args, engine, fake_slack, fake_socket_mode, num_replicas, run
+                )
+            )
+
+    baseline = results[0][3]
+    print_table(
+        headers=[
+            "replicas",
+            "events",
+            "elapsed [s]",
+            "events/s",
+            "ack p50 [ms]",
+            "ack p99 [ms]",
+            "speedup",
+        ],
+        rows=[result + [f"x{result[3] / baseline:.1f}"] for result in results],
+    )
+    engine.dispose()
@@ -0,0 +1,227 @@
+"""
+measure the overhead of Sentry on each work report with Sentry off, with every run traced and profiled
+(the settings before `TracesSampler`), and with the rates of `TracesSampler` (a few percent of work reports).
+each setting runs in its own process, which dispatches work reports one by one to the listeners and reports
+the latency, the CPU time per event and the peak memory of the process. Sentry sends envelopes to a local server
+instead of sentry.io, and Slack Web API is emulated by `fakeslack.py`.
+"""
+
+import argparse
+import datetime
+import logging
+import multiprocessing
+import resource
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import sentry_sdk
+from benchutil import (
+    add_db_arguments,
+    connect_benchmark_engine,
+    create_benchmark_engine,
+    print_table,
+)
+from fakeslack import FakeSlackWebAPI
+from slack_bolt import App, BoltRequest
+from slack_sdk.web.client import WebClient
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.config import BotConfig
+from app.context import BotContext
+from app.db.model import Base
+from app.listeners import register_listeners
+from app.sampling import PROFILES_SAMPLE_RATE, TracesSampler
+
+parser = argparse.ArgumentParser(description=__doc__)
+add_db_arguments(parser)
+parser.add_argument("--events", type=int, default=2000)
+parser.add_argument("--users", type=int, default=50)
+
+# sampler and share of traced runs profiled for each setting, or None to leave Sentry off
+SETTINGS = {
+    "off": None,
+    "trace and profile all": (TracesSampler(default_rate=1.0, rates={}), 1.0),
+    "TracesSampler": (TracesSampler(), PROFILES_SAMPLE_RATE),
+}
+
+
+class FakeSentry:
+    """
+    local HTTP server accepting envelopes sent by the Sentry SDK.
+    """
+
+    def __init__(self) -> None:
+        self.envelopes = multiprocessing.Value("i", 0)
+        self.bytes = multiprocessing.Value("q", 0)
+        envelopes, received_bytes = self.envelopes, self.bytes
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+                with envelopes.get_lock():
+                    envelopes.value += 1
+                    received_bytes.value += length
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def dsn(self) -> str:
+        return f"http://public@127.0.0.1:{self._server.server_port}/1"
+
+    def __enter__(self) -> "FakeSentry":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def make_payloads(num_events: int, num_users: int, setting: int) -> list[dict]:
+    """
+    return payloads of work reports, each of which is recorded and results in one chat.postEphemeral call.
+    """
+    today = datetime.date.today().strftime("%Y/%m/%d")
+    return [
+        {
+            "type": "event_callback",
+            "team_id": "T0",
+            "api_app_id": "A0",
+            "event_id": f"Ev{setting}-{i}",
+            "event": {
+                "type": "app_mention",
+                "user": f"U{i % num_users:08}",
+                "channel": "C0",
+                "ts": f"{setting}{i:08}.000100",
+                "text": f"<@UBOT>\n• user {i}\n• RA1\n• {today} 10:00-12:00\n• benchmark",
+            },
+        }
+        for i in range(num_events)
+    ]
+
+
+def run_setting(
+    args: argparse.Namespace,
+    setting: int,
+    slack_base_url: str,
+    sentry_dsn: str,
+    results: "multiprocessing.Queue",
+) -> None:
+    """
+    dispatch work reports with the `setting`-th setting of Sentry and put the result into `results`.
+    """
+    options = list(SETTINGS.values())[setting]
+    traces_sampler, profiles_sample_rate = options or (TracesSampler(), 0.0)
+    if options is not None:
+        traces_sampler.start_sentry(
+            dsn=sentry_dsn, profiles_sample_rate=profiles_sample_rate
+        )
+    logger = logging.getLogger("bot")
+    logger.setLevel(logging.WARNING)
+    engine = connect_benchmark_engine(args)
+    bot_context = BotContext(
+        botcfg=BotConfig(admin_ids=[]),
+        logger=logger,
+        db_sessmaker=sessionmaker(bind=engine, expire_on_commit=False),
+        traces_sampler=traces_sampler,
+    )
+    # listeners are run before the ack is returned, so that the latency covers the whole handling
+    app = App(
+        client=WebClient(token="xoxb-benchmark", base_url=slack_base_url),
+        request_verification_enabled=False,
+        token_verification_enabled=False,
+        process_before_response=True,
+    )
+    register_listeners(app=app, bot_context=bot_context)
+
+    payloads = make_payloads(args.events, args.users, setting)
+    # warm up caches and connections, which is excluded from measurement
+    for payload in payloads[: args.users]:
+        app.dispatch(BoltRequest(body=payload, mode="socket_mode"))
+    latencies = []
+    cpu_started_at = time.process_time()
+    for payload in payloads[args.users :]:
+        started_at = time.perf_counter()
+        app.dispatch(BoltRequest(body=payload, mode="socket_mode"))
+        latencies.append((time.perf_counter() - started_at) * 1000)
+    cpu_ms = (time.process_time() - cpu_started_at) * 1000 / len(latencies)
+    # wait until buffered envelopes are sent
+    sentry_sdk.flush()
+    latencies.sort()
+    results.put(
+        {
+            "median": statistics.median(latencies),
+            "p99": latencies[int(len(latencies) * 0.99)],
+            "cpu": cpu_ms,
+            "max_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+    )
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    engine = create_benchmark_engine(args)
+    with engine.begin() as conn:
+        Base.metadata.create_all(bind=conn)
+        conn.execute(
+            text(
+                "INSERT INTO botuser (slack_user_id, name) "
+                "SELECT 'U' || lpad(i::text, 8, '0'), 'user ' || i FROM generate_series(0, :users - 1) AS i"
+            ),
+            {"users": args.users},
+        )
+        conn.execute(
+            text("INSERT INTO ra (user_id, ra_name) SELECT id, 'RA1' FROM botuser")
+        )
+
+    spawn = multiprocessing.get_context("spawn")
+    rows = []
+    with FakeSlackWebAPI() as fake_slack, FakeSentry() as fake_sentry:
+        for setting, name in enumerate(SETTINGS):
+            results = spawn.Queue()
+            envelopes_before = fake_sentry.envelopes.value
+            bytes_before = fake_sentry.bytes.value
+            process = spawn.Process(
+                target=run_setting,
+                args=(args, setting, fake_slack.base_url, fake_sentry.dsn, results),
+            )
+            process.start()
+            result = results.get()
+            process.join()
+            rows.append(
+                [
+                    name,
+                    result["median"],
+                    result["p99"],
+                    result["cpu"],
+                    result["max_rss_mib"],
+                    fake_sentry.envelopes.value - envelopes_before,
+                    (fake_sentry.bytes.value - bytes_before) / 1024,
+                ]
+            )
+
+    print_table(
+        headers=[
+            "Sentry",
+            "latency median [ms]",
+            "latency p99 [ms]",
+            "CPU per event [ms]",
+            "max RSS [MiB]",
+            "envelopes",
+            "sent [KiB]",
+        ],
+        rows=rows,
+    )
+    engine.dispose()
@@ -0,0 +1,271 @@
+"""
+measure how long the bot takes to start: the time to import `run.py` (parsed from `python -X importtime`),
+the statements executed to prepare the database schema on every boot, and the time from launching `run.py`
+until its Socket Mode connection is opened and until it answers the first command, with and without `--fast_start`.
+Socket Mode is emulated by `fakesocketmode.py` and Slack Web API by `fakeslack.py`.
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchutil import add_db_arguments, create_benchmark_engine, print_table
+from fakeslack import FakeSlackWebAPI
+from fakesocketmode import FakeSocketModeServer
+from sqlalchemy import Engine, event
+
+from app.db.migrations import lock_schema, migrate
+from app.db.model import Base
+from app.db.setup import prepare_schema
+
+ROOT = Path(__file__).resolve().parents[2]
+
+parser = argparse.ArgumentParser(description=__doc__)
+add_db_arguments(parser)
+parser.add_argument("--repeat", type=int, default=5)
+parser.add_argument(
+    "--top", type=int, default=8, help="number of slowest packages to show"
+)
+parser.add_argument("--slack_latency_ms", type=float, default=100)
+
+# a command that results in one chat.postEphemeral call without touching the database
+INIT_PAYLOAD = {
+    "command": "/init",
+    "text": "",
+    "user_id": "U0",
+    "channel_id": "C0",
+    "team_id": "T0",
+    "api_app_id": "A0",
+}
+
+
+def import_times(code: str, depth: int = 0) -> dict[str, float]:
+    """
+    run `code` in a new interpreter and return the cumulative import time in milliseconds of each module
+    imported at `depth` (0 for modules imported by `code`, 1 for modules imported by them, and so on).
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    times = {}
+    for line in stderr.splitlines():
+        # "import time: <self [us]> | <cumulative [us]> | <indented module name>"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # modules imported by another module are indented by 2 spaces for each level
+        if len(name) - len(name.lstrip()) == 1 + 2 * depth:
+            times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def measure_imports(args: argparse.Namespace) -> None:
+    cases = {
+        "import run": "import run",
+        # what `run.py` imported before sentry_sdk was imported lazily
+        "import sentry_sdk, run": "import sentry_sdk, run",
+    }
+    rows = []
+    for name, code in cases.items():
+        runs = [import_times(code) for _ in range(args.repeat)]
+        rows.append([name, statistics.median(sum(times.values()) for times in runs)])
+    print_table(headers=["imports", "total [ms]"], rows=rows)
+
+    times = import_times("import run", depth=1)
+    print_table(
+        headers=["package imported by run.py", "cumulative [ms]"],
+        rows=sorted(times.items(), key=lambda item: -item[1])[: args.top],
+    )
+
+
+def count_statements(engine: Engine, f) -> tuple[float, int]:
+    """
+    call `f` and return the time taken in milliseconds and the number of statements executed through `engine`.
+    """
+    statements = 0
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    started_at = time.perf_counter()
+    f()
+    elapsed = (time.perf_counter() - started_at) * 1000
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return elapsed, statements
+
+
+def prepare_schema_every_time(engine: Engine) -> None:
+    """
+    prepare the schema as the bot did on every boot before `prepare_schema` checked the version.
+    """
+    with engine.begin() as conn:
+        lock_schema(conn)
+        Base.metadata.create_all(bind=conn, checkfirst=True)
+        migrate(conn=conn, logger=logging.getLogger("bot"))
+
+
+def measure_schema(args: argparse.Namespace, engine: Engine) -> None:
+    # the first boot creates the tables in both ways
+    prepare_schema(engine)
+    cases = {
+        "lock, create_all and migrate": lambda: prepare_schema_every_time(engine),
+        "prepare_schema": lambda: prepare_schema(engine),
+    }
+    rows = []
+    for name, f in cases.items():
+        results = [count_statements(engine, f) for _ in range(args.repeat)]
+        rows.append(
+            [
+                name,
+                statistics.median(elapsed for elapsed, _ in results),
+                results[0][1],
+            ]
+        )
+    print_table(
+        headers=["schema on boot (up to date)", "time [ms]", "statements"], rows=rows
+    )
+
+
+def launch_bot(
+    args: argparse.Namespace,
+    config_dir: str,
+    fake_slack: FakeSlackWebAPI,
+    fake_socket_mode: FakeSocketModeServer,
+    options: list[str],
+    first_boot: bool,
+) -> tuple[float, float]:
+    """
+    launch `run.py` with `options` and return the seconds until it connected and until it answered `/init`.
+    with `first_boot`, the bot starts with an empty schema and creates all tables.
+    """
+    if first_boot:
+        create_benchmark_engine(args).dispose()
+    env = dict(os.environ, PGOPTIONS=f"-csearch_path={args.schema}")
+    replies_before = fake_slack.calls["chat.postEphemeral"]
+    started_at = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "run.py",
+            "--botconfig",
+            os.path.join(config_dir, "botconfig.json"),
+            "--dbconfig",
+            args.dbconfig or os.path.join(config_dir, "dbconfig.json"),
+            "--slackconfig",
+            os.path.join(config_dir, "slackconfig.json"),
+        ]
+        + options,
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        if not fake_socket_mode.wait_for_connections(1, timeout=60):
+            raise RuntimeError("the bot did not connect to the Socket Mode server")
+        connected = time.perf_counter() - started_at
+        fake_socket_mode.deliver(INIT_PAYLOAD, envelope_type="slash_commands")
+        if not fake_slack.wait_for_calls(
+            "chat.postEphemeral", replies_before + 1, timeout=60
+        ):
+            raise RuntimeError("the bot did not answer /init")
+        answered = time.perf_counter() - started_at
+    finally:
+        process.terminate()
+        process.wait()
+    # wait until the server notices that the bot is gone, so that the next run only delivers to the new one
+    while fake_socket_mode.num_connections:
+        time.sleep(0.01)
+    return connected, answered
+
+
+def measure_launch(args: argparse.Namespace) -> None:
+    with (
+        tempfile.TemporaryDirectory() as config_dir,
+        FakeSocketModeServer() as fake_socket_mode,
+    ):
+        handlers = {
+            "apps.connections.open": lambda params: {"url": fake_socket_mode.url}
+        }
+        with FakeSlackWebAPI(
+            latency=args.slack_latency_ms / 1000, handlers=handlers
+        ) as fake_slack:
+            configs = {
+                "botconfig.json": {
+                    "admin_ids": [],
+                    "export_cache_dir": os.path.join(config_dir, "exports"),
+                },
+                "slackconfig.json": {
+                    "app_token": "xapp-benchmark",
+                    "bot_token": "xoxb-benchmark",
+                    "base_url": fake_slack.base_url,
+                },
+            }
+            if not args.dbconfig:
+                configs["dbconfig.json"] = {
+                    "username": os.environ.get("DB_USERNAME"),
+                    "password": os.environ.get("DB_PASSWORD"),
+                    "host": os.environ.get("DB_HOST"),
+                    "db_name": os.environ.get("DB_NAME"),
+                }
+            for filename, config in configs.items():
+                with open(os.path.join(config_dir, filename), "w") as f:
+                    json.dump(config, f)
+
+            rows = []
+            for first_boot in [True, False]:
+                for name, options in {
+                    "default": [],
+                    "--fast_start": ["--fast_start"],
+                }.items():
+                    results = [
+                        launch_bot(
+                            args,
+                            config_dir,
+                            fake_slack,
+                            fake_socket_mode,
+                            options,
+                            first_boot,
+                        )
+                        for _ in range(args.repeat)
+                    ]
+                    rows.append(
+                        [
+                            name,
+                            "empty" if first_boot else "up to date",
+                            statistics.median(connected for connected, _ in results)
+                            * 1000,
+                            statistics.median(answered for _, answered in results)
+                            * 1000,
+                        ]
+                    )
+    print_table(
+        headers=[
+            "run.py",
+            "schema",
+            "until connected [ms]",
+            "until first reply [ms]",
+        ],
+        rows=rows,
+    )
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    measure_imports(args)
+    engine = create_benchmark_engine(args)
+    measure_schema(args, engine)
+    engine.dispose()
+    measure_launch(args)
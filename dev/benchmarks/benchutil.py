@@ -0,0 +1,92 @@
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+# make `app` importable when a benchmark is launched like `uv run dev/benchmarks/<script>.py`
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from sqlalchemy import URL, Engine, create_engine, text  # noqa: E402
+
+from app.config import DBConfig  # noqa: E402
+from app.db.setup import get_db_url  # noqa: E402
+
+
+def add_db_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    add arguments to specify the database used for a benchmark.
+    """
+    parser.add_argument(
+        "--dbconfig",
+        help="JSON file containing database configuration (if not given, environment variables will be used)",
+    )
+    parser.add_argument(
+        "--schema",
+        help="PostgreSQL schema in which benchmark tables are created. It is dropped and recreated on every run.",
+        default="benchmark",
+    )
+
+
+def _get_benchmark_db_url(args: argparse.Namespace) -> URL:
+    db_config = (
+        DBConfig.from_file(filepath=args.dbconfig)
+        if args.dbconfig
+        else DBConfig.from_env()
+    )
+    return get_db_url(db_config=db_config)
+
+
+def create_benchmark_engine(args: argparse.Namespace, **kwargs) -> Engine:
+    """
+    (re)create the schema `args.schema` and return an engine whose connections only see that schema,
+    so that benchmarks never touch the tables used by the bot.
+    """
+    with create_engine(url=_get_benchmark_db_url(args)).begin() as conn:
+        conn.execute(text(f'DROP SCHEMA IF EXISTS "{args.schema}" CASCADE'))
+        conn.execute(text(f'CREATE SCHEMA "{args.schema}"'))
+    return connect_benchmark_engine(args, **kwargs)
+
+
+def connect_benchmark_engine(args: argparse.Namespace, **kwargs) -> Engine:
+    """
+    return an engine whose connections only see the schema `args.schema`, which has been created by
+    `create_benchmark_engine` (e.g. in another process).
+    """
+    return create_engine(
+        url=_get_benchmark_db_url(args),
+        connect_args={"options": f"-csearch_path={args.schema}"},
+        **kwargs,
+    )
+
+
+def measure(f: Callable[[], object], repeat: int) -> dict[str, float]:
+    """
+    call `f` `repeat` times and return statistics of the latency in milliseconds.
+    """
+    latencies = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        f()
+        latencies.append((time.perf_counter() - started_at) * 1000)
+    latencies.sort()
+    return {
+        "median": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "max": latencies[-1],
+    }
+
+
+def print_table(headers: list[str], rows: list[list[object]]) -> None:
+    """
+    print `rows` as a Markdown table, so that results can be pasted into a pull request.
+    """
+
+    def format_cell(cell: object) -> str:
+        return f"{cell:.3f}" if isinstance(cell, float) else str(cell)
+
+    print("| " + " | ".join(headers) + " |")
+    print("|" + "---|" * len(headers))
+    for row in rows:
+        print("| " + " | ".join(format_cell(cell) for cell in row) + " |")
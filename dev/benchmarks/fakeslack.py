@@ -0,0 +1,105 @@
+import collections
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+# response returned to any API method, which contains the keys read by the listeners
+DEFAULT_RESPONSE = {
+    "ok": True,
+    "user_id": "UBOT",
+    "bot_id": "BBOT",
+    "team_id": "T0",
+    "channel": {"id": "D0"},
+    "file_id": "F0",
+    "files": [{"id": "F0"}],
+}
+
+
+class FakeSlackWebAPI:
+    """
+    local HTTP server that answers Slack Web API calls with canned responses after `latency` seconds,
+    so that benchmarks can run without hitting Slack (and its rate limits).
+    pass `base_url` to `WebClient`/`AsyncWebClient`.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        handlers: Optional[dict[str, Callable[[dict], dict]]] = None,
+    ) -> None:
+        self.latency = latency
+        # API method name -> function that returns the response to given parameters.
+        # the response may contain "_status" and "_headers" to emulate errors like HTTP 429.
+        self.handlers = handlers or {}
+        self.calls: collections.Counter[str] = collections.Counter()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/api/"
+
+    def __enter__(self) -> "FakeSlackWebAPI":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def wait_for_calls(self, method: str, count: int, timeout: float) -> bool:
+        """
+        wait until `method` has been called `count` times in total, and return whether it has.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.calls[method] >= count:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                # AsyncWebClient sends some arguments in the query string
+                method = urllib.parse.urlsplit(self.path).path.rsplit("/", 1)[-1]
+                if self.headers.get("Content-Type", "").startswith("application/json"):
+                    params = json.loads(body or b"{}")
+                elif self.path.startswith("/api/"):
+                    params = dict(urllib.parse.parse_qsl(body.decode()))
+                else:
+                    params = {}  # uploaded file content
+                time.sleep(fake.latency)
+                response = dict(DEFAULT_RESPONSE)
+                response["upload_url"] = (
+                    f"http://127.0.0.1:{fake._server.server_port}/upload"
+                )
+                if handler := fake.handlers.get(method):
+                    response.update(handler(params))
+                status = response.pop("_status", 200)
+                headers = response.pop("_headers", {})
+                payload = json.dumps(response).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                # count calls only after responding, so that waiting for calls means waiting for responses
+                with fake._lock:
+                    fake.calls[method] += 1
+
+            def log_message(self, format: str, *args) -> None:
+                pass  # keep benchmark output clean
+
+        return Handler
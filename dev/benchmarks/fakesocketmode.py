@@ -0,0 +1,265 @@
+import base64
+import collections
+import hashlib
+import itertools
+import json
+import socket
+import threading
+import time
+import uuid
+from typing import Optional
+
+# defined by RFC 6455 to compute Sec-WebSocket-Accept
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OPCODE_TEXT = 0x1
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+
+class _Connection:
+    """
+    server side of a WebSocket connection, which only handles unfragmented frames like those of Socket Mode clients.
+    """
+
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+        self._send_lock = threading.Lock()
+
+    def _recv_exactly(self, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("connection closed by the client")
+            data += chunk
+        return data
+
+    def handshake(self) -> None:
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = self.sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("connection closed during handshake")
+            request += chunk
+        headers = dict(
+            line.split(": ", 1)
+            for line in request.decode().split("\r\n")[1:]
+            if ": " in line
+        )
+        accept = base64.b64encode(
+            hashlib.sha1(
+                (headers["Sec-WebSocket-Key"] + WEBSOCKET_GUID).encode()
+            ).digest()
+        ).decode()
+        self.sock.sendall(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+            ).encode()
+        )
+
+    def send(self, opcode: int, payload: bytes) -> None:
+        header = bytes([0x80 | opcode])
+        if len(payload) < 126:
+            header += bytes([len(payload)])
+        elif len(payload) < 2**16:
+            header += bytes([126]) + len(payload).to_bytes(2, "big")
+        else:
+            header += bytes([127]) + len(payload).to_bytes(8, "big")
+        with self._send_lock:
+            self.sock.sendall(header + payload)
+
+    def recv(self) -> tuple[int, bytes]:
+        first, second = self._recv_exactly(2)
+        length = second & 0x7F
+        if length == 126:
+            length = int.from_bytes(self._recv_exactly(2), "big")
+        elif length == 127:
+            length = int.from_bytes(self._recv_exactly(8), "big")
+        # frames from clients are always masked
+        mask = self._recv_exactly(4) if second & 0x80 else b"\0\0\0\0"
+        payload = self._recv_exactly(length)
+        return first & 0x0F, bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class FakeSocketModeServer:
+    """
+    local WebSocket server that delivers payloads to connected Socket Mode clients like Slack does:
+    each payload goes to one of the connections in turn, and is redelivered to another connection
+    with an incremented `retry_attempt` when it is not acknowledged within `ack_timeout` seconds.
+    answer `apps.connections.open` of `FakeSlackWebAPI` with `url`, so that `SocketModeHandler` connects to it.
+    """
+
+    def __init__(self, ack_timeout: float = 3.0, max_retries: int = 3) -> None:
+        self.ack_timeout = ack_timeout
+        self.max_retries = max_retries
+        self.acks = 0
+        self.redeliveries = 0
+        self.ack_latencies: list[float] = []
+        self._connections: list[_Connection] = []
+        # envelope id -> (envelope, connection, time of sending)
+        self._pending: dict[str, tuple[dict, _Connection, float]] = {}
+        self._turns = itertools.count()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._server = socket.create_server(("127.0.0.1", 0))
+        self._threads = [
+            threading.Thread(target=self._accept, daemon=True),
+            threading.Thread(target=self._redeliver, daemon=True),
+        ]
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self._server.getsockname()[1]}/link"
+
+    def __enter__(self) -> "FakeSocketModeServer":
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stopped.set()
+        self._server.close()
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+
+    @property
+    def num_connections(self) -> int:
+        with self._lock:
+            return len(self._connections)
+
+    def wait_for_connections(self, count: int, timeout: float) -> bool:
+        """
+        wait until `count` clients are connected, and return whether they are.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.num_connections >= count:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def deliver(
+        self,
+        payload: dict,
+        envelope_type: str = "events_api",
+        copies: int = 1,
+        connection_index: Optional[int] = None,
+    ) -> None:
+        """
+        send `payload` to the next connection, or to the connection at `connection_index`.
+        with `copies` > 1, the same payload is also sent to the following connections at once,
+        as Slack does when it retries an event before the first delivery is acknowledged.
+        """
+        with self._lock:
+            start = next(self._turns) if connection_index is None else connection_index
+            connections = [
+                self._connections[(start + i) % len(self._connections)]
+                for i in range(copies)
+            ]
+        for retry_attempt, connection in enumerate(connections):
+            self._send(
+                connection,
+                {
+                    "envelope_id": str(uuid.uuid4()),
+                    "type": envelope_type,
+                    "accepts_response_payload": envelope_type != "events_api",
+                    "retry_attempt": retry_attempt,
+                    "retry_reason": "timeout" if retry_attempt else "",
+                    "payload": payload,
+                },
+            )
+
+    def _send(self, connection: _Connection, envelope: dict) -> None:
+        with self._lock:
+            self._pending[envelope["envelope_id"]] = (
+                envelope,
+                connection,
+                time.monotonic(),
+            )
+        connection.send(OPCODE_TEXT, json.dumps(envelope).encode())
+
+    def _accept(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                sock, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(
+                target=self._serve, args=(_Connection(sock),), daemon=True
+            ).start()
+
+    def _serve(self, connection: _Connection) -> None:
+        try:
+            connection.handshake()
+            with self._lock:
+                self._connections.append(connection)
+            connection.send(
+                OPCODE_TEXT,
+                json.dumps({"type": "hello", "num_connections": 1}).encode(),
+            )
+            while not self._stopped.is_set():
+                opcode, payload = connection.recv()
+                if opcode == OPCODE_PING:
+                    connection.send(OPCODE_PONG, payload)
+                elif opcode == OPCODE_CLOSE:
+                    return
+                elif opcode == OPCODE_TEXT:
+                    envelope_id = json.loads(payload).get("envelope_id")
+                    with self._lock:
+                        if pending := self._pending.pop(envelope_id, None):
+                            self.acks += 1
+                            self.ack_latencies.append(time.monotonic() - pending[2])
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            with self._lock:
+                if connection in self._connections:
+                    self._connections.remove(connection)
+            connection.close()
+
+    def _redeliver(self) -> None:
+        while not self._stopped.wait(0.1):
+            now = time.monotonic()
+            with self._lock:
+                expired = [
+                    (envelope_id, envelope, connection)
+                    for envelope_id, (
+                        envelope,
+                        connection,
+                        sent_at,
+                    ) in self._pending.items()
+                    if now - sent_at > self.ack_timeout
+                ]
+                for envelope_id, _, _ in expired:
+                    del self._pending[envelope_id]
+                others = collections.deque(self._connections)
+            for _, envelope, connection in expired:
+                if envelope["retry_attempt"] >= self.max_retries or not others:
+                    continue
+                # deliver to another connection if any, as Slack does
+                others.rotate(1)
+                target = next(
+                    (other for other in others if other is not connection), others[0]
+                )
+                with self._lock:
+                    self.redeliveries += 1
+                self._send(
+                    target,
+                    dict(
+                        envelope,
+                        envelope_id=str(uuid.uuid4()),
+                        retry_attempt=envelope["retry_attempt"] + 1,
+                        retry_reason="timeout",
+                    ),
+                )
@@ -1,15 +1,27 @@
 import argparse
+import asyncio
 import logging
+import multiprocessing
+import threading
+from typing import Optional
 
 from slack_bolt import App
 from slack_bolt.adapter.socket_mode import SocketModeHandler
-import sentry_sdk
+from slack_sdk.web.client import WebClient
 import os
 
 from app.config import BotConfig, DBConfig, SlackConfig
-from app.context import BotContext
-from app.db.setup import setup_db_and_get_sessionmaker
+from app.context import AsyncBotContext, BotContext
+from app.db.setup import (
+    prepare_async_schema,
+    prepare_schema,
+    setup_async_db_and_get_sessionmaker,
+    setup_db_and_get_sessionmaker,
+)
 from app.listeners import register_listeners
+from app.metrics import MetricsServer
+from app.replicas import MonthInvalidationListener, listen_month_invalidations
+from app.sampling import TracesSampler
 
 
 class Args(argparse.Namespace):
@@ -18,6 +30,12 @@ class Args(argparse.Namespace):
     slackconfig: str
     bot_verbose: bool
     db_verbose: bool
+    skip_migrations: bool
+    fast_start: bool
+    async_mode: bool
+    use_sentry: bool
+    replicas: int
+    metrics_port: Optional[int]
 
 
 parser = argparse.ArgumentParser(description="Launch RA timecard recorder")
@@ -41,12 +59,191 @@ parser.add_argument(
     "--db_verbose", help="Enable verbose logging from SQLAlchemy", action="store_true"
 )
 parser.add_argument(
-    "--use-sentry", help="Send errors and metrics to Sentry. DSN should be set in environmental variable SENTRY_DSN", action="store_true"
+    "--skip_migrations",
+    help="Don't migrate database schema on startup (run `python -m app.db.migrations` separately instead)",
+    action="store_true",
+)
+parser.add_argument(
+    "--fast_start",
+    help="Connect to Slack before preparing the database schema (schema changes should be applied with `python -m app.db.migrations` beforehand)",
+    action="store_true",
+)
+parser.add_argument(
+    "--async",
+    help="Run listeners on asyncio with AsyncApp and a non-blocking database driver (requires the `async` extra)",
+    action="store_true",
+    dest="async_mode",
+)
+parser.add_argument(
+    "--use-sentry", help="Send errors and traces sampled at the rates in the bot config to Sentry. DSN should be set in environmental variable SENTRY_DSN", action="store_true"
+)
+parser.add_argument(
+    "--replicas",
+    help="Number of bot processes to launch, each with its own Socket Mode connection (Slack allows up to 10 per app)",
+    type=int,
+    default=1,
+)
+parser.add_argument(
+    "--metrics-port",
+    help="Serve metrics in Prometheus format at http://127.0.0.1:<port>/metrics (replicas use the following ports)",
+    type=int,
 )
 
-if __name__ == "__main__":
-    args = parser.parse_args(namespace=Args())
 
+def run_bot(
+    bot_config: BotConfig,
+    db_config: DBConfig,
+    slack_config: SlackConfig,
+    logger: logging.Logger,
+    sqlalchemy_loglevel: int,
+    run_migrations: bool,
+    traces_sampler: TracesSampler,
+    metrics_port: Optional[int] = None,
+    fast_start: bool = False,
+):
+    """
+    launch the bot. with `fast_start`, the Socket Mode connection is opened before the database schema is prepared,
+    so that the bot is reachable as soon as possible after a restart.
+    """
+    ### setup db ###
+    db_sessmaker = setup_db_and_get_sessionmaker(
+        db_config=db_config,
+        sqlalchemy_loglevel=sqlalchemy_loglevel,
+        run_migrations=run_migrations,
+        defer_schema=fast_start,
+    )
+
+    # wrap objects in BotContext
+    bot_context = BotContext(
+        botcfg=bot_config,
+        logger=logger,
+        db_sessmaker=db_sessmaker,
+        traces_sampler=traces_sampler,
+    )
+
+    # create app and register listeners
+    app = App(
+        client=WebClient(token=slack_config.bot_token, base_url=slack_config.base_url)
+    )
+    register_listeners(app=app, bot_context=bot_context)
+    handler = SocketModeHandler(app=app, app_token=slack_config.app_token)
+    if fast_start:
+        handler.connect()
+        logger.info("connected to Slack before preparing the database schema")
+        try:
+            prepare_schema(engine=db_sessmaker.kw["bind"], run_migrations=run_migrations)
+        except Exception:
+            # don't stay connected without a usable database, so that the process exits
+            handler.close()
+            raise
+
+    # make cached files stale when records are written by other replicas
+    MonthInvalidationListener(
+        engine=db_sessmaker.kw["bind"],
+        export_cache=bot_context.export_cache,
+        logger=logger,
+    ).start()
+    if metrics_port is not None:
+        MetricsServer(metrics=bot_context.metrics, port=metrics_port, logger=logger).start()
+
+    ### launch bot ###
+    try:
+        if fast_start:
+            # the connection has been opened above, and requests are handled on its threads
+            threading.Event().wait()
+        else:
+            handler.start()
+    finally:
+        # let files being prepared reach users before the database connection is closed
+        # (the signal handler of `setup_db_and_get_sessionmaker` exits through here)
+        bot_context.jobs.shutdown()
+        db_sessmaker.kw["bind"].dispose()
+
+
+async def run_async_bot(
+    bot_config: BotConfig,
+    db_config: DBConfig,
+    slack_config: SlackConfig,
+    logger: logging.Logger,
+    sqlalchemy_loglevel: int,
+    run_migrations: bool,
+    traces_sampler: TracesSampler,
+    metrics_port: Optional[int] = None,
+    fast_start: bool = False,
+):
+    """
+    launch the bot in async mode. modules for async mode are imported here, since they need optional dependencies.
+    `fast_start` works in the same way as `run_bot`.
+    """
+    from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+    from slack_bolt.async_app import AsyncApp
+    from slack_sdk.web.async_client import AsyncWebClient
+
+    from app.async_listeners import register_async_listeners
+
+    db_sessmaker = await setup_async_db_and_get_sessionmaker(
+        db_config=db_config,
+        sqlalchemy_loglevel=sqlalchemy_loglevel,
+        run_migrations=run_migrations,
+        defer_schema=fast_start,
+    )
+
+    # wrap objects in AsyncBotContext
+    bot_context = AsyncBotContext(
+        botcfg=bot_config,
+        logger=logger,
+        db_sessmaker=db_sessmaker,
+        traces_sampler=traces_sampler,
+    )
+
+    # create app and register listeners
+    app = AsyncApp(
+        client=AsyncWebClient(
+            token=slack_config.bot_token, base_url=slack_config.base_url
+        )
+    )
+    register_async_listeners(app=app, bot_context=bot_context)
+    handler = AsyncSocketModeHandler(app=app, app_token=slack_config.app_token)
+
+    invalidation_listener = None
+    try:
+        if fast_start:
+            await handler.connect_async()
+            logger.info("connected to Slack before preparing the database schema")
+            await prepare_async_schema(
+                engine=db_sessmaker.kw["bind"], run_migrations=run_migrations
+            )
+
+        # make cached files stale when records are written by other replicas
+        invalidation_listener = asyncio.create_task(
+            listen_month_invalidations(
+                engine=db_sessmaker.kw["bind"],
+                export_cache=bot_context.export_cache,
+                logger=logger,
+            )
+        )
+        if metrics_port is not None:
+            MetricsServer(metrics=bot_context.metrics, port=metrics_port, logger=logger).start()
+
+        ### launch bot ###
+        if fast_start:
+            # the connection has been opened above, and requests are handled on its tasks
+            await asyncio.Event().wait()
+        else:
+            await handler.start_async()
+    finally:
+        if invalidation_listener is not None:
+            invalidation_listener.cancel()
+        # let files being prepared reach users before the database connection is closed
+        await bot_context.jobs.shutdown()
+        # ensure the database connection is closed when the program is terminated
+        await db_sessmaker.kw["bind"].dispose()
+
+
+def launch(args: Args, replica: Optional[int] = None):
+    """
+    load configurations and launch the bot. `replica` is the index of the process when launched with `--replicas`.
+    """
     ### globally enable logging (to stdout) ###
     logging.basicConfig()
 
@@ -56,24 +253,27 @@ if __name__ == "__main__":
         logger.setLevel(logging.INFO)
     else:
         logger.setLevel(logging.WARNING)
+    if replica is not None:
+        # tell replicas apart in logs
+        logger = logger.getChild(f"replica{replica}")
+
+    ### load config ###
+    # load config file for bot
+    bot_config = BotConfig.from_file(filepath=args.botconfig)
 
     ### set up sentry for monitoring in production ###
+    # runs of listeners are traced at the rates in the bot config, instead of all of them
+    traces_sampler = TracesSampler.from_config(bot_config)
     if args.use_sentry:
         if sentry_dsn := os.getenv("SENTRY_DSN"):
-            sentry_sdk.init(
+            traces_sampler.start_sentry(
                 dsn=sentry_dsn,
-                send_default_pii=True,
-                traces_sample_rate=1.0,
-                profiles_sample_rate=1.0,
+                profiles_sample_rate=bot_config.sentry_profiles_sample_rate,
             )
             logger.info("monitoring with Sentry has been started")
         else:
             raise ValueError("Environment variable SENTRY_DSN is not set")
 
-    ### load config ###
-    # load config file for bot
-    bot_config = BotConfig.from_file(filepath=args.botconfig)
-
     # load config for db from either file or environment variables
     if args.dbconfig:
         db_config = DBConfig.from_file(filepath=args.dbconfig)
@@ -91,20 +291,76 @@ if __name__ == "__main__":
         )
         slack_config = SlackConfig.from_env()
 
-    ### setup db ###
+    if replica is not None:
+        # each replica needs its own directory, since a replica deletes cached files it does not know on startup
+        bot_config.export_cache_dir = os.path.join(
+            bot_config.export_cache_dir, f"replica{replica}"
+        )
+        # an event redelivered to another replica can only be dropped by claiming it in the database
+        bot_config.persist_seen_events = True
+
+    metrics_port = args.metrics_port
+    if metrics_port is not None and replica is not None:
+        # replicas cannot listen on the same port
+        metrics_port += replica
+
     sqlalchemy_loglevel = logging.INFO if args.db_verbose else logging.WARNING
-    db_sessmaker = setup_db_and_get_sessionmaker(
-        db_config=db_config, sqlalchemy_loglevel=sqlalchemy_loglevel
-    )
+    if args.async_mode:
+        logger.info("launching bot in async mode")
+        asyncio.run(
+            run_async_bot(
+                bot_config=bot_config,
+                db_config=db_config,
+                slack_config=slack_config,
+                logger=logger,
+                sqlalchemy_loglevel=sqlalchemy_loglevel,
+                run_migrations=not args.skip_migrations,
+                traces_sampler=traces_sampler,
+                metrics_port=metrics_port,
+                fast_start=args.fast_start,
+            )
+        )
+    else:
+        run_bot(
+            bot_config=bot_config,
+            db_config=db_config,
+            slack_config=slack_config,
+            logger=logger,
+            sqlalchemy_loglevel=sqlalchemy_loglevel,
+            run_migrations=not args.skip_migrations,
+            traces_sampler=traces_sampler,
+            metrics_port=metrics_port,
+            fast_start=args.fast_start,
+        )
 
-    # wrap objects in BotContext
-    bot_context = BotContext(
-        botcfg=bot_config, logger=logger, db_sessmaker=db_sessmaker
-    )
 
-    # create app and register listeners
-    app = App(token=slack_config.bot_token)
-    register_listeners(app=app, bot_context=bot_context)
+def launch_replicas(args: Args):
+    """
+    launch `args.replicas` bot processes and wait until all of them exit.
+    Slack delivers each event to one of their Socket Mode connections, and every replica claims events in the database,
+    so that an event redelivered to another replica is handled only once.
+    """
+    # spawn instead of fork, so that replicas share no connection or thread with this process
+    spawn = multiprocessing.get_context("spawn")
+    processes = [
+        spawn.Process(target=launch, args=(args, replica), name=f"replica{replica}")
+        for replica in range(args.replicas)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+                process.join()
 
-    ### launch bot ###
-    SocketModeHandler(app=app, app_token=slack_config.app_token).start()
+
+if __name__ == "__main__":
+    args = parser.parse_args(namespace=Args())
+    if args.replicas > 1:
+        launch_replicas(args)
+    else:
+        launch(args)
@@ -0,0 +1,92 @@
+import os
+from typing import TYPE_CHECKING, Iterator
+
+import pytest
+from sqlalchemy import Engine, NullPool, create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.config import DBConfig
+from app.db.model import RA, User
+from app.db.setup import get_db_url, prepare_schema
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+# the user registered by the `ra_id` fixture
+SLACK_USER_ID = "U0000001"
+
+# PostgreSQL schema in which the tables of each test are created. it is dropped and recreated for every test
+TEST_SCHEMA = "test"
+
+
+def _get_test_db_config() -> DBConfig:
+    """
+    return the configuration of the database used by tests, read from the JSON file at `TEST_DBCONFIG`
+    or the same environment variables as the bot. tests using the database are skipped if neither is given.
+    """
+    if filepath := os.environ.get("TEST_DBCONFIG"):
+        return DBConfig.from_file(filepath=filepath)
+    try:
+        return DBConfig.from_env()
+    except ValueError:
+        pytest.skip("no database is configured (set TEST_DBCONFIG or DB_* variables)")
+
+
+@pytest.fixture
+def empty_engine() -> Iterator[Engine]:
+    """
+    engine whose connections only see `TEST_SCHEMA`, which is empty at the start of the test.
+    """
+    db_url = get_db_url(db_config=_get_test_db_config())
+    admin_engine = create_engine(url=db_url)
+    with admin_engine.begin() as conn:
+        conn.execute(text(f'DROP SCHEMA IF EXISTS "{TEST_SCHEMA}" CASCADE'))
+        conn.execute(text(f'CREATE SCHEMA "{TEST_SCHEMA}"'))
+    admin_engine.dispose()
+    engine = create_engine(
+        url=db_url, connect_args={"options": f"-csearch_path={TEST_SCHEMA}"}
+    )
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def engine(empty_engine: Engine) -> Engine:
+    """
+    engine on `TEST_SCHEMA` with the tables and triggers in the latest version, as prepared by the bot.
+    """
+    prepare_schema(empty_engine)
+    return empty_engine
+
+
+@pytest.fixture
+def async_engine(engine: Engine) -> "AsyncEngine":
+    """
+    asyncpg engine on the database of `engine`, which requires the `async` extra.
+    connections are not pooled, so that the engine can be used in an event loop per test.
+    """
+    pytest.importorskip("asyncpg")
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    return create_async_engine(
+        url=get_db_url(
+            db_config=_get_test_db_config(), drivername="postgresql+asyncpg"
+        ),
+        connect_args={"server_settings": {"search_path": TEST_SCHEMA}},
+        poolclass=NullPool,
+    )
+
+
+@pytest.fixture
+def ra_id(engine: Engine) -> int:
+    """
+    id of an RA job of `SLACK_USER_ID`, who is registered in the database of `engine`.
+    """
+    with sessionmaker(bind=engine)() as sess:
+        user = User(slack_user_id=SLACK_USER_ID, name="NameOfRA")
+        sess.add(user)
+        sess.flush()
+        ra = RA(user_id=user.id, ra_name="CREST")
+        sess.add(ra)
+        sess.commit()
+        return ra.id
@@ -0,0 +1,42 @@
+import datetime
+
+import pytest
+
+from app.csv_import import parse_user_record
+
+MONTH = datetime.date(2023, 11, 1)
+RA_IDS = {"CREST": 1}
+
+
+@pytest.mark.parametrize(
+    "start, end, end_time",
+    [
+        ("1000", "1800", datetime.datetime(2023, 11, 18, 18, 0)),
+        ("2200", "0200", datetime.datetime(2023, 11, 19, 2, 0)),
+        ("2000", "0800", datetime.datetime(2023, 11, 19, 8, 0)),
+    ],
+)
+def test_parse_user_record(start: str, end: str, end_time: datetime.datetime):
+    record = parse_user_record(
+        ["CREST", "18", start, end, "0100", "analyzed dataset"], MONTH, RA_IDS
+    )
+    assert isinstance(record, tuple)
+    assert record[2] == end_time
+
+
+@pytest.mark.parametrize(
+    "start, end",
+    [
+        ("1000", "1000"),
+        # a typo rather than work until 09:00 on the next day
+        ("1000", "0900"),
+        ("2000", "0801"),
+    ],
+)
+def test_parse_invalid_user_record(start: str, end: str):
+    assert isinstance(
+        parse_user_record(
+            ["CREST", "18", start, end, "0000", "analyzed dataset"], MONTH, RA_IDS
+        ),
+        str,
+    )
@@ -0,0 +1,41 @@
+from app.dedup import EventDeduplicator, event_dedup_key
+
+
+def app_mention(event_id: str, edited_ts: str = "") -> dict:
+    event = {
+        "type": "app_mention",
+        "user": "U0000001",
+        "ts": "1700000000.000100",
+        "client_msg_id": "3f1e0e0c-0000-0000-0000-000000000001",
+        "text": "<@UBOT> report",
+    }
+    if edited_ts:
+        event["edited"] = {"user": "U0000001", "ts": edited_ts}
+    return {"type": "event_callback", "event_id": event_id, "event": event}
+
+
+def test_redelivery_has_same_key():
+    assert event_dedup_key(app_mention("Ev01")) == "Ev01"
+    assert event_dedup_key(app_mention("Ev01")) == event_dedup_key(app_mention("Ev01"))
+
+
+def test_edit_of_message_is_not_duplicate():
+    deduplicator = EventDeduplicator()
+    assert deduplicator.add(event_dedup_key(app_mention("Ev01")))
+    # the same message edited later is delivered as another event
+    assert deduplicator.add(
+        event_dedup_key(app_mention("Ev02", edited_ts="1700000100.000200"))
+    )
+    assert not deduplicator.add(event_dedup_key(app_mention("Ev01")))
+
+
+def test_slash_command_is_not_deduplicated():
+    assert event_dedup_key({"command": "/download_csv", "text": ""}) is None
+
+
+def test_deduplicator_forgets_oldest_keys():
+    deduplicator = EventDeduplicator(maxsize=2)
+    for event_id in ["Ev01", "Ev02", "Ev03"]:
+        assert deduplicator.add(event_id)
+    assert deduplicator.add("Ev01")
+    assert not deduplicator.add("Ev03")
@@ -0,0 +1,135 @@
+import asyncio
+import datetime
+import io
+import threading
+import zipfile
+
+import pytest
+from sqlalchemy import Engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.compliance import audit_month, audit_month_async
+from app.export import (
+    ExportLayout,
+    consume_record_batches,
+    export_all_records,
+    export_all_records_async,
+    parquet_available,
+    select_all_records,
+)
+
+FIRST_DAY = datetime.date(2023, 4, 1)
+NEXT_FISCAL_YEAR = datetime.date(2024, 4, 1)
+NUM_RECORDS = 2500
+
+
+@pytest.fixture
+def records(engine: Engine, ra_id: int) -> None:
+    """
+    add `NUM_RECORDS` records of 10 hours without a break, which are more than a batch of rows.
+    """
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO timecard (ra_id, start_time, end_time, break_duration, description, slack_message_ts) "
+                "SELECT :ra_id, start_time, start_time + interval '10 hours', 0, 'work ' || i, i::text "
+                "FROM generate_series(0, :num_records - 1) AS i "
+                "CROSS JOIN LATERAL (SELECT timestamp '2023-04-01 08:00' + i * interval '3 hours' AS start_time) AS t"
+            ),
+            {"ra_id": ra_id, "num_records": NUM_RECORDS},
+        )
+
+
+def export_sync(engine: Engine, layout: ExportLayout) -> tuple[int, bytes]:
+    with sessionmaker(bind=engine)() as sess, io.BytesIO() as export_file:
+        num_records = export_all_records(
+            sess,
+            first_day=FIRST_DAY,
+            first_day_of_next_period=NEXT_FISCAL_YEAR,
+            binary_file=export_file,
+            layout=layout,
+        )
+        return num_records, export_file.getvalue()
+
+
+def export_async(async_engine, layout: ExportLayout) -> tuple[int, bytes]:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async def export() -> tuple[int, bytes]:
+        async with async_sessionmaker(bind=async_engine)() as sess:
+            with io.BytesIO() as export_file:
+                num_records = await export_all_records_async(
+                    sess,
+                    first_day=FIRST_DAY,
+                    first_day_of_next_period=NEXT_FISCAL_YEAR,
+                    binary_file=export_file,
+                    layout=layout,
+                )
+                return num_records, export_file.getvalue()
+
+    return asyncio.run(export())
+
+
+def read_content(content: bytes, layout: ExportLayout) -> object:
+    """
+    return what is exported in `content`, ignoring metadata like the time at which each file in a ZIP file is written.
+    """
+    if layout == ExportLayout.CSV:
+        return content
+    if layout == ExportLayout.PARQUET:
+        import pyarrow.parquet as pq
+
+        return pq.read_table(io.BytesIO(content)).to_pylist()
+    with zipfile.ZipFile(io.BytesIO(content)) as zf:
+        return {name: zf.read(name) for name in zf.namelist()}
+
+
+@pytest.mark.parametrize("layout", list(ExportLayout), ids=lambda layout: layout.value)
+def test_async_export_is_same_as_sync_export(
+    engine: Engine, async_engine, records: None, layout: ExportLayout
+):
+    if layout == ExportLayout.PARQUET and not parquet_available():
+        pytest.skip("pyarrow is not installed")
+    num_records, content = export_sync(engine, layout)
+    assert num_records == NUM_RECORDS
+    num_records_async, content_async = export_async(async_engine, layout)
+    assert num_records_async == NUM_RECORDS
+    assert read_content(content_async, layout) == read_content(content, layout)
+
+
+def test_batches_are_consumed_outside_event_loop(async_engine, records: None):
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    def consume(batches) -> tuple[int, set[int]]:
+        sizes = [len(batch) for batch in batches]
+        return sum(sizes), {threading.get_ident()}
+
+    async def run() -> tuple[int, set[int]]:
+        async with async_sessionmaker(bind=async_engine)() as sess:
+            return await consume_record_batches(
+                sess,
+                stmt=select_all_records(FIRST_DAY, NEXT_FISCAL_YEAR),
+                consume=consume,
+                batch_size=1000,
+            )
+
+    num_rows, consumer_threads = asyncio.run(run())
+    assert num_rows == NUM_RECORDS
+    assert threading.get_ident() not in consumer_threads
+
+
+def test_async_audit_is_same_as_sync_audit(engine: Engine, async_engine, records: None):
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    first_day = datetime.date(2023, 5, 1)
+    first_day_of_next_month = datetime.date(2023, 6, 1)
+    with sessionmaker(bind=engine)() as sess:
+        violations = audit_month(sess, first_day, first_day_of_next_month)
+    # every record of 10 hours lacks a recess
+    assert violations
+
+    async def audit() -> list:
+        async with async_sessionmaker(bind=async_engine)() as sess:
+            return await audit_month_async(sess, first_day, first_day_of_next_month)
+
+    assert asyncio.run(audit()) == violations
@@ -0,0 +1,73 @@
+import logging
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.jobs import JobExecutor
+from app.listeners.commands.export_job import submit_export_job
+
+
+class RecordingOutbound:
+    """
+    records ephemeral messages, taking as long as a slow Slack API call to send each.
+    """
+
+    def __init__(self, events: list[str]) -> None:
+        self.events = events
+
+    def post_ephemeral(self, client, **kwargs) -> None:
+        time.sleep(0.05)
+        self.events.append(kwargs["text"])
+
+
+@pytest.fixture
+def events() -> list[str]:
+    return []
+
+
+@pytest.fixture
+def botctx(events: list[str]) -> SimpleNamespace:
+    logger = logging.getLogger("test")
+    return SimpleNamespace(
+        outbound=RecordingOutbound(events),
+        jobs=JobExecutor(logger=logger),
+        logger=logger,
+    )
+
+
+CONTEXT = SimpleNamespace(channel_id="C0000001", actor_user_id="U0000001")
+
+
+def test_file_is_sent_after_acknowledgement(botctx, events: list[str]):
+    submit_export_job(
+        botctx, None, CONTEXT, kind="download_csv", run=lambda: events.append("file")
+    )
+    botctx.jobs.shutdown()
+    assert events[0].startswith(":hourglass_flowing_sand:")
+    assert events[1:] == ["file"]
+
+
+def test_failure_is_told_after_acknowledgement(botctx, events: list[str]):
+    def fail() -> None:
+        raise RuntimeError("upload failed")
+
+    submit_export_job(botctx, None, CONTEXT, kind="download_csv", run=fail)
+    botctx.jobs.shutdown()
+    assert len(events) == 2
+    assert events[0].startswith(":hourglass_flowing_sand:")
+    assert events[1].startswith(":x:")
+    assert botctx.jobs.stats()["failed"] == 1
+
+
+def test_rejected_job_is_not_acknowledged(botctx, events: list[str]):
+    submit_export_job(
+        botctx, None, CONTEXT, kind="download_csv", run=lambda: time.sleep(0.2)
+    )
+    submit_export_job(
+        botctx, None, CONTEXT, kind="download_csv", run=lambda: events.append("file")
+    )
+    botctx.jobs.shutdown()
+    assert len(events) == 2
+    assert events[0].startswith(":hourglass_flowing_sand:")
+    assert events[1].startswith(":hourglass:")
@@ -0,0 +1,117 @@
+import datetime
+
+from sqlalchemy import Engine, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.migrations import LATEST_SCHEMA_VERSION, get_schema_version
+from app.db.model import TimeCard
+from app.db.setup import prepare_schema
+from app.services.rollup import find_rollup_drifts
+from app.services.timecards import find_timecard, record_timecard, sum_working_hours
+from conftest import SLACK_USER_ID
+
+# tables as created by `Base.metadata.create_all` before migrations were introduced (version 0)
+VERSION_0_SCHEMA = (
+    """
+    CREATE TABLE botuser (
+        id SERIAL NOT NULL,
+        slack_user_id VARCHAR NOT NULL,
+        name VARCHAR NOT NULL,
+        PRIMARY KEY (id),
+        UNIQUE (slack_user_id)
+    )
+    """,
+    """
+    CREATE TABLE ra (
+        id SERIAL NOT NULL,
+        user_id INTEGER NOT NULL,
+        ra_name VARCHAR NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES botuser (id) ON DELETE CASCADE ON UPDATE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE timecard (
+        id SERIAL NOT NULL,
+        ra_id INTEGER NOT NULL,
+        start_time TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        end_time TIMESTAMP WITHOUT TIME ZONE NOT NULL CONSTRAINT time_integrity CHECK (end_time > start_time),
+        duration TIME WITHOUT TIME ZONE NOT NULL,
+        break_duration TIME WITHOUT TIME ZONE NOT NULL,
+        description VARCHAR NOT NULL,
+        slack_message_ts VARCHAR NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(ra_id) REFERENCES ra (id) ON DELETE CASCADE ON UPDATE CASCADE
+    )
+    """,
+    f"INSERT INTO botuser (slack_user_id, name) VALUES ('{SLACK_USER_ID}', 'NameOfRA')",
+    "INSERT INTO ra (user_id, ra_name) VALUES (1, 'CREST')",
+    # the same message recorded twice, as it could be before migration 1
+    """
+    INSERT INTO timecard (ra_id, start_time, end_time, duration, break_duration, description, slack_message_ts)
+    VALUES
+        (1, '2023-11-02 09:00', '2023-11-02 18:30', '09:30', '01:00', 'work', '1.1'),
+        (1, '2023-11-03 10:00', '2023-11-03 12:00', '02:00', '00:00', 'work', '1.2'),
+        (1, '2023-11-03 10:00', '2023-11-03 13:15', '03:15', '00:15', 'edited', '1.2'),
+        (1, '2023-12-01 09:00', '2023-12-01 10:00', '01:00', '00:00', 'work', '1.3')
+    """,
+)
+
+
+def check_records(engine: Engine) -> None:
+    """
+    check that records can be added and edited, and that the rollup is kept in minutes.
+    """
+    sessmaker = sessionmaker(bind=engine)
+    with sessmaker() as sess:
+        record_timecard(
+            sess,
+            ra_id=1,
+            start_time=datetime.datetime(2023, 11, 30, 22),
+            end_time=datetime.datetime(2023, 12, 1, 2),
+            break_duration=30,
+            description="work across midnight",
+            slack_message_ts="1.4",
+        )
+    with sessmaker() as sess:
+        assert find_timecard(sess, "1.4").duration == 4 * 60
+        assert not find_rollup_drifts(sess)
+
+
+def test_fresh_install(empty_engine: Engine):
+    prepare_schema(empty_engine)
+    with empty_engine.begin() as conn:
+        assert get_schema_version(conn) == LATEST_SCHEMA_VERSION
+        for statement in VERSION_0_SCHEMA[3:5]:
+            conn.execute(text(statement))
+    check_records(empty_engine)
+    # nothing is done on a database in the latest version
+    prepare_schema(empty_engine)
+
+
+def test_upgrade_from_version_0(empty_engine: Engine):
+    with empty_engine.begin() as conn:
+        for statement in VERSION_0_SCHEMA:
+            conn.execute(text(statement))
+    prepare_schema(empty_engine)
+    with empty_engine.begin() as conn:
+        assert get_schema_version(conn) == LATEST_SCHEMA_VERSION
+    with sessionmaker(bind=empty_engine)() as sess:
+        records = sess.execute(
+            select(TimeCard.slack_message_ts, TimeCard.duration, TimeCard.break_duration)
+            .order_by(TimeCard.start_time)
+        ).all()  # fmt: skip
+        # the latest record of the message recorded twice is kept
+        assert [tuple(record) for record in records] == [
+            ("1.1", 9 * 60 + 30, 60),
+            ("1.2", 3 * 60 + 15, 15),
+            ("1.3", 60, 0),
+        ]
+        assert sum_working_hours(
+            sess,
+            slack_user_id=SLACK_USER_ID,
+            first_day=datetime.date(2023, 11, 1),
+            first_day_of_next_period=datetime.date(2023, 12, 1),
+        ) == [("CREST", 8 * 60 + 30 + 3 * 60)]
+        assert not find_rollup_drifts(sess)
+    check_records(empty_engine)
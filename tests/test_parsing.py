@@ -0,0 +1,110 @@
+import datetime
+
+import pytest
+from bench_parsing import legacy_parse, make_corpus, new_parse
+
+from app.parsing import (
+    ParseError,
+    ParseErrorKind,
+    WorkReport,
+    parse_work_period,
+    parse_work_report,
+)
+
+
+def make_message(duration: str) -> str:
+    return f"<@UBOT> report\n• NameOfRA\n• CREST\n• {duration}\n• analyzed dataset"
+
+
+def test_parse_work_report():
+    assert parse_work_report(
+        make_message("2023/11/18 10:00-18:30 R01:15")
+    ) == WorkReport(
+        name="NameOfRA",
+        ra_name="CREST",
+        description="analyzed dataset",
+        work_datetime="2023/11/18 10:00-18:30",
+        start_time=datetime.datetime(2023, 11, 18, 10, 0),
+        end_time=datetime.datetime(2023, 11, 18, 18, 30),
+        break_duration=75,
+    )
+
+
+@pytest.mark.parametrize(
+    "duration",
+    [
+        "2023/11/18 09:05-18:00 R01:00",
+        "2023/11/18 09:05-18:00",
+        "2023/11/18 9:05-18:00 R1:00",
+        "2023/11/8 09:05-18:00",
+        "2023/11/18 09:05-2023/11/18 18:00 R01:00",
+    ],
+)
+def test_parse_work_period_in_every_format(duration: str):
+    # the fast path (zero-padded) and the regex (the others) give the same result
+    start_time, end_time, break_duration = parse_work_period(duration)
+    assert start_time.hour == 9 and start_time.minute == 5
+    assert end_time.hour == 18 and end_time.minute == 0
+    assert (end_time - start_time) < datetime.timedelta(days=1)
+    assert break_duration in (0, 60)
+
+
+@pytest.mark.parametrize(
+    "duration, end_time",
+    [
+        ("2023/11/18 22:00-02:00", datetime.datetime(2023, 11, 19, 2, 0)),
+        ("2023/11/30 22:00-00:00", datetime.datetime(2023, 12, 1, 0, 0)),
+        ("2023/12/31 22:00-2024/01/01 02:00", datetime.datetime(2024, 1, 1, 2, 0)),
+        ("2023/11/18 22:00-2023/11/19 21:59", datetime.datetime(2023, 11, 19, 21, 59)),
+        ("2023/11/18 20:00-08:00", datetime.datetime(2023, 11, 19, 8, 0)),
+    ],
+)
+def test_parse_work_across_midnight(duration: str, end_time: datetime.datetime):
+    assert parse_work_period(duration)[1] == end_time
+
+
+@pytest.mark.parametrize(
+    "text, kind",
+    [
+        ("<@UBOT>\n• NameOfRA\n• CREST\n• 2023/11/18 10:00-18:00", ParseErrorKind.MESSAGE_FORMAT),
+        (make_message("2023/11/18 10:00 - 18:00"), ParseErrorKind.DURATION_FORMAT),
+        (make_message("2023/11/18 1000-18:00"), ParseErrorKind.DURATION_FORMAT),
+        (make_message("２023/11/18 10:00-18:00"), ParseErrorKind.DURATION_FORMAT),
+        (make_message("2023/13/01 10:00-12:00"), ParseErrorKind.DATETIME_VALUE),
+        (make_message("2023/02/30 10:00-12:00"), ParseErrorKind.DATETIME_VALUE),
+        (make_message("2023/11/18 10:00-25:00"), ParseErrorKind.DATETIME_VALUE),
+        (make_message("2023/11/18 10:00-18:00 R01:75"), ParseErrorKind.DATETIME_VALUE),
+        (make_message("2023/11/18 10:00-10:00"), ParseErrorKind.DATETIME_VALUE),
+        (make_message("2023/11/18 10:00-2023/11/17 12:00"), ParseErrorKind.DATETIME_VALUE),
+        # a typo in the end date, and work of a day or longer
+        (make_message("2023/11/18 22:00-2023/12/19 06:00"), ParseErrorKind.DATETIME_VALUE),
+        (make_message("2023/11/18 22:00-2023/11/19 22:00"), ParseErrorKind.DATETIME_VALUE),
+        # a typo rather than work until 09:00 on the next day, which has to be written with the end date
+        (make_message("2023/11/18 10:00-09:00"), ParseErrorKind.DATETIME_VALUE),
+        (make_message("2023/11/18 20:00-08:01"), ParseErrorKind.DATETIME_VALUE),
+    ],
+)  # fmt: skip
+def test_parse_errors(text: str, kind: ParseErrorKind):
+    parsed = parse_work_report(text)
+    assert isinstance(parsed, ParseError)
+    assert parsed.kind == kind
+    # the RA job is checked before complaining about the working hours
+    if kind != ParseErrorKind.MESSAGE_FORMAT:
+        assert parsed.ra_name == "CREST"
+
+
+def test_long_work_across_midnight_needs_end_date():
+    parsed = parse_work_report(make_message("2023/11/18 10:00-09:00 R01:00"))
+    assert isinstance(parsed, ParseError)
+    assert "`2023/11/18 10:00-2023/11/19 09:00`" in parsed.hint
+    assert parse_work_period("2023/11/18 10:00-2023/11/19 09:00 R01:00") == (
+        datetime.datetime(2023, 11, 18, 10, 0),
+        datetime.datetime(2023, 11, 19, 9, 0),
+        60,
+    )
+
+
+def test_agrees_with_legacy_parser():
+    corpus = make_corpus(num_messages=20_000, malformed_ratio=0.2, seed=0)
+    mismatches = [text for text in corpus if legacy_parse(text) != new_parse(text)]
+    assert not mismatches
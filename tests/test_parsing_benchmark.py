@@ -0,0 +1,24 @@
+"""
+parses per second of `app.parsing` and the parsing code `on_mention` used before it, with pytest-benchmark.
+run `uv run pytest tests/test_parsing_benchmark.py --benchmark-group-by=param:messages` to compare them.
+"""
+
+import pytest
+from bench_parsing import legacy_parse, make_corpus, new_parse
+
+pytest.importorskip("pytest_benchmark")
+
+CORPUS = make_corpus(num_messages=20_000, malformed_ratio=0.2, seed=0)
+SUBSETS = {
+    "all": CORPUS,
+    "valid": [text for text in CORPUS if new_parse(text)[0] == "ok"],
+    "malformed": [text for text in CORPUS if new_parse(text)[0] != "ok"],
+}
+
+
+@pytest.mark.parametrize("messages", SUBSETS)
+@pytest.mark.parametrize("parse", [legacy_parse, new_parse], ids=["legacy", "app.parsing"])  # fmt: skip
+def test_parses_per_second(benchmark, parse, messages: str):
+    corpus = SUBSETS[messages]
+    results = benchmark(lambda: [parse(text) for text in corpus])
+    assert len(results) == len(corpus)
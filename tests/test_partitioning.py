@@ -0,0 +1,155 @@
+import datetime
+import gzip
+import json
+import logging
+import os
+
+import pytest
+from bench_partitioning import capture_statements, scanned_relations
+from sqlalchemy import Engine, func, select, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.compliance import select_compliance_columns
+from app.db.model import TimeCard, WorkingHoursRollup
+from app.db.partitioning import (
+    DEFAULT_PARTITION,
+    archive_month_partition,
+    convert_timecard_to_partitioned,
+    ensure_timecard_partitions,
+    list_month_partitions,
+)
+from app.export import select_all_records
+from app.services.rollup import find_rollup_drifts
+from app.services.timecards import find_timecard, get_user_records
+from conftest import SLACK_USER_ID
+
+FIRST_DAY = datetime.date(2023, 11, 1)
+NEXT_MONTH = datetime.date(2023, 12, 1)
+
+# service functions issuing the monthly queries of the listeners
+MONTHLY_QUERIES = {
+    "download_csv": lambda sess: get_user_records(
+        sess,
+        slack_user_id=SLACK_USER_ID,
+        first_day=FIRST_DAY,
+        first_day_of_next_period=NEXT_MONTH,
+    ),
+    "admin_download_all_records": lambda sess: sess.execute(
+        select_all_records(FIRST_DAY, NEXT_MONTH)
+    ).all(),
+    "admin_compliance_report": lambda sess: sess.execute(
+        select_compliance_columns(FIRST_DAY, NEXT_MONTH)
+    ).all(),
+}
+
+
+@pytest.fixture
+def partitioned_engine(engine: Engine, ra_id: int) -> Engine:
+    """
+    engine on a database with records at 10:00 every day from 2023/09/01 to 2024/01/31, whose `timecard`
+    has been partitioned by month.
+    """
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO timecard (ra_id, start_time, end_time, break_duration, description, slack_message_ts) "
+                "SELECT :ra_id, day + interval '10 hours', day + interval '12 hours', 0, 'work', day::text "
+                "FROM generate_series(timestamp '2023-09-01', timestamp '2024-01-31', interval '1 day') AS day"
+            ),
+            {"ra_id": ra_id},
+        )
+        convert_timecard_to_partitioned(
+            conn, logger=logging.getLogger("test"), today=FIRST_DAY
+        )
+    return engine
+
+
+def count_records(sess: Session) -> int:
+    return sess.scalar(select(func.count()).select_from(TimeCard))
+
+
+@pytest.mark.parametrize("query", MONTHLY_QUERIES.values(), ids=MONTHLY_QUERIES)
+def test_monthly_query_scans_single_partition(partitioned_engine: Engine, query):
+    sessmaker = sessionmaker(bind=partitioned_engine)
+
+    def run() -> None:
+        with sessmaker() as sess:
+            assert len(query(sess)) == 30
+
+    (statement, parameters), *_ = capture_statements(partitioned_engine, run)
+    with partitioned_engine.connect() as conn:
+        plan = conn.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {statement}", parameters
+        ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    partitions = {
+        relation
+        for relation in scanned_relations(plan[0]["Plan"])
+        if relation.startswith("timecard")
+    }
+    assert partitions == {"timecard_202311"}
+
+
+def test_convert_keeps_records_and_rollup(partitioned_engine: Engine):
+    with partitioned_engine.connect() as conn:
+        months = list_month_partitions(conn)
+    # months with records, and the months ahead of `today`
+    assert sorted(months) == [datetime.date(2023, m, 1) for m in range(9, 13)] + [
+        datetime.date(2024, 1, 1),
+        datetime.date(2024, 2, 1),
+    ]
+    with sessionmaker(bind=partitioned_engine)() as sess:
+        assert count_records(sess) == 153
+        assert not find_rollup_drifts(sess)
+        # the month of a deleted message is unknown, so it is looked up in every partition
+        assert find_timecard(sess, "2023-11-18 00:00:00").start_time == (
+            datetime.datetime(2023, 11, 18, 10)
+        )
+
+
+def test_ensure_moves_records_out_of_default_partition(partitioned_engine: Engine):
+    with partitioned_engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO timecard (ra_id, start_time, end_time, break_duration, description, slack_message_ts) "
+                "SELECT min(id), timestamp '2024-03-05 10:00', timestamp '2024-03-05 12:00', 0, 'later', 'later' FROM ra"
+            )
+        )
+        assert ensure_timecard_partitions(conn, today=datetime.date(2024, 3, 1)) == [
+            "timecard_202403",
+            "timecard_202404",
+            "timecard_202405",
+            "timecard_202406",
+        ]
+    with partitioned_engine.connect() as conn:
+        assert conn.scalar(text(f"SELECT count(*) FROM {DEFAULT_PARTITION}")) == 0
+        assert (
+            conn.scalar(
+                text(
+                    "SELECT tableoid::regclass::text FROM timecard WHERE slack_message_ts = 'later'"
+                )
+            )
+            == "timecard_202403"
+        )
+    with sessionmaker(bind=partitioned_engine)() as sess:
+        assert not find_rollup_drifts(sess)
+
+
+def test_archive_month_partition(partitioned_engine: Engine, tmp_path):
+    with partitioned_engine.begin() as conn:
+        path = archive_month_partition(
+            conn, datetime.date(2023, 9, 1), output_dir=str(tmp_path)
+        )
+    with gzip.open(path, "rt") as dump:
+        # header and a record per day
+        assert len(dump.readlines()) == 1 + 30
+    assert os.listdir(tmp_path) == ["timecard_202309.csv.gz"]
+    with sessionmaker(bind=partitioned_engine)() as sess:
+        assert count_records(sess) == 153 - 30
+        assert not sess.scalar(
+            select(func.count())
+            .select_from(WorkingHoursRollup)
+            .where(WorkingHoursRollup.year_month == datetime.date(2023, 9, 1))
+        )
+        assert not find_rollup_drifts(sess)
@@ -0,0 +1,196 @@
+import datetime
+import logging
+
+import pytest
+from sqlalchemy import Engine, delete, func, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.migrations import schema_migration_table
+from app.db.model import TimeCard
+from app.db.partitioning import convert_timecard_to_partitioned
+from app.db.setup import prepare_schema
+from app.export import select_all_records
+from app.services.rollup import find_rollup_drifts
+from app.services.timecards import (
+    find_timecard,
+    get_user_records,
+    insert_missing_timecards,
+    record_timecard,
+    starts_within,
+    sum_working_hours,
+)
+from conftest import SLACK_USER_ID
+
+
+def work(day: int, hour: int = 9) -> dict:
+    return {
+        "start_time": datetime.datetime(2023, 11, day, hour),
+        "end_time": datetime.datetime(2023, 11, day, hour + 3),
+        "break_duration": 0,
+        "description": "analyzed dataset",
+    }
+
+
+def partition(engine: Engine) -> None:
+    with engine.begin() as conn:
+        convert_timecard_to_partitioned(
+            conn, logger=logging.getLogger("test"), today=datetime.date(2023, 11, 1)
+        )
+
+
+@pytest.mark.parametrize("partitioned", [False, True])
+def test_start_time_of_message_is_edited(engine: Engine, ra_id: int, partitioned: bool):
+    if partitioned:
+        partition(engine)
+    sessmaker = sessionmaker(bind=engine)
+    with sessmaker() as sess:
+        record_timecard(sess, ra_id=ra_id, slack_message_ts="1.1", **work(day=2))
+    with sessmaker() as sess:
+        _, is_new, previous_start_time = record_timecard(
+            sess, ra_id=ra_id, slack_message_ts="1.1", **work(day=3)
+        )
+    assert not is_new
+    assert previous_start_time == datetime.datetime(2023, 11, 2, 9)
+    with sessmaker() as sess:
+        assert find_timecard(sess, "1.1").start_time == datetime.datetime(
+            2023, 11, 3, 9
+        )
+        assert not find_rollup_drifts(sess)
+
+
+@pytest.mark.parametrize("partitioned", [False, True])
+def test_backfill_skips_message_edited_while_down(
+    engine: Engine, ra_id: int, partitioned: bool
+):
+    if partitioned:
+        partition(engine)
+    sessmaker = sessionmaker(bind=engine)
+    with sessmaker() as sess:
+        record_timecard(sess, ra_id=ra_id, slack_message_ts="1.1", **work(day=2))
+    # the message was edited to another day while the bot was down, and is read from the history with another one
+    with sessmaker() as sess:
+        added = insert_missing_timecards(
+            sess,
+            [
+                {"ra_id": ra_id, "slack_message_ts": "1.1", **work(day=3)},
+                {"ra_id": ra_id, "slack_message_ts": "1.2", **work(day=4)},
+            ],
+        )
+    assert added == 1
+    with sessmaker() as sess:
+        assert find_timecard(sess, "1.1").start_time == datetime.datetime(
+            2023, 11, 2, 9
+        )
+        assert find_timecard(sess, "1.2") is not None
+        assert not find_rollup_drifts(sess)
+
+
+def test_migration_keeps_latest_record_of_message(engine: Engine, ra_id: int):
+    # a database in version 8, to which the backfill added a second record of a message
+    with engine.begin() as conn:
+        conn.execute(
+            text("ALTER TABLE timecard DROP CONSTRAINT uq_timecard_slack_message_ts")
+        )
+        conn.execute(
+            delete(schema_migration_table).where(schema_migration_table.c.version == 9)
+        )
+    sessmaker = sessionmaker(bind=engine)
+    with sessmaker() as sess:
+        record_timecard(sess, ra_id=ra_id, slack_message_ts="1.1", **work(day=2))
+        sess.add(TimeCard(ra_id=ra_id, slack_message_ts="1.1", **work(day=3)))
+        sess.commit()
+    prepare_schema(engine)
+    with sessmaker() as sess:
+        records = sess.execute(select(TimeCard)).scalars().all()
+        assert [record.start_time for record in records] == [
+            datetime.datetime(2023, 11, 3, 9)
+        ]
+        assert not find_rollup_drifts(sess)
+
+
+FIRST_DAY = datetime.date(2023, 11, 1)
+NEXT_MONTH = datetime.date(2023, 12, 1)
+
+# work at the boundaries of 2023/11, and whether it belongs to the month
+BOUNDARY_WORK = [
+    (datetime.datetime(2023, 10, 31, 22), datetime.datetime(2023, 11, 1, 2), False),
+    (datetime.datetime(2023, 11, 1, 0), datetime.datetime(2023, 11, 1, 3), True),
+    (datetime.datetime(2023, 11, 30, 22), datetime.datetime(2023, 12, 1, 2), True),
+    (datetime.datetime(2023, 12, 1, 0), datetime.datetime(2023, 12, 1, 3), False),
+]
+
+
+def test_records_of_month_are_those_starting_within_it(engine: Engine, ra_id: int):
+    sessmaker = sessionmaker(bind=engine)
+    for i, (start_time, end_time, _) in enumerate(BOUNDARY_WORK):
+        with sessmaker() as sess:
+            record_timecard(
+                sess,
+                ra_id=ra_id,
+                start_time=start_time,
+                end_time=end_time,
+                break_duration=0,
+                description="work at the boundary",
+                slack_message_ts=f"1.{i}",
+            )
+    expected = [start for start, _, in_month in BOUNDARY_WORK if in_month]
+    with sessmaker() as sess:
+        assert (
+            sess.execute(
+                select(TimeCard.start_time)
+                .where(starts_within(FIRST_DAY, NEXT_MONTH))
+                .order_by(TimeCard.start_time)
+            )
+            .scalars()
+            .all()
+            == expected
+        )
+        # /download_csv, /admin_download_all_records and /get_working_hours agree on the records of the month
+        records = get_user_records(
+            sess,
+            slack_user_id=SLACK_USER_ID,
+            first_day=FIRST_DAY,
+            first_day_of_next_period=NEXT_MONTH,
+        )
+        assert [record.start_time for _, record in records] == expected
+        rows = sess.execute(select_all_records(FIRST_DAY, NEXT_MONTH)).all()
+        assert [row.start_time for row in rows] == expected
+        assert sum_working_hours(
+            sess,
+            slack_user_id=SLACK_USER_ID,
+            first_day=FIRST_DAY,
+            first_day_of_next_period=NEXT_MONTH,
+        ) == [("CREST", 3 * 60 + 4 * 60)]
+
+
+def test_starts_within_is_answered_by_index(engine: Engine, ra_id: int):
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO timecard (ra_id, start_time, end_time, break_duration, description, slack_message_ts) "
+                "SELECT :ra_id, hour, hour + interval '1 hour', 0, 'work', hour::text "
+                "FROM generate_series(timestamp '2023-01-01', timestamp '2023-12-31', interval '5 hours') AS hour"
+            ),
+            {"ra_id": ra_id},
+        )
+    # index-only scans need the visibility map, which is set by VACUUM
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE timecard"))
+    stmt = (
+        select(TimeCard.ra_id, func.count())
+        .where(TimeCard.ra_id == ra_id, starts_within(FIRST_DAY, NEXT_MONTH))
+        .group_by(TimeCard.ra_id)
+    )
+    with engine.connect() as conn:
+        # the table is small enough to be read sequentially, which is not what is tested here
+        conn.execute(text("SET enable_seqscan = off"))
+        conn.execute(text("SET enable_bitmapscan = off"))
+        compiled = stmt.compile(conn)
+        plan = (
+            conn.exec_driver_sql(f"EXPLAIN {compiled}", compiled.params).scalars().all()
+        )
+        assert any(
+            "Index Only Scan using ix_timecard_ra_id_start_time" in line
+            for line in plan
+        ), plan
+        assert conn.execute(stmt).one()[1] == 144